@@ -0,0 +1,22 @@
+"""Stable hashing helpers for cache keys and content fingerprints."""
+from __future__ import annotations
+
+import hashlib
+
+import orjson
+
+_DIGEST_SIZE = 16
+
+
+def content_digest(data: bytes | bytearray | memoryview) -> str:
+    """Return a compact hex digest of raw file or window content."""
+    return hashlib.blake2b(data, digest_size=_DIGEST_SIZE).hexdigest()
+
+
+def stable_key(*parts: object) -> str:
+    """Hash JSON-serialisable parts into a key that is stable across runs."""
+    payload = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(payload, digest_size=_DIGEST_SIZE).hexdigest()
+
+
+__all__ = ["content_digest", "stable_key"]
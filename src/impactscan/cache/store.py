@@ -1,6 +1,40 @@
 """Cache store abstractions used by ImpactScan."""
 from __future__ import annotations
 
+import asyncio
+import importlib
+import importlib.util
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol, Self, cast
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters for one cache namespace."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counters in the shape used by :class:`ImpactRunSummary`."""
+        return {"hits": self.hits, "misses": self.misses}
 
 
 class CacheStore:
@@ -22,9 +56,358 @@ class CacheStore:
         msg = "CacheStore.set is not yet implemented."
         raise NotImplementedError(msg)
 
+    async def aget(self, namespace: str, key: str) -> bytes | None:
+        """Retrieve a cached value from async code; blocking stores override this."""
+        return self.get(namespace, key)
+
+    async def aset(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl_sec: int | None = None,
+    ) -> None:
+        """Store a cached value from async code; blocking stores override this."""
+        self.set(namespace, key, value, ttl_sec)
+
+    def close(self) -> None:
+        """Release connections or other resources; the default holds none."""
+
+
+class MemoryCacheStore(CacheStore):
+    """Process-local cache kept in a dictionary."""
+
+    def __init__(self) -> None:
+        """Create an empty store."""
+        self._entries: dict[tuple[str, str], tuple[bytes, float | None]] = {}
+
+    def get(self, namespace: str, key: str) -> bytes | None:
+        """Retrieve a cached value, dropping it if it has expired."""
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[namespace, key]
+            return None
+        return value
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl_sec: int | None = None,
+    ) -> None:
+        """Store a cached value with an optional time to live."""
+        expires_at = None if ttl_sec is None else time.monotonic() + ttl_sec
+        self._entries[namespace, key] = (value, expires_at)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    codec INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+_CODEC_RAW = 0
+_CODEC_ZSTD = 1
+DEFAULT_COMPRESS_MIN_BYTES = 4096
+DEFAULT_WRITE_BATCH = 512
+EVICT_TO_FRACTION = 0.9
+"""Eviction frees space down to this fraction of ``max_bytes``, so it does not run on every write."""
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+
+class _Decompressor(Protocol):
+    def decompress(self, data: bytes) -> bytes: ...
+
+
+@dataclass(frozen=True)
+class _Write:
+    namespace: str
+    key: str
+    value: bytes | None  # None deletes the entry, only if it has expired by expires_at.
+    codec: int = _CODEC_RAW
+    expires_at: float | None = None
+
 
 class SQLiteCacheStore(CacheStore):
-    """SQLite-backed cache implementation."""
+    """Persistent cache in a SQLite database in WAL mode.
+
+    Reads use one connection per thread and never wait for writers. Writes
+    are queued to a background thread that commits them in groups, so
+    ``set`` on a hot path neither blocks on the database nor pays for a
+    commit of its own; queued values are visible to ``get`` immediately.
+
+    Expired entries read as missing and are deleted lazily. With
+    ``max_bytes`` set, the least recently read entries are evicted once the
+    stored values exceed it; reads are recorded in memory and written with
+    the next batch rather than one update per hit. Values of at least
+    ``compress_min_bytes`` are zstd-compressed when the optional
+    ``zstandard`` package (the ``cache`` extra) is installed; zstd contexts
+    are not thread-safe, so each thread keeps its own.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        max_bytes: int | None = None,
+        compress_min_bytes: int | None = DEFAULT_COMPRESS_MIN_BYTES,
+        write_batch: int = DEFAULT_WRITE_BATCH,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Open or create the database at ``path`` and start the writer thread.
+
+        Expiry uses wall-clock ``clock`` time, since entries outlive the process.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.write_batch = write_batch
+        self._clock = clock
+        self.compress_min_bytes = compress_min_bytes
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str], _Write] = {}
+        self._touched: set[tuple[str, str]] = set()
+        self._queue: queue.Queue[_Write | None] = queue.Queue()
+        self._closed = False
+        writer = self._connect()
+        writer.executescript(_SCHEMA)
+        self.total_bytes = int(writer.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0])
+        self._writer = threading.Thread(target=self._write_loop, args=(writer,), name="cache-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    def _codecs(self) -> tuple[_Compressor, _Decompressor] | None:
+        codecs: tuple[_Compressor, _Decompressor] | None = getattr(self._local, "codecs", None)
+        if codecs is None and ZSTD_AVAILABLE:
+            codecs = self._local.codecs = _zstd_codecs()
+        return codecs
+
+    def get(self, namespace: str, key: str) -> bytes | None:
+        """Return the value, including writes still queued; expired entries read as missing."""
+        now = self._clock()
+        with self._lock:
+            pending = self._pending.get((namespace, key))
+        if pending is not None:
+            if pending.value is None or (pending.expires_at is not None and pending.expires_at <= now):
+                return None
+            return self._decode(pending.value, pending.codec)
+        row = (
+            self._reader()
+            .execute("SELECT value, codec, expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        value, codec, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            if not self._closed:
+                # A set() racing with this read must win over the lazy delete.
+                self._enqueue(_Write(namespace, key, None, expires_at=now), replace=False)
+            return None
+        if self.max_bytes is not None:
+            with self._lock:
+                self._touched.add((namespace, key))
+        return self._decode(value, codec)
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl_sec: int | None = None,
+    ) -> None:
+        """Queue a write; it becomes durable with the writer's next group commit."""
+        codec = _CODEC_RAW
+        codecs = self._codecs() if self._compresses(value) else None
+        if codecs is not None:
+            compressed = codecs[0].compress(value)
+            if len(compressed) < len(value):
+                value, codec = compressed, _CODEC_ZSTD
+        expires_at = None if ttl_sec is None else self._clock() + ttl_sec
+        self._enqueue(_Write(namespace, key, value, codec, expires_at))
+
+    async def aget(self, namespace: str, key: str) -> bytes | None:
+        """Read in a worker thread so the event loop never waits on the database."""
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aset(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl_sec: int | None = None,
+    ) -> None:
+        """Queue a write; compression of large values runs in a worker thread."""
+        if self._compresses(value):
+            await asyncio.to_thread(self.set, namespace, key, value, ttl_sec)
+        else:
+            self.set(namespace, key, value, ttl_sec)
+
+    def _compresses(self, value: bytes) -> bool:
+        return ZSTD_AVAILABLE and self.compress_min_bytes is not None and len(value) >= self.compress_min_bytes
+
+    def _decode(self, value: bytes, codec: int) -> bytes | None:
+        if codec == _CODEC_RAW:
+            return value
+        codecs = self._codecs() if codec == _CODEC_ZSTD else None
+        if codecs is not None:
+            return codecs[1].decompress(value)
+        return None
+
+    def _enqueue(self, write: _Write, *, replace: bool = True) -> None:
+        """Queue ``write``; with ``replace=False`` it is dropped if a write to the same key is pending."""
+        if self._closed:
+            msg = "SQLiteCacheStore is closed"
+            raise RuntimeError(msg)
+        with self._lock:
+            if not replace and (write.namespace, write.key) in self._pending:
+                return
+            self._pending[write.namespace, write.key] = write
+            # Queued under the lock so the writer commits in the order ``_pending`` saw.
+            self._queue.put(write)
+
+    def _write_loop(self, connection: sqlite3.Connection) -> None:
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.write_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            writes = [write for write in batch if write is not None]
+            stop = len(writes) < len(batch)
+            try:
+                self._commit(connection, writes)
+            except sqlite3.Error:
+                logger.exception("Failed to write %d cache entries to %s", len(writes), self.path)
+            finally:
+                with self._lock:
+                    for write in writes:
+                        if self._pending.get((write.namespace, write.key)) is write:
+                            del self._pending[write.namespace, write.key]
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _commit(self, connection: sqlite3.Connection, writes: list[_Write]) -> None:
+        now = self._clock()
+        with self._lock:
+            touched, self._touched = self._touched, set()
+        connection.execute("BEGIN")
+        try:
+            for write in writes:
+                row = connection.execute(
+                    "SELECT size, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                    (write.namespace, write.key),
+                ).fetchone()
+                if write.value is None:
+                    # Lazy expiry: an entry rewritten since it was read as expired is kept.
+                    size, expires_at = row if row is not None else (0, None)
+                    if expires_at is not None and write.expires_at is not None and expires_at <= write.expires_at:
+                        connection.execute(
+                            "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                            (write.namespace, write.key),
+                        )
+                        self.total_bytes -= size
+                    continue
+                self.total_bytes -= row[0] if row is not None else 0
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (write.namespace, write.key, write.value, write.codec, len(write.value), write.expires_at, now),
+                )
+                self.total_bytes += len(write.value)
+            connection.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                [(now, namespace, key) for namespace, key in touched],
+            )
+            if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+                self._evict(connection, int(self.max_bytes * EVICT_TO_FRACTION))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            self.total_bytes = int(connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0])
+            raise
+
+    def _evict(self, connection: sqlite3.Connection, target: int) -> None:
+        victims: list[tuple[str, str]] = []
+        rows = connection.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at")
+        for namespace, key, size in rows:
+            if self.total_bytes <= target:
+                break
+            victims.append((namespace, key))
+            self.total_bytes -= size
+        connection.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Commit queued writes, stop the writer and close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def __enter__(self) -> Self:
+        """Return the store itself."""
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        """Close the store."""
+        self.close()
+
+
+def _zstd_codecs() -> tuple[_Compressor, _Decompressor]:
+    """Return new zstd compressor and decompressor objects; requires ``zstandard``."""
+    zstandard = importlib.import_module("zstandard")
+    return cast("_Compressor", zstandard.ZstdCompressor()), cast("_Decompressor", zstandard.ZstdDecompressor())
 
 
-__all__ = ["CacheStore", "SQLiteCacheStore"]
+__all__ = [
+    "DEFAULT_COMPRESS_MIN_BYTES",
+    "DEFAULT_WRITE_BATCH",
+    "EVICT_TO_FRACTION",
+    "ZSTD_AVAILABLE",
+    "CacheStats",
+    "CacheStore",
+    "MemoryCacheStore",
+    "SQLiteCacheStore",
+]
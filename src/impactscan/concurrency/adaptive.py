@@ -0,0 +1,308 @@
+"""Adaptive concurrency control for LLM requests.
+
+A fixed ``AnalysisConfig.parallelism`` is either too low and wastes quota or
+too high and triggers bursts of 429 responses, and the right level drifts
+with provider load. :class:`AdaptiveConcurrencyLimiter` finds it at run time
+with AIMD: the limit grows while requests succeed at a stable latency and is
+cut multiplicatively on throttling, timeouts or latency inflation. The
+configured ``parallelism`` is only the ceiling.
+
+Latency inflation is judged against a baseline, a low percentile (the median
+by default) of recent successful latencies, so the limiter backs off when
+queueing sets in at the provider rather than waiting for it to start
+rejecting requests. A percentile rather than the minimum keeps a few tiny
+requests from pinning the baseline and making every ordinary one look slow.
+One limiter is shared by every model of a run, so baselines are kept per
+latency key (the model): a large model's ordinary latency is not congestion
+by the small model's standard.
+
+The adapters retry 429 responses themselves, so a request can be throttled
+several times and still succeed. :class:`AdaptiveConcurrencyClient` listens
+for those retried attempts through
+:func:`~impactscan.llm.http.observe_throttling` and reports them to the
+limiter as they happen. It also takes its latency samples from
+:func:`~impactscan.llm.http.observe_latency` when the wrapped client reports
+round trips, so the adapter's own rate limiter waits and retry backoff do
+not read as provider latency.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Literal
+
+from impactscan.errors import RateLimitExceededError
+from impactscan.llm.http import observe_latency, observe_throttling
+from impactscan.models import ConcurrencyChange
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from impactscan.config import AnalysisConfig
+    from impactscan.llm.client import LLMClient, LLMResponse, Message
+
+Outcome = Literal["ok", "throttled", "timeout", "error"]
+
+DEFAULT_BACKOFF = 0.5
+DEFAULT_LATENCY_TOLERANCE = 2.0
+DEFAULT_BASELINE_PERCENTILE = 0.5
+BASELINE_SAMPLES = 64
+MIN_BASELINE_SAMPLES = 4
+DEFAULT_LATENCY_KEY = "default"
+
+
+@dataclass(frozen=True)
+class Permit:
+    """One admitted request, remembering when it started, the limiter epoch it started in and its latency key."""
+
+    epoch: int
+    started: float
+    key: str = DEFAULT_LATENCY_KEY
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on in-flight requests between ``min_limit`` and ``max_limit``.
+
+    The limit starts at ``initial_limit`` and, until the first congestion
+    signal, grows by one per success (doubling per round trip, as in TCP slow
+    start); afterwards it grows by ``1 / limit`` per success, about one per
+    round trip. A congestion signal multiplies it by ``backoff``. Requests
+    that were already in flight when the limit was cut report the same
+    congestion again, so only signals from requests admitted after the last
+    cut (a newer epoch) lower it further.
+
+    Latency baselines are kept per ``key`` given to :meth:`acquire`, while
+    the limit is shared. Waiters are admitted in arrival order.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        *,
+        min_limit: int = 1,
+        initial_limit: int | None = None,
+        backoff: float = DEFAULT_BACKOFF,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        baseline_percentile: float = DEFAULT_BASELINE_PERCENTILE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Configure the bounds; ``initial_limit`` defaults to ``min_limit``."""
+        if not 1 <= min_limit <= max_limit:
+            msg = f"Concurrency bounds must satisfy 1 <= min_limit <= max_limit, got {min_limit} and {max_limit}"
+            raise ValueError(msg)
+        if not 0.0 <= baseline_percentile <= 1.0:
+            msg = f"baseline_percentile must lie in [0, 1], got {baseline_percentile}"
+            raise ValueError(msg)
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.baseline_percentile = baseline_percentile
+        self._clock = clock
+        self._started = clock()
+        initial = initial_limit if initial_limit is not None else min_limit
+        self._limit = float(min(max_limit, max(min_limit, initial)))
+        self._slow_start = True
+        self._epoch = 0
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._latencies: dict[str, deque[float]] = {}
+        self.history: list[ConcurrencyChange] = []
+        self._record("start")
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a permit."""
+        return self._in_flight
+
+    def baseline_latency(self, key: str = DEFAULT_LATENCY_KEY) -> float | None:
+        """``baseline_percentile`` of recent successful latencies of ``key``, once enough exist to trust it."""
+        latencies = self._latencies.get(key, ())
+        if len(latencies) < MIN_BASELINE_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[int(self.baseline_percentile * (len(ordered) - 1))]
+
+    async def acquire(self, key: str = DEFAULT_LATENCY_KEY) -> Permit:
+        """Wait until fewer than ``limit`` requests are in flight and take a slot; ``key`` selects the baseline."""
+        if self._waiters or self._in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before cancellation; pass it on.
+                    self._in_flight -= 1
+                    self._wake()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        else:
+            self._in_flight += 1
+        return Permit(self._epoch, self._clock(), key)
+
+    def release(self, permit: Permit, outcome: Outcome, *, latency: float | None = None) -> None:
+        """Free the permit's slot and adapt the limit to how its request went.
+
+        ``latency`` is the request's own duration when known; otherwise the
+        time since the permit was taken is used. ``error`` outcomes (failures
+        unrelated to load) leave the limit alone.
+        """
+        self._in_flight -= 1
+        if outcome == "ok":
+            self._on_success(latency if latency is not None else self._clock() - permit.started, permit)
+        elif outcome != "error":
+            self._on_congestion(permit, outcome)
+        self._wake()
+
+    def throttled(self, permit: Permit) -> None:
+        """Cut the limit for a request that is still in flight but was just throttled, e.g. before a retry."""
+        self._on_congestion(permit, "throttled")
+
+    def _on_success(self, latency: float, permit: Permit) -> None:
+        baseline = self.baseline_latency(permit.key)
+        self._latencies.setdefault(permit.key, deque(maxlen=BASELINE_SAMPLES)).append(latency)
+        if baseline is not None and latency > baseline * self.latency_tolerance:
+            self._on_congestion(permit, "latency")
+            return
+        if self._limit >= self.max_limit:
+            return
+        before = self.limit
+        self._limit = min(float(self.max_limit), self._limit + (1.0 if self._slow_start else 1.0 / self._limit))
+        if self.limit != before:
+            self._record("increase")
+
+    def _on_congestion(self, permit: Permit, reason: Literal["throttled", "timeout", "latency"]) -> None:
+        self._slow_start = False
+        if permit.epoch != self._epoch:
+            return
+        self._epoch += 1
+        before = self.limit
+        self._limit = max(float(self.min_limit), float(int(self._limit * self.backoff)))
+        if self.limit != before:
+            self._record(reason)
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _record(self, reason: Literal["start", "increase", "throttled", "timeout", "latency"]) -> None:
+        self.history.append(
+            ConcurrencyChange(elapsed_sec=max(0.0, self._clock() - self._started), limit=self.limit, reason=reason),
+        )
+
+    def summary(self) -> dict[str, Any]:
+        """Return the ``ImpactRunSummary`` fields describing this limiter."""
+        return {"concurrency_limit": self.limit, "concurrency_history": list(self.history)}
+
+
+class AdaptiveConcurrencyClient:
+    """:class:`~impactscan.llm.client.LLMClient` wrapper that admits calls through an adaptive limiter.
+
+    :class:`~impactscan.errors.RateLimitExceededError` and timeouts (including
+    ``timeout``, when set) count as congestion; other exceptions release the
+    slot without changing the limit. Exceptions always propagate. Throttled
+    attempts that the wrapped client retries count as congestion as soon as
+    they happen, and the eventual success is not used as a latency sample.
+
+    Latencies are compared per ``key``, falling back to each call's
+    ``model_hint``; give every model sharing a limiter its own key. The
+    sample is the last round trip the wrapped client reported, or the whole
+    call for clients that report none.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        limiter: AdaptiveConcurrencyLimiter,
+        *,
+        key: str | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        """Wrap ``client``."""
+        self.client = client
+        self.limiter = limiter
+        self.key = key
+        self.timeout = timeout
+
+    async def chat(
+        self,
+        messages: list[Message],
+        *,
+        response_format: dict[str, Any] | None = None,
+        tools: list[dict[str, Any]] | None = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        model_hint: str | None = None,
+    ) -> LLMResponse:
+        """Wait for a slot, send the request and report its outcome to the limiter."""
+        permit = await self.limiter.acquire(self.key or model_hint or DEFAULT_LATENCY_KEY)
+        outcome: Outcome = "error"
+        retried_throttle = False
+        latency: float | None = None
+
+        def on_throttled(_exc: RateLimitExceededError) -> None:
+            nonlocal retried_throttle
+            retried_throttle = True
+            self.limiter.throttled(permit)
+
+        def on_latency(seconds: float) -> None:
+            nonlocal latency
+            latency = seconds
+
+        try:
+            with observe_throttling(on_throttled), observe_latency(on_latency):
+                call = self.client.chat(
+                    messages,
+                    response_format=response_format,
+                    tools=tools,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    model_hint=model_hint,
+                )
+                response = await asyncio.wait_for(call, self.timeout)
+        except RateLimitExceededError:
+            outcome = "throttled"
+            raise
+        except TimeoutError:
+            outcome = "timeout"
+            raise
+        else:
+            outcome = "throttled" if retried_throttle else "ok"
+            return response
+        finally:
+            self.limiter.release(permit, outcome, latency=latency)
+
+
+def build_concurrency_limiter(
+    config: AnalysisConfig,
+    *,
+    clock: Callable[[], float] = time.monotonic,
+) -> AdaptiveConcurrencyLimiter:
+    """Return a limiter whose ceiling is the configured ``parallelism``."""
+    return AdaptiveConcurrencyLimiter(config.parallelism, clock=clock)
+
+
+__all__ = [
+    "BASELINE_SAMPLES",
+    "DEFAULT_BACKOFF",
+    "DEFAULT_BASELINE_PERCENTILE",
+    "DEFAULT_LATENCY_KEY",
+    "DEFAULT_LATENCY_TOLERANCE",
+    "AdaptiveConcurrencyClient",
+    "AdaptiveConcurrencyLimiter",
+    "Outcome",
+    "Permit",
+    "build_concurrency_limiter",
+]
@@ -0,0 +1,140 @@
+"""Consume async iterators from synchronous code.
+
+:func:`iterate_in_thread` runs an async iterator on a private event loop in
+a background thread and hands its items to the calling thread through a
+bounded buffer, so synchronous callers stream results lazily while the
+async side keeps all of its concurrency. The producer waits whenever
+``max_buffered`` items are unread. Closing the returned iterator early
+cancels the producer and waits for it to unwind, so in-flight work such as
+LLM requests is abandoned promptly; errors raised by the producer are
+re-raised in the caller's thread. The wait is bounded: a producer that does
+not unwind within ``join_timeout`` is logged and left to its daemon thread
+rather than hanging the caller.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterator
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BUFFERED = 64
+DEFAULT_JOIN_TIMEOUT_SEC = 30.0
+
+
+@dataclass(frozen=True)
+class _Failure:
+    error: Exception
+
+
+class _Done:
+    pass
+
+
+_DONE = _Done()
+
+
+class _Producer(Generic[T]):  # noqa: UP046
+    """Drives the async iterator on the background loop."""
+
+    def __init__(self, make: Callable[[], AsyncIterator[T]], max_buffered: int) -> None:
+        self.make = make
+        self.max_buffered = max_buffered
+        self.items: queue.SimpleQueue[T | _Failure | _Done] = queue.SimpleQueue()
+        self.started = threading.Event()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.task: asyncio.Task[None] | None = None
+        self.slots: asyncio.Semaphore | None = None
+
+    def run(self) -> None:
+        # Cancellation means the consumer has gone, so there is nobody left to tell.
+        with contextlib.suppress(asyncio.CancelledError):
+            asyncio.run(self._produce())
+
+    async def _produce(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.slots = slots = asyncio.Semaphore(self.max_buffered)
+        self.started.set()
+        iterator = self.make()
+        try:
+            async for item in iterator:
+                await slots.acquire()
+                self.items.put(item)
+        except Exception as exc:  # handed to the consumer, which re-raises it
+            self.items.put(_Failure(exc))
+        else:
+            self.items.put(_DONE)
+        finally:
+            # Run the iterator's cleanup (e.g. stopping ripgrep) on this loop, before it closes.
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def consumed(self) -> None:
+        """Free one buffer slot; called from the consumer's thread."""
+        if self.loop is not None and self.slots is not None:
+            self._call_soon(self.slots.release)
+
+    def cancel(self) -> None:
+        """Cancel the producer; called from the consumer's thread."""
+        self.started.wait()
+        if self.task is not None:
+            self._call_soon(self.task.cancel)
+
+    def _call_soon(self, callback: Callable[[], object]) -> None:
+        loop = self.loop
+        if loop is None:
+            return
+        # A RuntimeError means the loop has already finished; there is nothing left to notify.
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(callback)
+
+
+def iterate_in_thread(  # noqa: UP047
+    make: Callable[[], AsyncIterator[T]],
+    *,
+    max_buffered: int = DEFAULT_MAX_BUFFERED,
+    name: str = "impactscan-loop",
+    join_timeout: float | None = DEFAULT_JOIN_TIMEOUT_SEC,
+) -> Iterator[T]:
+    """Yield the items of ``make()``, which runs on an event loop in a background thread.
+
+    The thread starts on the first ``next()``. Leaving the loop early (or
+    closing the iterator) cancels the async iterator and joins the thread,
+    for at most ``join_timeout`` seconds (``None`` waits indefinitely).
+    """
+    if max_buffered < 1:
+        msg = "max_buffered must be at least 1"
+        raise ValueError(msg)
+    producer = _Producer(make, max_buffered)
+    thread = threading.Thread(target=producer.run, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = producer.items.get()
+            if isinstance(item, _Done):
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            producer.consumed()
+            yield item
+    finally:
+        if thread.is_alive():
+            producer.cancel()
+        thread.join(join_timeout)
+        if thread.is_alive():
+            logger.warning("%s did not stop within %s seconds of being cancelled; abandoning it", name, join_timeout)
+
+
+__all__ = ["DEFAULT_JOIN_TIMEOUT_SEC", "DEFAULT_MAX_BUFFERED", "iterate_in_thread"]
@@ -0,0 +1,246 @@
+"""Hedged LLM requests.
+
+A run's wall clock is often set by the slowest few calls rather than the
+typical one. :class:`HedgedClient` tracks the latency distribution of each
+model and, when a call is still running past a chosen percentile, sends a
+duplicate and keeps whichever answer arrives first; the other is cancelled.
+Hedges are optional traffic: they are only sent while they stay under a
+fraction of all calls and the rate limiter has capacity for them right now.
+
+Only the latencies of calls that finish unhedged are fully observed. When a
+hedge wins, the primary's elapsed time is recorded as a lower bound on its
+latency; recording the hedge's own, shorter latency instead would drop the
+slow tail from the distribution and lower the threshold with every win.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any
+
+from impactscan.concurrency.limiter import DEFAULT_COMPLETION_RESERVE
+from impactscan.llm.tokens import ApproxTokenCounter
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine, Sequence
+
+    from impactscan.concurrency.limiter import RateLimiter, Reservation
+    from impactscan.config import AnalysisConfig
+    from impactscan.llm.client import LLMClient, LLMResponse, Message
+    from impactscan.llm.tokens import TokenCounter
+
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_MAX_HEDGE_FRACTION = 0.05
+TAIL_PERCENTILE = 0.99
+LATENCY_SAMPLES = 1024
+MIN_LATENCY_SAMPLES = 20
+_DEFAULT_MODEL = "default"
+
+
+class LatencyTracker:
+    """Recent successful call latencies per model, with nearest-rank percentiles."""
+
+    def __init__(self, *, samples: int = LATENCY_SAMPLES, min_samples: int = MIN_LATENCY_SAMPLES) -> None:
+        """Keep the last ``samples`` latencies per model; percentiles need ``min_samples``."""
+        self.samples = samples
+        self.min_samples = min_samples
+        self._latencies: dict[str, deque[float]] = {}
+        self._sorted: dict[str, list[float]] = {}
+
+    def record(self, model: str, latency: float) -> None:
+        """Add one observed latency."""
+        self._latencies.setdefault(model, deque(maxlen=self.samples)).append(latency)
+        self._sorted.pop(model, None)
+
+    def percentile(self, model: str, quantile: float) -> float | None:
+        """Return the ``quantile`` latency of ``model``, or ``None`` until enough calls were seen."""
+        latencies = self._latencies.get(model)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        ordered = self._sorted.get(model)
+        if ordered is None:
+            ordered = self._sorted[model] = sorted(latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(quantile * len(ordered)) - 1))]
+
+
+class HedgedClient:
+    """:class:`~impactscan.llm.client.LLMClient` wrapper that hedges calls slower than a latency percentile.
+
+    Latencies are tracked per ``model_hint``. Once a model has enough
+    samples, a call still running after its ``percentile`` latency gets a
+    duplicate if hedges stay within ``max_hedge_fraction`` of calls and
+    ``limiter`` can reserve the duplicate without waiting. The first
+    successful answer wins; the call fails only if both attempts fail, with
+    the first attempt's error. A hedge's reservation is reconciled with its
+    usage when it answers, and reduced to the prompt estimate when it is
+    cancelled, since no completion was generated for it.
+
+    Give ``limiter`` when the wrapped client does not reserve capacity
+    itself, e.g. with this client between a
+    :class:`~impactscan.concurrency.limiter.RateLimitedClient` and the
+    provider adapter; without it, hedges are charged by whatever limiter
+    the wrapped client uses.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        *,
+        limiter: RateLimiter | None = None,
+        counter: TokenCounter | None = None,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        max_hedge_fraction: float = DEFAULT_MAX_HEDGE_FRACTION,
+        tracker: LatencyTracker | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Wrap ``client``."""
+        if not 0.0 < percentile < 1.0:
+            msg = f"Hedge percentile must be between 0 and 1, got {percentile}"
+            raise ValueError(msg)
+        self.client = client
+        self.limiter = limiter
+        self.counter = counter if counter is not None else ApproxTokenCounter()
+        self.percentile = percentile
+        self.max_hedge_fraction = max_hedge_fraction
+        self.tracker = tracker if tracker is not None else LatencyTracker()
+        self._clock = clock
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latency_saved_sec = 0.0
+
+    @property
+    def hedge_rate(self) -> float:
+        """Fraction of calls that sent a hedge."""
+        return self.hedges / self.calls if self.calls else 0.0
+
+    async def chat(
+        self,
+        messages: list[Message],
+        *,
+        response_format: dict[str, Any] | None = None,
+        tools: list[dict[str, Any]] | None = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        model_hint: str | None = None,
+    ) -> LLMResponse:
+        """Send the request, hedging it if it runs past the latency percentile."""
+        model = model_hint or _DEFAULT_MODEL
+        self.calls += 1
+
+        def attempt() -> Coroutine[Any, Any, LLMResponse]:
+            return self.client.chat(
+                messages,
+                response_format=response_format,
+                tools=tools,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                model_hint=model_hint,
+            )
+
+        started = self._clock()
+        primary = asyncio.ensure_future(attempt())
+        tasks = [primary]
+        reservation: Reservation | None = None
+        prompt = 0
+        try:
+            threshold = self.tracker.percentile(model, self.percentile)
+            if threshold is not None:
+                await asyncio.wait(tasks, timeout=threshold)
+            if threshold is None or primary.done() or not self._may_hedge():
+                return await self._unhedged(primary, model, started)
+            if self.limiter is not None:
+                prompt = self.counter.count_prompt(messages)
+                completion = max_tokens if max_tokens is not None else DEFAULT_COMPLETION_RESERVE
+                reservation = self.limiter.try_acquire(prompt + completion)
+                if reservation is None:
+                    return await self._unhedged(primary, model, started)
+            self.hedges += 1
+            tasks.append(asyncio.ensure_future(attempt()))
+            winner = await _first_success(tasks)
+            response = winner.result()
+            elapsed = self._clock() - started
+            if winner is not primary:
+                self.hedge_wins += 1
+                tail = self.tracker.percentile(model, TAIL_PERCENTILE) or 0.0
+                self.latency_saved_sec += max(0.0, tail - elapsed)
+            # When the hedge won this is only a lower bound on the primary's latency.
+            self.tracker.record(model, elapsed)
+            return response
+        finally:
+            for task in tasks:
+                task.cancel()
+            if reservation is not None:
+                _settle(reservation, tasks[1], prompt)
+
+    async def _unhedged(self, primary: asyncio.Future[LLMResponse], model: str, started: float) -> LLMResponse:
+        response = await primary
+        self.tracker.record(model, self._clock() - started)
+        return response
+
+    def _may_hedge(self) -> bool:
+        return self.hedges + 1 <= self.max_hedge_fraction * self.calls
+
+    def summary(self) -> dict[str, Any]:
+        """Return the ``ImpactRunSummary`` fields describing hedging.
+
+        The latency saved is an estimate: for each call won by its hedge, how
+        much sooner it finished than the model's tracked p99 latency.
+        """
+        return {"hedge_rate": self.hedge_rate, "hedge_latency_saved_sec": self.latency_saved_sec}
+
+
+def _settle(reservation: Reservation, hedge: asyncio.Future[LLMResponse], prompt: int) -> None:
+    """Reconcile a hedge's reservation: with its usage if it answered, else down to its prompt if it was cancelled.
+
+    A hedge that failed keeps its reservation, like any failed call.
+    """
+    if hedge.done() and not hedge.cancelled():
+        if hedge.exception() is None:
+            reservation.reconcile_usage(hedge.result().get("usage"))
+        return
+    reservation.reconcile(prompt)
+
+
+async def _first_success(tasks: Sequence[asyncio.Future[LLMResponse]]) -> asyncio.Future[LLMResponse]:
+    """Return the first task to succeed or, once all have failed, the first task, whose error ``result()`` raises."""
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in sorted(done, key=tasks.index):
+            if task.exception() is None:
+                return task
+    return tasks[0]
+
+
+def build_hedged_client(
+    client: LLMClient,
+    config: AnalysisConfig,
+    *,
+    limiter: RateLimiter | None = None,
+    counter: TokenCounter | None = None,
+) -> LLMClient:
+    """Wrap ``client`` for hedging when ``config.hedge_percentile`` is set, else return it unchanged."""
+    if config.hedge_percentile is None:
+        return client
+    return HedgedClient(
+        client,
+        limiter=limiter,
+        counter=counter,
+        percentile=config.hedge_percentile,
+        max_hedge_fraction=config.hedge_max_fraction,
+    )
+
+
+__all__ = [
+    "DEFAULT_HEDGE_PERCENTILE",
+    "DEFAULT_MAX_HEDGE_FRACTION",
+    "LATENCY_SAMPLES",
+    "MIN_LATENCY_SAMPLES",
+    "TAIL_PERCENTILE",
+    "HedgedClient",
+    "LatencyTracker",
+    "build_hedged_client",
+]
@@ -1,19 +1,224 @@
 """Concurrency utilities such as rate limiters."""
 from __future__ import annotations
 
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Mapping
+
+    from impactscan.llm.client import LLMClient, LLMResponse, Message
+    from impactscan.llm.tokens import TokenCounter
+
+    Clock = Callable[[], float]
+    Sleep = Callable[[float], Awaitable[None]]
+
+DEFAULT_COMPLETION_RESERVE = 512
+"""Completion tokens reserved for requests that do not set ``max_tokens``."""
+_EPSILON = 1e-6
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to ``per_minute`` units.
+
+    The level may go negative when a reservation is reconciled upwards; the
+    debt is repaid by refill before anyone else is admitted.
+    """
+
+    def __init__(self, per_minute: int, now: float) -> None:
+        """Start full at time ``now``."""
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        """Add what accrued since the last update, up to capacity."""
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available, assuming no other withdrawals."""
+        deficit = min(amount, self.capacity) - self.level
+        # Refill arithmetic leaves rounding residue; waiting it out could stall on a clock that cannot advance by it.
+        return deficit / self.rate if deficit > _EPSILON else 0.0
+
+
+@dataclass
+class Reservation:
+    """Capacity granted by :meth:`RateLimiter.acquire`, to be reconciled with actual usage."""
+
+    limiter: RateLimiter
+    tokens: int
+    settled: bool = False
+
+    def reconcile(self, actual_tokens: int) -> None:
+        """Charge or refund the difference between the reserved and the actual token count."""
+        if self.settled:
+            return
+        self.settled = True
+        self.limiter.adjust(actual_tokens - self.tokens)
+
+    def reconcile_usage(self, usage: Mapping[str, Any] | None) -> None:
+        """Reconcile against an ``LLMResponse["usage"]`` mapping; missing usage keeps the reservation."""
+        if not usage:
+            self.settled = True
+            return
+        total = usage.get("total_tokens")
+        if total is None:
+            total = int(usage.get("prompt_tokens", 0) or 0) + int(usage.get("completion_tokens", 0) or 0)
+        self.reconcile(int(total))
+
 
 class RateLimiter:
-    """Placeholder rate limiter implementation."""
+    """Async limiter enforcing requests-per-minute and tokens-per-minute together.
 
-    def __init__(self, *, rpm_limit: int | None = None, tpm_limit: int | None = None) -> None:
+    Each limit is a token bucket that starts full and refills continuously.
+    Callers are admitted strictly in arrival order: one waiter at a time
+    holds an :class:`asyncio.Lock` (which is FIFO) and sleeps until both
+    buckets can cover its request, so a refill wakes exactly one task rather
+    than every waiter. Token reservations are estimates; reconciling them
+    with reported usage charges or refunds the difference.
+
+    One instance should be shared by every client talking to the same
+    deployment, since the provider enforces its limits per deployment.
+    ``clock`` and ``sleep`` are injectable for deterministic tests.
+    """
+
+    def __init__(
+        self,
+        *,
+        rpm_limit: int | None = None,
+        tpm_limit: int | None = None,
+        clock: Clock = time.monotonic,
+        sleep: Sleep = asyncio.sleep,
+    ) -> None:
         """Store rate limit configuration."""
         self.rpm_limit = rpm_limit
         self.tpm_limit = tpm_limit
+        self._clock = clock
+        self._sleep = sleep
+        now = clock()
+        self._requests = TokenBucket(rpm_limit, now) if rpm_limit is not None else None
+        self._tokens = TokenBucket(tpm_limit, now) if tpm_limit is not None else None
+        self._lock = asyncio.Lock()
+        self.waited_sec = 0.0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.refill(now)
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = self._requests.wait_time(1) if self._requests is not None else 0.0
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_time(tokens))
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> Reservation:
+        """Wait for capacity for one request of ``tokens`` estimated tokens and reserve it.
+
+        Requests larger than ``tpm_limit`` are clamped to it, so they wait for
+        a full bucket instead of forever.
+        """
+        if self.tpm_limit is not None:
+            tokens = min(tokens, self.tpm_limit)
+        async with self._lock:
+            self._refill()
+            while (wait := self._wait_time(tokens)) > 0:
+                self.waited_sec += wait
+                await self._sleep(wait)
+                self._refill()
+            return self._take(tokens)
+
+    def try_acquire(self, tokens: int = 0) -> Reservation | None:
+        """Reserve capacity only if it is free right now and nobody is waiting for it.
+
+        For optional traffic, such as hedged requests, that should never
+        queue ahead of or behind regular requests.
+        """
+        if self.tpm_limit is not None:
+            tokens = min(tokens, self.tpm_limit)
+        if self._lock.locked():
+            return None
+        self._refill()
+        if self._wait_time(tokens) > 0:
+            return None
+        return self._take(tokens)
+
+    def _take(self, tokens: int) -> Reservation:
+        if self._requests is not None:
+            self._requests.level -= 1
+        if self._tokens is not None:
+            self._tokens.level -= tokens
+        return Reservation(self, tokens)
+
+    def adjust(self, tokens: int) -> None:
+        """Withdraw ``tokens`` more from the token bucket, or return them when negative."""
+        if self._tokens is not None:
+            self._refill()
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level - tokens)
+
+
+class RateLimitedClient:
+    """:class:`~impactscan.llm.client.LLMClient` wrapper that admits calls through a shared limiter.
+
+    The reservation is the prompt estimate plus ``max_tokens`` (or
+    :data:`DEFAULT_COMPLETION_RESERVE`), reconciled with the response's usage.
+    A failed call keeps its reservation, since providers usually count it.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        limiter: RateLimiter,
+        counter: TokenCounter,
+        *,
+        completion_reserve: int = DEFAULT_COMPLETION_RESERVE,
+    ) -> None:
+        """Wrap ``client``."""
+        self.client = client
+        self.limiter = limiter
+        self.counter = counter
+        self.completion_reserve = completion_reserve
+
+    def estimate(self, messages: list[Message], max_tokens: int | None) -> int:
+        """Return the tokens to reserve for a request."""
+        completion = max_tokens if max_tokens is not None else self.completion_reserve
+        return self.counter.count_prompt(messages) + completion
 
-    async def acquire(self, tokens: int = 0) -> None:
-        """Acquire capacity for a request."""
-        msg = "RateLimiter.acquire is not yet implemented."
-        raise NotImplementedError(msg)
+    async def chat(
+        self,
+        messages: list[Message],
+        *,
+        response_format: dict[str, Any] | None = None,
+        tools: list[dict[str, Any]] | None = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        model_hint: str | None = None,
+    ) -> LLMResponse:
+        """Reserve capacity, send the request and reconcile the reservation with reported usage."""
+        reservation = await self.limiter.acquire(self.estimate(messages, max_tokens))
+        response = await self.client.chat(
+            messages,
+            response_format=response_format,
+            tools=tools,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            model_hint=model_hint,
+        )
+        reservation.reconcile_usage(response.get("usage"))
+        return response
 
 
-__all__ = ["RateLimiter"]
+__all__ = [
+    "DEFAULT_COMPLETION_RESERVE",
+    "RateLimitedClient",
+    "RateLimiter",
+    "Reservation",
+    "TokenBucket",
+]
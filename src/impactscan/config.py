@@ -21,6 +21,10 @@ class RipgrepConfig(BaseModel):
     smart_case: bool = True
     threads: int = Field(default=0, ge=0)
     include_hidden: bool = False
+    queue_size: int = Field(default=1024, ge=1)
+    shards: int = Field(default=1, ge=0)
+    index_path: str | None = None
+    incremental_state_path: str | None = None
 
 
 class PreprocessConfig(BaseModel):
@@ -33,8 +37,11 @@ class PreprocessConfig(BaseModel):
     detect_if0_blocks: bool = True
     cache_noncode_ranges: bool = True
     max_file_bytes_for_parse: int = Field(default=2_000_000, gt=0)
+    parse_workers: int = Field(default=0, ge=0)
     merge_window_lines: int = Field(default=40, ge=1)
     max_tokens_file_context: int = Field(default=2000, ge=1)
+    dedup_windows: bool = True
+    near_duplicate_threshold: float | None = Field(default=None, gt=0.0, le=1.0)
 
 
 class AzureOpenAIConfig(BaseModel):
@@ -63,6 +70,15 @@ class OutputConfig(BaseModel):
     write_csv: bool = True
     write_jsonl: bool = True
     write_summary_md: bool = False
+    journal_path: str | None = None
+
+
+class CacheConfig(BaseModel):
+    """Configuration for the cache store shared by a run's caches."""
+
+    path: str | None = None
+    max_bytes: int | None = Field(default=None, ge=1)
+    llm_responses: bool = True
 
 
 class AnalysisConfig(BaseModel):
@@ -72,9 +88,32 @@ class AnalysisConfig(BaseModel):
         default_factory=lambda: ["セキュリティ", "後方互換性", "パフォーマンス", "テスト影響"],
     )
     triage_threshold: float = Field(default=0.35, ge=0.0, le=1.0)
+    triage_batch_tokens: int = Field(default=8000, ge=1)
+    triage_batch_max_windows: int = Field(default=16, ge=1)
     parallelism: int = Field(default=16, ge=1)
+    adaptive_concurrency: bool = True
     rpm_limit: int | None = Field(default=900, ge=1)
     tpm_limit: int | None = Field(default=1_000_000, ge=1)
+    hedge_percentile: float | None = Field(default=None, gt=0.0, lt=1.0)
+    hedge_max_fraction: float = Field(default=0.05, ge=0.0, le=1.0)
+    max_total_tokens: int | None = Field(default=None, ge=1)
+    max_wall_time_sec: float | None = Field(default=None, gt=0.0)
+    max_analyzed: int | None = Field(default=None, ge=1)
+    prerank: bool = True
+    prerank_drop_ratio: float | None = Field(default=None, gt=0.0, le=1.0)
+    prerank_warmup_windows: int = Field(default=256, ge=1)
+
+
+class PipelineConfig(BaseModel):
+    """Worker counts and queue bounds of the streaming pipeline stages."""
+
+    queue_size: int = Field(default=256, ge=1)
+    classify_workers: int = Field(default=4, ge=1)
+    classify_batch_files: int = Field(default=64, ge=1)
+    classify_flush_sec: float = Field(default=0.005, ge=0)
+    window_workers: int = Field(default=4, ge=1)
+    triage_workers: int = Field(default=4, ge=1)
+    analyze_workers: int = Field(default=16, ge=1)
 
 
 class ImpactScanConfig(BaseModel):
@@ -93,9 +132,11 @@ class ImpactScanConfig(BaseModel):
     ripgrep: RipgrepConfig = Field(default_factory=RipgrepConfig)
     preprocess: PreprocessConfig = Field(default_factory=PreprocessConfig)
     analysis: AnalysisConfig = Field(default_factory=AnalysisConfig)
+    pipeline: PipelineConfig = Field(default_factory=PipelineConfig)
     azure_openai: AzureOpenAIConfig = Field(default_factory=AzureOpenAIConfig)
     openai: OpenAIConfig = Field(default_factory=OpenAIConfig)
     output: OutputConfig = Field(default_factory=OutputConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
 
     def __init__(self, **data: object) -> None:
         """Validate incoming data and surface ConfigError on failure."""
@@ -116,6 +157,7 @@ __all__ = [
     "ImpactScanConfig",
     "OpenAIConfig",
     "OutputConfig",
+    "PipelineConfig",
     "PreprocessConfig",
     "RipgrepConfig",
 ]
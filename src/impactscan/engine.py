@@ -2,16 +2,36 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import time
 from typing import TYPE_CHECKING
 
+from impactscan.cache.store import MemoryCacheStore, SQLiteCacheStore
+from impactscan.concurrency.bridge import iterate_in_thread
 from impactscan.errors import ConfigError
+from impactscan.llm.stack import ClientStack, model_names
+from impactscan.llm.tokens import TokenUsage, default_token_counter
+from impactscan.models import ImpactRunSummary
+from impactscan.pipeline.intention import extract_intention
+from impactscan.pipeline.journal import JournalState, RunJournal, read_journal
+from impactscan.pipeline.stream import PipelineStats, StreamingPipeline
+from impactscan.preprocess.cache import NONCODE_NAMESPACE, CachingClassifier
+from impactscan.preprocess.factory import build_classifier
+from impactscan.preprocess.filecache import FileContentCache
+from impactscan.preprocess.windows import WindowBuilder
+from impactscan.report.writer import write_reports
+from impactscan.scanner.incremental import IncrementalScanner
+from impactscan.scanner.ripgrep import RipgrepScanner
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncIterator, Iterable, Sequence
+    from collections.abc import AsyncGenerator, AsyncIterable, Iterator, Sequence
 
+    from impactscan.cache.store import CacheStore
     from impactscan.config import ImpactScanConfig
     from impactscan.llm.client import LLMClient
-    from impactscan.models import ImpactAssessment, ImpactRunSummary
+    from impactscan.models import CandidateHit, ImpactAssessment
+    from impactscan.preprocess.classifier import NonCodeClassifier
+    from impactscan.scanner.incremental import FileRevision
 
 
 class ImpactScanEngine:
@@ -27,45 +47,207 @@ class ImpactScanEngine:
         self.config = config
         self._llm_small = llm_small
         self._llm_large = llm_large
+        self.last_stats = PipelineStats()
+        self.last_usage = TokenUsage()
+        self.last_cache_stats: dict[str, dict[str, int]] = {}
+        self.last_clients: ClientStack | None = None
 
     async def run(
         self,
         *,
         instruction: str,
         extra_keywords: Sequence[str] | None = None,
+        resume: bool = False,
     ) -> ImpactRunSummary:
-        """Run the full pipeline and return a summary."""
-        msg = "Pipeline execution is not yet implemented."
-        raise NotImplementedError(msg)
+        """Run the full pipeline, write the configured reports and return a summary.
+
+        With ``resume`` the run continues the journal at
+        ``output.journal_path`` (see :meth:`iter_assessments`). Reports list
+        assessments in a stable order, so a resumed run writes the same
+        reports as an uninterrupted one.
+        """
+        started = time.perf_counter()
+        assessments = [
+            assessment
+            async for assessment in self.iter_assessments(
+                instruction=instruction,
+                extra_keywords=extra_keywords,
+                resume=resume,
+            )
+        ]
+        stats = self.last_stats
+        clients = self.last_clients
+        summary = ImpactRunSummary(
+            files_scanned=stats.files_scanned,
+            matches_total=stats.matches_total,
+            candidates_after_filter=stats.candidates_after_filter,
+            triage_kept=stats.triage_kept,
+            analyzed=stats.analyzed,
+            budget_exhausted=stats.budget_exhausted,
+            skipped_windows=stats.skipped_windows,
+            prerank_dropped=stats.prerank_dropped,
+            token_usage={**self.last_usage.as_dict(), **(clients.token_usage() if clients is not None else {})},
+            cache_stats=dict(self.last_cache_stats),
+            elapsed_sec=time.perf_counter() - started,
+            **(clients.summary() if clients is not None else {}),
+        )
+        summary.output_paths = await asyncio.to_thread(write_reports, self.config.output, assessments, summary)
+        return summary
 
     async def iter_assessments(
         self,
         *,
         instruction: str,
         extra_keywords: Sequence[str] | None = None,
-    ) -> AsyncIterator[ImpactAssessment]:
-        """Yield detailed assessments as soon as they are ready."""
-        msg = "Assessment streaming is not yet implemented."
-        raise NotImplementedError(msg)
+        resume: bool = False,
+    ) -> AsyncGenerator[ImpactAssessment]:
+        """Yield detailed assessments as soon as they are ready.
+
+        The stages run concurrently (see :mod:`impactscan.pipeline.stream`),
+        so the first assessment arrives while the repository is still being
+        scanned. Counters and token usage of the run are kept in
+        :attr:`last_stats` and :attr:`last_usage`.
+
+        The LLM clients are wrapped in the layers configured under
+        ``analysis`` and ``cache`` (see :mod:`impactscan.llm.stack`); their
+        counters are kept in :attr:`last_clients`. Responses are cached in
+        the run's cache store, which persists across runs when
+        ``cache.path`` is set.
+
+        With ``output.journal_path`` set the run is journaled (see
+        :mod:`impactscan.pipeline.journal`). ``resume`` replays that journal
+        first: its intention is reused and windows it already triaged or
+        assessed are not sent to a model again.
+        """
+        config = self.config
+        small_client = self.require_small_client()
+        large_client = self.require_large_client()
+        journal, replay = self._open_journal(instruction, extra_keywords, resume=resume)
+        # Everything opened so far is closed again if a later constructor raises.
+        with contextlib.ExitStack() as resources:
+            if journal is not None:
+                resources.callback(journal.close)
+            files = FileContentCache(config.target_dir)
+            resources.callback(files.close)
+            store = self._open_store()
+            resources.callback(store.close)
+            classifier = build_classifier(config.preprocess, store)
+            resources.callback(classifier.close)
+            resources.callback(self._keep_cache_stats, files, classifier)
+            counter = default_token_counter()
+            clients = self.last_clients = ClientStack(config, counter, store)
+            small_model, large_model = model_names(config)
+            small = clients.wrap(small_client, model=small_model)
+            large = clients.wrap(large_client, model=large_model)
+            intention = replay.intention
+            if intention is None:
+                intention = await extract_intention(
+                    instruction,
+                    extra_keywords=extra_keywords,
+                    client=small,
+                    perspectives=config.analysis.perspectives,
+                )
+                if journal is not None:
+                    journal.record_intention(intention)
+            hits, revisions = self._hit_source(intention.must_keywords, files)
+            self.last_usage = TokenUsage()
+            pipeline = StreamingPipeline(
+                config,
+                intention=intention,
+                hits=hits,
+                files=files,
+                classifier=classifier,
+                windows=WindowBuilder(config, files, revisions=revisions, token_counter=counter),
+                triage_client=small,
+                analysis_client=large,
+                counter=counter,
+                usage=self.last_usage,
+                journal=journal,
+                replay=replay,
+            )
+            self.last_stats = pipeline.stats
+            async with contextlib.aclosing(pipeline.assessments()) as assessments:
+                async for assessment in assessments:
+                    yield assessment
+
+    def _keep_cache_stats(self, files: FileContentCache, classifier: NonCodeClassifier) -> None:
+        """Keep the run's file and non-code cache counters in :attr:`last_cache_stats`."""
+        self.last_cache_stats = {"file_content": files.stats.as_dict()}
+        if isinstance(classifier, CachingClassifier):
+            self.last_cache_stats[NONCODE_NAMESPACE] = classifier.stats.as_dict()
+
+    def _open_store(self) -> CacheStore:
+        """Return the run's cache store: the SQLite database at ``cache.path``, otherwise one in memory."""
+        cache = self.config.cache
+        if cache.path is None:
+            return MemoryCacheStore()
+        return SQLiteCacheStore(cache.path, max_bytes=cache.max_bytes)
+
+    def _open_journal(
+        self,
+        instruction: str,
+        extra_keywords: Sequence[str] | None,
+        *,
+        resume: bool,
+    ) -> tuple[RunJournal | None, JournalState]:
+        """Open the configured journal, replaying it first when resuming."""
+        path = self.config.output.journal_path
+        if path is None:
+            if resume:
+                msg = "Resuming a run requires output.journal_path"
+                raise ConfigError(msg)
+            return None, JournalState()
+        extra = list(extra_keywords or [])
+        replay = read_journal(path) if resume else JournalState()
+        if replay.instruction is None:
+            journal = RunJournal(path)
+            journal.record_run(instruction, extra)
+            return journal, JournalState()
+        if (replay.instruction, replay.extra_keywords) != (instruction, extra):
+            msg = f"Journal {path} belongs to a different instruction; run without resume to start over"
+            raise ConfigError(msg)
+        return RunJournal(path, append=True), replay
+
+    def _hit_source(
+        self,
+        keywords: Sequence[str],
+        files: FileContentCache,
+    ) -> tuple[AsyncIterable[CandidateHit], dict[str, FileRevision] | None]:
+        """Return the hit stream, incremental when a scan state path is configured, and its revisions."""
+        scanner = RipgrepScanner(self.config)
+        if self.config.ripgrep.incremental_state_path is None:
+            return scanner.search(must_keywords=keywords), None
+        incremental = IncrementalScanner(scanner, files=files)
+        return incremental.search(must_keywords=keywords), incremental.revisions
 
     def run_sync(
         self,
         *,
         instruction: str,
         extra_keywords: Sequence[str] | None = None,
+        resume: bool = False,
     ) -> ImpactRunSummary:
         """Run the asynchronous pipeline synchronously."""
-        return asyncio.run(self.run(instruction=instruction, extra_keywords=extra_keywords))
+        return asyncio.run(self.run(instruction=instruction, extra_keywords=extra_keywords, resume=resume))
 
     def iter_assessments_sync(
         self,
         *,
         instruction: str,
         extra_keywords: Sequence[str] | None = None,
-    ) -> Iterable[ImpactAssessment]:
-        """Stream assessments synchronously."""
-        msg = "Synchronous assessment streaming is not yet implemented."
-        raise NotImplementedError(msg)
+        resume: bool = False,
+    ) -> Iterator[ImpactAssessment]:
+        """Stream assessments synchronously.
+
+        :meth:`iter_assessments` runs on its own event loop in a background
+        thread; at most ``pipeline.queue_size`` finished assessments wait
+        for the caller. Leaving the loop early cancels the run, including
+        in-flight LLM requests, and errors are raised in the caller.
+        """
+        return iterate_in_thread(
+            lambda: self.iter_assessments(instruction=instruction, extra_keywords=extra_keywords, resume=resume),
+            max_buffered=self.config.pipeline.queue_size,
+        )
 
     def require_small_client(self) -> LLMClient:
         """Return the configured small LLM client or raise an error."""
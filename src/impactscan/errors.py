@@ -10,6 +10,10 @@ class RipgrepNotFoundError(ImpactScanError):
     """Raised when the ripgrep executable cannot be located."""
 
 
+class RipgrepExecutionError(ImpactScanError):
+    """Raised when ripgrep exits with an error status and produced no results."""
+
+
 class LLMResponseFormatError(ImpactScanError):
     """Raised when an LLM response fails schema validation after retries."""
 
@@ -17,6 +21,29 @@ class LLMResponseFormatError(ImpactScanError):
 class RateLimitExceededError(ImpactScanError):
     """Raised when configured rate limits are exceeded."""
 
+    def __init__(self, message: str, *, retry_after: float | None = None) -> None:
+        """Record how many seconds the provider asked callers to wait, when it said."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMServiceError(ImpactScanError):
+    """Raised when an LLM endpoint answers with an error status or cannot be reached."""
+
+    def __init__(
+        self,
+        message: str,
+        *,
+        status_code: int | None = None,
+        retry_after: float | None = None,
+        retryable: bool = False,
+    ) -> None:
+        """Record the HTTP status and whether repeating the request may succeed."""
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = retryable
+
 
 class ConfigError(ImpactScanError):
     """Raised when user configuration is invalid or incomplete."""
@@ -26,6 +53,8 @@ __all__ = [
     "ConfigError",
     "ImpactScanError",
     "LLMResponseFormatError",
+    "LLMServiceError",
     "RateLimitExceededError",
+    "RipgrepExecutionError",
     "RipgrepNotFoundError",
 ]
@@ -1,33 +1,139 @@
 """Built-in adapters that implement :class:`impactscan.llm.client.LLMClient`."""
 from __future__ import annotations
 
-from collections.abc import Awaitable, Mapping
+import asyncio
+from collections.abc import Awaitable, Callable, Mapping
+import time
 import typing as t
 from typing import Any
 
+import httpx
+import orjson
+
+from impactscan.concurrency.limiter import DEFAULT_COMPLETION_RESERVE, RateLimiter
+from impactscan.errors import LLMServiceError
 from impactscan.llm.client import LLMClient, LLMResponse, Message
+from impactscan.llm.http import (
+    DEFAULT_MAX_ATTEMPTS,
+    decode_json,
+    new_http_client,
+    raise_for_status,
+    report_latency,
+    retrying,
+    shared_http_client,
+)
+from impactscan.llm.tokens import ApproxTokenCounter, TokenCounter
 
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+_USAGE_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
 
-class AzureOpenAIAdapter(LLMClient):
-    """Adapter for Azure OpenAI deployments."""
+
+def normalize_completion(body: Mapping[str, Any], *, expect_json: bool) -> LLMResponse:
+    """Convert a chat completions response body into an :class:`LLMResponse`.
+
+    With ``expect_json`` the message content, or else the first tool call's
+    arguments, is parsed into ``json`` when it holds a JSON object.
+    """
+    choices = t.cast("list[dict[str, Any]]", body.get("choices") or [{}])
+    message = t.cast("dict[str, Any]", choices[0].get("message") or {})
+    text = t.cast("str | None", message.get("content"))
+    parsed: dict[str, Any] | None = None
+    if expect_json:
+        tool_calls = t.cast("list[dict[str, Any]]", message.get("tool_calls") or [])
+        candidate = text or (tool_calls[0].get("function", {}).get("arguments") if tool_calls else None)
+        if candidate:
+            try:
+                decoded = orjson.loads(candidate)
+            except orjson.JSONDecodeError:
+                decoded = None
+            if isinstance(decoded, dict):
+                parsed = t.cast("dict[str, Any]", decoded)
+    usage = t.cast("dict[str, Any]", body.get("usage") or {})
+    return {
+        "text": text,
+        "json": parsed,
+        "usage": {key: int(usage[key]) for key in _USAGE_KEYS if usage.get(key) is not None},
+        "raw": body,
+    }
+
+
+class _ChatCompletionsAdapter(LLMClient):
+    """Shared request path for OpenAI-compatible chat completions endpoints.
+
+    Each attempt takes capacity from :attr:`limiter`, and is reconciled with
+    the reported usage; failed attempts keep their reservation, since the
+    provider counts them too. Requests go through the pooled client shared
+    by every adapter for the same endpoint unless ``http_client`` or
+    ``transport`` is given. ``retry_sleep`` waits between attempts and may be
+    replaced, e.g. by tests. The duration of each successful round trip,
+    without limiter waits or retries, is passed to
+    :func:`~impactscan.llm.http.report_latency`.
+    """
 
     def __init__(
         self,
         *,
-        endpoint: str,
-        api_key: str,
-        deployment: str,
-        api_version: str | None = None,
-        rpm_limit: int | None = None,
-        tpm_limit: int | None = None,
+        pool_key: str,
+        rpm_limit: int | None,
+        tpm_limit: int | None,
+        limiter: RateLimiter | None,
+        http_client: httpx.AsyncClient | None,
+        transport: httpx.AsyncBaseTransport | None,
+        max_attempts: int,
+        token_counter: TokenCounter | None,
     ) -> None:
-        """Store Azure-specific connection information."""
-        self.endpoint = endpoint
-        self.api_key = api_key
-        self.deployment = deployment
-        self.api_version = api_version
         self.rpm_limit = rpm_limit
         self.tpm_limit = tpm_limit
+        self.limiter = limiter if limiter is not None else RateLimiter(rpm_limit=rpm_limit, tpm_limit=tpm_limit)
+        self.max_attempts = max_attempts
+        self.token_counter = token_counter if token_counter is not None else ApproxTokenCounter()
+        self.retry_sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+        self._pool_key = pool_key
+        self._http = http_client
+        self._transport = transport
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            if self._transport is not None:
+                self._http = new_http_client(transport=self._transport)
+            else:
+                return shared_http_client(self._pool_key)
+        return self._http
+
+    def _request(self) -> tuple[str, dict[str, str], dict[str, str]]:
+        """Return the URL, query parameters and headers of a completion request."""
+        raise NotImplementedError
+
+    def _payload(
+        self,
+        messages: list[Message],
+        *,
+        response_format: dict[str, Any] | None,
+        tools: list[dict[str, Any]] | None,
+        temperature: float,
+        max_tokens: int | None,
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {"messages": messages, "temperature": temperature}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if response_format is not None:
+            payload["response_format"] = response_format
+        if tools is not None:
+            payload["tools"] = tools
+        return payload
+
+    async def _post(self, body: bytes) -> dict[str, Any]:
+        url, params, headers = self._request()
+        try:
+            response = await self._client().post(url, params=params, headers=headers, content=body)
+        except httpx.TimeoutException as exc:
+            msg = f"Request to {url} timed out"
+            raise TimeoutError(msg) from exc
+        except httpx.TransportError as exc:
+            msg = f"Request to {url} failed: {exc}"
+            raise LLMServiceError(msg, retryable=True) from exc
+        raise_for_status(response)
+        return decode_json(response)
 
     async def chat(
         self,
@@ -37,14 +143,78 @@ class AzureOpenAIAdapter(LLMClient):
         tools: list[dict[str, Any]] | None = None,
         temperature: float = 0.2,
         max_tokens: int | None = None,
-        model_hint: str | None = None,
+        model_hint: str | None = None,  # noqa: ARG002
     ) -> LLMResponse:
-        """Send a chat completion request."""
-        msg = "Azure OpenAI adapter has not been implemented yet."
-        raise NotImplementedError(msg)
+        """Send a chat completion request, retrying throttled, timed-out and transient failures.
+
+        ``model_hint`` is ignored: each adapter is bound to one model or deployment.
+        """
+        payload = self._payload(
+            messages,
+            response_format=response_format,
+            tools=tools,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        body = orjson.dumps(payload)
+        completion = max_tokens if max_tokens is not None else DEFAULT_COMPLETION_RESERVE
+        estimate = self.token_counter.count_prompt(messages) + completion
+        decoded: dict[str, Any] = {}
+        async for attempt in retrying(max_attempts=self.max_attempts, sleep=self.retry_sleep):
+            with attempt:
+                reservation = await self.limiter.acquire(estimate)
+                started = time.monotonic()
+                decoded = await self._post(body)
+                report_latency(time.monotonic() - started)
+                reservation.reconcile_usage(t.cast("dict[str, Any]", decoded.get("usage") or {}))
+        return normalize_completion(decoded, expect_json=response_format is not None or tools is not None)
+
+
+class AzureOpenAIAdapter(_ChatCompletionsAdapter):
+    """Adapter for Azure OpenAI deployments."""
 
+    def __init__(
+        self,
+        *,
+        endpoint: str,
+        api_key: str,
+        deployment: str,
+        api_version: str | None = None,
+        rpm_limit: int | None = None,
+        tpm_limit: int | None = None,
+        limiter: RateLimiter | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        token_counter: TokenCounter | None = None,
+    ) -> None:
+        """Store Azure-specific connection information.
+
+        Pass the same ``limiter`` to every adapter that targets this deployment;
+        otherwise one is created from ``rpm_limit`` and ``tpm_limit``.
+        """
+        super().__init__(
+            pool_key=endpoint,
+            rpm_limit=rpm_limit,
+            tpm_limit=tpm_limit,
+            limiter=limiter,
+            http_client=http_client,
+            transport=transport,
+            max_attempts=max_attempts,
+            token_counter=token_counter,
+        )
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.deployment = deployment
+        self.api_version = api_version
+
+    def _request(self) -> tuple[str, dict[str, str], dict[str, str]]:
+        url = f"{self.endpoint.rstrip('/')}/openai/deployments/{self.deployment}/chat/completions"
+        params = {"api-version": self.api_version} if self.api_version else {}
+        return url, params, {"api-key": self.api_key, "content-type": "application/json"}
 
-class OpenAIAdapter(LLMClient):
+
+class OpenAIAdapter(_ChatCompletionsAdapter):
     """Adapter for the public OpenAI API."""
 
     def __init__(
@@ -54,26 +224,49 @@ class OpenAIAdapter(LLMClient):
         model: str,
         rpm_limit: int | None = None,
         tpm_limit: int | None = None,
+        limiter: RateLimiter | None = None,
+        base_url: str = DEFAULT_OPENAI_BASE_URL,
+        http_client: httpx.AsyncClient | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        token_counter: TokenCounter | None = None,
     ) -> None:
-        """Store OpenAI connection information."""
+        """Store OpenAI connection information; ``limiter`` may be shared as for Azure."""
+        super().__init__(
+            pool_key=base_url,
+            rpm_limit=rpm_limit,
+            tpm_limit=tpm_limit,
+            limiter=limiter,
+            http_client=http_client,
+            transport=transport,
+            max_attempts=max_attempts,
+            token_counter=token_counter,
+        )
         self.api_key = api_key
         self.model = model
-        self.rpm_limit = rpm_limit
-        self.tpm_limit = tpm_limit
+        self.base_url = base_url
 
-    async def chat(
+    def _request(self) -> tuple[str, dict[str, str], dict[str, str]]:
+        url = f"{self.base_url.rstrip('/')}/chat/completions"
+        return url, {}, {"authorization": f"Bearer {self.api_key}", "content-type": "application/json"}
+
+    def _payload(
         self,
         messages: list[Message],
         *,
-        response_format: dict[str, Any] | None = None,
-        tools: list[dict[str, Any]] | None = None,
-        temperature: float = 0.2,
-        max_tokens: int | None = None,
-        model_hint: str | None = None,
-    ) -> LLMResponse:
-        """Send a chat completion request."""
-        msg = "OpenAI adapter has not been implemented yet."
-        raise NotImplementedError(msg)
+        response_format: dict[str, Any] | None,
+        tools: list[dict[str, Any]] | None,
+        temperature: float,
+        max_tokens: int | None,
+    ) -> dict[str, Any]:
+        payload = super()._payload(
+            messages,
+            response_format=response_format,
+            tools=tools,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return {"model": self.model, **payload}
 
 
 class CallableAdapter(LLMClient):
@@ -112,4 +305,10 @@ class CallableAdapter(LLMClient):
         return t.cast("LLMResponse", dict(candidate))
 
 
-__all__ = ["AzureOpenAIAdapter", "CallableAdapter", "OpenAIAdapter"]
+__all__ = [
+    "DEFAULT_OPENAI_BASE_URL",
+    "AzureOpenAIAdapter",
+    "CallableAdapter",
+    "OpenAIAdapter",
+    "normalize_completion",
+]
@@ -0,0 +1,259 @@
+"""Content-addressed caching of LLM responses.
+
+:class:`CachingLLMClient` wraps any :class:`~impactscan.llm.client.LLMClient`
+and stores each response in a :class:`~impactscan.cache.store.CacheStore`
+under a hash of everything that determines it, so re-running an instruction
+after a crash or a configuration tweak only pays for requests that changed.
+Place it outside the rate-limited client, so that hits never take capacity
+from the :class:`~impactscan.concurrency.limiter.RateLimiter`.
+
+Responses served without a provider call (cache hits and requests that
+joined another caller's call) have ``cached`` set and zero ``usage``, so
+:class:`~impactscan.llm.tokens.TokenUsage` and the run budget only count
+tokens that were actually spent. The usage they would have cost is reported
+as ``llm_cache_tokens_saved`` instead. The cache is an optimisation: if the
+store fails, the request is answered as if it had missed.
+
+The cache cannot tell whether an answer satisfied the caller's schema.
+Callers that retry a rejected answer with the same messages make the retry
+inside :func:`bypass_cache`, which skips the lookup and replaces the stored
+answer with the fresh one, so the rejected answer is neither replayed to the
+retry nor kept for later runs.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import sqlite3
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, cast
+
+import orjson
+
+from impactscan.cache.keys import stable_key
+from impactscan.cache.store import CacheStats
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from impactscan.cache.store import CacheStore
+    from impactscan.llm.client import LLMClient, LLMResponse, Message
+
+logger = logging.getLogger(__name__)
+
+LLM_NAMESPACE = "llm_responses"
+LLM_CACHE_VERSION = 1
+DEFAULT_TTL_SEC = 7 * 24 * 3600
+_CACHED_FIELDS = ("text", "json", "usage")
+_USAGE_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
+# Store failures, including use after close(), must not fail the request.
+_STORE_ERRORS = (sqlite3.Error, OSError, RuntimeError)
+_bypass: ContextVar[bool] = ContextVar("impactscan_llm_cache_bypass", default=False)
+
+
+@contextlib.contextmanager
+def bypass_cache() -> Generator[None]:
+    """Send requests made inside the block to the provider, replacing what the cache holds for them."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def encode_response(response: LLMResponse) -> bytes:
+    """Serialise the portable fields of a response; ``raw`` provider objects are not kept."""
+    return orjson.dumps({name: value for name, value in response.items() if name in _CACHED_FIELDS})
+
+
+def decode_response(payload: bytes) -> LLMResponse | None:
+    """Inverse of :func:`encode_response`; ``None`` for payloads that are not a cached response."""
+    try:
+        decoded = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(decoded, dict):
+        return None
+    return cast("LLMResponse", decoded)
+
+
+class CachingLLMClient:
+    """LLM client decorator that serves repeated requests from a cache.
+
+    Keys hash the messages, ``model`` (the deployment or model name the
+    wrapped client talks to), temperature, response format, tools,
+    ``max_tokens`` and the model hint. Concurrent identical requests share a
+    single in-flight call; if it fails, every caller sees the error and
+    nothing is stored. Answers to structured requests (``response_format``
+    or ``tools`` set) are only stored when they parsed into ``json``, so a
+    malformed answer is not replayed to the caller's retry or to later runs;
+    requests made inside :func:`bypass_cache` neither read the cache nor join
+    a call in flight.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        store: CacheStore,
+        *,
+        model: str,
+        namespace: str = LLM_NAMESPACE,
+        ttl_sec: int | None = DEFAULT_TTL_SEC,
+    ) -> None:
+        """Wrap ``client``; ``model`` identifies what it calls, so caches are not shared across models."""
+        self.client = client
+        self.store = store
+        self.model = model
+        self.namespace = namespace
+        self.ttl_sec = ttl_sec
+        self.stats = CacheStats()
+        self.coalesced = 0
+        self.tokens_saved = 0
+        self._in_flight: dict[str, asyncio.Task[LLMResponse]] = {}
+
+    def cache_key(
+        self,
+        messages: list[Message],
+        *,
+        response_format: dict[str, Any] | None,
+        tools: list[dict[str, Any]] | None,
+        temperature: float,
+        max_tokens: int | None,
+        model_hint: str | None,
+    ) -> str:
+        """Return the content-addressed key of a request."""
+        return stable_key(
+            LLM_CACHE_VERSION,
+            self.model,
+            model_hint,
+            messages,
+            temperature,
+            max_tokens,
+            response_format,
+            tools,
+        )
+
+    async def chat(
+        self,
+        messages: list[Message],
+        *,
+        response_format: dict[str, Any] | None = None,
+        tools: list[dict[str, Any]] | None = None,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        model_hint: str | None = None,
+    ) -> LLMResponse:
+        """Return the cached response, joining or starting the call that produces it on a miss."""
+        key = self.cache_key(
+            messages,
+            response_format=response_format,
+            tools=tools,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            model_hint=model_hint,
+        )
+        bypass = _bypass.get()
+        task = None if bypass else self._in_flight.get(key)
+        if task is not None:
+            return await self._join(task)
+        payload = None
+        if not bypass:
+            try:
+                payload = await self.store.aget(self.namespace, key)
+            except _STORE_ERRORS:
+                logger.warning("LLM cache lookup failed; calling the provider", exc_info=True)
+        cached = None if payload is None else decode_response(payload)
+        if cached is not None:
+            self.stats.hits += 1
+            return self._as_hit(cached)
+        # Another caller may have started the call while this one awaited the store.
+        task = None if bypass else self._in_flight.get(key)
+        if task is not None:
+            return await self._join(task)
+        self.stats.misses += 1
+        task = asyncio.ensure_future(
+            self._fetch(
+                key,
+                messages,
+                response_format=response_format,
+                tools=tools,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                model_hint=model_hint,
+            ),
+        )
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _task: self._in_flight.pop(key, None))
+        # Shielded so that a cancelled caller does not cancel the call for everyone sharing it.
+        return await asyncio.shield(task)
+
+    async def _join(self, task: asyncio.Task[LLMResponse]) -> LLMResponse:
+        self.coalesced += 1
+        return self._as_hit(await asyncio.shield(task))
+
+    async def _fetch(
+        self,
+        key: str,
+        messages: list[Message],
+        *,
+        response_format: dict[str, Any] | None,
+        tools: list[dict[str, Any]] | None,
+        temperature: float,
+        max_tokens: int | None,
+        model_hint: str | None,
+    ) -> LLMResponse:
+        response = await self.client.chat(
+            messages,
+            response_format=response_format,
+            tools=tools,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            model_hint=model_hint,
+        )
+        if (response_format is not None or tools is not None) and response.get("json") is None:
+            return response
+        try:
+            await self.store.aset(self.namespace, key, encode_response(response), self.ttl_sec)
+        except (TypeError, orjson.JSONEncodeError):
+            logger.warning("Not caching an LLM response that cannot be serialised", exc_info=True)
+        except _STORE_ERRORS:
+            logger.warning("Could not store an LLM response in the cache", exc_info=True)
+        return response
+
+    def _as_hit(self, response: LLMResponse) -> LLMResponse:
+        """Return a copy of ``response`` marked as cached, moving its usage to ``tokens_saved``."""
+        usage = response.get("usage") or {}
+        total = usage.get("total_tokens")
+        if total is None:
+            total = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        self.tokens_saved += total
+        hit = cast("LLMResponse", dict(response))
+        hit["usage"] = dict.fromkeys(_USAGE_KEYS, 0)
+        hit["cached"] = True
+        return hit
+
+    def token_usage(self) -> dict[str, int | float]:
+        """Return cache effectiveness in the shape of ``ImpactRunSummary.token_usage``.
+
+        Coalesced requests count as hits: they were answered without a call.
+        """
+        hits = self.stats.hits + self.coalesced
+        lookups = hits + self.stats.misses
+        return {
+            "llm_cache_hits": hits,
+            "llm_cache_misses": self.stats.misses,
+            "llm_cache_hit_ratio": hits / lookups if lookups else 0.0,
+            "llm_cache_tokens_saved": self.tokens_saved,
+        }
+
+
+__all__ = [
+    "DEFAULT_TTL_SEC",
+    "LLM_CACHE_VERSION",
+    "LLM_NAMESPACE",
+    "CachingLLMClient",
+    "bypass_cache",
+    "decode_response",
+    "encode_response",
+]
@@ -12,12 +12,16 @@ class Message(TypedDict):
 
 
 class LLMResponse(TypedDict, total=False):
-    """Standardized response container for LLM invocations."""
+    """Standardized response container for LLM invocations.
+
+    ``cached`` is set on responses answered without calling the provider.
+    """
 
     text: str | None
     json: dict[str, Any] | None
     usage: dict[str, int]
     raw: Any
+    cached: bool
 
 
 class LLMClient(Protocol):
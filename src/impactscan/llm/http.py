@@ -0,0 +1,241 @@
+"""Shared HTTP plumbing for the OpenAI-compatible adapters.
+
+At hundreds of concurrent requests a TLS handshake per request adds seconds
+of latency, so every adapter talking to the same endpoint shares one pooled
+:class:`httpx.AsyncClient` with keep-alive, and HTTP/2 when the optional
+``h2`` package is installed (the ``http2`` extra). Clients are bound to the
+event loop that created them, so the pool keeps one per loop and endpoint.
+
+Failed requests are retried with tenacity. A ``Retry-After`` (or
+``retry-after-ms``) header sets the wait when present; otherwise the wait
+grows exponentially with jitter. Because throttled attempts are retried
+here, callers that adapt to load register with :func:`observe_throttling`
+to hear about every 429, not only one that exhausts the attempts. For the
+same reason the time a whole call takes includes rate limiter waits and
+retry backoff; adapters report each successful round trip with
+:func:`report_latency`, and :func:`observe_latency` hears about it.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import email.utils
+import importlib.util
+import time
+import weakref
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, cast
+
+import httpx
+import orjson
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from tenacity.wait import wait_base
+
+from impactscan.errors import LLMServiceError, RateLimitExceededError
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Generator
+
+    from tenacity import RetryCallState
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=512, max_keepalive_connections=512, keepalive_expiry=120.0)
+DEFAULT_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+DEFAULT_MAX_ATTEMPTS = 6
+MAX_RETRY_WAIT_SEC = 60.0
+RETRYABLE_STATUS = frozenset({408, 409, 500, 502, 503, 504})
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_HTTP_TOO_MANY_REQUESTS = 429
+_HTTP_ERROR = 400
+
+_throttle_observers: ContextVar[tuple[Callable[[RateLimitExceededError], None], ...]] = ContextVar(
+    "impactscan_throttle_observers",
+    default=(),
+)
+_latency_observers: ContextVar[tuple[Callable[[float], None], ...]] = ContextVar(
+    "impactscan_latency_observers",
+    default=(),
+)
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def new_http_client(
+    *,
+    transport: httpx.AsyncBaseTransport | None = None,
+    timeout: httpx.Timeout | float = DEFAULT_TIMEOUT,
+    limits: httpx.Limits = DEFAULT_LIMITS,
+) -> httpx.AsyncClient:
+    """Return a pooled keep-alive client; ``transport`` replaces the network, e.g. in tests."""
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE and transport is None,
+        limits=limits,
+        timeout=timeout,
+        transport=transport,
+    )
+
+
+def shared_http_client(endpoint: str) -> httpx.AsyncClient:
+    """Return the running loop's client for ``endpoint``, creating it on first use."""
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(endpoint)
+    if client is None or client.is_closed:
+        client = clients[endpoint] = new_http_client()
+    return client
+
+
+async def close_shared_http_clients() -> None:
+    """Close the running loop's shared clients, e.g. at the end of a run."""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    await asyncio.gather(*(client.aclose() for client in clients.values()))
+
+
+def parse_retry_after(headers: httpx.Headers, *, now: float | None = None) -> float | None:
+    """Return the wait a response asks for, from ``retry-after-ms`` or ``Retry-After`` (seconds or a date)."""
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds is not None:
+        try:
+            return max(0.0, float(milliseconds) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+
+def raise_for_status(response: httpx.Response) -> None:
+    """Raise the ImpactScan error for an unsuccessful response."""
+    if response.status_code < _HTTP_ERROR:
+        return
+    retry_after = parse_retry_after(response.headers)
+    detail = response.text[:500]
+    if response.status_code == _HTTP_TOO_MANY_REQUESTS:
+        msg = f"Rate limited by {response.request.url.host}: {detail}"
+        raise RateLimitExceededError(msg, retry_after=retry_after)
+    msg = f"{response.request.url.host} answered {response.status_code}: {detail}"
+    raise LLMServiceError(
+        msg,
+        status_code=response.status_code,
+        retry_after=retry_after,
+        retryable=response.status_code in RETRYABLE_STATUS,
+    )
+
+
+def decode_json(response: httpx.Response) -> dict[str, Any]:
+    """Decode a JSON object body with orjson."""
+    try:
+        decoded = orjson.loads(response.content)
+    except orjson.JSONDecodeError as exc:
+        msg = f"{response.request.url.host} returned a body that is not JSON"
+        raise LLMServiceError(msg, status_code=response.status_code) from exc
+    if not isinstance(decoded, dict):
+        msg = f"{response.request.url.host} returned JSON that is not an object"
+        raise LLMServiceError(msg, status_code=response.status_code)
+    return cast("dict[str, Any]", decoded)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed attempt is worth repeating."""
+    if isinstance(exc, RateLimitExceededError | TimeoutError):
+        return True
+    return isinstance(exc, LLMServiceError) and exc.retryable
+
+
+class wait_retry_after(wait_base):  # noqa: N801 - named like tenacity's own wait strategies
+    """Wait as long as the failed response asked, else fall back to another strategy."""
+
+    def __init__(self, fallback: wait_base, *, max_wait: float = MAX_RETRY_WAIT_SEC) -> None:
+        """Wrap ``fallback``; requested waits are capped at ``max_wait``."""
+        self.fallback = fallback
+        self.max_wait = max_wait
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        """Return the wait before the next attempt."""
+        exc = retry_state.outcome.exception() if retry_state.outcome is not None else None
+        retry_after: float | None = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.max_wait)
+        return self.fallback(retry_state)
+
+
+@contextlib.contextmanager
+def observe_throttling(callback: Callable[[RateLimitExceededError], None]) -> Generator[None]:
+    """Call ``callback`` for each throttled attempt that requests made inside the block retry.
+
+    Observers follow the context, so they also see attempts made by tasks
+    started inside the block. A 429 that ends the retries propagates instead.
+    """
+    token = _throttle_observers.set((*_throttle_observers.get(), callback))
+    try:
+        yield
+    finally:
+        _throttle_observers.reset(token)
+
+
+@contextlib.contextmanager
+def observe_latency(callback: Callable[[float], None]) -> Generator[None]:
+    """Call ``callback`` with the duration of each successful provider round trip made inside the block."""
+    token = _latency_observers.set((*_latency_observers.get(), callback))
+    try:
+        yield
+    finally:
+        _latency_observers.reset(token)
+
+
+def report_latency(seconds: float) -> None:
+    """Pass the duration of one successful round trip to the observers registered in this context."""
+    for callback in _latency_observers.get():
+        callback(seconds)
+
+
+def _notify_throttled(retry_state: RetryCallState) -> None:
+    exc = retry_state.outcome.exception() if retry_state.outcome is not None else None
+    if isinstance(exc, RateLimitExceededError):
+        for callback in _throttle_observers.get():
+            callback(exc)
+
+
+def retrying(
+    *,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+) -> AsyncRetrying:
+    """Return the retry policy for LLM requests; the last error is re-raised when attempts run out."""
+    return AsyncRetrying(
+        sleep=sleep,
+        stop=stop_after_attempt(max_attempts),
+        wait=wait_retry_after(wait_exponential_jitter(initial=1.0, max=MAX_RETRY_WAIT_SEC)),
+        retry=retry_if_exception(is_retryable),
+        before_sleep=_notify_throttled,
+        reraise=True,
+    )
+
+
+__all__ = [
+    "DEFAULT_LIMITS",
+    "DEFAULT_MAX_ATTEMPTS",
+    "DEFAULT_TIMEOUT",
+    "HTTP2_AVAILABLE",
+    "RETRYABLE_STATUS",
+    "close_shared_http_clients",
+    "decode_json",
+    "is_retryable",
+    "new_http_client",
+    "observe_latency",
+    "observe_throttling",
+    "parse_retry_after",
+    "raise_for_status",
+    "report_latency",
+    "retrying",
+    "shared_http_client",
+    "wait_retry_after",
+]
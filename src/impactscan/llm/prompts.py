@@ -16,8 +16,47 @@ class PromptTemplate:
 DEFAULT_INTENTION_PROMPT = PromptTemplate(
     name="intention",
     system="You are an assistant that extracts structured intents for repository impact analysis.",
-    user="""Instruction: {instruction}\nExtra keywords: {extra_keywords}\nReturn JSON with intention and keywords.""",
+    user=(
+        "Instruction: {instruction}\nExtra keywords: {extra_keywords}\nReturn a JSON object with intention"
+        " (the change restated in one sentence), must_keywords (identifiers to search the code for) and"
+        " should_keywords (related terms)."
+    ),
 )
 
+DEFAULT_TRIAGE_PROMPT = PromptTemplate(
+    name="triage",
+    system=(
+        "You triage code excerpts for repository impact analysis. For every excerpt decide whether the"
+        " requested change could affect it. Answer with a JSON object whose 'results' array holds one"
+        " object per excerpt with the keys file, window_index, triage_decision ('drop', 'keep' or"
+        " 'maybe'), relevance_score (0 to 1), quick_reason and hints (a list of short strings)."
+        " Copy file and window_index exactly from the excerpt header."
+    ),
+    user="""Change: {intention}\nKeywords: {keywords}\nPerspectives: {perspectives}\n\n{windows}""",
+)
+
+DEFAULT_ANALYSIS_PROMPT = PromptTemplate(
+    name="analysis",
+    system=(
+        "You assess how a requested change affects one code excerpt of a repository. Answer with a JSON"
+        " object with the keys impact_level ('none', 'low', 'medium', 'high' or 'critical'), reason,"
+        " perspective_scores (an object mapping each perspective to a score from 0 to 1), affected_apis,"
+        " risk_tags, change_suggestion, dependencies, confidence (0 to 1) and lines (the affected line"
+        " numbers or ranges, e.g. '12' or '12-14')."
+    ),
+    user=(
+        "Change: {intention}\nKeywords: {keywords}\nPerspectives: {perspectives}\n"
+        "Triage note: {triage_note}\n\n{window}"
+    ),
+)
+
+DEFAULT_TRIAGE_WINDOW = """### file={file} window_index={window_index} lines={lines}\n```\n{content}\n```"""
+
 
-__all__ = ["DEFAULT_INTENTION_PROMPT", "PromptTemplate"]
+__all__ = [
+    "DEFAULT_ANALYSIS_PROMPT",
+    "DEFAULT_INTENTION_PROMPT",
+    "DEFAULT_TRIAGE_PROMPT",
+    "DEFAULT_TRIAGE_WINDOW",
+    "PromptTemplate",
+]
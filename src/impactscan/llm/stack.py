@@ -0,0 +1,122 @@
+"""The wrappers a run puts around its LLM clients.
+
+:class:`ClientStack` wraps each client handed to the engine in the
+configured layers, outermost first:
+
+* :class:`~impactscan.llm.cache.CachingLLMClient`, so hits cost nothing
+  below it;
+* :class:`~impactscan.concurrency.limiter.RateLimitedClient`, unless the
+  client brings its own :class:`~impactscan.concurrency.limiter.RateLimiter`
+  with a limit set (the built-in adapters always carry one, but it only
+  limits anything when they were given ``rpm_limit`` or ``tpm_limit``);
+* :class:`~impactscan.concurrency.hedging.HedgedClient`, when
+  ``analysis.hedge_percentile`` is set, charging hedges to that limiter;
+* :class:`~impactscan.concurrency.adaptive.AdaptiveConcurrencyClient`, right
+  above the provider so that it sees every throttled attempt.
+
+One adaptive limiter is shared by every client, since
+``analysis.parallelism`` bounds the run as a whole; each client judges
+latency against the baseline of its own model. The stack keeps the
+wrappers it built so their counters can be reported in the run summary.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from impactscan.concurrency.adaptive import AdaptiveConcurrencyClient, build_concurrency_limiter
+from impactscan.concurrency.hedging import HedgedClient, build_hedged_client
+from impactscan.concurrency.limiter import RateLimitedClient, RateLimiter
+from impactscan.llm.cache import CachingLLMClient
+
+if TYPE_CHECKING:
+    from impactscan.cache.store import CacheStore
+    from impactscan.concurrency.adaptive import AdaptiveConcurrencyLimiter
+    from impactscan.config import ImpactScanConfig
+    from impactscan.llm.client import LLMClient
+    from impactscan.llm.tokens import TokenCounter
+
+
+@dataclass
+class ClientStack:
+    """Builds the wrapped clients of one run and summarises what the wrappers did."""
+
+    config: ImpactScanConfig
+    counter: TokenCounter
+    store: CacheStore | None = None
+    limiter: AdaptiveConcurrencyLimiter | None = None
+    caches: list[CachingLLMClient] = field(default_factory=list[CachingLLMClient])
+    hedgers: list[HedgedClient] = field(default_factory=list[HedgedClient])
+    rate_limiters: dict[int, RateLimiter] = field(default_factory=dict[int, RateLimiter])
+    """Limiters created for clients without their own, by client identity, so one client shares one."""
+
+    def __post_init__(self) -> None:
+        """Create the shared concurrency limiter when adaptive concurrency is on."""
+        if self.limiter is None and self.config.analysis.adaptive_concurrency:
+            self.limiter = build_concurrency_limiter(self.config.analysis)
+
+    def wrap(self, client: LLMClient, *, model: str) -> LLMClient:
+        """Return ``client`` inside the configured layers; ``model`` names what it calls, for cache keys."""
+        analysis = self.config.analysis
+        wrapped = client
+        if self.limiter is not None:
+            wrapped = AdaptiveConcurrencyClient(wrapped, self.limiter, key=model)
+        rate_limiter = None
+        if not _limits_itself(client) and (analysis.rpm_limit or analysis.tpm_limit):
+            rate_limiter = self.rate_limiters.get(id(client))
+            if rate_limiter is None:
+                rate_limiter = RateLimiter(rpm_limit=analysis.rpm_limit, tpm_limit=analysis.tpm_limit)
+                self.rate_limiters[id(client)] = rate_limiter
+        wrapped = build_hedged_client(wrapped, analysis, limiter=rate_limiter, counter=self.counter)
+        if isinstance(wrapped, HedgedClient):
+            self.hedgers.append(wrapped)
+        if rate_limiter is not None:
+            wrapped = RateLimitedClient(wrapped, rate_limiter, self.counter)
+        if self.store is not None and self.config.cache.llm_responses:
+            cache = CachingLLMClient(wrapped, self.store, model=model)
+            self.caches.append(cache)
+            wrapped = cache
+        return wrapped
+
+    def summary(self) -> dict[str, Any]:
+        """Return the ``ImpactRunSummary`` fields describing concurrency and hedging."""
+        fields: dict[str, Any] = {}
+        if self.limiter is not None:
+            fields.update(self.limiter.summary())
+        if self.hedgers:
+            calls = sum(hedger.calls for hedger in self.hedgers)
+            fields["hedge_rate"] = sum(hedger.hedges for hedger in self.hedgers) / calls if calls else 0.0
+            fields["hedge_latency_saved_sec"] = sum(hedger.latency_saved_sec for hedger in self.hedgers)
+        return fields
+
+    def token_usage(self) -> dict[str, int | float]:
+        """Return the LLM cache keys of ``ImpactRunSummary.token_usage``, summed over every cached client."""
+        if not self.caches:
+            return {}
+        hits = sum(cache.stats.hits + cache.coalesced for cache in self.caches)
+        misses = sum(cache.stats.misses for cache in self.caches)
+        return {
+            "llm_cache_hits": hits,
+            "llm_cache_misses": misses,
+            "llm_cache_hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "llm_cache_tokens_saved": sum(cache.tokens_saved for cache in self.caches),
+        }
+
+
+def _limits_itself(client: LLMClient) -> bool:
+    """Return whether ``client`` carries a rate limiter that enforces a limit."""
+    limiter = getattr(client, "limiter", None)
+    return isinstance(limiter, RateLimiter) and (limiter.rpm_limit is not None or limiter.tpm_limit is not None)
+
+
+def model_names(config: ImpactScanConfig) -> tuple[str, str]:
+    """Return the names of the small and large models the configuration points at, for cache keys."""
+    if config.azure_openai.enabled:
+        deployments = config.azure_openai.deployments
+        return deployments.get("small", "small"), deployments.get("large", "large")
+    if config.openai.enabled:
+        return config.openai.model_small or "small", config.openai.model_large or "large"
+    return "small", "large"
+
+
+__all__ = ["ClientStack", "model_names"]
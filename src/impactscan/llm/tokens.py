@@ -0,0 +1,230 @@
+"""Token counting for context budgets, rate limiting and usage reporting.
+
+Counting the same window text at every stage is wasteful, so counters are
+meant to be wrapped in :class:`CachedTokenCounter`, which memoises counts by
+content digest. Windows carry their count in ``CandidateFileWindow.token_count``
+once it has been computed, and later stages read it from there. A stage that
+has built a request estimate from those counts announces it with
+:func:`estimated_prompt`, and the rate limiter, hedger and adapters read it
+through :meth:`TokenCounter.count_prompt` instead of tokenising the prompt
+again.
+"""
+from __future__ import annotations
+
+import contextlib
+import importlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Protocol, cast
+
+from impactscan.cache.keys import content_digest
+from impactscan.cache.store import CacheStats
+from impactscan.errors import ConfigError
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable, Mapping
+
+    from impactscan.llm.client import Message
+    from impactscan.models import CandidateFileWindow
+
+logger = logging.getLogger(__name__)
+
+APPROX_CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+"""Per-message framing tokens added by chat completion APIs."""
+DEFAULT_ENCODING = "o200k_base"
+DEFAULT_CACHE_ENTRIES = 65_536
+
+_prompt_estimate: ContextVar[int | None] = ContextVar("impactscan_prompt_estimate", default=None)
+
+
+@contextlib.contextmanager
+def estimated_prompt(tokens: int) -> Generator[None]:
+    """Have client layers inside the block take ``tokens`` as the prompt size instead of counting the messages."""
+    token = _prompt_estimate.set(tokens)
+    try:
+        yield
+    finally:
+        _prompt_estimate.reset(token)
+
+
+class _Encoding(Protocol):
+    def encode_ordinary(self, text: str) -> list[int]: ...
+
+
+class TokenCounter:
+    """Interface for counting the tokens of a piece of text."""
+
+    name = "abstract"
+
+    def count(self, text: str) -> int:
+        """Return the number of tokens in ``text``."""
+        raise NotImplementedError
+
+    def count_messages(self, messages: Iterable[Message]) -> int:
+        """Return the prompt tokens of a chat request, including per-message framing."""
+        return sum(self.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+    def count_prompt(self, messages: Iterable[Message]) -> int:
+        """Return the estimate set by :func:`estimated_prompt`, counting ``messages`` only when there is none."""
+        estimate = _prompt_estimate.get()
+        return estimate if estimate is not None else self.count_messages(messages)
+
+
+class ApproxTokenCounter(TokenCounter):
+    """Character-class estimate that needs no tokenizer.
+
+    ASCII text averages about four characters per token with BPE
+    vocabularies, while CJK and other non-ASCII characters are close to one
+    token each, so the two are counted separately.
+    """
+
+    name = "approx"
+
+    def __init__(self, chars_per_token: int = APPROX_CHARS_PER_TOKEN) -> None:
+        """Set the ASCII characters-per-token ratio."""
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        """Estimate tokens from ASCII and non-ASCII character counts."""
+        ascii_chars = len(text.encode("ascii", errors="ignore"))
+        return math.ceil(ascii_chars / self.chars_per_token) + len(text) - ascii_chars
+
+
+class TiktokenCounter(TokenCounter):
+    """Exact counts from a tiktoken BPE encoding; requires the optional ``tiktoken`` package (``tokens`` extra)."""
+
+    def __init__(self, encoding: str = DEFAULT_ENCODING) -> None:
+        """Load ``encoding``, raising :class:`ConfigError` when tiktoken or the encoding is unavailable.
+
+        tiktoken downloads an encoding's BPE file on first use, so loading
+        also fails offline, with whatever network or file error it hit.
+        """
+        try:
+            tiktoken = importlib.import_module("tiktoken")
+        except ImportError as exc:
+            msg = "Exact token counting requires the 'tiktoken' package"
+            raise ConfigError(msg) from exc
+        try:
+            self._encoding = cast("_Encoding", tiktoken.get_encoding(encoding))
+        except Exception as exc:
+            msg = f"Could not load the tiktoken encoding {encoding!r}: {exc}"
+            raise ConfigError(msg) from exc
+        self.name = f"tiktoken:{encoding}"
+
+    def count(self, text: str) -> int:
+        """Encode ``text`` and return its length, treating special-token text as ordinary."""
+        return len(self._encoding.encode_ordinary(text))
+
+
+class CachedTokenCounter(TokenCounter):
+    """Memoise another counter's results by content digest, keeping the most recent entries."""
+
+    def __init__(self, inner: TokenCounter, *, max_entries: int = DEFAULT_CACHE_ENTRIES) -> None:
+        """Wrap ``inner``."""
+        self.inner = inner
+        self.name = inner.name
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """Return the cached count for ``text``, counting it on first sight."""
+        key = content_digest(text.encode("utf-8", errors="surrogatepass"))
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None:
+                self._counts.move_to_end(key)
+                self.stats.hits += 1
+                return cached
+            self.stats.misses += 1
+        tokens = self.inner.count(text)
+        with self._lock:
+            self._counts[key] = tokens
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return tokens
+
+
+def default_token_counter(*, exact: bool = True) -> CachedTokenCounter:
+    """Return a cached exact counter when tiktoken is usable, else a cached approximation."""
+    if exact:
+        try:
+            return CachedTokenCounter(TiktokenCounter())
+        except ConfigError as exc:
+            if not isinstance(exc.__cause__, ImportError):
+                logger.warning("Falling back to approximate token counts: %s", exc)
+    return CachedTokenCounter(ApproxTokenCounter())
+
+
+def window_tokens(window: CandidateFileWindow, counter: TokenCounter) -> int:
+    """Return the window's carried token count, counting and storing it on first use."""
+    if window.token_count is None:
+        window.token_count = counter.count(window.content)
+    return window.token_count
+
+
+def prompt_tokens(
+    counter: TokenCounter,
+    skeleton: Iterable[Message],
+    windows: Iterable[CandidateFileWindow] = (),
+    *,
+    framing: int = 0,
+) -> int:
+    """Estimate a chat prompt from its ``skeleton`` and the windows rendered into it.
+
+    The skeleton is the request with window contents left out; it is short and
+    its template parts hit the counter's cache. Window contents reuse their
+    carried counts, plus ``framing`` tokens each, so nothing is tokenised twice.
+    """
+    fixed = counter.count_messages(skeleton)
+    return fixed + sum(window_tokens(window, counter) + framing for window in windows)
+
+
+@dataclass
+class TokenUsage:
+    """Run-wide token totals in the shape of ``ImpactRunSummary.token_usage``.
+
+    Keys are ``"<stage>_<kind>"``, e.g. ``triage_prompt`` or
+    ``analysis_completion``; ``total`` sums every reported LLM token.
+    """
+
+    counts: dict[str, int] = field(default_factory=dict[str, int])
+
+    def add(self, key: str, tokens: int) -> None:
+        """Add ``tokens`` to ``key``."""
+        self.counts[key] = self.counts.get(key, 0) + tokens
+
+    def record_response(self, stage: str, usage: Mapping[str, Any] | None, *, estimated_prompt: int = 0) -> None:
+        """Record an LLM response's usage, falling back to the estimate when the provider sent none."""
+        usage = usage or {}
+        prompt = int(usage.get("prompt_tokens", estimated_prompt) or 0)
+        completion = int(usage.get("completion_tokens", 0) or 0)
+        self.add(f"{stage}_prompt", prompt)
+        self.add(f"{stage}_completion", completion)
+        self.add("total", prompt + completion)
+
+    def as_dict(self) -> dict[str, int]:
+        """Return a sorted copy of the totals."""
+        return dict(sorted(self.counts.items()))
+
+
+__all__ = [
+    "APPROX_CHARS_PER_TOKEN",
+    "DEFAULT_ENCODING",
+    "MESSAGE_OVERHEAD_TOKENS",
+    "ApproxTokenCounter",
+    "CachedTokenCounter",
+    "TiktokenCounter",
+    "TokenCounter",
+    "TokenUsage",
+    "default_token_counter",
+    "estimated_prompt",
+    "prompt_tokens",
+    "window_tokens",
+]
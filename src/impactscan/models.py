@@ -31,6 +31,7 @@ class CandidateHit(BaseModel):
     byte_offset: int
     kind: Literal["code", "string", "comment", "preproc_disabled", "unknown"] = "unknown"
     text: str
+    matched_keywords: list[str] = Field(default_factory=list)
 
 
 def _default_hits() -> list[CandidateHit]:
@@ -42,11 +43,15 @@ class CandidateFileWindow(BaseModel):
     """Aggregated view of ripgrep hits grouped by proximity within a file."""
 
     file: str
+    window_index: int = Field(default=0, ge=0)
     spans: list[tuple[int, int]] = Field(default_factory=_default_spans)
     hits: list[CandidateHit] = Field(default_factory=_default_hits)
     num_occurrences: int = Field(default=0, ge=0)
     file_hash: str | None = None
     commit: str | None = None
+    content: str = ""
+    token_count: int | None = Field(default=None, ge=0)
+    lexical_score: float | None = Field(default=None, ge=0.0, le=1.0)
 
     @field_validator("spans", mode="before")
     @classmethod
@@ -129,6 +134,14 @@ class ImpactAssessment(BaseModel):
         return value
 
 
+class ConcurrencyChange(BaseModel):
+    """A change of the adaptive LLM concurrency limit during a run."""
+
+    elapsed_sec: float = Field(ge=0.0)
+    limit: int = Field(ge=1)
+    reason: Literal["start", "increase", "throttled", "timeout", "latency"]
+
+
 class ImpactRunSummary(BaseModel):
     """Aggregate metrics covering an ImpactScan execution."""
 
@@ -138,13 +151,22 @@ class ImpactRunSummary(BaseModel):
     triage_kept: int
     analyzed: int
     output_paths: dict[str, str] = Field(default_factory=dict)
-    token_usage: dict[str, int] = Field(default_factory=dict)
+    token_usage: dict[str, int | float] = Field(default_factory=dict[str, int | float])
+    cache_stats: dict[str, dict[str, int]] = Field(default_factory=dict)
+    concurrency_limit: int | None = None
+    concurrency_history: list[ConcurrencyChange] = Field(default_factory=list[ConcurrencyChange])
+    hedge_rate: float | None = None
+    hedge_latency_saved_sec: float | None = None
+    budget_exhausted: Literal["tokens", "wall_time", "analyzed"] | None = None
+    skipped_windows: int = 0
+    prerank_dropped: int = 0
     elapsed_sec: float
 
 
 __all__ = [
     "CandidateFileWindow",
     "CandidateHit",
+    "ConcurrencyChange",
     "ImpactAssessment",
     "ImpactRunSummary",
     "InstructionIntention",
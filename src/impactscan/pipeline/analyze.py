@@ -1,22 +1,186 @@
-"""Detailed analysis stage implementation."""
+"""Detailed analysis stage implementation.
+
+Each window that passed triage is sent to the large model on its own, with
+the triage note, and the answer is validated into an
+:class:`~impactscan.models.ImpactAssessment`. The identity fields (file,
+occurrences, triage decision, revision) always come from the window, never
+from the model.
+"""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import contextlib
+import logging
+from typing import TYPE_CHECKING, Any, cast
+
+import orjson
+from pydantic import ValidationError
+
+from impactscan.llm.cache import bypass_cache
+from impactscan.llm.prompts import DEFAULT_ANALYSIS_PROMPT
+from impactscan.llm.tokens import ApproxTokenCounter, estimated_prompt, prompt_tokens
+from impactscan.models import ImpactAssessment
+from impactscan.pipeline.triage import render_window
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
 
-    from impactscan.models import ImpactAssessment, InstructionIntention, TriageResult
+    from impactscan.config import AnalysisConfig
+    from impactscan.llm.client import LLMClient, LLMResponse, Message
+    from impactscan.llm.prompts import PromptTemplate
+    from impactscan.llm.tokens import TokenCounter, TokenUsage
+    from impactscan.models import CandidateFileWindow, InstructionIntention, TriageResult
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_MAX_TOKENS = 1024
+ANALYSIS_ATTEMPTS = 2
+
+
+def build_analysis_messages(
+    intention: InstructionIntention,
+    window: CandidateFileWindow,
+    triage: TriageResult,
+    template: PromptTemplate = DEFAULT_ANALYSIS_PROMPT,
+) -> list[Message]:
+    """Return the chat messages asking for the assessment of one window."""
+    user = template.user.format(
+        intention=intention.intention,
+        keywords=", ".join([*intention.must_keywords, *intention.should_keywords]),
+        perspectives=", ".join(intention.normalized_perspectives),
+        triage_note="; ".join([triage.quick_reason, *triage.hints]),
+        window=render_window(window),
+    )
+    return [{"role": "system", "content": template.system}, {"role": "user", "content": user}]
+
+
+def _hit_lines(window: CandidateFileWindow) -> list[str]:
+    return [str(line) for line in dict.fromkeys(hit.line_no for hit in window.hits)]
+
+
+def parse_assessment(
+    response: LLMResponse,
+    window: CandidateFileWindow,
+    triage: TriageResult,
+) -> ImpactAssessment | None:
+    """Validate the model's answer for ``window``; ``None`` when it is missing or malformed."""
+    payload: object = response.get("json")
+    if payload is None:
+        try:
+            payload = orjson.loads(response.get("text") or "")
+        except orjson.JSONDecodeError:
+            return None
+    if not isinstance(payload, dict):
+        return None
+    fields = cast("dict[str, Any]", payload)
+    try:
+        assessment = ImpactAssessment.model_validate(
+            {
+                **fields,
+                "file": window.file,
+                "num_occurrences": window.num_occurrences,
+                "triage_decision": triage.triage_decision,
+                "commit": window.commit,
+                "hash": window.file_hash,
+            },
+        )
+    except ValidationError:
+        return None
+    if not assessment.lines:
+        assessment.lines = _hit_lines(window)
+    return assessment
+
+
+def fallback_assessment(window: CandidateFileWindow, triage: TriageResult) -> ImpactAssessment:
+    """Return the placeholder reported when the model never gave a valid answer for ``window``."""
+    return ImpactAssessment(
+        file=window.file,
+        impact_level="medium",
+        reason="Analysis response was missing or invalid; review manually.",
+        confidence=0.0,
+        lines=_hit_lines(window),
+        num_occurrences=window.num_occurrences,
+        triage_decision=triage.triage_decision,
+        commit=window.commit,
+        hash=window.file_hash,
+    )
+
+
+async def analyze_window(
+    window: CandidateFileWindow,
+    triage: TriageResult,
+    *,
+    intention: InstructionIntention,
+    client: LLMClient,
+    counter: TokenCounter | None = None,
+    usage: TokenUsage | None = None,
+) -> ImpactAssessment:
+    """Assess one window, retrying a malformed answer once before falling back to :func:`fallback_assessment`.
+
+    The retry bypasses the LLM response cache, which would otherwise replay
+    the rejected answer. The prompt estimate handed to the client layers is
+    built from the window's carried token count; reported usage is added to
+    ``usage`` under the ``analysis`` stage.
+    """
+    messages = build_analysis_messages(intention, window, triage)
+    skeleton = build_analysis_messages(intention, window.model_copy(update={"content": ""}), triage)
+    estimate = prompt_tokens(counter if counter is not None else ApproxTokenCounter(), skeleton, [window])
+    for attempt in range(ANALYSIS_ATTEMPTS):
+        with bypass_cache() if attempt else contextlib.nullcontext(), estimated_prompt(estimate):
+            response = await client.chat(
+                messages,
+                response_format={"type": "json_object"},
+                temperature=0.0,
+                max_tokens=ANALYSIS_MAX_TOKENS,
+            )
+        if usage is not None:
+            usage.record_response("analysis", response.get("usage"), estimated_prompt=estimate)
+        assessment = parse_assessment(response, window, triage)
+        if assessment is not None:
+            return assessment
+    logger.warning(
+        "No valid assessment for %s window %d; reporting it for manual review",
+        window.file,
+        window.window_index,
+    )
+    return fallback_assessment(window, triage)
 
 
 async def run_analysis(
-    triage_results: Iterable[TriageResult],
+    items: Iterable[tuple[CandidateFileWindow, TriageResult]],
     *,
     intention: InstructionIntention,
+    client: LLMClient,
+    config: AnalysisConfig,
+    counter: TokenCounter | None = None,
+    usage: TokenUsage | None = None,
 ) -> list[ImpactAssessment]:
-    """Execute the heavy-weight LLM analysis stage."""
-    msg = "Analysis execution is not yet implemented."
-    raise NotImplementedError(msg)
+    """Execute the heavy-weight LLM analysis stage for triaged windows, in input order.
+
+    At most ``config.parallelism`` windows are analysed at once.
+    """
+    gate = asyncio.Semaphore(config.parallelism)
+
+    async def one(window: CandidateFileWindow, triage: TriageResult) -> ImpactAssessment:
+        async with gate:
+            return await analyze_window(
+                window,
+                triage,
+                intention=intention,
+                client=client,
+                counter=counter,
+                usage=usage,
+            )
+
+    return list(await asyncio.gather(*(one(window, triage) for window, triage in items)))
 
 
-__all__ = ["run_analysis"]
+__all__ = [
+    "ANALYSIS_ATTEMPTS",
+    "ANALYSIS_MAX_TOKENS",
+    "analyze_window",
+    "build_analysis_messages",
+    "fallback_assessment",
+    "parse_assessment",
+    "run_analysis",
+]
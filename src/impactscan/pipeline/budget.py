@@ -0,0 +1,79 @@
+"""Run budgets that cap the cost of one ImpactScan run.
+
+``AnalysisConfig`` can bound a run by LLM tokens, wall time and the number
+of windows sent to the large model. :class:`RunBudget` answers whether any
+of them is used up; the streaming pipeline asks before every triage batch
+and analysis call, so requests already in flight finish but no new ones
+start, and the scan stops reading further hits.
+"""
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Literal
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from impactscan.config import AnalysisConfig
+    from impactscan.llm.tokens import TokenUsage
+
+BudgetName = Literal["tokens", "wall_time", "analyzed"]
+
+
+class RunBudget:
+    """Tracks token, time and analysis-count budgets of a run.
+
+    Tokens are read from ``usage["total"]``, so every stage recording into
+    ``usage`` draws from the same budget. The clock starts at :meth:`start`.
+    """
+
+    def __init__(
+        self,
+        config: AnalysisConfig,
+        usage: TokenUsage,
+        *,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """Read the limits from ``config``; ``None`` leaves a budget unbounded."""
+        self.max_total_tokens = config.max_total_tokens
+        self.max_wall_time_sec = config.max_wall_time_sec
+        self.max_analyzed = config.max_analyzed
+        self.usage = usage
+        self.clock = clock
+        self.started = clock()
+        self.analyzed = 0
+        self.exhausted: BudgetName | None = None
+
+    @property
+    def bounded(self) -> bool:
+        """Whether any budget is set, so that the run may stop before every window is analysed."""
+        return self.max_total_tokens is not None or self.max_wall_time_sec is not None or self.max_analyzed is not None
+
+    def start(self) -> None:
+        """Restart the wall-time budget."""
+        self.started = self.clock()
+
+    def check(self) -> bool:
+        """Return whether budget remains; the first budget found used up is kept in :attr:`exhausted`."""
+        if self.exhausted is None:
+            self.exhausted = self._used_up()
+        return self.exhausted is None
+
+    def start_analysis(self) -> bool:
+        """Count one window sent to the large model, or return ``False`` when the budget is exhausted."""
+        if not self.check():
+            return False
+        self.analyzed += 1
+        return True
+
+    def _used_up(self) -> BudgetName | None:
+        if self.max_total_tokens is not None and self.usage.counts.get("total", 0) >= self.max_total_tokens:
+            return "tokens"
+        if self.max_wall_time_sec is not None and self.clock() - self.started >= self.max_wall_time_sec:
+            return "wall_time"
+        if self.max_analyzed is not None and self.analyzed >= self.max_analyzed:
+            return "analyzed"
+        return None
+
+
+__all__ = ["BudgetName", "RunBudget"]
@@ -0,0 +1,269 @@
+"""Cluster duplicate windows so the LLM stages run once per cluster.
+
+Vendored copies, generated clients and copy-pasted modules produce many
+windows with the same code. Windows are grouped by a digest of their
+content with whitespace collapsed, and optionally merged further when their
+MinHash signatures estimate a Jaccard similarity of at least
+``near_duplicate_threshold`` over word 5-grams. Triage and analysis run on
+each cluster's representative, the first member in input order, and the
+results are fanned out to every member with that member's file, window,
+line numbers, occurrence count and revision.
+
+MinHash uses one-permutation hashing: every shingle is hashed once into one
+of :data:`MINHASH_BINS` bins, so fingerprinting is linear in the window
+size. Candidate pairs come from locality-sensitive hashing over bands of
+the signature and are verified against the full signature.
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from impactscan.cache.keys import content_digest
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from impactscan.models import CandidateFileWindow, ImpactAssessment, TriageResult
+
+MINHASH_BINS = 64
+MINHASH_BANDS = 16
+SHINGLE_WORDS = 5
+_EMPTY_BIN = 0xFFFFFFFF
+_LINE_REFERENCE = re.compile(r"^(?P<prefix>L?)(?P<start>\d+)(?:-(?P<end>\d+))?$")
+
+
+def normalize_content(text: str) -> str:
+    """Collapse every run of whitespace to one space, so re-indented or re-wrapped copies compare equal."""
+    return " ".join(text.split())
+
+
+def exact_fingerprint(text: str) -> str:
+    """Return the digest of ``text`` after :func:`normalize_content`."""
+    return content_digest(normalize_content(text).encode("utf-8", errors="surrogatepass"))
+
+
+def minhash_signature(text: str) -> tuple[int, ...]:
+    """Return the one-permutation MinHash signature of the word 5-grams of ``text``.
+
+    Empty bins borrow the value of the next non-empty bin, so that sparse
+    signatures stay comparable bin by bin.
+    """
+    words = text.split()
+    bins = [_EMPTY_BIN] * MINHASH_BINS
+    for start in range(max(1, len(words) - SHINGLE_WORDS + 1)):
+        hashed = zlib.crc32(" ".join(words[start : start + SHINGLE_WORDS]).encode("utf-8", errors="surrogatepass"))
+        index, value = hashed % MINHASH_BINS, hashed // MINHASH_BINS
+        bins[index] = min(bins[index], value)
+    donor = next((value for value in bins if value != _EMPTY_BIN), _EMPTY_BIN)
+    for index in reversed(range(MINHASH_BINS)):
+        if bins[index] == _EMPTY_BIN:
+            bins[index] = donor
+        else:
+            donor = bins[index]
+    return tuple(bins)
+
+
+def signature_similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimate the Jaccard similarity of two signatures as the fraction of equal bins."""
+    return sum(a == b for a, b in zip(left, right, strict=True)) / len(left)
+
+
+@dataclass
+class WindowCluster:
+    """Windows with the same (or nearly the same) content; ``members[0]`` is the representative."""
+
+    members: list[CandidateFileWindow] = field(default_factory=list["CandidateFileWindow"])
+
+    @property
+    def representative(self) -> CandidateFileWindow:
+        """The window sent to the LLM stages on behalf of the cluster."""
+        return self.members[0]
+
+    def fan_out_triage(self, result: TriageResult) -> list[TriageResult]:
+        """Copy the representative's triage result to every member, in member order."""
+        return [
+            result.model_copy(update={"file": member.file, "window_index": member.window_index})
+            for member in self.members
+        ]
+
+    def fan_out_assessment(self, assessment: ImpactAssessment) -> list[ImpactAssessment]:
+        """Copy the representative's assessment to every member with :func:`assessment_for`."""
+        return [assessment_for(member, self.representative, assessment) for member in self.members]
+
+
+def assessment_for(
+    member: CandidateFileWindow,
+    representative: CandidateFileWindow,
+    assessment: ImpactAssessment,
+) -> ImpactAssessment:
+    """Copy ``representative``'s assessment to ``member``.
+
+    Line references of the form ``12``, ``L12`` or ``12-14`` are moved by the
+    offset between the member's window and the representative's; other
+    entries are copied unchanged.
+    """
+    offset = _first_line(member) - _first_line(representative)
+    return assessment.model_copy(
+        update={
+            "file": member.file,
+            "lines": [_shift(line, offset) for line in assessment.lines],
+            "num_occurrences": member.num_occurrences,
+            "commit": member.commit,
+            "hash": member.file_hash,
+        },
+    )
+
+
+def _first_line(window: CandidateFileWindow) -> int:
+    return window.spans[0][0] if window.spans else 1
+
+
+def _shift(line: str, offset: int) -> str:
+    match = _LINE_REFERENCE.match(line)
+    if match is None or offset == 0:
+        return line
+    shifted = f"{match['prefix']}{int(match['start']) + offset}"
+    if match["end"] is not None:
+        shifted += f"-{int(match['end']) + offset}"
+    return shifted
+
+
+class _DisjointSet:
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, left: int, right: int) -> None:
+        left, right = self.find(left), self.find(right)
+        if left != right:
+            # The lower index wins, so the earliest window stays representative.
+            self.parent[max(left, right)] = min(left, right)
+
+
+def cluster_windows(
+    windows: Iterable[CandidateFileWindow],
+    *,
+    near_duplicate_threshold: float | None = None,
+) -> list[WindowCluster]:
+    """Group ``windows`` into clusters ordered by their representative's position in the input.
+
+    Without ``near_duplicate_threshold`` only whitespace-insensitive exact
+    duplicates are grouped.
+    """
+    clusters: list[WindowCluster] = []
+    by_digest: dict[str, WindowCluster] = {}
+    for window in windows:
+        digest = exact_fingerprint(window.content)
+        cluster = by_digest.get(digest)
+        if cluster is None:
+            cluster = by_digest[digest] = WindowCluster()
+            clusters.append(cluster)
+        cluster.members.append(window)
+    if near_duplicate_threshold is None or len(clusters) < 2:  # noqa: PLR2004
+        return clusters
+    return _merge_near_duplicates(clusters, near_duplicate_threshold)
+
+
+def _merge_near_duplicates(clusters: list[WindowCluster], threshold: float) -> list[WindowCluster]:
+    signatures = [minhash_signature(cluster.representative.content) for cluster in clusters]
+    rows = MINHASH_BINS // MINHASH_BANDS
+    sets = _DisjointSet(len(clusters))
+    for band in range(MINHASH_BANDS):
+        leaders: dict[tuple[int, ...], int] = {}
+        for index, signature in enumerate(signatures):
+            bucket = signature[band * rows : (band + 1) * rows]
+            leader = leaders.setdefault(bucket, index)
+            if leader != index and signature_similarity(signatures[leader], signature) >= threshold:
+                sets.union(leader, index)
+    merged: dict[int, WindowCluster] = {}
+    for index, cluster in enumerate(clusters):
+        root = sets.find(index)
+        if root in merged:
+            merged[root].members.extend(cluster.members)
+        else:
+            merged[root] = cluster
+    return list(merged.values())
+
+
+def fan_out_triage(clusters: Iterable[WindowCluster], results: Iterable[TriageResult]) -> list[TriageResult]:
+    """Expand per-representative triage results to every cluster member.
+
+    Results are matched to clusters by the representative's ``file`` and
+    ``window_index``; clusters without a result are skipped.
+    """
+    by_key = {(result.file, result.window_index): result for result in results}
+    expanded: list[TriageResult] = []
+    for cluster in clusters:
+        result = by_key.get((cluster.representative.file, cluster.representative.window_index))
+        if result is not None:
+            expanded.extend(cluster.fan_out_triage(result))
+    return expanded
+
+
+class WindowDeduplicator:
+    """Assign windows to clusters one at a time, for pipelines that cannot wait for every window.
+
+    Unlike :func:`cluster_windows`, an assignment is final: two clusters that
+    a later window would bridge are not merged. Only a content-free copy of
+    each representative and, for near duplicates, its signature are kept.
+    """
+
+    def __init__(self, *, near_duplicate_threshold: float | None = None) -> None:
+        """Group exact duplicates, and near duplicates when ``near_duplicate_threshold`` is set."""
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self._by_digest: dict[str, CandidateFileWindow] = {}
+        self._leaders: dict[tuple[int, tuple[int, ...]], tuple[CandidateFileWindow, tuple[int, ...]]] = {}
+
+    def assign(self, window: CandidateFileWindow) -> CandidateFileWindow | None:
+        """Return the representative ``window`` duplicates, or ``None`` when it becomes one itself."""
+        digest = exact_fingerprint(window.content)
+        representative = self._by_digest.get(digest)
+        if representative is not None:
+            return representative
+        threshold = self.near_duplicate_threshold
+        signature: tuple[int, ...] = ()
+        if threshold is not None:
+            signature = minhash_signature(window.content)
+            representative = self._similar(signature, threshold)
+        if representative is not None:
+            self._by_digest[digest] = representative
+            return representative
+        stub = window.model_copy(update={"content": "", "hits": []})
+        self._by_digest[digest] = stub
+        if threshold is not None:
+            rows = MINHASH_BINS // MINHASH_BANDS
+            for band in range(MINHASH_BANDS):
+                self._leaders.setdefault((band, signature[band * rows : (band + 1) * rows]), (stub, signature))
+        return None
+
+    def _similar(self, signature: tuple[int, ...], threshold: float) -> CandidateFileWindow | None:
+        rows = MINHASH_BINS // MINHASH_BANDS
+        for band in range(MINHASH_BANDS):
+            leader = self._leaders.get((band, signature[band * rows : (band + 1) * rows]))
+            if leader is not None and signature_similarity(leader[1], signature) >= threshold:
+                return leader[0]
+        return None
+
+
+__all__ = [
+    "MINHASH_BANDS",
+    "MINHASH_BINS",
+    "SHINGLE_WORDS",
+    "WindowCluster",
+    "WindowDeduplicator",
+    "assessment_for",
+    "cluster_windows",
+    "exact_fingerprint",
+    "fan_out_triage",
+    "minhash_signature",
+    "normalize_content",
+    "signature_similarity",
+]
@@ -1,22 +1,97 @@
 """Instruction intention extraction stage."""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import logging
+import re
+from typing import TYPE_CHECKING, Any, cast
+
+import orjson
+
+from impactscan.llm.prompts import DEFAULT_INTENTION_PROMPT
+from impactscan.models import InstructionIntention
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Iterable, Sequence
+
+    from impactscan.llm.client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+_QUOTED = re.compile(r"`([^`]+)`|\"([^\"]+)\"|'([^']+)'")
+
 
-    from impactscan.models import InstructionIntention
+def quoted_keywords(instruction: str) -> list[str]:
+    """Return the terms quoted with backticks, double or single quotes in ``instruction``."""
+    return [next(group for group in match.groups() if group) for match in _QUOTED.finditer(instruction)]
+
+
+def _strings(value: object) -> list[str]:
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list):
+        return []
+    return [item.strip() for item in cast("list[object]", value) if isinstance(item, str) and item.strip()]
+
+
+def _unique(*groups: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(keyword for group in groups for keyword in group if keyword))
 
 
 async def extract_intention(
     instruction: str,
     *,
     extra_keywords: Sequence[str] | None = None,
+    client: LLMClient | None = None,
+    perspectives: Sequence[str] = (),
 ) -> InstructionIntention:
-    """Derive the normalized instruction intention."""
-    msg = "Intention extraction is not yet implemented."
-    raise NotImplementedError(msg)
+    """Derive the normalized instruction intention.
+
+    With ``client`` the model restates the change and proposes keywords;
+    without one, or when its answer is unusable, the quoted terms of the
+    instruction become the keywords. ``extra_keywords`` are always searched
+    for.
+    """
+    extra = list(extra_keywords or [])
+    fallback = InstructionIntention(
+        intention=instruction.strip(),
+        must_keywords=_unique(extra, quoted_keywords(instruction)),
+        normalized_perspectives=list(perspectives),
+    )
+    if client is None:
+        return fallback
+    template = DEFAULT_INTENTION_PROMPT
+    response = await client.chat(
+        [
+            {"role": "system", "content": template.system},
+            {
+                "role": "user",
+                "content": template.user.format(instruction=instruction, extra_keywords=", ".join(extra)),
+            },
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.0,
+    )
+    payload: object = response.get("json")
+    if payload is None:
+        try:
+            payload = orjson.loads(response.get("text") or "")
+        except orjson.JSONDecodeError:
+            payload = None
+    if not isinstance(payload, dict):
+        logger.warning("Intention response was not a JSON object; searching for the quoted terms only")
+        return fallback
+    fields = cast("dict[str, Any]", payload)
+    must = _unique(extra, _strings(fields.get("must_keywords")) or _strings(fields.get("keywords")))
+    if not must:
+        return fallback
+    intention = fields.get("intention")
+    should = _unique(_strings(fields.get("should_keywords")))
+    return InstructionIntention(
+        intention=intention.strip() if isinstance(intention, str) and intention.strip() else fallback.intention,
+        must_keywords=must,
+        should_keywords=[keyword for keyword in should if keyword not in must],
+        normalized_perspectives=list(perspectives),
+    )
 
 
-__all__ = ["extract_intention"]
+__all__ = ["extract_intention", "quoted_keywords"]
@@ -0,0 +1,280 @@
+"""Append-only run journal for resuming interrupted runs.
+
+With ``OutputConfig.journal_path`` set, a run appends one JSON line per
+event: the instruction (``run``), the extracted ``intention``, every
+admitted ``window``, every completed ``triage`` result and every emitted
+``assessment``. Window records, triage results and assessments carry the
+digest of the window content they were recorded for. Resuming replays the
+file into a :class:`JournalState`: the intention is reused, and a window
+whose content is unchanged skips the LLM stages it already went through,
+so only the outstanding work is scheduled. The recorded window set tells
+the resumed run which windows changed or disappeared since.
+
+Records are serialised by the caller and queued to a background thread,
+which writes them and makes them durable with ``fsync`` every
+:data:`FSYNC_EVERY` records or :data:`FSYNC_INTERVAL_SEC` seconds,
+whichever comes first, so an event loop recording results never waits on
+the disk. A crash therefore loses at most one batch, which the resumed run
+simply redoes. A line torn by the crash is ignored on replay and cut off
+before appending.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+
+import orjson
+from pydantic import ValidationError
+
+from impactscan.cache.keys import content_digest
+from impactscan.models import ImpactAssessment, InstructionIntention, TriageResult
+from impactscan.pipeline.triage import window_key
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Collection, Sequence
+
+    from impactscan.models import CandidateFileWindow
+    from impactscan.pipeline.triage import WindowKey
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+FSYNC_EVERY = 64
+FSYNC_INTERVAL_SEC = 1.0
+
+
+def window_digest(window: CandidateFileWindow) -> str:
+    """Return the digest recorded with results, identifying the content they were computed for."""
+    return content_digest(window.content.encode())
+
+
+@dataclass
+class JournalState:
+    """Everything a journal recorded, keyed by window."""
+
+    instruction: str | None = None
+    extra_keywords: list[str] = field(default_factory=list[str])
+    intention: InstructionIntention | None = None
+    windows: dict[WindowKey, str] = field(default_factory=dict["WindowKey", str])
+    triage: dict[WindowKey, tuple[str, TriageResult]] = field(
+        default_factory=dict["WindowKey", tuple[str, TriageResult]],
+    )
+    assessments: dict[WindowKey, tuple[str, ImpactAssessment]] = field(
+        default_factory=dict["WindowKey", tuple[str, ImpactAssessment]],
+    )
+
+    def changed(self, window: CandidateFileWindow) -> bool:
+        """Return whether the journal recorded ``window`` with different content."""
+        digest = self.windows.get(window_key(window))
+        return digest is not None and digest != window_digest(window)
+
+    def missing(self, seen: Collection[WindowKey]) -> list[WindowKey]:
+        """Return the recorded windows not in ``seen``, in key order."""
+        return sorted(key for key in self.windows if key not in seen)
+
+    def triage_for(self, window: CandidateFileWindow) -> TriageResult | None:
+        """Return the recorded triage result of ``window``, unless its content changed since."""
+        entry = self.triage.get(window_key(window))
+        return entry[1] if entry is not None and entry[0] == window_digest(window) else None
+
+    def assessment_for(self, window: CandidateFileWindow) -> ImpactAssessment | None:
+        """Return the recorded assessment of ``window``, unless its content changed since."""
+        entry = self.assessments.get(window_key(window))
+        return entry[1] if entry is not None and entry[0] == window_digest(window) else None
+
+
+def _key(record: dict[str, Any]) -> WindowKey:
+    file, index = record["key"]
+    return (str(file), int(index))
+
+
+def read_journal(path: str | Path) -> JournalState:
+    """Replay the journal at ``path``; a missing file is an empty journal."""
+    state = JournalState()
+    path = Path(path)
+    if not path.exists():
+        return state
+    with path.open("rb") as handle:
+        for number, line in enumerate(handle, start=1):
+            try:
+                record = cast("dict[str, Any]", orjson.loads(line))
+                kind = record["type"]
+                if kind == "run":
+                    state.instruction = str(record["instruction"])
+                    state.extra_keywords = [str(keyword) for keyword in record["extra_keywords"]]
+                elif kind == "intention":
+                    state.intention = InstructionIntention.model_validate(record["intention"])
+                elif kind == "window":
+                    state.windows[_key(record)] = str(record["digest"])
+                elif kind == "triage":
+                    result = TriageResult.model_validate(record["result"])
+                    state.triage[_key(record)] = (str(record["digest"]), result)
+                elif kind == "assessment":
+                    assessment = ImpactAssessment.model_validate(record["assessment"])
+                    state.assessments[_key(record)] = (str(record["digest"]), assessment)
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError, ValidationError):
+                logger.warning("Ignoring unreadable record on line %d of journal %s", number, path)
+    return state
+
+
+def _cut_torn_tail(path: Path) -> None:
+    """Truncate ``path`` after its last newline, dropping a record torn by a crash."""
+    with path.open("r+b") as handle:
+        size = handle.seek(0, os.SEEK_END)
+        position = size
+        while position > 0:
+            step = min(position, 4096)
+            handle.seek(position - step)
+            newline = handle.read(step).rfind(b"\n")
+            if newline >= 0:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position != size:
+            handle.truncate(position)
+
+
+class RunJournal:
+    """Appends the records of one run to a JSON Lines file from a writer thread."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        append: bool = False,
+        fsync_every: int = FSYNC_EVERY,
+        fsync_interval_sec: float = FSYNC_INTERVAL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Open ``path``, continuing it when ``append`` is set and starting it over otherwise, and start the writer."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if append and self.path.exists():
+            _cut_torn_tail(self.path)
+        self._file = self.path.open("ab" if append else "wb")
+        self.fsync_every = fsync_every
+        self.fsync_interval_sec = fsync_interval_sec
+        self._clock = clock
+        self._pending = 0
+        self._synced_at = clock()
+        self._queue: queue.Queue[bytes | threading.Event | None] = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    def record_run(self, instruction: str, extra_keywords: Sequence[str]) -> None:
+        """Record the instruction the run was started with."""
+        self._append(
+            {
+                "type": "run",
+                "version": JOURNAL_VERSION,
+                "instruction": instruction,
+                "extra_keywords": list(extra_keywords),
+            },
+        )
+
+    def record_intention(self, intention: InstructionIntention) -> None:
+        """Record the extracted intention."""
+        self._append({"type": "intention", "intention": intention.model_dump(mode="json")})
+
+    def record_window(self, window: CandidateFileWindow) -> None:
+        """Record that ``window`` is part of the run."""
+        self._append({"type": "window", "key": window_key(window), "digest": window_digest(window)})
+
+    def record_triage(self, window: CandidateFileWindow, result: TriageResult) -> None:
+        """Record the triage result of ``window``."""
+        self._append(
+            {
+                "type": "triage",
+                "key": window_key(window),
+                "digest": window_digest(window),
+                "result": result.model_dump(mode="json"),
+            },
+        )
+
+    def record_assessment(self, window: CandidateFileWindow, assessment: ImpactAssessment) -> None:
+        """Record the assessment emitted for ``window``."""
+        self._append(
+            {
+                "type": "assessment",
+                "key": window_key(window),
+                "digest": window_digest(window),
+                "assessment": assessment.model_dump(mode="json"),
+            },
+        )
+
+    def sync(self) -> None:
+        """Block until every record queued so far has been written and ``fsync``-ed to disk."""
+        done = threading.Event()
+        self._put(done)
+        done.wait()
+
+    def close(self) -> None:
+        """Write and sync queued records, stop the writer and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+
+    def _append(self, record: dict[str, Any]) -> None:
+        self._put(orjson.dumps(record) + b"\n")
+
+    def _put(self, item: bytes | threading.Event) -> None:
+        if self._closed:
+            msg = "RunJournal is closed"
+            raise RuntimeError(msg)
+        self._queue.put(item)
+
+    def _write_loop(self) -> None:
+        while True:
+            timeout = None
+            if self._pending:
+                timeout = max(0.0, self.fsync_interval_sec - (self._clock() - self._synced_at))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._sync()
+                continue
+            if isinstance(item, bytes):
+                try:
+                    self._file.write(item)
+                except OSError:
+                    logger.exception("Failed to write a record to journal %s", self.path)
+                    continue
+                self._pending += 1
+                if self._pending >= self.fsync_every or self._clock() - self._synced_at >= self.fsync_interval_sec:
+                    self._sync()
+                continue
+            self._sync()
+            if item is None:
+                return
+            item.set()
+
+    def _sync(self) -> None:
+        """Flush written records and ``fsync`` them; runs on the writer thread."""
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            logger.exception("Failed to sync journal %s", self.path)
+        self._pending = 0
+        self._synced_at = self._clock()
+
+
+__all__ = [
+    "FSYNC_EVERY",
+    "FSYNC_INTERVAL_SEC",
+    "JOURNAL_VERSION",
+    "JournalState",
+    "RunJournal",
+    "read_journal",
+    "window_digest",
+]
@@ -0,0 +1,208 @@
+"""Lexical pre-ranking of windows before LLM triage.
+
+Every window costs a share of a triage request just to learn how relevant
+it is. :class:`LexicalRanker` estimates that locally, from four signals:
+
+* BM25 of the window text against the intention's keywords. The
+  ``must_keywords`` and ``should_keywords`` parts are each divided by the
+  best score their keywords could reach, and the second is added at
+  :data:`SHOULD_KEYWORD_WEIGHT`, so the result lies in ``[0, 1]`` and is
+  comparable with ``AnalysisConfig.triage_threshold``.
+* The kind of the best hit: string literals are discounted by
+  ``PreprocessConfig.string_weight_penalty`` and comments by
+  :data:`COMMENT_WEIGHT`.
+* Co-occurrence: the share of ``must_keywords`` present in the window.
+* The path: vendored, generated, documentation and test files are weighted
+  down (:data:`DIRECTORY_WEIGHTS`, :data:`FILENAME_WEIGHTS`); a path matching
+  several takes the lowest weight.
+
+Keywords are counted case-insensitively with ``str.count`` on the lowered
+window text, so the work per window is a few C-level scans plus a few
+microseconds of bookkeeping; a keyword inside a longer one is counted in
+both.
+
+The corpus statistics BM25 needs (document frequencies and the average
+window length) come from the first ``warmup`` windows scored, so scoring
+streams alongside window building. While that warm-up corpus is being
+collected scores are provisional and shift with every window; once it is
+complete (:attr:`LexicalRanker.calibrated`) the statistics and term weights
+are frozen, and a window's score no longer depends on which windows arrived
+before it. Only calibrated scores should be used to drop windows.
+:meth:`LexicalRanker.rank` scores a whole list against the same statistics.
+"""
+from __future__ import annotations
+
+import math
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from impactscan.config import PreprocessConfig
+    from impactscan.models import CandidateFileWindow, InstructionIntention
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+SHOULD_KEYWORD_WEIGHT = 0.5
+COMMENT_WEIGHT = 0.5
+CO_OCCURRENCE_FLOOR = 0.6
+"""Weight of a window that contains none of the ``must_keywords`` (only ``should_keywords``)."""
+DEFAULT_WARMUP_WINDOWS = 256
+"""Windows whose statistics calibrate a ranker before its scores are frozen."""
+
+DIRECTORY_WEIGHTS: dict[str, float] = {
+    **dict.fromkeys(("vendor", "vendors", "third_party", "third-party", "node_modules", "external"), 0.5),
+    "generated": 0.5,
+    **dict.fromkeys(("doc", "docs", "example", "examples", "sample", "samples"), 0.6),
+    **dict.fromkeys(("test", "tests", "spec", "__tests__"), 0.8),
+}
+"""Weights of files below directories with these names."""
+FILENAME_WEIGHTS: tuple[tuple[re.Pattern[str], float], ...] = (
+    (re.compile(r"\.generated\.|\.min\.\w+$|_pb2(?:_grpc)?\.py$|\.pb\.go$"), 0.5),
+    (re.compile(r"\.(?:md|rst|txt)$"), 0.6),
+    (re.compile(r"^test_|_test\.\w+$|\.(?:spec|test)\.\w+$"), 0.8),
+)
+"""Weights of file names matching these patterns."""
+
+_ANY_FILENAME = re.compile("|".join(pattern.pattern for pattern, _weight in FILENAME_WEIGHTS))
+
+
+class LexicalRanker:
+    """Scores windows for one intention without calling a model."""
+
+    def __init__(
+        self,
+        intention: InstructionIntention,
+        preprocess: PreprocessConfig,
+        *,
+        warmup: int = DEFAULT_WARMUP_WINDOWS,
+    ) -> None:
+        """Prepare the keyword matcher and empty corpus statistics, collected from the first ``warmup`` windows."""
+        must = list(dict.fromkeys(keyword.lower() for keyword in intention.must_keywords if keyword))
+        should = [
+            keyword
+            for keyword in dict.fromkeys(keyword.lower() for keyword in intention.should_keywords if keyword)
+            if keyword not in must
+        ]
+        self.terms = [*must, *should]
+        self.must_count = len(must)
+        # Co-occurrence weight by the number of must_keywords present.
+        self._co_occurrence = [
+            CO_OCCURRENCE_FLOOR + (1.0 - CO_OCCURRENCE_FLOOR) * present / (len(must) or 1)
+            for present in range(len(must) + 1)
+        ]
+        self.kind_weights = {
+            "code": 1.0,
+            "unknown": 1.0,
+            "string": 1.0 - preprocess.string_weight_penalty,
+            "comment": COMMENT_WEIGHT,
+            "preproc_disabled": 0.0,
+        }
+        self.warmup = warmup
+        self.documents = 0
+        self.total_length = 0
+        self.document_frequency = [0] * len(self.terms)
+        self._path_weights: dict[str, float] = {}
+        self._weights: list[float] | None = None
+        self._saturation = (BM25_K1, 0.0)
+
+    @property
+    def calibrated(self) -> bool:
+        """Whether the warm-up corpus is complete, so that scores are final."""
+        return self.documents >= self.warmup
+
+    def score(self, window: CandidateFileWindow) -> float:
+        """Return the score of ``window`` in ``[0, 1]``, adding it to the statistics during the warm-up."""
+        counts, length = self._observe(window)
+        return self._score(window, counts, length, self._term_weights())
+
+    def rank(self, windows: Iterable[CandidateFileWindow]) -> list[tuple[CandidateFileWindow, float]]:
+        """Score ``windows`` best first, with the statistics the warm-up takes from them; ties keep input order."""
+        observed = [(window, *self._observe(window)) for window in windows]
+        weights = self._term_weights()
+        scored = [(window, self._score(window, counts, length, weights)) for window, counts, length in observed]
+        scored.sort(key=lambda item: -item[1])
+        return scored
+
+    def path_weight(self, path: str) -> float:
+        """Return the lowest weight ``path`` gets from its directories and its file name."""
+        weight = self._path_weights.get(path)
+        if weight is None:
+            *directories, name = path.split("/")
+            weight = min((DIRECTORY_WEIGHTS.get(directory, 1.0) for directory in directories), default=1.0)
+            if _ANY_FILENAME.search(name):
+                weight = min(weight, *(named for pattern, named in FILENAME_WEIGHTS if pattern.search(name)))
+            self._path_weights[path] = weight
+        return weight
+
+    def _observe(self, window: CandidateFileWindow) -> tuple[list[int], int]:
+        """Count the keywords of ``window``, adding it to the corpus statistics until they are frozen."""
+        text = window.content or "\n".join(hit.text for hit in window.hits)
+        counts = list(map(text.lower().count, self.terms))
+        length = len(text)
+        if self.documents < self.warmup:
+            self.documents += 1
+            self.total_length += length
+            for position, count in enumerate(counts):
+                if count:
+                    self.document_frequency[position] += 1
+            self._weights = None
+        return counts, length
+
+    def _term_weights(self) -> list[float]:
+        """Return each term's idf divided by the summed idf of its group, scaled by the group's weight.
+
+        With these weights a group's BM25 is at most 1. Terms no window
+        contains yet get no weight, so they do not set the scale. The
+        weights, and the BM25 length normalisation, are computed again only
+        after the statistics changed.
+        """
+        if self._weights is not None:
+            return self._weights
+        average = self.total_length / self.documents if self.total_length else 1.0
+        self._saturation = (BM25_K1 * (1.0 - BM25_B), BM25_K1 * BM25_B / average)
+        documents = self.documents
+        idf = [
+            math.log(1.0 + (documents - frequency + 0.5) / (frequency + 0.5)) if frequency else 0.0
+            for frequency in self.document_frequency
+        ]
+        must, should = idf[: self.must_count], idf[self.must_count :]
+        must_scale, should_scale = sum(must) or 1.0, sum(should) / SHOULD_KEYWORD_WEIGHT or 1.0
+        self._weights = [value / must_scale for value in must] + [value / should_scale for value in should]
+        return self._weights
+
+    def _score(self, window: CandidateFileWindow, counts: list[int], length: int, weights: list[float]) -> float:
+        if not self.terms:
+            return 0.0
+        constant, per_char = self._saturation
+        saturation = constant + per_char * length
+        bm25 = 0.0
+        for weight, count in zip(weights, counts, strict=True):
+            if count:
+                bm25 += weight * count / (count + saturation)
+        lexical = min(1.0, bm25)
+        if self.must_count:
+            lexical *= self._co_occurrence[self.must_count - counts[: self.must_count].count(0)]
+        hits = window.hits
+        if len(hits) == 1:
+            kind = self.kind_weights[hits[0].kind]
+        else:
+            kind = max(map(self.kind_weights.__getitem__, {hit.kind for hit in hits}), default=1.0)
+        path = self._path_weights.get(window.file)
+        if path is None:
+            path = self.path_weight(window.file)
+        return lexical * kind * path
+
+
+__all__ = [
+    "BM25_B",
+    "BM25_K1",
+    "COMMENT_WEIGHT",
+    "CO_OCCURRENCE_FLOOR",
+    "DEFAULT_WARMUP_WINDOWS",
+    "DIRECTORY_WEIGHTS",
+    "FILENAME_WEIGHTS",
+    "SHOULD_KEYWORD_WEIGHT",
+    "LexicalRanker",
+]
@@ -0,0 +1,533 @@
+"""Streaming stage pipeline behind :meth:`ImpactScanEngine.iter_assessments`.
+
+Hits flow through scan → classify → window → triage → analyze, with each
+stage connected to the next by a bounded :class:`asyncio.Queue` and running
+its own number of workers (``ImpactScanConfig.pipeline``). Classify workers
+take files in batches of up to ``classify_batch_files``, collected for at
+most ``classify_flush_sec``, and hand each batch to the classifier's
+``build_ranges_many``, so its parse pool is not limited to one file per
+worker. Triage starts as
+soon as the first windows exist, while the scan is still walking the
+tree, and assessments are yielded as each one completes. When a downstream
+stage falls behind its input queue fills up and the stages before it block,
+down to ripgrep itself, so memory stays bounded by the queue sizes rather
+than by the size of the repository.
+
+Duplicate windows are recognised as they arrive (see
+:class:`~impactscan.pipeline.dedup.WindowDeduplicator`): only the first of
+each cluster is triaged and analysed, and its outcome is fanned out to the
+others, including ones that arrive after it completed.
+
+New windows are scored locally by
+:class:`~impactscan.pipeline.prerank.LexicalRanker` and wait for triage
+best-scored first; with ``AnalysisConfig.prerank_drop_ratio`` set, windows
+scoring below that fraction of ``triage_threshold`` are dropped without
+asking a model. The first ``prerank_warmup_windows`` windows calibrate the
+ranker and are never dropped, since their scores still depend on the order
+in which windows arrive.
+
+Triage-kept windows wait for the large model in a priority queue, highest
+``relevance_score`` first, so the most relevant windows are analysed first.
+A priority queue only orders what is waiting in it, so when a run budget is
+set, and the run may stop before everything is analysed, kept windows are
+held back until triage has finished or the queue (``pipeline.queue_size``)
+is full; analysis then takes the best window of that look-ahead rather than
+whichever was kept first. Once one of the run budgets in ``AnalysisConfig`` is used up (see
+:class:`~impactscan.pipeline.budget.RunBudget`) the scan stops, in-flight
+requests finish and every window still waiting is counted in
+:attr:`PipelineStats.skipped_windows` instead of being sent to a model.
+
+With a :class:`~impactscan.pipeline.journal.RunJournal` every admitted
+window, triage result and emitted assessment is recorded; with a ``replay``
+state from an earlier journal, windows it already assessed are emitted
+again without any LLM call and recorded triage results are reused. Windows
+the journal recorded with other content, or that no longer exist, are
+logged at the end of the resumed run.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, TypeVar, cast
+
+from impactscan.llm.tokens import TokenUsage
+from impactscan.pipeline.analyze import analyze_window
+from impactscan.pipeline.budget import RunBudget
+from impactscan.pipeline.dedup import WindowDeduplicator, assessment_for
+from impactscan.pipeline.prerank import LexicalRanker
+from impactscan.pipeline.triage import TriageSession, passes_triage, window_key
+from impactscan.preprocess.classifier import classify_hits
+from impactscan.preprocess.languages import detect_language
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, AsyncIterable, Awaitable, Callable
+
+    from impactscan.config import ImpactScanConfig
+    from impactscan.llm.client import LLMClient
+    from impactscan.llm.tokens import TokenCounter
+    from impactscan.models import (
+        CandidateFileWindow,
+        CandidateHit,
+        ImpactAssessment,
+        InstructionIntention,
+        TriageResult,
+    )
+    from impactscan.pipeline.budget import BudgetName
+    from impactscan.pipeline.journal import JournalState, RunJournal
+    from impactscan.pipeline.triage import WindowKey
+    from impactscan.preprocess.classifier import NonCodeClassifier
+    from impactscan.preprocess.filecache import FileContentCache
+    from impactscan.preprocess.windows import WindowBuilder
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class PipelineStats:
+    """Counters in the shape of the matching ``ImpactRunSummary`` fields."""
+
+    files_scanned: int = 0
+    matches_total: int = 0
+    candidates_after_filter: int = 0
+    triage_kept: int = 0
+    analyzed: int = 0
+    skipped_windows: int = 0
+    prerank_dropped: int = 0
+    budget_exhausted: BudgetName | None = None
+
+
+@dataclass
+class _Cluster:
+    """Outcome of a representative window, and the duplicates waiting for it."""
+
+    representative: CandidateFileWindow
+    waiting: list[CandidateFileWindow] = field(default_factory=list["CandidateFileWindow"])
+    kept: bool | None = None
+    skipped: bool = False
+    assessment: ImpactAssessment | None = None
+
+
+@dataclass(order=True)
+class _Ranked:
+    """A triage-kept window in the analysis queue; lower ``priority`` is analysed first."""
+
+    priority: float
+    sequence: int
+    item: tuple[CandidateFileWindow, TriageResult] | None = field(compare=False)
+
+
+_CLOSED = _Ranked(math.inf, 0, None)
+
+
+class _ScoredWindows(asyncio.Queue["CandidateFileWindow | None"]):
+    """Hands out the queued window with the best ``lexical_score`` first, and the closing ``None`` last."""
+
+    def _init(self, maxsize: int) -> None:  # noqa: ARG002 - the bound is enforced by Queue itself
+        # ``asyncio.Queue`` sizes itself by ``len(self._queue)``.
+        self._queue: list[tuple[float, int, CandidateFileWindow | None]] = []
+        self._sequence = itertools.count()
+
+    def _put(self, item: CandidateFileWindow | None) -> None:
+        priority = math.inf if item is None else -(item.lexical_score or 0.0)
+        heapq.heappush(self._queue, (priority, next(self._sequence), item))
+
+    def _get(self) -> CandidateFileWindow | None:
+        return heapq.heappop(self._queue)[2]
+
+
+def _unwrap(exc: BaseException) -> BaseException:
+    """Return the single error inside (nested) exception groups, so callers see what a stage raised."""
+    while isinstance(exc, BaseExceptionGroup):
+        errors = cast("BaseExceptionGroup[BaseException]", exc).exceptions
+        if len(errors) != 1:
+            break
+        exc = errors[0]
+    return cast("BaseException", exc)
+
+
+class StreamingPipeline:
+    """One run of the stage pipeline over a stream of hits.
+
+    ``hits`` must deliver each file's hits contiguously, as the scanners do.
+    Counters are updated in :attr:`stats` while the run progresses.
+    """
+
+    def __init__(
+        self,
+        config: ImpactScanConfig,
+        *,
+        intention: InstructionIntention,
+        hits: AsyncIterable[CandidateHit],
+        files: FileContentCache,
+        classifier: NonCodeClassifier,
+        windows: WindowBuilder,
+        triage_client: LLMClient,
+        analysis_client: LLMClient,
+        counter: TokenCounter | None = None,
+        usage: TokenUsage | None = None,
+        journal: RunJournal | None = None,
+        replay: JournalState | None = None,
+    ) -> None:
+        """Bind the run's inputs; nothing starts until :meth:`assessments` is iterated."""
+        self.config = config
+        self.intention = intention
+        self.hits = hits
+        self.files = files
+        self.classifier = classifier
+        self.windows = windows
+        self.analysis_client = analysis_client
+        self.counter = counter
+        self.journal = journal
+        self.replay = replay
+        self.usage = usage if usage is not None else TokenUsage()
+        self.budget = RunBudget(config.analysis, self.usage)
+        self.triage = TriageSession(
+            triage_client,
+            intention=intention,
+            config=config.analysis,
+            counter=counter,
+            usage=self.usage,
+        )
+        self.dedup = (
+            WindowDeduplicator(near_duplicate_threshold=config.preprocess.near_duplicate_threshold)
+            if config.preprocess.dedup_windows
+            else None
+        )
+        self.ranker = (
+            LexicalRanker(intention, config.preprocess, warmup=config.analysis.prerank_warmup_windows)
+            if config.analysis.prerank
+            else None
+        )
+        self.stats = PipelineStats()
+        self._clusters: dict[WindowKey, _Cluster] = {}
+        size = config.pipeline.queue_size
+        self._file_hits: asyncio.Queue[list[CandidateHit] | None] = asyncio.Queue(size)
+        self._code_hits: asyncio.Queue[list[CandidateHit] | None] = asyncio.Queue(size)
+        self._to_triage: asyncio.Queue[CandidateFileWindow | None] = _ScoredWindows(size)
+        self._to_analyze: asyncio.PriorityQueue[_Ranked] = asyncio.PriorityQueue(size)
+        self._ranks = itertools.count()
+        self._lookahead = asyncio.Condition()
+        self._triage_done = not self.budget.bounded
+        self._output: asyncio.Queue[ImpactAssessment | None] = asyncio.Queue(size)
+        self._failure: Exception | None = None
+        self._admitted: set[WindowKey] = set()
+        self._changed = 0
+
+    async def assessments(self) -> AsyncGenerator[ImpactAssessment]:
+        """Run the stages and yield assessments in completion order.
+
+        Closing the generator early cancels every stage. The first error
+        raised by a stage cancels the others and is re-raised here.
+        """
+        self.budget.start()
+        runner = asyncio.ensure_future(self._run())
+        try:
+            while (assessment := await self._output.get()) is not None:
+                yield assessment
+            await runner
+            if self._failure is not None:
+                raise _unwrap(self._failure)
+        finally:
+            runner.cancel()
+            await asyncio.wait([runner])
+
+    async def _run(self) -> None:
+        pipeline = self.config.pipeline
+        try:
+            async with asyncio.TaskGroup() as group:
+                stages = (
+                    (1, self._scan, functools.partial(self._file_hits.put, None)),
+                    (pipeline.classify_workers, self._classify, functools.partial(self._code_hits.put, None)),
+                    (pipeline.window_workers, self._window, functools.partial(self._to_triage.put, None)),
+                    (pipeline.triage_workers, self._triage, self._close_triage),
+                    (pipeline.analyze_workers, self._analyze, None),
+                )
+                for workers, work, close in stages:
+                    group.create_task(self._stage(workers, work, close))
+        except Exception as exc:  # handed to the consumer, which re-raises it
+            self._failure = exc
+        else:
+            self._report_replay()
+        await self._output.put(None)
+
+    @staticmethod
+    async def _stage(
+        workers: int,
+        work: Callable[[], Awaitable[None]],
+        close: Callable[[], Awaitable[None]] | None,
+    ) -> None:
+        """Run ``workers`` copies of ``work``, then ``close`` the downstream queue once."""
+        await asyncio.gather(*(work() for _ in range(workers)))
+        if close is not None:
+            await close()
+
+    @staticmethod
+    async def _next(queue: asyncio.Queue[_T | None]) -> _T | None:
+        """Return the next item, or ``None`` once closed; the ``None`` is put back for sibling workers."""
+        item = await queue.get()
+        if item is None:
+            queue.put_nowait(None)
+        return item
+
+    async def _scan(self) -> None:
+        current: list[CandidateHit] = []
+        try:
+            async for hit in self.hits:
+                if not self._within_budget():
+                    break
+                self.stats.matches_total += 1
+                if current and current[0].file != hit.file:
+                    await self._file_hits.put(current)
+                    current = []
+                if not current:
+                    self.stats.files_scanned += 1
+                current.append(hit)
+            if current:
+                await self._file_hits.put(current)
+        finally:
+            aclose = getattr(self.hits, "aclose", None)
+            if aclose is not None:
+                # Stops ripgrep now, also when the run is cancelled, rather than whenever the generator is collected.
+                await aclose()
+
+    async def _classify(self) -> None:
+        while (batch := await self._file_batch()) is not None:
+            for kept in await self._code_only(batch):
+                if kept:
+                    await self._code_hits.put(kept)
+
+    async def _file_batch(self) -> list[list[CandidateHit]] | None:
+        """Wait for one file, then collect the files queued within the flush delay; ``None`` once closed."""
+        pipeline = self.config.pipeline
+        first = await self._next(self._file_hits)
+        if first is None:
+            return None
+        batch = [first]
+        if pipeline.classify_flush_sec and self._file_hits.qsize() < pipeline.classify_batch_files - 1:
+            await asyncio.sleep(pipeline.classify_flush_sec)
+        while len(batch) < pipeline.classify_batch_files and not self._file_hits.empty():
+            hits = self._file_hits.get_nowait()
+            if hits is None:
+                self._file_hits.put_nowait(None)
+                break
+            batch.append(hits)
+        return batch
+
+    async def _code_only(self, batch: list[list[CandidateHit]]) -> list[list[CandidateHit]]:
+        """Classify a batch of files' hits and drop those in disabled code and, if configured, in comments.
+
+        The files are classified with one ``build_ranges_many`` call, so the
+        classifier can spread them over its workers.
+        """
+        preprocess = self.config.preprocess
+        readable: list[list[CandidateHit]] = []
+        items: list[tuple[str, bytes | memoryview, str | None]] = []
+        for hits in batch:
+            path = hits[0].file
+            try:
+                content = self.files.read(path)
+            except FileNotFoundError:
+                logger.warning("Skipping %s: file disappeared after scanning", path)
+                continue
+            readable.append(hits)
+            items.append((path, content, detect_language(path)))
+        if not items:
+            return []
+        dropped = {"preproc_disabled", "comment"} if preprocess.drop_comment_lines else {"preproc_disabled"}
+        kept: list[list[CandidateHit]] = []
+        for hits, ranges in zip(readable, await self.classifier.build_ranges_many(items), strict=True):
+            kinds = classify_hits([hit.byte_offset for hit in hits], ranges, preprocess.keep_string_literals)
+            kept.append(
+                [
+                    hit.model_copy(update={"kind": kind})
+                    for hit, kind in zip(hits, kinds, strict=True)
+                    if kind not in dropped
+                ],
+            )
+        return kept
+
+    async def _window(self) -> None:
+        while (hits := await self._next(self._code_hits)) is not None:
+            try:
+                windows = await asyncio.to_thread(self.windows.build, hits[0].file, hits)
+            except FileNotFoundError:
+                logger.warning("Skipping %s: file disappeared after scanning", hits[0].file)
+                continue
+            self.stats.candidates_after_filter += len(windows)
+            for window in windows:
+                if self._prerank(window):
+                    await self._admit(window)
+
+    def _prerank(self, window: CandidateFileWindow) -> bool:
+        """Score ``window`` lexically; ``False`` when it scores too low to be worth triage."""
+        if self.ranker is None:
+            return True
+        window.lexical_score = score = self.ranker.score(window)
+        ratio = self.config.analysis.prerank_drop_ratio
+        if ratio is None or not self.ranker.calibrated or score >= ratio * self.config.analysis.triage_threshold:
+            return True
+        self.stats.prerank_dropped += 1
+        return False
+
+    async def _admit(self, window: CandidateFileWindow) -> None:
+        """Send a new representative to triage, or attach a duplicate to its cluster."""
+        if self.journal is not None:
+            self.journal.record_window(window)
+        if self.replay is not None:
+            self._admitted.add(window_key(window))
+            self._changed += self.replay.changed(window)
+        representative = self.dedup.assign(window) if self.dedup is not None else None
+        replayed = self.replay.assessment_for(window) if self.replay is not None else None
+        if replayed is not None:
+            if representative is None and self.dedup is not None:
+                # Later duplicates are answered from the replayed assessment.
+                cluster = _Cluster(window, kept=True, assessment=replayed)
+                self._clusters[window_key(window)] = cluster
+                self._settle(cluster)
+            self.stats.triage_kept += 1
+            await self._emit(window, replayed, record=False)
+            return
+        if representative is None:
+            self._clusters[window_key(window)] = _Cluster(window)
+            await self._to_triage.put(window)
+            return
+        cluster = self._clusters[window_key(representative)]
+        if cluster.skipped:
+            self.stats.skipped_windows += 1
+            return
+        if cluster.kept:
+            self.stats.triage_kept += 1
+        if cluster.kept is None or (cluster.kept and cluster.assessment is None):
+            cluster.waiting.append(window)
+        elif cluster.assessment is not None:
+            await self._emit(window, assessment_for(window, cluster.representative, cluster.assessment))
+
+    def _report_replay(self) -> None:
+        """Log the windows that changed or disappeared since the replayed journal was written."""
+        if self.replay is None or self.stats.budget_exhausted is not None:
+            return
+        missing = self.replay.missing(self._admitted)
+        if self._changed or missing:
+            logger.info(
+                "Since the journal was written, %d windows changed and %d are gone",
+                self._changed,
+                len(missing),
+            )
+
+    async def _triage(self) -> None:
+        threshold = self.config.analysis.triage_threshold
+        while (batch := await self.triage.take_batch(self._to_triage)) is not None:
+            results = self._replayed_triage(batch)
+            fresh = [window for window in batch if window_key(window) not in results]
+            if fresh and not self._within_budget():
+                for window in fresh:
+                    self._skip(self._clusters[window_key(window)])
+                batch = [window for window in batch if window_key(window) in results]
+            elif fresh:
+                answered = await self.triage.triage_batch(fresh)
+                if self.journal is not None:
+                    for window in fresh:
+                        self.journal.record_triage(window, answered[window_key(window)])
+                results.update(answered)
+            for window in batch:
+                result = results[window_key(window)]
+                cluster = self._clusters[window_key(window)]
+                cluster.kept = passes_triage(result, threshold)
+                if cluster.kept:
+                    self.stats.triage_kept += 1 + len(cluster.waiting)
+                    ranked = _Ranked(-result.relevance_score, next(self._ranks), (window, result))
+                    await self._to_analyze.put(ranked)
+                    if self._to_analyze.full():
+                        async with self._lookahead:
+                            self._lookahead.notify_all()
+                else:
+                    self._settle(cluster)
+
+    async def _close_triage(self) -> None:
+        await self._to_analyze.put(_CLOSED)
+        async with self._lookahead:
+            self._triage_done = True
+            self._lookahead.notify_all()
+
+    async def _next_ranked(self) -> _Ranked:
+        """Return the best kept window; on a budgeted run, wait for a full look-ahead while triage runs."""
+        if not self._triage_done:
+            async with self._lookahead:
+                await self._lookahead.wait_for(lambda: self._triage_done or self._to_analyze.full())
+        return await self._to_analyze.get()
+
+    async def _analyze(self) -> None:
+        while (item := (await self._next_ranked()).item) is not None:
+            window, result = item
+            cluster = self._clusters[window_key(window)]
+            if not self.budget.start_analysis():
+                self._note_exhausted()
+                self._skip(cluster)
+                continue
+            assessment = await analyze_window(
+                window,
+                result,
+                intention=self.intention,
+                client=self.analysis_client,
+                counter=self.counter,
+                usage=self.usage,
+            )
+            cluster.assessment = assessment
+            waiting = self._settle(cluster)
+            await self._emit(window, assessment)
+            for member in waiting:
+                await self._emit(member, assessment_for(member, window, assessment))
+        # Hand the closing entry on to the sibling workers.
+        self._to_analyze.put_nowait(_CLOSED)
+
+    def _replayed_triage(self, batch: list[CandidateFileWindow]) -> dict[WindowKey, TriageResult]:
+        """Return the journaled triage results of the windows in ``batch`` whose content is unchanged."""
+        if self.replay is None:
+            return {}
+        results: dict[WindowKey, TriageResult] = {}
+        for window in batch:
+            result = self.replay.triage_for(window)
+            if result is not None:
+                results[window_key(window)] = result
+        return results
+
+    def _within_budget(self) -> bool:
+        if self.budget.check():
+            return True
+        self._note_exhausted()
+        return False
+
+    def _note_exhausted(self) -> None:
+        if self.stats.budget_exhausted is None:
+            self.stats.budget_exhausted = self.budget.exhausted
+            logger.info("Run budget %r exhausted; skipping the remaining windows", self.budget.exhausted)
+
+    def _skip(self, cluster: _Cluster) -> None:
+        """Count ``cluster`` and its waiting duplicates as skipped for lack of budget."""
+        cluster.skipped = True
+        self.stats.skipped_windows += 1 + len(self._settle(cluster))
+
+    def _settle(self, cluster: _Cluster) -> list[CandidateFileWindow]:
+        """Mark ``cluster`` decided and return its waiting duplicates; keep only a content-free representative."""
+        waiting, cluster.waiting = cluster.waiting, []
+        if self.dedup is None:
+            del self._clusters[window_key(cluster.representative)]
+            return waiting
+        cluster.representative = cluster.representative.model_copy(update={"content": "", "hits": []})
+        return waiting
+
+    async def _emit(self, window: CandidateFileWindow, assessment: ImpactAssessment, *, record: bool = True) -> None:
+        if record and self.journal is not None:
+            self.journal.record_assessment(window, assessment)
+        self.stats.analyzed += 1
+        await self._output.put(assessment)
+
+
+__all__ = ["PipelineStats", "StreamingPipeline"]
@@ -1,22 +1,313 @@
-"""LLM powered triage stage."""
+"""LLM powered triage stage.
+
+Triage asks the small model whether each window could be affected by the
+requested change. Sending one request per window makes the requests-per-minute
+limit the bottleneck long before the token limit, so windows are packed into
+batches bounded by ``AnalysisConfig.triage_batch_tokens`` and the model
+answers with one result per window, identified by ``file`` and
+``window_index``. Results that are missing or malformed are retried one
+window at a time instead of re-sending the batch, and the batch size follows
+the observed error rate.
+"""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import contextlib
+import logging
+import math
+from collections import deque
+from typing import TYPE_CHECKING, Any, cast
+
+import orjson
+from pydantic import ValidationError
+
+from impactscan.llm.cache import bypass_cache
+from impactscan.llm.prompts import DEFAULT_TRIAGE_PROMPT, DEFAULT_TRIAGE_WINDOW
+from impactscan.llm.tokens import ApproxTokenCounter, estimated_prompt, prompt_tokens, window_tokens
+from impactscan.models import TriageResult
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Iterable, Sequence
+
+    from impactscan.config import AnalysisConfig
+    from impactscan.llm.client import LLMClient, LLMResponse, Message
+    from impactscan.llm.prompts import PromptTemplate
+    from impactscan.llm.tokens import TokenCounter, TokenUsage
+    from impactscan.models import CandidateFileWindow, InstructionIntention
+
+logger = logging.getLogger(__name__)
+
+TRIAGE_TOKENS_PER_RESULT = 96
+"""Completion tokens requested per window in a batch."""
+WINDOW_FRAMING_TOKENS = 24
+"""Allowance for the header and fences around each rendered window."""
+SINGLE_ATTEMPTS = 2
+DEFAULT_TARGET_ERROR_RATE = 0.05
+
+WindowKey = tuple[str, int]
+
+
+class BatchSizer:
+    """Adapt the number of windows per triage request to how reliably the model answers.
+
+    The error rate is an exponential average of the fraction of windows per
+    batch that came back missing or malformed. While it stays under
+    ``target_error_rate`` a clean batch adds one window; a batch with errors
+    while the average is over target halves the size.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        *,
+        min_size: int = 1,
+        target_error_rate: float = DEFAULT_TARGET_ERROR_RATE,
+        smoothing: float = 0.3,
+    ) -> None:
+        """Start at ``max_size``."""
+        self.max_size = max_size
+        self.min_size = min_size
+        self.target_error_rate = target_error_rate
+        self.smoothing = smoothing
+        self.size = max_size
+        self.error_rate = 0.0
+
+    def record(self, windows: int, failures: int) -> None:
+        """Update the error rate with one batch's outcome and resize."""
+        if windows <= 1:
+            return
+        self.error_rate += self.smoothing * (failures / windows - self.error_rate)
+        if failures and self.error_rate > self.target_error_rate:
+            self.size = max(self.min_size, math.ceil(self.size / 2))
+        elif not failures and self.error_rate <= self.target_error_rate:
+            self.size = min(self.max_size, self.size + 1)
+
+
+def window_key(window: CandidateFileWindow) -> WindowKey:
+    """Return the identity the model echoes back for ``window``."""
+    return (window.file, window.window_index)
+
+
+def render_window(window: CandidateFileWindow) -> str:
+    """Format one window for the triage prompt."""
+    lines = ",".join(f"{start}-{end}" for start, end in window.spans)
+    return DEFAULT_TRIAGE_WINDOW.format(
+        file=window.file,
+        window_index=window.window_index,
+        lines=lines,
+        content=window.content,
+    )
+
+
+def build_triage_messages(
+    intention: InstructionIntention,
+    windows: Sequence[CandidateFileWindow],
+    template: PromptTemplate = DEFAULT_TRIAGE_PROMPT,
+) -> list[Message]:
+    """Return the chat messages asking for one triage result per window."""
+    user = template.user.format(
+        intention=intention.intention,
+        keywords=", ".join([*intention.must_keywords, *intention.should_keywords]),
+        perspectives=", ".join(intention.normalized_perspectives),
+        windows="\n\n".join(render_window(window) for window in windows),
+    )
+    return [{"role": "system", "content": template.system}, {"role": "user", "content": user}]
+
+
+def parse_triage_results(response: LLMResponse, expected: Iterable[WindowKey]) -> dict[WindowKey, TriageResult]:
+    """Return the valid results for ``expected`` windows; anything else in the response is ignored.
+
+    Accepts a ``{"results": [...]}`` object or a bare array, from the parsed
+    JSON or, failing that, the response text.
+    """
+    payload: object = response.get("json")
+    if payload is None:
+        try:
+            payload = orjson.loads(response.get("text") or "")
+        except orjson.JSONDecodeError:
+            return {}
+    if isinstance(payload, dict):
+        payload = cast("dict[str, Any]", payload).get("results")
+    if not isinstance(payload, list):
+        return {}
+    wanted = set(expected)
+    results: dict[WindowKey, TriageResult] = {}
+    for item in cast("list[object]", payload):
+        try:
+            result = TriageResult.model_validate(item)
+        except ValidationError:
+            continue
+        key = (result.file, result.window_index)
+        if key in wanted and key not in results:
+            results[key] = result
+    return results
+
+
+class TriageSession:
+    """State shared by the workers triaging one stream of windows."""
+
+    def __init__(
+        self,
+        client: LLMClient,
+        *,
+        intention: InstructionIntention,
+        config: AnalysisConfig,
+        counter: TokenCounter | None = None,
+        usage: TokenUsage | None = None,
+        sizer: BatchSizer | None = None,
+    ) -> None:
+        """Bind the client and the run's intention."""
+        self.client = client
+        self.intention = intention
+        self.config = config
+        self.counter = counter if counter is not None else ApproxTokenCounter()
+        self.usage = usage
+        self.sizer = sizer if sizer is not None else BatchSizer(config.triage_batch_max_windows)
+        self.skeleton = build_triage_messages(intention, [])
+        self.fixed_tokens = self.counter.count_messages(self.skeleton)
+        self._carried: deque[CandidateFileWindow] = deque()
+
+    def next_batch(self, pending: deque[CandidateFileWindow]) -> list[CandidateFileWindow]:
+        """Take windows from ``pending`` while they fit the token budget and the current batch size."""
+        batch = [pending.popleft()]
+        tokens = self.fixed_tokens + self._cost(batch[0])
+        while pending and len(batch) < self.sizer.size:
+            cost = self._cost(pending[0])
+            if tokens + cost > self.config.triage_batch_tokens:
+                break
+            tokens += cost
+            batch.append(pending.popleft())
+        return batch
+
+    async def take_batch(
+        self,
+        windows: asyncio.Queue[CandidateFileWindow | None],
+    ) -> list[CandidateFileWindow] | None:
+        """Wait for one window, then add the windows already queued while they fit; ``None`` once closed.
 
-    from impactscan.models import CandidateFileWindow, InstructionIntention, TriageResult
+        The stream is closed by a single ``None``, which is put back so every
+        worker sees it. A window that does not fit is carried over to the next
+        batch.
+        """
+        if not self._carried:
+            window = await windows.get()
+            if window is None:
+                windows.put_nowait(None)
+                return None
+            self._carried.append(window)
+        while len(self._carried) < self.sizer.size and not windows.empty():
+            window = windows.get_nowait()
+            if window is None:
+                windows.put_nowait(None)
+                break
+            self._carried.append(window)
+        return self.next_batch(self._carried)
+
+    def _cost(self, window: CandidateFileWindow) -> int:
+        return window_tokens(window, self.counter) + WINDOW_FRAMING_TOKENS + TRIAGE_TOKENS_PER_RESULT
+
+    async def request(
+        self,
+        batch: Sequence[CandidateFileWindow],
+        *,
+        fresh: bool = False,
+    ) -> dict[WindowKey, TriageResult]:
+        """Send one triage request and return the valid results it contains; ``fresh`` bypasses the LLM cache."""
+        messages = build_triage_messages(self.intention, batch)
+        estimate = prompt_tokens(self.counter, self.skeleton, batch, framing=WINDOW_FRAMING_TOKENS)
+        with bypass_cache() if fresh else contextlib.nullcontext(), estimated_prompt(estimate):
+            response = await self.client.chat(
+                messages,
+                response_format={"type": "json_object"},
+                temperature=0.0,
+                max_tokens=TRIAGE_TOKENS_PER_RESULT * len(batch),
+            )
+        if self.usage is not None:
+            self.usage.record_response("triage", response.get("usage"), estimated_prompt=estimate)
+        return parse_triage_results(response, map(window_key, batch))
+
+    async def single(self, window: CandidateFileWindow) -> TriageResult:
+        """Triage one window alone, falling back to ``maybe`` at the threshold if it keeps failing.
+
+        Retries bypass the LLM cache, which would otherwise replay the rejected answer.
+        """
+        key = window_key(window)
+        for attempt in range(SINGLE_ATTEMPTS):
+            result = (await self.request([window], fresh=attempt > 0)).get(key)
+            if result is not None:
+                return result
+        logger.warning("No valid triage result for %s window %d; keeping it for analysis", *key)
+        return TriageResult(
+            file=window.file,
+            window_index=window.window_index,
+            triage_decision="maybe",
+            relevance_score=self.config.triage_threshold,
+            quick_reason="Triage response was missing or invalid.",
+        )
+
+    async def triage_batch(self, batch: Sequence[CandidateFileWindow]) -> dict[WindowKey, TriageResult]:
+        """Return one result per window of ``batch``, retrying missing ones alone."""
+        if len(batch) == 1:
+            return {window_key(batch[0]): await self.single(batch[0])}
+        answered = await self.request(batch)
+        missing = [window for window in batch if window_key(window) not in answered]
+        self.sizer.record(len(batch), len(missing))
+        for window in missing:
+            answered[window_key(window)] = await self.single(window)
+        return answered
+
+    async def worker(self, pending: deque[CandidateFileWindow], results: dict[WindowKey, TriageResult]) -> None:
+        """Triage batches from ``pending`` until it is empty."""
+        while pending:
+            results.update(await self.triage_batch(self.next_batch(pending)))
+
+
+def passes_triage(result: TriageResult, threshold: float) -> bool:
+    """Whether ``result`` sends its window on to analysis: ``keep``, or ``maybe`` at ``threshold`` or above."""
+    return result.triage_decision == "keep" or (
+        result.triage_decision == "maybe" and result.relevance_score >= threshold
+    )
 
 
 async def run_triage(
     windows: Iterable[CandidateFileWindow],
     *,
     intention: InstructionIntention,
+    client: LLMClient,
+    config: AnalysisConfig,
+    counter: TokenCounter | None = None,
+    usage: TokenUsage | None = None,
+    sizer: BatchSizer | None = None,
 ) -> list[TriageResult]:
-    """Execute the triage stage for provided windows."""
-    msg = "Triage execution is not yet implemented."
-    raise NotImplementedError(msg)
+    """Triage ``windows`` in token-bounded batches and return one result per window, in input order.
+
+    ``config.parallelism`` batches are in flight at once; wrap ``client`` in
+    the rate and concurrency limiters to bound it further. Reported usage is
+    added to ``usage`` under the ``triage`` stage.
+    """
+    ordered = list(windows)
+    keys = [window_key(window) for window in ordered]
+    if len(set(keys)) != len(keys):
+        msg = "Triage windows must have distinct (file, window_index) pairs"
+        raise ValueError(msg)
+    state = TriageSession(client, intention=intention, config=config, counter=counter, usage=usage, sizer=sizer)
+    pending = deque(ordered)
+    results: dict[WindowKey, TriageResult] = {}
+    workers = min(config.parallelism, len(ordered))
+    await asyncio.gather(*(state.worker(pending, results) for _ in range(workers)))
+    return [results[key] for key in keys]
 
 
-__all__ = ["run_triage"]
+__all__ = [
+    "SINGLE_ATTEMPTS",
+    "TRIAGE_TOKENS_PER_RESULT",
+    "WINDOW_FRAMING_TOKENS",
+    "BatchSizer",
+    "TriageSession",
+    "build_triage_messages",
+    "parse_triage_results",
+    "passes_triage",
+    "render_window",
+    "run_triage",
+    "window_key",
+]
@@ -0,0 +1,167 @@
+"""Content-addressed caching of :class:`NonCodeRanges`."""
+from __future__ import annotations
+
+import asyncio
+import struct
+import sys
+from array import array
+from typing import TYPE_CHECKING
+
+from impactscan.cache.keys import content_digest, stable_key
+from impactscan.cache.store import CacheStats
+from impactscan.config import PreprocessConfig
+from impactscan.preprocess.classifier import CLASSIFIER_VERSION, NonCodeClassifier, NonCodeRanges
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from impactscan.cache.store import CacheStore
+
+NONCODE_NAMESPACE = "noncode_ranges"
+_FORMAT_VERSION = 1
+# Format version, array typecode, then the number of comment, string and disabled spans.
+_HEADER = struct.Struct("<BcIII")
+_MAX_UINT32 = 0xFFFFFFFF
+
+
+def encode_ranges(ranges: NonCodeRanges) -> bytes:
+    """Serialise ranges as a small header followed by one packed little-endian integer array."""
+    groups = (ranges.comment_spans, ranges.string_spans, ranges.disabled_spans)
+    flat = [bound for spans in groups for span in spans for bound in span]
+    packed = array("I", flat) if max(flat, default=0) <= _MAX_UINT32 else array("Q", flat)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    header = _HEADER.pack(_FORMAT_VERSION, packed.typecode.encode(), *(len(spans) for spans in groups))
+    return header + packed.tobytes()
+
+
+def decode_ranges(payload: bytes) -> NonCodeRanges | None:
+    """Inverse of :func:`encode_ranges`; ``None`` for payloads in an unknown or corrupt format."""
+    if len(payload) < _HEADER.size:
+        return None
+    version, raw_typecode, *counts = _HEADER.unpack_from(payload)
+    if version != _FORMAT_VERSION or raw_typecode not in {b"I", b"Q"}:
+        return None
+    packed = array("I") if raw_typecode == b"I" else array("Q")
+    body = payload[_HEADER.size :]
+    if len(body) != 2 * sum(counts) * packed.itemsize:
+        return None
+    packed.frombytes(body)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    groups: list[list[tuple[int, int]]] = []
+    start = 0
+    for count in counts:
+        end = start + 2 * count
+        groups.append(list(zip(packed[start:end:2], packed[start + 1 : end : 2], strict=True)))
+        start = end
+    return NonCodeRanges(comment_spans=groups[0], string_spans=groups[1], disabled_spans=groups[2])
+
+
+class CachingClassifier(NonCodeClassifier):
+    """Serves :class:`NonCodeRanges` from a :class:`CacheStore` before parsing.
+
+    Entries are keyed by content hash, language, the analyzer that handles
+    the file (tree-sitter or its fallback, see
+    :meth:`NonCodeClassifier.analyzer_for`), the preprocessing settings that
+    affect parsing and :data:`CLASSIFIER_VERSION`. Unchanged files are never
+    re-parsed, while installing a grammar, changing those settings or
+    upgrading the classifier invalidates everything computed differently.
+    """
+
+    def __init__(
+        self,
+        inner: NonCodeClassifier,
+        store: CacheStore,
+        *,
+        config: PreprocessConfig | None = None,
+        namespace: str = NONCODE_NAMESPACE,
+        ttl_sec: int | None = None,
+    ) -> None:
+        """Wrap ``inner`` and bind the cache namespace."""
+        self.inner = inner
+        self.store = store
+        self.config = config or PreprocessConfig()
+        self.namespace = namespace
+        self.ttl_sec = ttl_sec
+        self.stats = CacheStats()
+
+    def analyzer_for(self, content: bytes | memoryview, lang: str | None) -> str:
+        """Return the analyzer of the wrapped classifier."""
+        return self.inner.analyzer_for(content, lang)
+
+    def cache_key(self, content: bytes | memoryview, lang: str | None) -> str:
+        """Return the content-addressed key for ``content`` parsed as ``lang``."""
+        return stable_key(
+            content_digest(content),
+            lang,
+            self.inner.analyzer_for(content, lang),
+            self.config.detect_if0_blocks,
+            self.config.max_file_bytes_for_parse,
+            CLASSIFIER_VERSION,
+        )
+
+    def _lookup(self, payload: bytes | None) -> NonCodeRanges | None:
+        ranges = None if payload is None else decode_ranges(payload)
+        if ranges is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return ranges
+
+    async def build_ranges(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Return cached ranges, parsing and storing them on a miss."""
+        key = self.cache_key(content, lang)
+        ranges = self._lookup(await self.store.aget(self.namespace, key))
+        if ranges is None:
+            ranges = await self.inner.build_ranges(path, content, lang)
+            await self.store.aset(self.namespace, key, encode_ranges(ranges), self.ttl_sec)
+        return ranges
+
+    async def build_ranges_many(
+        self,
+        items: Sequence[tuple[str, bytes | memoryview, str | None]],
+    ) -> list[NonCodeRanges]:
+        """Return cached ranges, handing every miss to the wrapped classifier in one batch."""
+        keys = [self.cache_key(content, lang) for _path, content, lang in items]
+        payloads = await asyncio.gather(*(self.store.aget(self.namespace, key) for key in keys))
+        found = [self._lookup(payload) for payload in payloads]
+        missing = [index for index, ranges in enumerate(found) if ranges is None]
+        parsed = await self.inner.build_ranges_many([items[index] for index in missing])
+        for index, ranges in zip(missing, parsed, strict=True):
+            found[index] = ranges
+            await self.store.aset(self.namespace, keys[index], encode_ranges(ranges), self.ttl_sec)
+        return [ranges for ranges in found if ranges is not None]
+
+    def build_ranges_sync(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Return cached ranges, parsing and storing them on a miss."""
+        key = self.cache_key(content, lang)
+        ranges = self._lookup(self.store.get(self.namespace, key))
+        if ranges is None:
+            ranges = self.inner.build_ranges_sync(path, content, lang)
+            self.store.set(self.namespace, key, encode_ranges(ranges), self.ttl_sec)
+        return ranges
+
+    def close(self) -> None:
+        """Close the wrapped classifier."""
+        self.inner.close()
+
+
+def with_range_cache(
+    classifier: NonCodeClassifier,
+    config: PreprocessConfig,
+    store: CacheStore | None,
+) -> NonCodeClassifier:
+    """Wrap ``classifier`` in a :class:`CachingClassifier` when ``cache_noncode_ranges`` is enabled."""
+    if not config.cache_noncode_ranges or store is None:
+        return classifier
+    return CachingClassifier(classifier, store, config=config)
+
+
+__all__ = [
+    "NONCODE_NAMESPACE",
+    "CachingClassifier",
+    "decode_ranges",
+    "encode_ranges",
+    "with_range_cache",
+]
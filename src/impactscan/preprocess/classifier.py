@@ -1,56 +1,356 @@
 """Non-code range classification interfaces."""
 from __future__ import annotations
 
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import cached_property
+from typing import TYPE_CHECKING, Literal, Self
+
+from impactscan.config import PreprocessConfig
+from impactscan.preprocess import heuristics, treesitter
+from impactscan.preprocess.intervals import IntervalTable
+from impactscan.preprocess.languages import detect_language
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+    from types import TracebackType
+
+    from impactscan.preprocess.filecache import FileContentCache
+    from impactscan.preprocess.heuristics import SpanLists
+    from impactscan.preprocess.treesitter import GrammarLoader, PackedSpans
+
+BATCHES_PER_WORKER = 2
+HEURISTIC_INLINE_BYTES = 256_000
+"""Files up to this size are lexed on the event loop; larger ones in a worker thread."""
+
+CLASSIFIER_VERSION = 1
+"""Bumped whenever classifier output changes, invalidating cached ranges."""
 
 
 @dataclass
 class NonCodeRanges:
-    """Represents the ranges of non-code artifacts in a source file."""
+    """Represents the ranges of non-code artifacts in a source file.
+
+    Spans are half-open ``[start, end)`` byte offsets. Lookups go through
+    interval tables built on first use, so the span lists must not be mutated
+    after a hit has been classified.
+    """
 
     comment_spans: list[tuple[int, int]]
     string_spans: list[tuple[int, int]]
     disabled_spans: list[tuple[int, int]]
 
+    @cached_property
+    def comment_table(self) -> IntervalTable:
+        """Merged comment intervals."""
+        return IntervalTable(self.comment_spans)
+
+    @cached_property
+    def string_table(self) -> IntervalTable:
+        """Merged string literal intervals."""
+        return IntervalTable(self.string_spans)
+
+    @cached_property
+    def disabled_table(self) -> IntervalTable:
+        """Merged preprocessor-disabled intervals."""
+        return IntervalTable(self.disabled_spans)
+
 
 class NonCodeClassifier:
     """Interface for building non-code ranges."""
 
-    async def build_ranges(self, path: str, content: bytes, lang: str | None) -> NonCodeRanges:
+    name = "none"
+    """Analyzer name recorded in range cache keys."""
+
+    def analyzer_for(self, content: bytes | memoryview, lang: str | None) -> str:  # noqa: ARG002
+        """Return the name of the analyzer that classifies ``content``; range cache keys include it."""
+        return self.name
+
+    async def build_ranges(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
         """Compute non-code ranges asynchronously."""
         raise NotImplementedError
 
-    def build_ranges_sync(self, path: str, content: bytes, lang: str | None) -> NonCodeRanges:
+    def build_ranges_sync(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
         """Compute non-code ranges synchronously."""
         raise NotImplementedError
 
+    async def build_ranges_many(
+        self,
+        items: Sequence[tuple[str, bytes | memoryview, str | None]],
+    ) -> list[NonCodeRanges]:
+        """Compute ranges for ``(path, content, lang)`` items; implementations may parallelise."""
+        return [await self.build_ranges(path, content, lang) for path, content, lang in items]
+
+    def close(self) -> None:
+        """Release workers or other resources; the default holds none."""
+
+
+def _empty_ranges() -> NonCodeRanges:
+    return NonCodeRanges(comment_spans=[], string_spans=[], disabled_spans=[])
+
 
 class TreeSitterClassifier(NonCodeClassifier):
-    """Tree-sitter backed implementation."""
+    """Tree-sitter backed implementation.
+
+    Parsing is CPU-bound, so it runs in a spawn-started process pool whose
+    workers load every available grammar once at startup. Files are shipped
+    in size-balanced batches and spans come back as packed integer arrays,
+    leaving the event loop free for LLM I/O. Files in languages without an
+    installed grammar, or larger than ``max_file_bytes_for_parse``, go to
+    ``fallback`` (or get empty ranges) without reaching the pool; with no
+    grammar package installed (see the ``grammars`` extra) no pool is
+    started at all. A custom ``loader`` is offered every known language.
+    """
+
+    name = "tree-sitter"
+
+    def __init__(
+        self,
+        config: PreprocessConfig | None = None,
+        *,
+        fallback: NonCodeClassifier | None = None,
+        languages: Sequence[str] | None = None,
+        loader: GrammarLoader = treesitter.load_language,
+    ) -> None:
+        """Configure the pool; workers are started on first use."""
+        self.config = config or PreprocessConfig()
+        self.fallback = fallback
+        if languages is None:
+            installed = loader is treesitter.load_language
+            languages = treesitter.installed_languages() if installed else tuple(treesitter.GRAMMAR_MODULES)
+        self.languages = tuple(languages)
+        self.workers = self.config.parse_workers or os.cpu_count() or 1
+        self._loader = loader
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=treesitter.init_worker,
+                initargs=(self.languages, self.config.detect_if0_blocks, self._loader),
+            )
+        return self._pool
+
+    def close(self) -> None:
+        """Shut the worker pool down."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> Self:
+        """Return the classifier for use in a ``with`` block."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Shut the worker pool down."""
+        self.close()
+
+    def _parseable(self, content: bytes | memoryview, lang: str | None) -> bool:
+        return lang in self.languages and len(content) <= self.config.max_file_bytes_for_parse
+
+    def analyzer_for(self, content: bytes | memoryview, lang: str | None) -> str:
+        """Return ``tree-sitter`` for parseable files, otherwise the analyzer of the fallback."""
+        if self._parseable(content, lang):
+            return self.name
+        return self.fallback.analyzer_for(content, lang) if self.fallback is not None else NonCodeClassifier.name
+
+    @staticmethod
+    def _unpack(packed: PackedSpans) -> NonCodeRanges:
+        comments, strings, disabled = packed
+        return NonCodeRanges(
+            comment_spans=treesitter.unpack_spans(comments),
+            string_spans=treesitter.unpack_spans(strings),
+            disabled_spans=treesitter.unpack_spans(disabled),
+        )
+
+    async def build_ranges(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Parse one file in the worker pool."""
+        return (await self.build_ranges_many([(path, content, lang)]))[0]
+
+    async def build_ranges_many(
+        self,
+        items: Sequence[tuple[str, bytes | memoryview, str | None]],
+    ) -> list[NonCodeRanges]:
+        """Parse many files across the worker pool in size-balanced batches."""
+        parseable = [index for index, (_, content, lang) in enumerate(items) if self._parseable(content, lang)]
+        batches = treesitter.size_balanced_batches(
+            [len(items[index][1]) for index in parseable],
+            self.workers * BATCHES_PER_WORKER,
+        )
+        results: list[NonCodeRanges | None] = [None] * len(items)
+        if batches:
+            loop = asyncio.get_running_loop()
+            pool = self._executor()
+            jobs = [
+                loop.run_in_executor(
+                    pool,
+                    treesitter.parse_batch,
+                    # Memory-mapped content cannot be pickled; only files sent to the pool are copied.
+                    [(bytes(items[parseable[position]][1]), items[parseable[position]][2]) for position in batch],
+                )
+                for batch in batches
+            ]
+            for batch, packed_batch in zip(batches, await asyncio.gather(*jobs), strict=True):
+                for position, packed in zip(batch, packed_batch, strict=True):
+                    if packed is not None:
+                        results[parseable[position]] = self._unpack(packed)
+        ranges: list[NonCodeRanges] = []
+        for (path, content, lang), result in zip(items, results, strict=True):
+            if result is not None:
+                ranges.append(result)
+            elif self.fallback is not None:
+                ranges.append(await self.fallback.build_ranges(path, content, lang))
+            else:
+                ranges.append(_empty_ranges())
+        return ranges
+
+    def build_ranges_sync(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Parse one file in the calling process, loading grammars on first use."""
+        packed = None
+        if self._parseable(content, lang):
+            treesitter.ensure_initialised(self.languages, self.config.detect_if0_blocks, self._loader)
+            packed = treesitter.parse_one(content, lang)
+        if packed is not None:
+            return self._unpack(packed)
+        if self.fallback is not None:
+            return self.fallback.build_ranges_sync(path, content, lang)
+        return _empty_ranges()
 
 
 class PygmentsClassifier(NonCodeClassifier):
     """Pygments backed implementation."""
 
+    name = "pygments"
+
 
 class HeuristicClassifier(NonCodeClassifier):
-    """Lightweight heuristic implementation."""
+    """Lightweight heuristic implementation.
+
+    Uses the single-pass lexers from :mod:`impactscan.preprocess.heuristics`,
+    which need no grammars and have no size limit, so this is also the
+    fallback for files tree-sitter cannot parse. The language is detected
+    from the path when the caller does not supply one; unsupported languages
+    get empty ranges.
+    """
+
+    name = "heuristics"
+
+    def __init__(self, config: PreprocessConfig | None = None) -> None:
+        """Store the preprocessing configuration."""
+        self.config = config or PreprocessConfig()
+
+    def _lexer(self, path: str | Path, lang: str | None) -> heuristics.Lexer | None:
+        lang = lang or detect_language(str(path))
+        return heuristics.LEXERS.get(lang) if lang is not None else None
+
+    @staticmethod
+    def _ranges(spans: SpanLists) -> NonCodeRanges:
+        comments, strings, disabled = spans
+        return NonCodeRanges(comment_spans=comments, string_spans=strings, disabled_spans=disabled)
+
+    async def build_ranges(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Lex one file, off the event loop when it is large."""
+        if len(content) <= HEURISTIC_INLINE_BYTES:
+            return self.build_ranges_sync(path, content, lang)
+        return await asyncio.to_thread(self.build_ranges_sync, path, content, lang)
+
+    def build_ranges_sync(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Lex one file held in memory."""
+        lexer = self._lexer(path, lang)
+        if lexer is None:
+            return _empty_ranges()
+        return self._ranges(lexer.scan(content, detect_if0=self.config.detect_if0_blocks))
+
+    def build_ranges_for_path(
+        self,
+        path: str | Path,
+        lang: str | None = None,
+        *,
+        files: FileContentCache | None = None,
+    ) -> NonCodeRanges:
+        """Lex a file on disk through a memory map, reusing the run's map when ``files`` is given."""
+        lexer = self._lexer(path, lang)
+        if lexer is None:
+            return _empty_ranges()
+        detect_if0 = self.config.detect_if0_blocks
+        if files is not None:
+            return self._ranges(lexer.scan(files.read(path), detect_if0=detect_if0))
+        return self._ranges(heuristics.scan_file(path, lexer, detect_if0=detect_if0))
+
+
+HitKind = Literal["code", "string", "comment", "preproc_disabled"]
 
 
 def classify_hit(
     byte_offset: int,
     ranges: NonCodeRanges,
     keep_strings: bool,
-) -> str:
-    """Classify a ripgrep hit based on non-code ranges."""
-    raise NotImplementedError
+) -> HitKind:
+    """Classify a ripgrep hit based on non-code ranges.
+
+    Disabled blocks take precedence over comments, and comments over strings.
+    When ``keep_strings`` is false string spans are not consulted, so matches
+    inside literals count as code.
+    """
+    if ranges.disabled_table.contains(byte_offset):
+        return "preproc_disabled"
+    if ranges.comment_table.contains(byte_offset):
+        return "comment"
+    if keep_strings and ranges.string_table.contains(byte_offset):
+        return "string"
+    return "code"
+
+
+def classify_hits(
+    offsets: Sequence[int],
+    ranges: NonCodeRanges,
+    keep_strings: bool = True,
+) -> list[HitKind]:
+    """Classify every hit of one file, matching :func:`classify_hit` element-wise.
+
+    Offsets are visited in ascending order so each interval table is walked
+    once; ripgrep already reports hits in file order, in which case no sort is
+    needed.
+    """
+    if all(offsets[index] <= offsets[index + 1] for index in range(len(offsets) - 1)):
+        order: Sequence[int] = range(len(offsets))
+    else:
+        order = sorted(range(len(offsets)), key=offsets.__getitem__)
+    ordered = [offsets[index] for index in order]
+    disabled = ranges.disabled_table.contains_sorted(ordered)
+    comments = ranges.comment_table.contains_sorted(ordered)
+    strings = ranges.string_table.contains_sorted(ordered) if keep_strings else [False] * len(ordered)
+    kinds: list[HitKind] = ["code"] * len(offsets)
+    for position, index in enumerate(order):
+        if disabled[position]:
+            kinds[index] = "preproc_disabled"
+        elif comments[position]:
+            kinds[index] = "comment"
+        elif strings[position]:
+            kinds[index] = "string"
+    return kinds
 
 
 __all__ = [
+    "CLASSIFIER_VERSION",
+    "HEURISTIC_INLINE_BYTES",
     "HeuristicClassifier",
+    "HitKind",
     "NonCodeClassifier",
     "NonCodeRanges",
     "PygmentsClassifier",
     "TreeSitterClassifier",
     "classify_hit",
+    "classify_hits",
 ]
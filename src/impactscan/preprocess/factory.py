@@ -0,0 +1,31 @@
+"""Construction of the configured non-code classifier."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from impactscan.errors import ConfigError
+from impactscan.preprocess.cache import with_range_cache
+from impactscan.preprocess.classifier import HeuristicClassifier, NonCodeClassifier, TreeSitterClassifier
+
+if TYPE_CHECKING:
+    from impactscan.cache.store import CacheStore
+    from impactscan.config import PreprocessConfig
+
+
+def build_classifier(config: PreprocessConfig, store: CacheStore | None = None) -> NonCodeClassifier:
+    """Return the classifier selected by ``config.analyzer``, with range caching applied.
+
+    Tree-sitter falls back to the heuristic lexers for languages without an
+    installed grammar and for files above ``max_file_bytes_for_parse``.
+    """
+    if config.analyzer == "tree-sitter":
+        classifier: NonCodeClassifier = TreeSitterClassifier(config, fallback=HeuristicClassifier(config))
+    elif config.analyzer == "heuristics":
+        classifier = HeuristicClassifier(config)
+    else:
+        msg = f"Analyzer {config.analyzer!r} is not implemented."
+        raise ConfigError(msg)
+    return with_range_cache(classifier, config, store)
+
+
+__all__ = ["build_classifier"]
@@ -0,0 +1,178 @@
+"""Per-run cache of memory-mapped source files shared by preprocessing stages.
+
+Classification, window extraction and content hashing all need the same
+bytes. :class:`FileContentCache` maps each file once, hands out zero-copy
+``memoryview`` slices, and builds a newline-offset index on first line lookup
+so line numbers translate to byte ranges in constant time.
+"""
+from __future__ import annotations
+
+import bisect
+import contextlib
+import mmap
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+from impactscan.cache.keys import content_digest
+from impactscan.cache.store import CacheStats
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+DEFAULT_MAX_OPEN = 256
+
+_NEWLINE = re.compile(b"\n")
+
+
+class MappedFile:
+    """A read-only view of one file's bytes with a lazy line index.
+
+    Line numbers are 1-based, matching ripgrep. :attr:`view` and the slices
+    handed out share memory with the map, which is unmapped once neither the
+    cache nor any caller references it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Map ``path`` read-only; empty files get an empty view."""
+        self.path = path
+        self._mmap: mmap.mmap | None = None
+        with path.open("rb") as handle:
+            size = path.stat().st_size
+            if size:
+                self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._mmap) if self._mmap is not None else memoryview(b"")
+
+    def __len__(self) -> int:
+        """Return the file size in bytes."""
+        return len(self.view)
+
+    @cached_property
+    def line_starts(self) -> array[int]:
+        """Byte offset at which each line starts."""
+        starts = array("Q", [0])
+        starts.extend(match.end() for match in _NEWLINE.finditer(self.view))
+        if len(starts) > 1 and starts[-1] == len(self.view):
+            starts.pop()
+        return starts
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, counting a final line without a trailing newline."""
+        return len(self.line_starts) if self.view else 0
+
+    @cached_property
+    def digest(self) -> str:
+        """Content digest as used for ``file_hash`` and cache keys."""
+        return content_digest(self.view)
+
+    def line_range(self, first: int, last: int) -> tuple[int, int]:
+        """Return the ``[start, end)`` byte range covering lines ``first``..``last``, clamped to the file."""
+        starts = self.line_starts
+        first = min(max(first, 1), self.line_count or 1)
+        last = min(max(last, first), self.line_count or 1)
+        end = starts[last] if last < len(starts) else len(self.view)
+        return starts[first - 1], end
+
+    def lines(self, first: int, last: int) -> memoryview:
+        """Return lines ``first``..``last`` (inclusive, newlines kept) without copying."""
+        start, end = self.line_range(first, last)
+        return self.view[start:end]
+
+    def line_of(self, offset: int) -> int:
+        """Return the 1-based line containing byte ``offset``."""
+        return bisect.bisect_right(self.line_starts, offset)
+
+    def close(self) -> None:
+        """Unmap now unless slices are still in use, in which case the last slice releases it."""
+        self.view.release()
+        if self._mmap is not None:
+            with contextlib.suppress(BufferError):
+                self._mmap.close()
+            self._mmap = None
+
+
+class FileContentCache:
+    """LRU-bounded cache of :class:`MappedFile` objects for one run.
+
+    Relative paths are resolved against ``root`` (usually
+    ``ImpactScanConfig.target_dir``). At most ``max_open`` maps are held;
+    the least recently used is dropped when another file is opened. Eviction
+    only forgets the cache's reference, so a worker thread still using an
+    evicted file is unaffected. The cache is safe to share between the event
+    loop and worker threads.
+    """
+
+    def __init__(self, root: str | Path | None = None, *, max_open: int = DEFAULT_MAX_OPEN) -> None:
+        """Create an empty cache."""
+        if max_open < 1:
+            msg = "max_open must be at least 1"
+            raise ValueError(msg)
+        self.root = Path(root) if root is not None else None
+        self.max_open = max_open
+        self.stats = CacheStats()
+        self._files: OrderedDict[Path, MappedFile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _resolve(self, path: str | Path) -> Path:
+        resolved = Path(path)
+        if self.root is not None and not resolved.is_absolute():
+            resolved = self.root / resolved
+        return resolved
+
+    def get(self, path: str | Path) -> MappedFile:
+        """Return the mapped file for ``path``, mapping it on first use."""
+        resolved = self._resolve(path)
+        with self._lock:
+            mapped = self._files.get(resolved)
+            if mapped is not None:
+                self._files.move_to_end(resolved)
+                self.stats.hits += 1
+                return mapped
+            self.stats.misses += 1
+            mapped = MappedFile(resolved)
+            self._files[resolved] = mapped
+            while len(self._files) > self.max_open:
+                self._files.popitem(last=False)
+            return mapped
+
+    def read(self, path: str | Path) -> memoryview:
+        """Return the whole content of ``path`` without copying."""
+        return self.get(path).view
+
+    def digest(self, path: str | Path) -> str:
+        """Return the content digest of ``path``, hashing it once per run."""
+        return self.get(path).digest
+
+    def lines(self, path: str | Path, first: int, last: int) -> memoryview:
+        """Return lines ``first``..``last`` of ``path`` without copying."""
+        return self.get(path).lines(first, last)
+
+    def __len__(self) -> int:
+        """Return the number of files currently mapped."""
+        return len(self._files)
+
+    def close(self) -> None:
+        """Forget every mapped file; maps still referenced elsewhere stay valid."""
+        with self._lock:
+            self._files.clear()
+
+    def __enter__(self) -> Self:
+        """Return the cache for use in a ``with`` block."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Forget every mapped file."""
+        self.close()
+
+
+__all__ = ["DEFAULT_MAX_OPEN", "FileContentCache", "MappedFile"]
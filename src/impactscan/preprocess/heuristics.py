@@ -0,0 +1,212 @@
+"""Single-pass lexers that locate comments, strings and ``#if 0`` blocks.
+
+Each language's token rules are joined into one precompiled alternation of
+non-capturing patterns, so ``re.finditer`` skips ordinary code with the
+regex engine's literal-prefix search and hands back one match per comment,
+string or preprocessor directive, in file order. Comment markers inside
+strings and quotes inside comments are therefore consumed exactly as a real
+tokenizer would consume them. Every rule starts with a fixed lead byte, which
+is how a match is mapped back to its token kind.
+"""
+from __future__ import annotations
+
+import mmap
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal
+
+from impactscan.preprocess.languages import EXTENSION_TO_LANGUAGE
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    Buffer = bytes | mmap.mmap | memoryview
+    SpanLists = tuple[list[tuple[int, int]], list[tuple[int, int]], list[tuple[int, int]]]
+
+TokenKind = Literal["comment", "string", "preproc"]
+
+_SLASH_COMMENT = rb"//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/"
+_DOUBLE = rb'"[^"\\\n]*(?:\\[\s\S][^"\\\n]*)*"'
+_SINGLE = rb"'[^'\\\n]*(?:\\[\s\S][^'\\\n]*)*'"
+_BACKTICK = rb"`[^`\\]*(?:\\[\s\S][^`\\]*)*`"
+_PREPROCESSOR = rb"#[ \t]*(?P<directive>ifdef|ifndef|if|elif|else|endif)\b(?P<condition>[^\n]*)"
+_FALSE_CONDITIONS = frozenset({b"0", b"false"})
+
+
+@dataclass(frozen=True)
+class LexerSpec:
+    """Token rules for one language family.
+
+    Each rule is ``(lead byte, kind, pattern)`` and its pattern must start
+    with the lead byte. Rules sharing a lead byte must share a kind; earlier
+    rules win when several match at the same offset.
+    """
+
+    rules: tuple[tuple[bytes, TokenKind, bytes], ...]
+    string_prefixes: bytes = b""
+
+
+PYTHON_SPEC = LexerSpec(
+    rules=(
+        (b"#", "comment", rb"#[^\n]*"),
+        (b'"', "string", rb'"""[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*"""'),
+        (b'"', "string", _DOUBLE),
+        (b"'", "string", rb"'''[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*'''"),
+        (b"'", "string", _SINGLE),
+    ),
+    string_prefixes=b"rRbBuUfF",
+)
+C_FAMILY_SPEC = LexerSpec(
+    rules=(
+        (b"/", "comment", _SLASH_COMMENT),
+        (b'"', "string", _DOUBLE),
+        (b"'", "string", _SINGLE),
+        (b"#", "preproc", _PREPROCESSOR),
+    ),
+    string_prefixes=b"uUL8R",
+)
+JAVASCRIPT_SPEC = LexerSpec(
+    rules=(
+        (b"/", "comment", _SLASH_COMMENT),
+        (b'"', "string", _DOUBLE),
+        (b"'", "string", _SINGLE),
+        (b"`", "string", _BACKTICK),
+    ),
+)
+GO_SPEC = LexerSpec(
+    rules=(
+        (b"/", "comment", _SLASH_COMMENT),
+        (b'"', "string", _DOUBLE),
+        (b"`", "string", rb"`[^`]*`"),
+        (b"'", "string", _SINGLE),
+    ),
+)
+RUST_SPEC = LexerSpec(
+    rules=(
+        (b"/", "comment", _SLASH_COMMENT),
+        (b'"', "string", rb'"[^"\\]*(?:\\[\s\S][^"\\]*)*"'),
+        # Char literals must close right after one (possibly escaped) char, so lifetimes never match.
+        (b"'", "string", rb"'(?:[^'\\\n]|\\[^\n]{1,10}?)'"),
+        (b"#", "string", rb'(?P<hashes>#+)"[\s\S]*?"(?P=hashes)'),
+    ),
+    string_prefixes=b"rb",
+)
+
+SPECS_BY_LANGUAGE: dict[str, LexerSpec] = {
+    "python": PYTHON_SPEC,
+    "c": C_FAMILY_SPEC,
+    "cpp": C_FAMILY_SPEC,
+    "javascript": JAVASCRIPT_SPEC,
+    "typescript": JAVASCRIPT_SPEC,
+    "tsx": JAVASCRIPT_SPEC,
+    "go": GO_SPEC,
+    "rust": RUST_SPEC,
+}
+
+
+class Lexer:
+    """Compiled single-pass scanner for one language."""
+
+    def __init__(self, spec: LexerSpec) -> None:
+        """Compile the combined token pattern, with and without preprocessor rules."""
+        kinds: dict[int, TokenKind] = {}
+        for lead, kind, _ in spec.rules:
+            if kinds.setdefault(lead[0], kind) != kind:
+                msg = f"Lead byte {lead!r} is used for more than one token kind"
+                raise ValueError(msg)
+        self.spec = spec
+        self.kinds = kinds
+        self.pattern = _combine(spec.rules)
+        self.pattern_without_preproc = _combine(rule for rule in spec.rules if rule[1] != "preproc")
+
+    def scan(self, data: Buffer, *, detect_if0: bool = True) -> SpanLists:
+        """Return comment, string and disabled spans found in ``data``."""
+        comments: list[tuple[int, int]] = []
+        strings: list[tuple[int, int]] = []
+        disabled: list[tuple[int, int]] = []
+        # One entry per open conditional: the offset a disabled region started at, or None.
+        conditionals: list[int | None] = []
+        prefixes = self.spec.string_prefixes
+        kinds = self.kinds
+        pattern = self.pattern if detect_if0 else self.pattern_without_preproc
+        for match in pattern.finditer(data):
+            start, end = match.span()
+            kind = kinds[data[start]]
+            if kind == "comment":
+                comments.append((start, end))
+            elif kind == "string":
+                while prefixes and start > 0 and data[start - 1] in prefixes:
+                    start -= 1
+                strings.append((start, end))
+            elif _at_line_start(data, start):
+                _directive(match, conditionals, disabled)
+        disabled.extend((opened, len(data)) for opened in conditionals if opened is not None)
+        return comments, strings, disabled
+
+
+def _combine(rules: Iterable[tuple[bytes, TokenKind, bytes]]) -> re.Pattern[bytes]:
+    """Join rule patterns into one alternation, keeping their order."""
+    return re.compile(b"|".join(b"(?:" + pattern + b")" for _, _, pattern in rules))
+
+
+def _directive(match: re.Match[bytes], conditionals: list[int | None], disabled: list[tuple[int, int]]) -> None:
+    """Track ``#if``/``#else``/``#endif`` nesting and close disabled regions."""
+    directive = match.group("directive")
+    if directive in {b"if", b"ifdef", b"ifndef"}:
+        condition = match.group("condition").split(b"//")[0].split(b"/*")[0].strip()
+        inside_disabled = any(opened is not None for opened in conditionals)
+        zero = directive == b"if" and condition in _FALSE_CONDITIONS and not inside_disabled
+        conditionals.append(match.end() if zero else None)
+    elif conditionals:
+        opened = conditionals[-1]
+        if opened is not None:
+            disabled.append((opened, match.start()))
+        if directive == b"endif":
+            conditionals.pop()
+        else:
+            conditionals[-1] = None
+
+
+def _at_line_start(data: Buffer, offset: int) -> bool:
+    """Return whether only spaces or tabs precede ``offset`` on its line."""
+    index = offset - 1
+    while index >= 0 and data[index] in b" \t":
+        index -= 1
+    return index < 0 or data[index] == ord("\n")
+
+
+def build_lexers(extensions: Mapping[str, str]) -> dict[str, Lexer]:
+    """Compile a lexer for every language in ``extensions`` that has a spec."""
+    compiled: dict[LexerSpec, Lexer] = {}
+    lexers: dict[str, Lexer] = {}
+    for lang in extensions.values():
+        spec = SPECS_BY_LANGUAGE.get(lang)
+        if spec is not None:
+            if spec not in compiled:
+                compiled[spec] = Lexer(spec)
+            lexers[lang] = compiled[spec]
+    return lexers
+
+
+LEXERS = build_lexers(EXTENSION_TO_LANGUAGE)
+
+
+def scan_file(path: str | Path, lexer: Lexer, *, detect_if0: bool = True) -> SpanLists:
+    """Scan a file through a read-only memory map instead of reading it into memory."""
+    with Path(path).open("rb") as handle:
+        if Path(path).stat().st_size == 0:
+            return [], [], []
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return lexer.scan(mapped, detect_if0=detect_if0)
+
+
+__all__ = [
+    "LEXERS",
+    "SPECS_BY_LANGUAGE",
+    "Lexer",
+    "LexerSpec",
+    "TokenKind",
+    "build_lexers",
+    "scan_file",
+]
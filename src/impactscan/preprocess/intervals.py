@@ -0,0 +1,59 @@
+"""Sorted, merged interval tables for byte-offset lookups."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+
+class IntervalTable:
+    """Half-open ``[start, end)`` byte intervals stored as two parallel arrays.
+
+    Overlapping and touching spans are merged on construction, so the starts
+    and ends are both strictly increasing. Point lookups use :func:`bisect`;
+    :meth:`contains_sorted` labels an ascending run of offsets in one pass.
+    """
+
+    __slots__ = ("ends", "starts")
+
+    def __init__(self, spans: Iterable[tuple[int, int]]) -> None:
+        """Sort and merge ``spans``; empty spans are discarded."""
+        self.starts: array[int] = array("Q")
+        self.ends: array[int] = array("Q")
+        for start, end in sorted(span for span in spans if span[1] > span[0]):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self) -> int:
+        """Return the number of merged intervals."""
+        return len(self.starts)
+
+    def spans(self) -> list[tuple[int, int]]:
+        """Return the merged intervals as tuples."""
+        return list(zip(self.starts, self.ends, strict=True))
+
+    def contains(self, offset: int) -> bool:
+        """Return whether ``offset`` falls inside any interval."""
+        index = bisect_right(self.starts, offset) - 1
+        return index >= 0 and offset < self.ends[index]
+
+    def contains_sorted(self, offsets: Sequence[int]) -> list[bool]:
+        """Label ascending ``offsets`` with a single merge pass over the table."""
+        starts, ends = self.starts, self.ends
+        count = len(starts)
+        index = 0
+        labels: list[bool] = []
+        for offset in offsets:
+            while index < count and ends[index] <= offset:
+                index += 1
+            labels.append(index < count and starts[index] <= offset)
+        return labels
+
+
+__all__ = ["IntervalTable"]
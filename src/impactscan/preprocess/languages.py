@@ -1,6 +1,7 @@
 """Language detection helpers for ImpactScan."""
 from __future__ import annotations
 
+from pathlib import PurePosixPath
 
 EXTENSION_TO_LANGUAGE: dict[str, str] = {
     ".py": "python",
@@ -9,7 +10,19 @@ EXTENSION_TO_LANGUAGE: dict[str, str] = {
     ".js": "javascript",
     ".rs": "rust",
     ".go": "go",
+    ".c": "c",
+    ".h": "c",
+    ".cc": "cpp",
+    ".cpp": "cpp",
+    ".cxx": "cpp",
+    ".hh": "cpp",
+    ".hpp": "cpp",
 }
 
 
-__all__ = ["EXTENSION_TO_LANGUAGE"]
+def detect_language(path: str) -> str | None:
+    """Return the language for ``path`` based on its extension."""
+    return EXTENSION_TO_LANGUAGE.get(PurePosixPath(path).suffix.lower())
+
+
+__all__ = ["EXTENSION_TO_LANGUAGE", "detect_language"]
@@ -0,0 +1,184 @@
+"""Tree-sitter grammar loading and span extraction for classifier workers.
+
+Everything here is importable in a freshly spawned process: workers call
+:func:`init_worker` once to load their grammars and then serve
+:func:`parse_batch` requests, returning spans as packed integer arrays.
+"""
+from __future__ import annotations
+
+import heapq
+import importlib
+import importlib.util
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from tree_sitter import Language, Parser
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from tree_sitter import Node
+
+    GrammarLoader = Callable[[str], Language | None]
+
+PackedSpans = tuple[bytes, bytes, bytes]
+"""Comment, string and disabled spans, each a flattened native ``array("Q")``."""
+
+# Grammar package and factory function for each language, as published on PyPI.
+GRAMMAR_MODULES: dict[str, tuple[str, str]] = {
+    "python": ("tree_sitter_python", "language"),
+    "javascript": ("tree_sitter_javascript", "language"),
+    "typescript": ("tree_sitter_typescript", "language_typescript"),
+    "tsx": ("tree_sitter_typescript", "language_tsx"),
+    "rust": ("tree_sitter_rust", "language"),
+    "go": ("tree_sitter_go", "language"),
+    "c": ("tree_sitter_c", "language"),
+    "cpp": ("tree_sitter_cpp", "language"),
+}
+
+STRING_NODE_TYPES = frozenset(
+    {
+        "char_literal",
+        "character_literal",
+        "concatenated_string",
+        "interpreted_string_literal",
+        "raw_string_literal",
+        "rune_literal",
+        "string",
+        "string_literal",
+        "template_string",
+    },
+)
+_FALSE_CONDITIONS = frozenset({b"0", b"false"})
+
+
+@dataclass
+class _WorkerState:
+    parsers: dict[str, Parser] = field(default_factory=dict[str, Parser])
+    detect_if0: bool = True
+    settings: tuple[tuple[str, ...], bool, GrammarLoader] | None = None
+
+
+_STATE = _WorkerState()
+
+
+def load_language(lang: str) -> Language | None:
+    """Return the grammar for ``lang``, or ``None`` when its package is not installed."""
+    spec = GRAMMAR_MODULES.get(lang)
+    if spec is None:
+        return None
+    module_name, factory = spec
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return None
+    capsule: object = getattr(module, factory)()
+    return Language(capsule)
+
+
+def installed_languages() -> tuple[str, ...]:
+    """Return the languages of :data:`GRAMMAR_MODULES` whose grammar package is installed.
+
+    Packages are only located, not imported, so the parent process can rule
+    out languages before anything is shipped to a worker.
+    """
+    return tuple(
+        lang for lang, (module_name, _factory) in GRAMMAR_MODULES.items() if importlib.util.find_spec(module_name)
+    )
+
+
+def init_worker(languages: Sequence[str], detect_if0: bool, loader: GrammarLoader = load_language) -> None:
+    """Load a parser for every available grammar into this process."""
+    _STATE.parsers.clear()
+    for lang in languages:
+        language = loader(lang)
+        if language is not None:
+            _STATE.parsers[lang] = Parser(language)
+    _STATE.detect_if0 = detect_if0
+    _STATE.settings = (tuple(languages), detect_if0, loader)
+
+
+def ensure_initialised(languages: Sequence[str], detect_if0: bool, loader: GrammarLoader = load_language) -> None:
+    """Run :func:`init_worker` unless this process already holds parsers for the same settings."""
+    if _STATE.settings != (tuple(languages), detect_if0, loader):
+        init_worker(languages, detect_if0, loader)
+
+
+def extract_spans(root: Node, *, detect_if0: bool) -> PackedSpans:
+    """Collect comment, string and ``#if 0`` spans below ``root``."""
+    comments: array[int] = array("Q")
+    strings: array[int] = array("Q")
+    disabled: array[int] = array("Q")
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        kind = node.type
+        if kind.endswith("comment"):
+            comments.extend((node.start_byte, node.end_byte))
+            continue
+        if kind in STRING_NODE_TYPES:
+            strings.extend((node.start_byte, node.end_byte))
+            continue
+        if detect_if0 and kind == "preproc_if":
+            condition = node.child_by_field_name("condition")
+            if condition is not None and condition.text in _FALSE_CONDITIONS:
+                alternative = node.child_by_field_name("alternative")
+                end = alternative.start_byte if alternative is not None else node.end_byte
+                disabled.extend((condition.end_byte, end))
+        stack.extend(node.children)
+    return comments.tobytes(), strings.tobytes(), disabled.tobytes()
+
+
+def parse_one(content: bytes | memoryview, lang: str | None) -> PackedSpans | None:
+    """Parse one file with this process's parsers; ``None`` when its language is unavailable."""
+    parser = _STATE.parsers.get(lang) if lang is not None else None
+    if parser is None:
+        return None
+    return extract_spans(parser.parse(content).root_node, detect_if0=_STATE.detect_if0)
+
+
+def parse_batch(batch: Sequence[tuple[bytes, str | None]]) -> list[PackedSpans | None]:
+    """Parse a batch of ``(content, lang)`` pairs in order."""
+    return [parse_one(content, lang) for content, lang in batch]
+
+
+def unpack_spans(packed: bytes) -> list[tuple[int, int]]:
+    """Turn one packed span array back into ``(start, end)`` tuples."""
+    values: array[int] = array("Q")
+    values.frombytes(packed)
+    return list(zip(values[0::2], values[1::2], strict=True))
+
+
+def size_balanced_batches(sizes: Sequence[int], batches: int) -> list[list[int]]:
+    """Group item indices into at most ``batches`` groups of similar total size.
+
+    Largest items are placed first, each into the currently lightest batch, so
+    one huge file ends up alone rather than stalling a batch of small ones.
+    """
+    count = min(batches, len(sizes))
+    if count <= 0:
+        return []
+    heap = [(0, slot) for slot in range(count)]
+    groups: list[list[int]] = [[] for _ in range(count)]
+    for index in sorted(range(len(sizes)), key=lambda item: -sizes[item]):
+        load, slot = heapq.heappop(heap)
+        groups[slot].append(index)
+        heapq.heappush(heap, (load + sizes[index], slot))
+    return [sorted(group) for group in groups if group]
+
+
+__all__ = [
+    "GRAMMAR_MODULES",
+    "STRING_NODE_TYPES",
+    "PackedSpans",
+    "ensure_initialised",
+    "extract_spans",
+    "init_worker",
+    "installed_languages",
+    "load_language",
+    "parse_batch",
+    "parse_one",
+    "size_balanced_batches",
+    "unpack_spans",
+]
@@ -0,0 +1,238 @@
+"""Turn per-file hit streams into token-bounded :class:`CandidateFileWindow` objects.
+
+Hits are merged in one sweep over their sorted line numbers: a hit joins the
+current window when it lies within ``merge_window_lines`` of the previous
+one. Windows whose hit lines alone exceed ``max_tokens_file_context`` are
+split around their densest hit clusters, by joining the closest hits first
+for as long as the budget allows. Context lines (``RipgrepConfig.context_lines``)
+are then added around every window while the budget lasts, without running
+into neighbouring windows.
+
+Token cost is estimated from byte counts, which the file cache's line index
+yields in constant time for any line range, so building windows for a file
+with many thousands of hits stays linear outside the rare split path. When a
+:class:`~impactscan.llm.tokens.TokenCounter` is supplied, each finished window
+is counted once and trimmed if the estimate was optimistic; the count travels
+on the window for the rate limiter and usage accounting.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from impactscan.models import CandidateFileWindow
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, AsyncIterable, Mapping, Sequence
+
+    from impactscan.config import ImpactScanConfig
+    from impactscan.llm.tokens import TokenCounter
+    from impactscan.models import CandidateHit
+    from impactscan.preprocess.filecache import FileContentCache, MappedFile
+    from impactscan.scanner.incremental import FileRevision
+
+logger = logging.getLogger(__name__)
+
+APPROX_BYTES_PER_TOKEN = 4.0
+
+
+@dataclass
+class _Window:
+    """Indices ``[lo, hi]`` into a file's distinct hit lines, plus the final line span."""
+
+    lo: int
+    hi: int
+    start: int = 0
+    end: int = 0
+
+
+class WindowBuilder:
+    """Build windows for one run from hits and the shared file cache.
+
+    Output depends only on each file's hits and content, so it is identical
+    across runs; with sharded scans only the order between files varies.
+    """
+
+    def __init__(
+        self,
+        config: ImpactScanConfig,
+        files: FileContentCache,
+        *,
+        revisions: Mapping[str, FileRevision] | None = None,
+        bytes_per_token: float = APPROX_BYTES_PER_TOKEN,
+        token_counter: TokenCounter | None = None,
+    ) -> None:
+        """Bind the run configuration.
+
+        ``revisions`` supplies commit and hash when the scan recorded them.
+        ``token_counter`` counts each finished window; windows it finds over
+        budget lose context lines until they fit. Without one, the byte
+        estimate is recorded as the window's count.
+        """
+        self.merge_lines = config.preprocess.merge_window_lines
+        self.max_tokens = config.preprocess.max_tokens_file_context
+        self.context_lines = config.ripgrep.context_lines
+        self.files = files
+        self.revisions = revisions
+        self.bytes_per_token = bytes_per_token
+        self.token_counter = token_counter
+
+    def _tokens(self, mapped: MappedFile, first: int, last: int) -> int:
+        start, end = mapped.line_range(first, last)
+        return math.ceil((end - start) / self.bytes_per_token)
+
+    def build(self, file: str, hits: Sequence[CandidateHit]) -> list[CandidateFileWindow]:
+        """Return the windows of one file, in line order."""
+        if not hits:
+            return []
+        ordered = list(hits)
+        if any(ordered[index].line_no > ordered[index + 1].line_no for index in range(len(ordered) - 1)):
+            ordered.sort(key=lambda hit: (hit.line_no, hit.byte_offset))
+        mapped = self.files.get(file)
+        lines = sorted({hit.line_no for hit in ordered})
+        windows: list[_Window] = []
+        lo = 0
+        for index in range(1, len(lines) + 1):
+            if index == len(lines) or lines[index] - lines[index - 1] > self.merge_lines:
+                windows.extend(self._split(mapped, lines, lo, index - 1))
+                lo = index
+        self._add_context(mapped, lines, windows)
+        return self._materialise(file, mapped, ordered, lines, windows)
+
+    def _split(self, mapped: MappedFile, lines: list[int], lo: int, hi: int) -> list[_Window]:
+        """Split ``lines[lo..hi]`` into the fewest dense groups whose hit lines fit the budget."""
+        if self._tokens(mapped, lines[lo], lines[hi]) <= self.max_tokens:
+            return [_Window(lo, hi)]
+        # Groups are index intervals; ``upper[lo]`` and ``lower[hi]`` give the other end of the group.
+        upper = {index: index for index in range(lo, hi + 1)}
+        lower = dict(upper)
+        for gap in sorted(range(lo, hi), key=lambda index: (lines[index + 1] - lines[index], index)):
+            first, last = lower[gap], upper[gap + 1]
+            if self._tokens(mapped, lines[first], lines[last]) <= self.max_tokens:
+                upper[first], lower[last] = last, first
+        groups: list[_Window] = []
+        index = lo
+        while index <= hi:
+            groups.append(_Window(index, upper[index]))
+            index = upper[index] + 1
+        return groups
+
+    def _add_context(self, mapped: MappedFile, lines: list[int], windows: list[_Window]) -> None:
+        """Grow each window by up to ``context_lines`` per side, alternating sides, within the budget."""
+        previous_end = 0
+        for position, window in enumerate(windows):
+            start, end = lines[window.lo], lines[window.hi]
+            floor = max(1, start - self.context_lines, previous_end + 1)
+            ceiling = min(mapped.line_count, end + self.context_lines)
+            if position + 1 < len(windows):
+                ceiling = min(ceiling, lines[windows[position + 1].lo] - 1)
+            grew = True
+            while grew:
+                grew = False
+                if start > floor and self._tokens(mapped, start - 1, end) <= self.max_tokens:
+                    start -= 1
+                    grew = True
+                if end < ceiling and self._tokens(mapped, start, end + 1) <= self.max_tokens:
+                    end += 1
+                    grew = True
+            window.start, window.end = start, end
+            previous_end = end
+
+    def _fit(
+        self,
+        mapped: MappedFile,
+        lines: list[int],
+        window: _Window,
+        hits: Sequence[CandidateHit],
+    ) -> tuple[str, int]:
+        """Return the window's text and token count, dropping context lines while the count is over budget."""
+        content = self._content(mapped, window, hits)
+        if self.token_counter is None:
+            return content, self._tokens(mapped, window.start, window.end)
+        tokens = self.token_counter.count(content)
+        first, last = lines[window.lo], lines[window.hi]
+        while tokens > self.max_tokens and (window.start < first or window.end > last):
+            # Trim the side with more context first, so hits stay roughly centred.
+            if first - window.start >= window.end - last:
+                window.start += 1
+            else:
+                window.end -= 1
+            content = self._content(mapped, window, hits)
+            tokens = self.token_counter.count(content)
+        return content, tokens
+
+    def _content(self, mapped: MappedFile, window: _Window, hits: Sequence[CandidateHit]) -> str:
+        """Decode the window's text, clipping around the first hit when one line alone is over budget."""
+        start, end = mapped.line_range(window.start, window.end)
+        limit = int(self.max_tokens * self.bytes_per_token)
+        if end - start > limit:
+            start = min(max(start, hits[0].byte_offset - limit // 2), end - limit)
+            end = start + limit
+        return bytes(mapped.view[start:end]).decode("utf-8", errors="replace")
+
+    def _materialise(
+        self,
+        file: str,
+        mapped: MappedFile,
+        hits: list[CandidateHit],
+        lines: list[int],
+        windows: list[_Window],
+    ) -> list[CandidateFileWindow]:
+        revision = self.revisions.get(file) if self.revisions is not None else None
+        file_hash = revision.file_hash if revision is not None else mapped.digest
+        commit = revision.commit if revision is not None else None
+        results: list[CandidateFileWindow] = []
+        cursor = 0
+        for window_index, window in enumerate(windows):
+            last_line = lines[window.hi]
+            begin = cursor
+            while cursor < len(hits) and hits[cursor].line_no <= last_line:
+                cursor += 1
+            members = hits[begin:cursor]
+            content, tokens = self._fit(mapped, lines, window, members)
+            results.append(
+                CandidateFileWindow(
+                    file=file,
+                    window_index=window_index,
+                    spans=[(window.start, window.end)],
+                    hits=members,
+                    num_occurrences=len(members),
+                    file_hash=file_hash,
+                    commit=commit,
+                    content=content,
+                    token_count=tokens,
+                ),
+            )
+        return results
+
+    async def stream(self, hits: AsyncIterable[CandidateHit]) -> AsyncGenerator[CandidateFileWindow]:
+        """Yield each file's windows as soon as the hit stream moves past that file.
+
+        Scanners deliver a file's hits contiguously, so a change of file means
+        the previous file is complete. Files that vanished since the scan are
+        logged and skipped.
+        """
+        current: list[CandidateHit] = []
+        async for hit in hits:
+            if current and current[0].file != hit.file:
+                for window in await self._build_async(current):
+                    yield window
+                current = []
+            current.append(hit)
+        if current:
+            for window in await self._build_async(current):
+                yield window
+
+    async def _build_async(self, hits: list[CandidateHit]) -> list[CandidateFileWindow]:
+        file = hits[0].file
+        try:
+            return await asyncio.to_thread(self.build, file, hits)
+        except FileNotFoundError:
+            logger.warning("Skipping %s: file disappeared after scanning", file)
+            return []
+
+
+__all__ = ["APPROX_BYTES_PER_TOKEN", "WindowBuilder"]
@@ -1,31 +1,125 @@
-"""Report writers for ImpactScan outputs."""
+"""Report writers for ImpactScan outputs.
+
+Assessments arrive in completion order, which changes from run to run and
+between an uninterrupted and a resumed run. Writers therefore sort them by
+file, line numbers and finally their full content, so the same set of
+assessments always produces byte-identical reports. Every file is written
+to a temporary sibling first and moved into place, so an interrupted write
+never leaves a truncated report behind.
+"""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import csv
+import io
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+
+import orjson
+
+from impactscan.models import ImpactAssessment
 
 if TYPE_CHECKING:
     from collections.abc import Iterable, Mapping
-    from typing import Any
 
-    from impactscan.models import ImpactAssessment
+    from impactscan.config import OutputConfig
+    from impactscan.models import ImpactRunSummary
+
+CSV_FILENAME = "impact_assessments.csv"
+JSONL_FILENAME = "impact_assessments.jsonl"
+SUMMARY_MD_FILENAME = "summary.md"
+
+_LINE_NUMBER = re.compile(r"\d+")
+
+
+def _line_numbers(lines: list[str]) -> tuple[int, ...]:
+    return tuple(int(match.group()) if (match := _LINE_NUMBER.search(line)) else 0 for line in lines)
+
+
+def sorted_assessments(items: Iterable[ImpactAssessment]) -> list[ImpactAssessment]:
+    """Return ``items`` in report order: by file, then line numbers, then content."""
+    keyed = [(item.file, _line_numbers(item.lines), orjson.dumps(item.model_dump(mode="json")), item) for item in items]
+    keyed.sort(key=lambda entry: entry[:3])
+    return [entry[3] for entry in keyed]
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f".{target.name}.partial")
+    partial.write_bytes(data)
+    partial.replace(target)
+
+
+def _csv_cell(value: object) -> object:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ";".join(str(item) for item in cast("list[object]", value))
+    if isinstance(value, dict):
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS).decode()
+    return value
 
 
 def write_csv(path: str, items: Iterable[ImpactAssessment]) -> None:
-    """Write assessments to a CSV file."""
-    msg = "CSV writer is not yet implemented."
-    raise NotImplementedError(msg)
+    """Write assessments to a CSV file, one column per assessment field."""
+    columns = list(ImpactAssessment.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for item in sorted_assessments(items):
+        fields = item.model_dump(mode="json")
+        writer.writerow([_csv_cell(fields[column]) for column in columns])
+    _write_atomic(path, buffer.getvalue().encode())
 
 
 def write_jsonl(path: str, items: Iterable[ImpactAssessment]) -> None:
     """Write assessments to a JSON Lines file."""
-    msg = "JSONL writer is not yet implemented."
-    raise NotImplementedError(msg)
+    data = b"".join(orjson.dumps(item.model_dump(mode="json")) + b"\n" for item in sorted_assessments(items))
+    _write_atomic(path, data)
+
+
+def _markdown_cell(value: object) -> str:
+    text = value if isinstance(value, str) else orjson.dumps(value, option=orjson.OPT_SORT_KEYS).decode()
+    return text.replace("|", "\\|").replace("\n", " ")
 
 
 def write_summary_md(path: str, summary: Mapping[str, Any]) -> None:
     """Write a Markdown summary of the run."""
-    msg = "Markdown summary writer is not yet implemented."
-    raise NotImplementedError(msg)
+    rows = [f"| {key} | {_markdown_cell(value)} |" for key, value in summary.items()]
+    text = "\n".join(["# ImpactScan summary", "", "| Metric | Value |", "| --- | --- |", *rows, ""])
+    _write_atomic(path, text.encode())
+
+
+def write_reports(
+    output: OutputConfig,
+    items: Iterable[ImpactAssessment],
+    summary: ImpactRunSummary,
+) -> dict[str, str]:
+    """Write the reports enabled in ``output`` into ``output.dir`` and return their paths by format."""
+    assessments = list(items)
+    paths: dict[str, str] = {}
+    if output.write_csv:
+        paths["csv"] = str(Path(output.dir) / CSV_FILENAME)
+        write_csv(paths["csv"], assessments)
+    if output.write_jsonl:
+        paths["jsonl"] = str(Path(output.dir) / JSONL_FILENAME)
+        write_jsonl(paths["jsonl"], assessments)
+    if output.write_summary_md:
+        paths["summary_md"] = str(Path(output.dir) / SUMMARY_MD_FILENAME)
+        fields = summary.model_dump(mode="json")
+        fields["output_paths"] = paths
+        write_summary_md(paths["summary_md"], fields)
+    return paths
 
 
-__all__ = ["write_csv", "write_jsonl", "write_summary_md"]
+__all__ = [
+    "CSV_FILENAME",
+    "JSONL_FILENAME",
+    "SUMMARY_MD_FILENAME",
+    "sorted_assessments",
+    "write_csv",
+    "write_jsonl",
+    "write_reports",
+    "write_summary_md",
+]
@@ -0,0 +1,70 @@
+"""Glob matching compatible with ripgrep's ``--glob`` semantics."""
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+
+def glob_to_regex(pattern: str) -> re.Pattern[str]:
+    """Translate a gitignore-style glob into a compiled regular expression.
+
+    ``**`` spans directories, ``*`` and ``?`` stay within one path component,
+    and a pattern without a slash matches the file name at any depth.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    body = pattern.lstrip("/")
+    parts: list[str] = []
+    index = 0
+    while index < len(body):
+        if body.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+        elif body.startswith("**", index):
+            parts.append(".*")
+            index += 2
+        elif body[index] == "*":
+            parts.append("[^/]*")
+            index += 1
+        elif body[index] == "?":
+            parts.append("[^/]")
+            index += 1
+        elif body[index] == "[" and (close := body.find("]", index + 1)) != -1:
+            members = body[index + 1 : close]
+            if members.startswith("!"):
+                members = "^" + members[1:]
+            parts.append(f"[{members}]")
+            index = close + 1
+        else:
+            parts.append(re.escape(body[index]))
+            index += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"{prefix}{''.join(parts)}(?:/.*)?")
+
+
+class GlobFilter:
+    """Decides whether a relative path survives include/exclude globs.
+
+    Used for explicit path lists, which ripgrep searches without applying its
+    own ``--glob`` filters.
+    """
+
+    def __init__(self, include: Sequence[str], exclude: Sequence[str], *, include_hidden: bool = False) -> None:
+        """Compile the include and exclude patterns."""
+        self._include = [glob_to_regex(pattern) for pattern in include]
+        self._exclude = [glob_to_regex(pattern) for pattern in exclude]
+        self.include_hidden = include_hidden
+
+    def matches(self, path: str) -> bool:
+        """Return whether ``path`` (relative to the scan root) should be searched."""
+        path = path.removeprefix("./")
+        if not self.include_hidden and any(part.startswith(".") for part in path.split("/")):
+            return False
+        if any(pattern.fullmatch(path) for pattern in self._exclude):
+            return False
+        return not self._include or any(pattern.fullmatch(path) for pattern in self._include)
+
+
+__all__ = ["GlobFilter", "glob_to_regex"]
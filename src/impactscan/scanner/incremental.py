@@ -0,0 +1,333 @@
+"""Git-aware incremental scanning on top of :class:`RipgrepScanner`."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import sqlite3
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal
+
+import orjson
+
+from impactscan.cache.keys import content_digest, stable_key
+from impactscan.errors import ConfigError
+from impactscan.models import CandidateHit
+from impactscan.scanner.ripgrep import unique_keywords
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Generator, Iterable, Sequence
+
+    from impactscan.preprocess.filecache import FileContentCache
+    from impactscan.scanner.ripgrep import RipgrepScanner
+
+logger = logging.getLogger(__name__)
+
+SCAN_STATE_VERSION = 1
+_FLUSH_FILES = 256
+_SQL_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (key TEXT PRIMARY KEY, commit_sha TEXT NOT NULL, dirty BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    key TEXT NOT NULL,
+    file TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    hits BLOB NOT NULL,
+    PRIMARY KEY (key, file)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True)
+class FileRevision:
+    """Identifies the content a file's hits were taken from."""
+
+    commit: str | None
+    file_hash: str
+
+
+@dataclass(frozen=True)
+class PreviousRun:
+    """Commit and dirty paths recorded by the last completed scan."""
+
+    commit: str
+    dirty: frozenset[str] = frozenset()
+
+
+@dataclass(frozen=True)
+class _ScanPlan:
+    head: str | None
+    dirty: frozenset[str] = frozenset()
+    paths: list[str] | None = None
+    replaced: frozenset[str] | None = None
+
+
+def _git(root: str, *args: str) -> bytes | None:
+    """Run a git command in ``root`` and return stdout, or ``None`` on failure."""
+    try:
+        return subprocess.run(  # noqa: S603
+            ["git", *args],  # noqa: S607
+            cwd=root,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _split_z(output: bytes) -> set[str]:
+    return {entry.decode("utf-8", errors="surrogateescape") for entry in output.split(b"\0") if entry}
+
+
+def head_commit(root: str) -> str | None:
+    """Return the ``HEAD`` commit of the checkout containing ``root``."""
+    output = _git(root, "rev-parse", "--verify", "HEAD")
+    return output.decode().strip() if output else None
+
+
+def changed_paths(root: str, since: str) -> set[str] | None:
+    """Return paths (relative to ``root``) changed between ``since`` and ``HEAD``.
+
+    ``None`` means git cannot answer, for example because ``since`` was
+    garbage collected, and the caller must fall back to a full scan.
+    """
+    output = _git(root, "diff", "--name-only", "--relative", "--no-renames", "-z", since, "HEAD", "--", ".")
+    return None if output is None else _split_z(output)
+
+
+def dirty_paths(root: str) -> set[str]:
+    """Return tracked files modified in the work tree plus untracked, non-ignored files."""
+    modified = _git(root, "diff", "--name-only", "--relative", "--no-renames", "-z", "HEAD", "--", ".") or b""
+    untracked = _git(root, "ls-files", "--others", "--exclude-standard", "-z", "--", ".") or b""
+    return _split_z(modified) | _split_z(untracked)
+
+
+class ScanState:
+    """SQLite store of the hits each file produced in the last completed scan.
+
+    Rows are keyed by a digest of the keyword set and scanner settings, so a
+    different instruction never reuses another's results. New rows are staged
+    under a pending key and only swapped in by :meth:`commit`, so an abandoned
+    scan leaves the previous state intact.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Bind the state to a database file."""
+        self.path = Path(path)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Generator[sqlite3.Connection]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.executescript(_SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _pending(key: str) -> str:
+        return f"{key}:pending"
+
+    def last_run(self, key: str) -> PreviousRun | None:
+        """Return the commit and dirty set recorded for ``key``."""
+        if not self.path.exists():
+            return None
+        with self._connect() as conn:
+            row = conn.execute("SELECT commit_sha, dirty FROM runs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return PreviousRun(commit=row[0], dirty=frozenset(orjson.loads(row[1])))
+
+    def begin(self, key: str) -> None:
+        """Discard rows staged by an earlier, unfinished scan."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE key = ?", (self._pending(key),))
+
+    def stage(self, key: str, rows: Sequence[tuple[str, str, list[CandidateHit]]]) -> None:
+        """Stage ``(file, file_hash, hits)`` rows for the scan in progress."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (key, file, file_hash, hits) VALUES (?, ?, ?, ?)",
+                [
+                    (self._pending(key), file, file_hash, orjson.dumps([hit.model_dump() for hit in hits]))
+                    for file, file_hash, hits in rows
+                ],
+            )
+
+    def commit(self, key: str, *, commit: str, dirty: Iterable[str], replaced: Iterable[str] | None) -> None:
+        """Atomically publish staged rows, replacing ``replaced`` files (or all files when ``None``)."""
+        with self._connect() as conn:
+            if replaced is None:
+                conn.execute("DELETE FROM files WHERE key = ?", (key,))
+            else:
+                files = sorted(replaced)
+                for start in range(0, len(files), _SQL_BATCH):
+                    batch = files[start : start + _SQL_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    conn.execute(f"DELETE FROM files WHERE key = ? AND file IN ({placeholders})", (key, *batch))  # noqa: S608
+            conn.execute("UPDATE files SET key = ? WHERE key = ?", (key, self._pending(key)))
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (key, commit_sha, dirty) VALUES (?, ?, ?)",
+                (key, commit, orjson.dumps(sorted(dirty))),
+            )
+
+    def load(
+        self,
+        key: str,
+        *,
+        after: str = "",
+        limit: int = _FLUSH_FILES,
+    ) -> list[tuple[str, str, list[CandidateHit]]]:
+        """Return up to ``limit`` stored ``(file, file_hash, hits)`` rows after ``after``, in path order."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT file, file_hash, hits FROM files WHERE key = ? AND file > ? ORDER BY file LIMIT ?",
+                (key, after, limit),
+            ).fetchall()
+        return [
+            (file, file_hash, [CandidateHit.model_validate(item) for item in orjson.loads(payload)])
+            for file, file_hash, payload in rows
+        ]
+
+
+class IncrementalScanner:
+    """Re-scans only the files git reports as changed since the previous run.
+
+    Hits for unchanged files are replayed from :class:`ScanState`; after a
+    complete scan the state is advanced to the current ``HEAD``. Without git,
+    or when no usable previous run exists, a full scan is performed.
+    """
+
+    def __init__(
+        self,
+        scanner: RipgrepScanner,
+        state_path: str | Path | None = None,
+        *,
+        files: FileContentCache | None = None,
+    ) -> None:
+        """Wrap ``scanner`` and bind the state database; ``files`` shares mapped content with later stages."""
+        path = state_path if state_path is not None else scanner.config.ripgrep.incremental_state_path
+        if path is None:
+            msg = "RipgrepConfig.incremental_state_path must be set for incremental scanning"
+            raise ConfigError(msg)
+        self.scanner = scanner
+        self.files = files
+        self.state = ScanState(path)
+        self.revisions: dict[str, FileRevision] = {}
+        self.last_mode: Literal["full", "incremental"] | None = None
+        self.rescanned_files = 0
+
+    def state_key(self, keywords: Sequence[str]) -> str:
+        """Digest of everything that determines which hits a scan produces."""
+        rg = self.scanner.config.ripgrep
+        return stable_key(
+            SCAN_STATE_VERSION,
+            sorted(unique_keywords(keywords)),
+            rg.fixed_strings,
+            rg.smart_case,
+            self.scanner.filter_args(),
+        )
+
+    async def _plan(self, key: str) -> _ScanPlan:
+        """Decide between a full scan and rescanning the paths git reports as changed."""
+        root = self.scanner.config.target_dir
+        head = await asyncio.to_thread(head_commit, root)
+        if head is None:
+            logger.info("%s is not a git checkout; running a full scan", root)
+            return _ScanPlan(head=None)
+        dirty = await asyncio.to_thread(dirty_paths, root)
+        previous = await asyncio.to_thread(self.state.last_run, key)
+        changed = None if previous is None else await asyncio.to_thread(changed_paths, root, previous.commit)
+        if previous is None or changed is None:
+            return _ScanPlan(head=head, dirty=frozenset(dirty))
+        glob_filter = self.scanner.glob_filter()
+        # Deleted or filtered-out paths are kept in ``replaced`` so their stale rows are dropped.
+        replaced = frozenset(changed | previous.dirty | dirty)
+        paths = sorted(path for path in replaced if glob_filter.matches(path) and (Path(root) / path).is_file())
+        return _ScanPlan(head=head, dirty=frozenset(dirty), paths=paths, replaced=replaced)
+
+    async def search(self, *, must_keywords: Sequence[str]) -> AsyncGenerator[CandidateHit]:
+        """Stream hits for changed files from ripgrep, then replay unchanged files from the state.
+
+        The state only advances once the generator is exhausted; abandoning it
+        midway leaves the previous run in place.
+        """
+        keywords = unique_keywords(must_keywords)
+        self.revisions.clear()
+        if not keywords:
+            return
+        key = self.state_key(keywords)
+        plan = await self._plan(key)
+        self.last_mode = "full" if plan.paths is None else "incremental"
+        if plan.head is not None:
+            await asyncio.to_thread(self.state.begin, key)
+
+        staged: list[tuple[str, str, list[CandidateHit]]] = []
+        current: list[CandidateHit] = []
+        async with contextlib.aclosing(self.scanner.search(must_keywords=keywords, paths=plan.paths)) as hits:
+            async for hit in hits:
+                if current and current[0].file != hit.file:
+                    staged.append(await self._finish_file(plan.head, current))
+                    current = []
+                if len(staged) >= _FLUSH_FILES:
+                    await self._stage(key, plan, staged)
+                    staged = []
+                current.append(hit)
+                yield hit
+        if current:
+            staged.append(await self._finish_file(plan.head, current))
+        self.rescanned_files = len(plan.paths) if plan.paths is not None else len(self.revisions)
+        await self._stage(key, plan, staged)
+        if plan.head is None:
+            return
+
+        if plan.replaced is not None:
+            async for hit in self._replay(key, plan.head, plan.replaced):
+                yield hit
+        await asyncio.to_thread(self.state.commit, key, commit=plan.head, dirty=plan.dirty, replaced=plan.replaced)
+
+    async def _stage(self, key: str, plan: _ScanPlan, rows: list[tuple[str, str, list[CandidateHit]]]) -> None:
+        """Stage rescanned files; scans outside git are not persisted."""
+        if plan.head is not None and rows:
+            await asyncio.to_thread(self.state.stage, key, rows)
+
+    async def _replay(self, key: str, head: str, replaced: frozenset[str]) -> AsyncGenerator[CandidateHit]:
+        """Yield the stored hits of every file outside ``replaced``, a page at a time."""
+        after = ""
+        while rows := await asyncio.to_thread(self.state.load, key, after=after):
+            for file, file_hash, hits in rows:
+                if file in replaced:
+                    continue
+                self.revisions[file] = FileRevision(commit=head, file_hash=file_hash)
+                for hit in hits:
+                    yield hit
+            after = rows[-1][0]
+
+    async def _finish_file(self, head: str | None, hits: list[CandidateHit]) -> tuple[str, str, list[CandidateHit]]:
+        """Hash a fully scanned file and record its revision."""
+        file = hits[0].file
+        path = Path(self.scanner.config.target_dir) / file
+        if self.files is not None:
+            file_hash = await asyncio.to_thread(self.files.digest, path)
+        else:
+            file_hash = await asyncio.to_thread(lambda: content_digest(path.read_bytes()))
+        self.revisions[file] = FileRevision(commit=head, file_hash=file_hash)
+        return file, file_hash, hits
+
+
+__all__ = [
+    "SCAN_STATE_VERSION",
+    "FileRevision",
+    "IncrementalScanner",
+    "PreviousRun",
+    "ScanState",
+    "changed_paths",
+    "dirty_paths",
+    "head_commit",
+]
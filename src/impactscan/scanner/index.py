@@ -0,0 +1,287 @@
+"""Persistent trigram index used to prefilter ripgrep searches."""
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import sqlite3
+import subprocess
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable, Sequence
+
+INDEX_VERSION = 2
+DEFAULT_MAX_FILE_BYTES = 4_000_000
+GRAM_SIZE = 3
+_BINARY_SNIFF_BYTES = 8192
+_SQL_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    indexed INTEGER NOT NULL,
+    grams BLOB
+);
+CREATE TABLE IF NOT EXISTS postings (
+    gram INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, file_id)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class IndexUpdateStats:
+    """Outcome of an incremental index refresh."""
+
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+
+def _grams(folded: bytes) -> set[int]:
+    return {int.from_bytes(folded[index : index + GRAM_SIZE], "big") for index in range(len(folded) - GRAM_SIZE + 1)}
+
+
+def trigrams(data: bytes) -> set[int]:
+    """Return the case-folded byte trigrams of ``data`` as integers.
+
+    ASCII letters are folded bytewise. Data with other bytes is also decoded
+    as UTF-8 and folded with ``str.lower`` and ``str.casefold``, adding
+    those trigrams too, so text ripgrep matches against an ASCII keyword
+    through Unicode case folding (the Kelvin sign for ``k``, the long s for ``s``) keeps
+    its file a candidate.
+    """
+    grams = _grams(data.lower())
+    if not data.isascii():
+        text = data.decode("utf-8", errors="surrogateescape")
+        for folded in {text.lower(), text.casefold()}:
+            grams |= _grams(folded.encode("utf-8", errors="surrogateescape"))
+    return grams
+
+
+def git_fingerprint(root: str) -> str | None:
+    """Fingerprint the work tree of a git checkout, or ``None`` outside git.
+
+    The fingerprint combines the ``HEAD`` tree hash with the status and stat
+    data of every dirty or untracked path, so editing a file that is already
+    dirty still changes it.
+    """
+    try:
+        toplevel, tree = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel", "HEAD^{tree}"],  # noqa: S607
+            cwd=root,
+            capture_output=True,
+            check=True,
+        ).stdout.split()
+        status = subprocess.run(
+            ["git", "status", "--porcelain=v1", "-z", "--untracked-files=all", "--", "."],  # noqa: S607
+            cwd=root,
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+    digest = hashlib.sha256(tree)
+    entries = iter(status.split(b"\0"))
+    for entry in entries:
+        if not entry:
+            continue
+        digest.update(entry)
+        if b"R" in entry[:2] or b"C" in entry[:2]:
+            # Renames and copies are followed by their source path as a field of its own.
+            digest.update(b"\0" + next(entries, b""))
+        # Porcelain paths are relative to the repository root, not to ``root``.
+        with contextlib.suppress(OSError):
+            stat = (Path(os.fsdecode(toplevel)) / os.fsdecode(entry[3:])).stat()
+            digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return digest.hexdigest()
+
+
+def stat_fingerprint(root: str, paths: Iterable[str]) -> str:
+    """Fingerprint a tree outside git from the path, mtime and size of each file."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode())
+        with contextlib.suppress(OSError):
+            stat = (Path(root) / path).stat()
+            digest.update(f"\0{stat.st_mtime_ns}:{stat.st_size}\0".encode())
+    return digest.hexdigest()
+
+
+class TrigramIndex:
+    """SQLite-backed trigram index of the files below a scan root.
+
+    Every file is reduced to its set of case-folded byte trigrams. A keyword
+    can only occur in files containing all of its trigrams, so intersecting
+    posting lists narrows a search to a superset of the true matches, which
+    ripgrep then confirms. Files that are too large to index are always
+    returned as candidates; binary files never are, mirroring ripgrep.
+    """
+
+    def __init__(self, path: str | Path, *, root: str, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES) -> None:
+        """Bind the index database at ``path`` to the scan ``root``."""
+        self.path = Path(path)
+        self.root = root
+        self.max_file_bytes = max_file_bytes
+
+    @contextlib.contextmanager
+    def _connect(self) -> Generator[sqlite3.Connection]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.executescript(_SCHEMA)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def exists(self) -> bool:
+        """Return whether an index database has been written."""
+        return self.path.exists()
+
+    def metadata(self) -> dict[str, str]:
+        """Return the stored metadata (version, fingerprint, filter signature)."""
+        if not self.exists():
+            return {}
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def is_fresh(self, *, fingerprint: str | None, signature: str) -> bool:
+        """Return whether the index matches the current tree and file filters."""
+        if fingerprint is None:
+            return False
+        meta = self.metadata()
+        return (
+            meta.get("version") == str(INDEX_VERSION)
+            and meta.get("fingerprint") == fingerprint
+            and meta.get("signature") == signature
+        )
+
+    def update(self, paths: Iterable[str], *, fingerprint: str | None, signature: str) -> IndexUpdateStats:
+        """Bring the index in line with ``paths``, re-reading only changed files.
+
+        A file is re-indexed when its mtime or size differs from the stored
+        entry; entries for paths no longer listed are removed.
+        """
+        stats = IndexUpdateStats()
+        with self._connect() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            if meta and (meta.get("signature"), meta.get("version")) != (signature, str(INDEX_VERSION)):
+                conn.execute("DELETE FROM postings")
+                conn.execute("DELETE FROM files")
+            known = {
+                path: (file_id, mtime_ns, size)
+                for file_id, path, mtime_ns, size in conn.execute("SELECT id, path, mtime_ns, size FROM files")
+            }
+            seen: set[str] = set()
+            for raw_path in paths:
+                path = raw_path.removeprefix("./")
+                if path in seen:
+                    continue
+                seen.add(path)
+                try:
+                    stat = (Path(self.root) / path).stat()
+                except OSError:
+                    continue
+                previous = known.get(path)
+                if previous is not None and previous[1:] == (stat.st_mtime_ns, stat.st_size):
+                    stats.unchanged += 1
+                    continue
+                if previous is not None:
+                    self._drop(conn, previous[0])
+                    stats.updated += 1
+                else:
+                    stats.added += 1
+                self._insert(conn, path, stat.st_mtime_ns, stat.st_size)
+            for path, (file_id, _, _) in known.items():
+                if path not in seen:
+                    self._drop(conn, file_id)
+                    stats.removed += 1
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("version", str(INDEX_VERSION)), ("fingerprint", fingerprint or ""), ("signature", signature)],
+            )
+        return stats
+
+    def _insert(self, conn: sqlite3.Connection, path: str, mtime_ns: int, size: int) -> None:
+        grams: set[int] = set()
+        indexed = size <= self.max_file_bytes
+        if indexed:
+            try:
+                data = (Path(self.root) / path).read_bytes()
+            except OSError:
+                indexed = False
+            else:
+                if b"\0" not in data[:_BINARY_SNIFF_BYTES]:
+                    grams = trigrams(data)
+        packed = array("I", sorted(grams))
+        cursor = conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, indexed, grams) VALUES (?, ?, ?, ?, ?)",
+            (path, mtime_ns, size, int(indexed), packed.tobytes()),
+        )
+        file_id = cursor.lastrowid
+        conn.executemany("INSERT INTO postings (gram, file_id) VALUES (?, ?)", ((gram, file_id) for gram in packed))
+
+    @staticmethod
+    def _drop(conn: sqlite3.Connection, file_id: int) -> None:
+        row = conn.execute("SELECT grams FROM files WHERE id = ?", (file_id,)).fetchone()
+        if row is not None and row[0]:
+            grams = array("I")
+            grams.frombytes(row[0])
+            conn.executemany("DELETE FROM postings WHERE gram = ? AND file_id = ?", ((gram, file_id) for gram in grams))
+        conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def candidates(self, keywords: Sequence[str]) -> list[str] | None:
+        """Return sorted candidate files for any of ``keywords``.
+
+        ``None`` means the index cannot narrow the search and the caller should
+        fall back to a full walk: a keyword is shorter than a trigram, or has
+        non-ASCII characters, which ripgrep's smart case folds in ways the
+        byte trigrams of the keyword do not capture.
+        """
+        if not all(keyword.isascii() for keyword in keywords):
+            return None
+        keyword_grams = [trigrams(keyword.encode()) for keyword in keywords]
+        if not keyword_grams or any(not grams for grams in keyword_grams):
+            return None
+        with self._connect() as conn:
+            matched: set[int] = set()
+            for grams in keyword_grams:
+                files: set[int] | None = None
+                for gram in grams:
+                    postings = {row[0] for row in conn.execute("SELECT file_id FROM postings WHERE gram = ?", (gram,))}
+                    files = postings if files is None else files & postings
+                    if not files:
+                        break
+                matched |= files or set()
+            matched.update(row[0] for row in conn.execute("SELECT id FROM files WHERE indexed = 0"))
+            ids = sorted(matched)
+            paths: list[str] = []
+            for start in range(0, len(ids), _SQL_BATCH):
+                batch = ids[start : start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                paths.extend(
+                    row[0] for row in conn.execute(f"SELECT path FROM files WHERE id IN ({placeholders})", batch)  # noqa: S608
+                )
+        return sorted(paths)
+
+
+__all__ = [
+    "DEFAULT_MAX_FILE_BYTES",
+    "INDEX_VERSION",
+    "IndexUpdateStats",
+    "TrigramIndex",
+    "git_fingerprint",
+    "stat_fingerprint",
+    "trigrams",
+]
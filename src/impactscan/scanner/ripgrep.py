@@ -1,31 +1,613 @@
 """Ripgrep scanner interface and implementation."""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import base64
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, cast
+
+import orjson
+
+from impactscan.errors import ConfigError, RipgrepExecutionError, RipgrepNotFoundError
+from impactscan.models import CandidateHit
+from impactscan.scanner.globs import GlobFilter
+from impactscan.scanner.index import IndexUpdateStats, TrigramIndex, git_fingerprint, stat_fingerprint
+from impactscan.scanner.sharding import ShardPlanner
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncIterator, Iterable, Sequence
+    from collections.abc import AsyncGenerator, Iterator, Sequence
 
     from impactscan.config import ImpactScanConfig
-    from impactscan.models import CandidateHit
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK_BYTES = 1 << 16
+_CHUNK_HITS = 256
+_MAX_ARGV_PATH_BYTES = 96_000
+_STDERR_TAIL_BYTES = 4096
+_EXIT_ERROR = 2
+
+
+@dataclass
+class ScanStats:
+    """Counters describing a single ripgrep invocation."""
+
+    hits: int = 0
+    files_searched: int = 0
+    files_with_matches: int = 0
+    bytes_read: int = 0
+    parse_sec: float = 0.0
+    elapsed_sec: float = 0.0
+
+    def absorb(self, other: ScanStats) -> None:
+        """Add the counters of another (per-shard) invocation to this one."""
+        self.hits += other.hits
+        self.files_searched += other.files_searched
+        self.files_with_matches += other.files_with_matches
+        self.bytes_read += other.bytes_read
+        self.parse_sec += other.parse_sec
+
+    @property
+    def parse_hits_per_sec(self) -> float:
+        """Hits decoded per second of parser CPU time."""
+        return self.hits / self.parse_sec if self.parse_sec > 0 else 0.0
+
+    @property
+    def hits_per_sec(self) -> float:
+        """Hits delivered per second of wall-clock time."""
+        return self.hits / self.elapsed_sec if self.elapsed_sec > 0 else 0.0
+
+
+def _decode_data(field: dict[str, Any]) -> str:
+    """Decode ripgrep's ``{"text": ...}`` / ``{"bytes": ...}`` payloads."""
+    text = field.get("text")
+    if isinstance(text, str):
+        return text
+    raw = base64.b64decode(cast("str", field.get("bytes", "")))
+    return raw.decode("utf-8", errors="replace")
+
+
+def _argv_batches(paths: Sequence[str]) -> Iterator[list[str]]:
+    """Split search roots into batches that keep each command line within limits."""
+    batch: list[str] = []
+    size = 0
+    for path in paths:
+        if batch and size + len(path) + 1 > _MAX_ARGV_PATH_BYTES:
+            yield batch
+            batch, size = [], 0
+        batch.append(path)
+        size += len(path) + 1
+    if batch:
+        yield batch
+
+
+def _normalise_path(path: str) -> str:
+    """Strip the ``./`` prefix ripgrep adds when searching the working directory."""
+    return path.removeprefix("./")
+
+
+def unique_keywords(keywords: Sequence[str]) -> list[str]:
+    """Drop blank and duplicate keywords while preserving their order."""
+    return list(dict.fromkeys(keyword for keyword in keywords if keyword))
+
+
+class KeywordAttributor:
+    """Maps ripgrep submatch texts back to the keywords that produced them.
+
+    All keywords are searched in a single ripgrep walk, so each submatch has to
+    be attributed after the fact. Case folding mirrors ripgrep's smart-case rule,
+    which applies to the combined pattern set: the search is case-insensitive
+    only when no keyword contains an uppercase character.
+    """
+
+    def __init__(self, keywords: Sequence[str], *, fixed_strings: bool, smart_case: bool) -> None:
+        """Prepare per-keyword matchers for the configured search mode."""
+        self.keywords = unique_keywords(keywords)
+        self.ignore_case = smart_case and not any(keyword != keyword.lower() for keyword in self.keywords)
+        self._folded = [self._fold(keyword) for keyword in self.keywords]
+        self._patterns: list[re.Pattern[str] | None] = []
+        if not fixed_strings:
+            flags = re.IGNORECASE if self.ignore_case else 0
+            for keyword in self.keywords:
+                try:
+                    self._patterns.append(re.compile(keyword, flags))
+                except re.error:
+                    # ripgrep's regex dialect is wider than Python's; fall back to literal containment.
+                    self._patterns.append(None)
+
+    def _fold(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def attribute(self, submatch_texts: Sequence[str]) -> list[str]:
+        """Return the keywords present in the given submatches, in first-seen order."""
+        found: dict[str, None] = {}
+        for text in submatch_texts:
+            folded = self._fold(text)
+            for index, keyword in enumerate(self.keywords):
+                if keyword in found:
+                    continue
+                pattern = self._patterns[index] if self._patterns else None
+                # Substring containment also credits shorter keywords swallowed by a longer match.
+                matched = pattern.search(text) is not None if pattern is not None else self._folded[index] in folded
+                if matched:
+                    found[keyword] = None
+        return list(found)
+
+
+@dataclass
+class _HitChunk:
+    """Batch of hits from one file; ``file_done`` marks the file's last batch."""
+
+    hits: list[CandidateHit]
+    file_done: bool
+
+
+class RipgrepEventParser:
+    """Decoder for the line-delimited events emitted by ``rg --json``."""
+
+    def __init__(self, stats: ScanStats | None = None, attributor: KeywordAttributor | None = None) -> None:
+        """Attach the parser to a stats accumulator and optional keyword attributor."""
+        self.stats = stats if stats is not None else ScanStats()
+        self.attributor = attributor
+        self.last_event: str | None = None
+
+    def feed(self, line: bytes) -> CandidateHit | None:
+        """Parse a single event line and return a hit for ``match`` events."""
+        if not line.strip():
+            return None
+        started = time.perf_counter()
+        self.stats.bytes_read += len(line)
+        event = cast("dict[str, Any]", orjson.loads(line))
+        event_type = cast("str | None", event.get("type"))
+        self.last_event = event_type
+        data = cast("dict[str, Any]", event.get("data", {}))
+        hit: CandidateHit | None = None
+        if event_type == "match":
+            hit = self._parse_match(data)
+            self.stats.hits += 1
+        elif event_type == "summary":
+            stats = cast("dict[str, int]", data.get("stats", {}))
+            self.stats.files_searched += stats.get("searches", 0)
+            self.stats.files_with_matches += stats.get("searches_with_match", 0)
+        self.stats.parse_sec += time.perf_counter() - started
+        return hit
+
+    def _parse_match(self, data: dict[str, Any]) -> CandidateHit:
+        """Build a :class:`CandidateHit` from a ``match`` event payload."""
+        submatches = cast("list[dict[str, Any]]", data.get("submatches", []))
+        line_offset = cast("int", data.get("absolute_offset", 0))
+        first_start = cast("int", submatches[0]["start"]) if submatches else 0
+        text = _decode_data(cast("dict[str, Any]", data["lines"]))
+        matched_keywords: list[str] = []
+        if self.attributor is not None:
+            matched_keywords = self.attributor.attribute(
+                [_decode_data(cast("dict[str, Any]", submatch["match"])) for submatch in submatches],
+            )
+        # Fields are already typed by the decoder; skip per-hit validation on the hot path.
+        return CandidateHit.model_construct(
+            file=_normalise_path(_decode_data(cast("dict[str, Any]", data["path"]))),
+            line_no=cast("int", data["line_number"]),
+            byte_offset=line_offset + first_start,
+            text=text.rstrip("\r\n"),
+            matched_keywords=matched_keywords,
+        )
 
 
 class RipgrepScanner:
     """Wrapper around the ripgrep command line interface."""
 
-    def __init__(self, config: ImpactScanConfig) -> None:
+    def __init__(self, config: ImpactScanConfig, *, executable: str = "rg") -> None:
         """Initialize the scanner with runtime configuration."""
         self.config = config
+        self.executable = executable
+        self.last_stats = ScanStats()
+
+    def resolve_executable(self) -> str:
+        """Return the absolute path to ripgrep or raise :class:`RipgrepNotFoundError`."""
+        resolved = shutil.which(self.executable)
+        if resolved is None:
+            msg = f"ripgrep executable '{self.executable}' was not found on PATH"
+            raise RipgrepNotFoundError(msg)
+        return resolved
+
+    def attributor(self, must_keywords: Sequence[str]) -> KeywordAttributor:
+        """Build the keyword attributor matching this scanner's search mode."""
+        rg = self.config.ripgrep
+        return KeywordAttributor(must_keywords, fixed_strings=rg.fixed_strings, smart_case=rg.smart_case)
+
+    def filter_args(self) -> list[str]:
+        """Return the file-selection flags shared by searches and file listings."""
+        args = ["--no-config"]
+        if self.config.ripgrep.include_hidden:
+            args.append("--hidden")
+        for pattern in self.config.include_globs:
+            args.extend(["--glob", pattern])
+        for pattern in self.config.exclude_globs:
+            args.extend(["--glob", f"!{pattern}"])
+        return args
+
+    def glob_filter(self) -> GlobFilter:
+        """Return a Python-side filter equivalent to :meth:`filter_args` for explicit paths."""
+        return GlobFilter(
+            self.config.include_globs,
+            self.config.exclude_globs,
+            include_hidden=self.config.ripgrep.include_hidden,
+        )
+
+    def build_args(
+        self,
+        must_keywords: Sequence[str],
+        paths: Sequence[str] = (".",),
+        *,
+        threads: int | None = None,
+    ) -> list[str]:
+        """Translate configuration and keywords into ripgrep arguments.
+
+        Every keyword becomes its own ``-e`` pattern so a single directory walk
+        covers the whole keyword set; with ``fixed_strings`` ripgrep compiles
+        them into one multi-literal matcher.
+        """
+        rg = self.config.ripgrep
+        args = ["--json", *self.filter_args()]
+        if rg.fixed_strings:
+            args.append("--fixed-strings")
+        args.append("--smart-case" if rg.smart_case else "--case-sensitive")
+        threads = rg.threads if threads is None else threads
+        if threads:
+            args.extend(["--threads", str(threads)])
+        for keyword in unique_keywords(must_keywords):
+            args.extend(["-e", keyword])
+        args.append("--")
+        args.extend(paths)
+        return args
+
+    def shard_count(self) -> int:
+        """Return how many ripgrep processes an async search runs concurrently."""
+        return self.config.ripgrep.shards or os.cpu_count() or 1
+
+    async def list_files(self) -> AsyncGenerator[str]:
+        """Stream the files ripgrep would search, as paths relative to ``target_dir``."""
+        argv = [self.resolve_executable(), "--files", *self.filter_args(), "--", "."]
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=self.config.target_dir,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout = cast("asyncio.StreamReader", process.stdout)
+        try:
+            pending = b""
+            while chunk := await stdout.read(_READ_CHUNK_BYTES):
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    yield _normalise_path(os.fsdecode(line))
+            if pending:
+                yield _normalise_path(os.fsdecode(pending))
+        finally:
+            await self._terminate(process)
+
+    async def plan_shards(self, shards: int) -> list[list[str]]:
+        """Partition the target directory into balanced search roots.
+
+        The partition is derived from ``rg --files`` with the same filters as
+        the search itself, so ignore files and globs decide what gets counted.
+        """
+        planner = ShardPlanner()
+        async for path in self.list_files():
+            planner.add(path)
+        return planner.partitions(shards)
+
+    def filter_signature(self) -> str:
+        """Digest of the file-selection flags; an index is only valid for the same filters."""
+        return hashlib.sha256("\0".join(self.filter_args()).encode()).hexdigest()
+
+    def trigram_index(self) -> TrigramIndex:
+        """Return the trigram index configured by ``RipgrepConfig.index_path``."""
+        index_path = self.config.ripgrep.index_path
+        if index_path is None:
+            msg = "RipgrepConfig.index_path must be set to use the trigram index"
+            raise ConfigError(msg)
+        return TrigramIndex(index_path, root=self.config.target_dir)
+
+    async def tree_fingerprint(self) -> str:
+        """Fingerprint the target tree: git state when available, file stats otherwise."""
+        root = self.config.target_dir
+        fingerprint = await asyncio.to_thread(git_fingerprint, root)
+        if fingerprint is not None:
+            return fingerprint
+        paths = sorted([path async for path in self.list_files()])
+        return await asyncio.to_thread(stat_fingerprint, root, paths)
+
+    async def update_index(self) -> IndexUpdateStats:
+        """Incrementally refresh the trigram index from the current tree."""
+        index = self.trigram_index()
+        fingerprint = await self.tree_fingerprint()
+        paths = [path async for path in self.list_files()]
+        return await asyncio.to_thread(index.update, paths, fingerprint=fingerprint, signature=self.filter_signature())
+
+    async def index_candidates(self, keywords: Sequence[str]) -> list[str] | None:
+        """Narrow ``keywords`` to candidate files, or ``None`` to request a full walk.
+
+        The index is skipped when it is not configured, missing, stale with
+        respect to the tree or the file filters, or when the search is not a
+        fixed-string search.
+        """
+        rg = self.config.ripgrep
+        if rg.index_path is None or not rg.fixed_strings:
+            return None
+        index = self.trigram_index()
+        if not index.exists():
+            logger.info("trigram index %s is missing; running a full ripgrep walk", index.path)
+            return None
+        fingerprint = await self.tree_fingerprint()
+        if not await asyncio.to_thread(index.is_fresh, fingerprint=fingerprint, signature=self.filter_signature()):
+            logger.info("trigram index %s is stale; running a full ripgrep walk", index.path)
+            return None
+        return await asyncio.to_thread(index.candidates, keywords)
+
+    async def search(
+        self,
+        *,
+        must_keywords: Sequence[str],
+        paths: Sequence[str] | None = None,
+    ) -> AsyncGenerator[CandidateHit]:
+        """Stream ripgrep matches asynchronously.
+
+        Hits travel through bounded queues: once they are full the readers stop
+        draining ripgrep's stdout, the pipes fill up and ripgrep blocks, so a
+        slow consumer throttles the search instead of buffering every match.
+
+        With ``RipgrepConfig.shards`` other than 1 the target directory is split
+        into balanced partitions, one ripgrep process runs per partition and the
+        streams are merged. Each file lives in exactly one partition and the
+        merge never interleaves two files, so the hits of a file always arrive
+        contiguously and in line order; only the order between files varies.
+        Sharding is off by default: ripgrep already walks the tree with one
+        thread per core and every hit is decoded on this event loop, so extra
+        processes rarely pay off (``tests/benchmarks/test_scanner_sharding.py``
+        measures it on a given machine).
+
+        ``paths`` restricts the search to an explicit list of files relative to
+        ``target_dir``. ripgrep does not apply globs to explicit paths, so the
+        caller is responsible for filtering them.
+        """
+        keywords = unique_keywords(must_keywords)
+        if not keywords:
+            return
+        stats = ScanStats()
+        self.last_stats = stats
+        started = time.perf_counter()
+        executable = self.resolve_executable()
+        attributor = self.attributor(keywords)
+        shards = self.shard_count()
+        threads: int | None = None
+        roots: list[list[str]] = [["."]]
+        candidates = list(paths) if paths is not None else await self.index_candidates(keywords)
+        if candidates is not None:
+            # Explicit file lists bypass ripgrep's globs; index candidates are already filtered.
+            roots = [candidates[offset::shards] for offset in range(min(shards, len(candidates)))]
+        elif shards > 1:
+            roots = await self.plan_shards(shards)
+        if len(roots) > 1:
+            threads = max(1, (self.config.ripgrep.threads or os.cpu_count() or 1) // len(roots))
+        if not roots:
+            stats.elapsed_sec = time.perf_counter() - started
+            return
+        parsers = [RipgrepEventParser(ScanStats(), attributor) for _ in roots]
+        argv_groups = [
+            [[executable, *self.build_args(keywords, batch, threads=threads)] for batch in _argv_batches(paths)]
+            for paths in roots
+        ]
+        try:
+            # aclosing stops the shard processes as soon as this generator is closed, not at garbage collection.
+            async with contextlib.aclosing(self._merge_streams(argv_groups, parsers)) as merged:
+                async for hits in merged:
+                    for hit in hits:
+                        yield hit
+        finally:
+            for parser in parsers:
+                stats.absorb(parser.stats)
+            stats.elapsed_sec = time.perf_counter() - started
+
+    async def _merge_streams(
+        self,
+        argv_groups: Sequence[Sequence[Sequence[str]]],
+        parsers: Sequence[RipgrepEventParser],
+    ) -> AsyncGenerator[list[CandidateHit]]:
+        """Run each argv group concurrently and merge their chunks without splitting files."""
+        queue_size = self.config.ripgrep.queue_size
+        chunk_hits = min(_CHUNK_HITS, queue_size)
+        queues: list[asyncio.Queue[_HitChunk | None]] = [
+            asyncio.Queue(maxsize=max(1, queue_size // chunk_hits)) for _ in argv_groups
+        ]
+        producers = [
+            asyncio.create_task(self._produce(argvs, parser, queue, chunk_hits))
+            for argvs, parser, queue in zip(argv_groups, parsers, queues, strict=True)
+        ]
+        getters: dict[int, asyncio.Task[_HitChunk | None]] = {}
+        active = set(range(len(producers)))
+        current: int | None = None
+        try:
+            while active:
+                # While a file is open, only its producer may deliver the next chunk.
+                candidates = [current] if current is not None else sorted(active)
+                for index in candidates:
+                    if index not in getters:
+                        getters[index] = asyncio.create_task(queues[index].get())
+                done, _ = await asyncio.wait(
+                    [getters[index] for index in candidates],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                index = min(index for index in candidates if getters[index] in done)
+                chunk = getters.pop(index).result()
+                if chunk is None:
+                    active.discard(index)
+                    current = None
+                    await producers[index]
+                    continue
+                current = None if chunk.file_done else index
+                if chunk.hits:
+                    yield chunk.hits
+        finally:
+            for task in [*getters.values(), *producers]:
+                task.cancel()
+            await asyncio.gather(*getters.values(), *producers, return_exceptions=True)
+
+    async def _produce(
+        self,
+        argvs: Sequence[Sequence[str]],
+        parser: RipgrepEventParser,
+        queue: asyncio.Queue[_HitChunk | None],
+        chunk_hits: int,
+    ) -> None:
+        """Run ripgrep once per argv in turn, publish the hits, then a ``None`` sentinel."""
+        try:
+            for argv in argvs:
+                await self._run_process(argv, parser, queue, chunk_hits)
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            await queue.put(None)
+            raise
+        else:
+            await queue.put(None)
+
+    async def _run_process(
+        self,
+        argv: Sequence[str],
+        parser: RipgrepEventParser,
+        queue: asyncio.Queue[_HitChunk | None],
+        chunk_hits: int,
+    ) -> None:
+        """Spawn one ripgrep process and pump its output into ``queue``."""
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=self.config.target_dir,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            await self._pump(process, parser, queue, chunk_hits)
+        finally:
+            await self._terminate(process)
+
+    def search_sync(self, *, must_keywords: Sequence[str]) -> Iterator[CandidateHit]:
+        """Return ripgrep matches synchronously from a single ripgrep process."""
+        keywords = unique_keywords(must_keywords)
+        if not keywords:
+            return
+        stats = ScanStats()
+        self.last_stats = stats
+        started = time.perf_counter()
+        parser = RipgrepEventParser(stats, self.attributor(keywords))
+        argv = [self.resolve_executable(), *self.build_args(keywords)]
+        # stderr goes to a spool file so a chatty ripgrep can never block on a full pipe.
+        with tempfile.TemporaryFile() as stderr_file, subprocess.Popen(  # noqa: S603
+            argv,
+            cwd=self.config.target_dir,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+        ) as process:
+            stdout = cast("Any", process.stdout)
+            try:
+                for line in stdout:
+                    hit = parser.feed(cast("bytes", line))
+                    if hit is not None:
+                        yield hit
+                returncode = process.wait()
+                stderr_file.seek(0)
+                self._check_exit(returncode, stderr_file.read()[-_STDERR_TAIL_BYTES:], stats)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                stats.elapsed_sec = time.perf_counter() - started
+
+    async def _pump(
+        self,
+        process: asyncio.subprocess.Process,
+        parser: RipgrepEventParser,
+        queue: asyncio.Queue[_HitChunk | None],
+        chunk_hits: int,
+    ) -> None:
+        """Read ripgrep stdout in chunks, parse each line and feed the queue."""
+        stdout = cast("asyncio.StreamReader", process.stdout)
+        stderr_task = asyncio.create_task(self._drain_stderr(process))
+        try:
+            pending = b""
+            hits: list[CandidateHit] = []
+            while chunk := await stdout.read(_READ_CHUNK_BYTES):
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    hit = parser.feed(line)
+                    if hit is not None:
+                        hits.append(hit)
+                        if len(hits) >= chunk_hits:
+                            await queue.put(_HitChunk(hits, file_done=False))
+                            hits = []
+                    elif parser.last_event == "end":
+                        await queue.put(_HitChunk(hits, file_done=True))
+                        hits = []
+            if pending and (hit := parser.feed(pending)) is not None:
+                hits.append(hit)
+            if hits:
+                await queue.put(_HitChunk(hits, file_done=True))
+            returncode = await process.wait()
+            self._check_exit(returncode, await stderr_task, parser.stats)
+        finally:
+            # Wait for the reader to let go of stderr so _terminate can drain it.
+            stderr_task.cancel()
+            await asyncio.gather(stderr_task, return_exceptions=True)
+
+    @staticmethod
+    async def _drain_stderr(process: asyncio.subprocess.Process) -> bytes:
+        """Consume stderr so ripgrep never blocks on it, keeping only the tail."""
+        stream = cast("asyncio.StreamReader", process.stderr)
+        tail = b""
+        while chunk := await stream.read(_READ_CHUNK_BYTES):
+            tail = (tail + chunk)[-_STDERR_TAIL_BYTES:]
+        return tail
+
+    @staticmethod
+    def _check_exit(returncode: int, stderr: bytes, stats: ScanStats) -> None:
+        """Interpret ripgrep's exit status (0: matches, 1: no matches, 2: error)."""
+        if returncode < _EXIT_ERROR:
+            return
+        detail = stderr.decode("utf-8", errors="replace").strip()
+        if stats.hits == 0:
+            msg = f"ripgrep exited with status {returncode}: {detail}"
+            raise RipgrepExecutionError(msg)
+        logger.warning("ripgrep reported errors (status %s): %s", returncode, detail)
 
-    async def search(self, *, must_keywords: Sequence[str]) -> AsyncIterator[CandidateHit]:
-        """Stream ripgrep matches asynchronously."""
-        msg = "Ripgrep async search is not yet implemented."
-        raise NotImplementedError(msg)
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process) -> None:
+        """Stop ripgrep if the consumer abandoned the stream early.
 
-    def search_sync(self, *, must_keywords: Sequence[str]) -> Iterable[CandidateHit]:
-        """Return ripgrep matches synchronously."""
-        msg = "Ripgrep sync search is not yet implemented."
-        raise NotImplementedError(msg)
+        ``wait()`` only returns once every pipe has reached EOF, and a pipe
+        whose reader is paused on a full buffer never gets there, so whatever
+        the killed process left in its pipes is read and discarded first.
+        """
+        if process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+        for stream in (process.stdout, process.stderr):
+            if stream is not None:
+                while await stream.read(_READ_CHUNK_BYTES):
+                    pass
+        await process.wait()
 
 
-__all__ = ["RipgrepScanner"]
+__all__ = ["KeywordAttributor", "RipgrepEventParser", "RipgrepScanner", "ScanStats", "unique_keywords"]
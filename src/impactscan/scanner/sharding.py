@@ -0,0 +1,74 @@
+"""Directory partitioning for sharded ripgrep scans."""
+from __future__ import annotations
+
+import heapq
+from collections import defaultdict
+
+MAX_SPLIT_DEPTH = 3
+
+
+class ShardPlanner:
+    """Splits a file listing into balanced groups of search roots.
+
+    Paths are fed one at a time (typically from ``rg --files``). Top-level
+    directories are weighted by the number of files beneath them; any directory
+    heavier than an even share is replaced by its children, down to
+    ``max_depth``, before the roots are bin-packed into shards.
+    """
+
+    def __init__(self, max_depth: int = MAX_SPLIT_DEPTH) -> None:
+        """Create an empty planner."""
+        self.max_depth = max_depth
+        self.total = 0
+        self._dir_weights: dict[str, int] = defaultdict(int)
+        self._children: dict[str, set[str]] = defaultdict(set)
+
+    def add(self, path: str) -> None:
+        """Record a single file path relative to the scan root."""
+        parts = path.removeprefix("./").split("/")
+        self.total += 1
+        parent = ""
+        for depth, part in enumerate(parts[:-1], start=1):
+            if depth > self.max_depth:
+                return
+            child = f"{parent}/{part}" if parent else part
+            self._children[parent].add(child)
+            self._dir_weights[child] += 1
+            parent = child
+        if len(parts) - 1 < self.max_depth:
+            # Directories at max_depth stay whole, so their files are never listed individually.
+            self._children[parent].add("/".join(parts))
+
+    def _weight(self, unit: str) -> int:
+        return self._dir_weights.get(unit, 1)
+
+    def _splittable(self, unit: str) -> bool:
+        return unit in self._dir_weights and unit in self._children
+
+    def partitions(self, shards: int) -> list[list[str]]:
+        """Return up to ``shards`` sorted root lists with roughly equal file counts."""
+        if self.total == 0:
+            return []
+        units = {unit: self._weight(unit) for unit in self._children[""]}
+        target = self.total / max(shards, 1)
+        while True:
+            oversized = [unit for unit, weight in units.items() if weight > target and self._splittable(unit)]
+            if not oversized:
+                break
+            heaviest = max(oversized, key=lambda unit: (units[unit], unit))
+            del units[heaviest]
+            units.update({child: self._weight(child) for child in self._children[heaviest]})
+        return balance(units, shards)
+
+
+def balance(weights: dict[str, int], shards: int) -> list[list[str]]:
+    """Greedy longest-processing-time packing of weighted roots into shards."""
+    bins: list[tuple[int, int, list[str]]] = [(0, index, []) for index in range(max(shards, 1))]
+    for unit in sorted(weights, key=lambda name: (-weights[name], name)):
+        load, index, members = heapq.heappop(bins)
+        members.append(unit)
+        heapq.heappush(bins, (load + weights[unit], index, members))
+    return [sorted(members) for _, _, members in sorted(bins, key=lambda item: item[1]) if members]
+
+
+__all__ = ["MAX_SPLIT_DEPTH", "ShardPlanner", "balance"]
@@ -0,0 +1,65 @@
+"""Microbenchmark comparing per-hit span scans with interval-table classification."""
+
+import random
+import time
+
+import pytest
+
+from impactscan.preprocess.classifier import NonCodeRanges, classify_hit, classify_hits
+
+pytestmark = pytest.mark.slow
+
+STRING_LITERALS = 50_000
+COMMENTS = 5_000
+HITS = 10_000
+
+
+def _linear_classify(byte_offset: int, ranges: NonCodeRanges) -> str:
+    """Scan every span list for each hit, as the tuple-list implementation did."""
+    if any(start <= byte_offset < end for start, end in ranges.disabled_spans):
+        return "preproc_disabled"
+    if any(start <= byte_offset < end for start, end in ranges.comment_spans):
+        return "comment"
+    if any(start <= byte_offset < end for start, end in ranges.string_spans):
+        return "string"
+    return "code"
+
+
+def _generated_file() -> tuple[NonCodeRanges, list[int]]:
+    rng = random.Random(7)  # noqa: S311
+    strings = [(offset, offset + 12) for offset in range(0, STRING_LITERALS * 40, 40)]
+    comments = [(offset, offset + 30) for offset in range(20, COMMENTS * 400, 400)]
+    size = STRING_LITERALS * 40
+    offsets = sorted(rng.randrange(size) for _ in range(HITS))
+    return NonCodeRanges(comment_spans=comments, string_spans=strings, disabled_spans=[]), offsets
+
+
+def test_classify_hits_speedup(capsys: pytest.CaptureFixture[str]) -> None:
+    """Report per-hit linear, per-hit bisect and batch timings; all must agree."""
+    ranges, offsets = _generated_file()
+    sample = offsets[:: HITS // 200]
+
+    started = time.perf_counter()
+    linear = [_linear_classify(offset, ranges) for offset in sample]
+    linear_per_hit = (time.perf_counter() - started) / len(sample)
+
+    started = time.perf_counter()
+    bisected = [classify_hit(offset, ranges, keep_strings=True) for offset in offsets]
+    bisect_elapsed = time.perf_counter() - started
+
+    fresh = NonCodeRanges(ranges.comment_spans, ranges.string_spans, ranges.disabled_spans)
+    started = time.perf_counter()
+    _ = (fresh.comment_table, fresh.string_table, fresh.disabled_table)
+    build_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    batched = classify_hits(offsets, fresh)
+    batch_elapsed = time.perf_counter() - started
+
+    with capsys.disabled():
+        print(f"linear (extrapolated) {linear_per_hit * HITS:.3f}s")  # noqa: T201
+        print(f"classify_hit          {bisect_elapsed:.3f}s")  # noqa: T201
+        print(f"classify_hits         {batch_elapsed:.3f}s")  # noqa: T201
+        print(f"table build           {build_elapsed:.3f}s")  # noqa: T201
+
+    assert bisected[:: HITS // 200] == linear
+    assert batched == bisected
@@ -0,0 +1,50 @@
+"""Throughput of the single-pass heuristic lexers on generated sources."""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from impactscan.preprocess.heuristics import LEXERS, scan_file
+
+pytestmark = pytest.mark.slow
+
+TARGET_BYTES = 8_000_000
+SOURCES = {
+    "c": (
+        b"static int handle(struct req *r) {  /* validate */\n"
+        b'    if (r->len > 0) return lookup(r, "key\\n");  // fast path\n'
+        b"    return r->len / 2;\n}\n"
+    ),
+    "python": (
+        b"def handle(request, user_id):\n"
+        b"    value = compute(request.payload, user_id)  # normalise\n"
+        b'    return render(value, "template.html")\n'
+    ),
+}
+
+
+@pytest.mark.parametrize("lang", sorted(SOURCES))
+def test_lexer_throughput(lang: str, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Report MB/s for in-memory and memory-mapped scans; both must agree."""
+    chunk = SOURCES[lang]
+    content = chunk * (TARGET_BYTES // len(chunk))
+    path = tmp_path / "generated"
+    path.write_bytes(content)
+    lexer = LEXERS[lang]
+
+    started = time.perf_counter()
+    in_memory = lexer.scan(content)
+    memory_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    mapped = scan_file(path, lexer)
+    mapped_elapsed = time.perf_counter() - started
+
+    megabytes = len(content) / 1_000_000
+    with capsys.disabled():
+        print(f"{lang:<7} in-memory {megabytes / memory_elapsed:6.1f} MB/s")  # noqa: T201
+        print(f"{lang:<7} mmap      {megabytes / mapped_elapsed:6.1f} MB/s")  # noqa: T201
+
+    assert mapped == in_memory
+    assert len(in_memory[0]) == content.count(b"//") + content.count(b"/*") + content.count(b"# ")
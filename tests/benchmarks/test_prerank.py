@@ -0,0 +1,58 @@
+"""Lexical pre-ranking time for a large stream of windows."""
+
+import random
+import time
+
+import pytest
+
+from impactscan.config import PreprocessConfig
+from impactscan.models import CandidateFileWindow, CandidateHit, InstructionIntention
+from impactscan.pipeline.prerank import LexicalRanker
+
+pytestmark = pytest.mark.slow
+
+WINDOWS = 100_000
+INTENTION = InstructionIntention(
+    intention="Rename fetch_user to load_user",
+    must_keywords=["fetch_user", "UserRecord"],
+    should_keywords=["user_id", "session"],
+)
+FILLER = "    result = lookup(value, options)  # keep\n"
+KEYWORD_LINES = (
+    "    record: UserRecord = api.fetch_user(user_id)\n",
+    "    value = api.fetch_user(42)\n",
+    "    # fetch_user is deprecated, use load_user\n",
+    '    HELP = "call fetch_user(user_id) with a session"\n',
+)
+DIRECTORIES = ("src/app", "src/core/services", "vendor/lib", "tests", "docs/examples")
+
+
+def _windows() -> list[CandidateFileWindow]:
+    rng = random.Random(5)  # noqa: S311
+    windows: list[CandidateFileWindow] = []
+    for index in range(WINDOWS):
+        file = f"{rng.choice(DIRECTORIES)}/module_{index % 5000}.py"
+        lines = [FILLER] * rng.randrange(8, 40)
+        for _ in range(rng.randrange(1, 4)):
+            lines.insert(rng.randrange(len(lines)), rng.choice(KEYWORD_LINES))
+        kind = rng.choice(("code", "code", "string", "comment"))
+        hit = CandidateHit(file=file, line_no=1, byte_offset=0, text="", kind=kind)
+        windows.append(CandidateFileWindow(file=file, content="".join(lines), hits=[hit], num_occurrences=1))
+    return windows
+
+
+def test_score_streamed_windows(capsys: pytest.CaptureFixture[str]) -> None:
+    """Report how long scoring a stream of windows one by one takes."""
+    windows = _windows()
+    ranker = LexicalRanker(INTENTION, PreprocessConfig())
+
+    started = time.perf_counter()
+    scores = [ranker.score(window) for window in windows]
+    elapsed = time.perf_counter() - started
+
+    with capsys.disabled():
+        print(f"{len(windows)} windows scored in {elapsed:.3f}s")  # noqa: T201
+
+    assert ranker.calibrated
+    assert all(0.0 <= score <= 1.0 for score in scores)
+    assert elapsed < 1.0
@@ -0,0 +1,63 @@
+"""Benchmark of sharded ripgrep scans against the single-process default.
+
+Sharding stays off by default: on typical machines ripgrep's own threads
+already saturate the walk and every hit is decoded on one event loop, so
+extra processes show no speedup. Run this before enabling ``shards``.
+"""
+
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.scanner.ripgrep import RipgrepScanner
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed"),
+]
+
+TOP_DIRS = 24
+FILES_PER_DIR = 40
+LINES_PER_FILE = 200
+
+
+def _build_tree(root: Path) -> None:
+    body = "".join(
+        f"value_{line} = compute(user_id, {line})\n" if line % 10 == 0 else f"value_{line} = {line}\n"
+        for line in range(LINES_PER_FILE)
+    )
+    for top in range(TOP_DIRS):
+        # Uneven directory sizes exercise the file-count weighting.
+        for index in range(FILES_PER_DIR * (1 + top % 3)):
+            path = root / f"service{top}" / f"pkg{index % 5}" / f"mod{index}.py"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(body)
+
+
+async def _scan(root: Path, shards: int) -> tuple[int, float]:
+    scanner = RipgrepScanner(ImpactScanConfig(target_dir=str(root), ripgrep={"shards": shards}))
+    started = time.perf_counter()
+    hits = 0
+    async for _ in scanner.search(must_keywords=["user_id"]):
+        hits += 1
+    return hits, time.perf_counter() - started
+
+
+def test_sharded_scan_scaling(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Report wall time per shard count; every configuration must find the same hits."""
+    _build_tree(tmp_path)
+    cores = os.cpu_count() or 1
+    shard_counts = sorted({1, 2, 4, cores})
+    results = {shards: asyncio.run(_scan(tmp_path, shards)) for shards in shard_counts}
+
+    with capsys.disabled():
+        baseline = results[1][1]
+        for shards, (hits, elapsed) in results.items():
+            print(f"shards={shards:<3} hits={hits} elapsed={elapsed:.3f}s speedup={baseline / elapsed:.2f}x")  # noqa: T201
+
+    assert len({hits for hits, _ in results.values()}) == 1
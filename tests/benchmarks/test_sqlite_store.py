@@ -0,0 +1,48 @@
+"""Throughput of the SQLite cache store with concurrent writers."""
+
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from impactscan.cache.store import SQLiteCacheStore
+
+pytestmark = pytest.mark.slow
+
+OPS_PER_WRITER = 5_000
+VALUE = b"x" * 512
+
+
+@pytest.mark.parametrize("writers", [1, 4, 8])
+def test_set_and_get_throughput(writers: int, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Report committed sets/sec and gets/sec when ``writers`` threads share one store."""
+    with SQLiteCacheStore(tmp_path / "bench.sqlite", max_bytes=writers * OPS_PER_WRITER * len(VALUE)) as store:
+
+        def write(worker: int) -> None:
+            for index in range(OPS_PER_WRITER):
+                store.set("bench", f"{worker}:{index}", VALUE)
+
+        def read(worker: int) -> None:
+            for index in range(OPS_PER_WRITER):
+                assert store.get("bench", f"{worker}:{index}") == VALUE
+
+        def run(target: Callable[[int], None]) -> float:
+            threads = [threading.Thread(target=target, args=(worker,)) for worker in range(writers)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            store.flush()
+            return time.perf_counter() - started
+
+        write_sec = run(write)
+        read_sec = run(read)
+
+    total = writers * OPS_PER_WRITER
+    with capsys.disabled():
+        print(  # noqa: T201
+            f"{writers} writers: {total / write_sec:,.0f} sets/s, {total / read_sec:,.0f} gets/s",
+        )
@@ -0,0 +1,42 @@
+"""Window building time on a file with many thousands of hits."""
+
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.models import CandidateHit
+from impactscan.preprocess.filecache import FileContentCache
+from impactscan.preprocess.windows import WindowBuilder
+
+pytestmark = pytest.mark.slow
+
+LINES = 200_000
+HITS = 12_000
+
+
+@pytest.mark.parametrize("budget", [2000, 60])
+def test_build_windows_for_dense_file(budget: int, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Report build time for a large hit list, with and without budget-driven splitting."""
+    line = b"    result = lookup(user_id, session)  # keep\n"
+    (tmp_path / "big.py").write_bytes(line * LINES)
+    rng = random.Random(11)  # noqa: S311
+    lines = sorted(rng.randrange(1, LINES + 1) for _ in range(HITS))
+    hits = [
+        CandidateHit(file="big.py", line_no=number, byte_offset=(number - 1) * len(line), text="")
+        for number in lines
+    ]
+    config = ImpactScanConfig(target_dir=str(tmp_path), preprocess={"max_tokens_file_context": budget})
+    builder = WindowBuilder(config, FileContentCache(tmp_path))
+
+    started = time.perf_counter()
+    windows = builder.build("big.py", hits)
+    elapsed = time.perf_counter() - started
+
+    with capsys.disabled():
+        print(f"budget {budget:>5}: {len(windows)} windows in {elapsed:.3f}s")  # noqa: T201
+
+    assert sum(window.num_occurrences for window in windows) == HITS
+    assert builder.build("big.py", hits) == windows
@@ -0,0 +1 @@
+"""Cache unit tests."""
@@ -0,0 +1,38 @@
+"""Tests for the in-memory cache store."""
+
+import time
+
+import pytest
+
+from impactscan.cache.store import MemoryCacheStore
+
+
+def test_values_are_namespaced() -> None:
+    """The same key in different namespaces holds different values."""
+    store = MemoryCacheStore()
+    store.set("a", "key", b"1")
+    store.set("b", "key", b"2")
+    assert store.get("a", "key") == b"1"
+    assert store.get("b", "key") == b"2"
+    assert store.get("c", "key") is None
+
+
+def test_expired_values_are_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Entries past their time to live read as missing."""
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    store = MemoryCacheStore()
+    store.set("ns", "short", b"v", ttl_sec=5)
+    store.set("ns", "forever", b"v")
+    now[0] += 5
+    assert store.get("ns", "short") is None
+    assert store.get("ns", "forever") == b"v"
+
+
+@pytest.mark.asyncio
+async def test_async_accessors_delegate() -> None:
+    """The async accessors read and write the same entries."""
+    store = MemoryCacheStore()
+    await store.aset("ns", "key", b"v")
+    assert store.get("ns", "key") == b"v"
+    assert await store.aget("ns", "key") == b"v"
@@ -0,0 +1,167 @@
+"""Tests for the SQLite-backed cache store."""
+
+import asyncio
+import sqlite3
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Self
+
+import pytest
+
+from impactscan.cache.store import SQLiteCacheStore
+
+
+class TickClock:
+    """Wall clock stand-in that advances one second per reading."""
+
+    def __init__(self) -> None:
+        """Start at an arbitrary epoch."""
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        """Return the current time, then advance it."""
+        self.now += 1.0
+        return self.now
+
+
+def _keys(path: Path) -> list[str]:
+    with sqlite3.connect(path) as connection:
+        return [row[0] for row in connection.execute("SELECT key FROM entries ORDER BY key")]
+
+
+def test_values_persist_across_reopening(tmp_path: Path) -> None:
+    """Queued writes are readable at once, namespaced, and durable after close."""
+    path = tmp_path / "cache" / "impactscan.sqlite"
+    with SQLiteCacheStore(path) as store:
+        store.set("a", "key", b"1")
+        store.set("b", "key", b"2")
+        assert store.get("a", "key") == b"1"
+        store.set("a", "key", b"3")
+        assert store.get("a", "key") == b"3"
+    with SQLiteCacheStore(path) as store:
+        assert store.get("a", "key") == b"3"
+        assert store.get("b", "key") == b"2"
+        assert store.get("c", "key") is None
+        assert store.total_bytes == 2
+        journal_mode = sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode == "wal"
+
+
+def test_expired_entries_read_as_missing_and_are_deleted(tmp_path: Path) -> None:
+    """TTL expiry is checked on read; the expired row is removed by the writer."""
+    clock = TickClock()
+    path = tmp_path / "cache.sqlite"
+    with SQLiteCacheStore(path, clock=clock) as store:
+        store.set("ns", "short", b"v", ttl_sec=5)
+        store.set("ns", "forever", b"v")
+        store.flush()
+        assert store.get("ns", "short") == b"v"
+        clock.now += 10
+        assert store.get("ns", "short") is None
+        assert store.get("ns", "forever") == b"v"
+        store.flush()
+    assert _keys(path) == ["forever"]
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path: Path) -> None:
+    """Over ``max_bytes``, the entries read longest ago go first, down to 90% of the bound."""
+    clock = TickClock()
+    path = tmp_path / "cache.sqlite"
+    with SQLiteCacheStore(path, max_bytes=1000, clock=clock) as store:
+        for index in range(5):
+            store.set("ns", f"k{index}", bytes(200))
+            store.flush()
+        assert store.get("ns", "k0") == bytes(200)
+        store.set("ns", "k5", bytes(200))
+        store.flush()
+        assert store.total_bytes == 800
+    assert _keys(path) == ["k0", "k3", "k4", "k5"]
+
+
+class RacingReader:
+    """Reader connection that lets a writer update the key right after the row was read."""
+
+    def __init__(self, connection: sqlite3.Connection, race: Callable[[], None]) -> None:
+        """Wrap ``connection``; ``race`` runs after each query."""
+        self.connection = connection
+        self.race = race
+        self.row: tuple[object, ...] | None = None
+
+    def execute(self, sql: str, parameters: tuple[str, str]) -> Self:
+        """Read the row, then let the racing write happen."""
+        self.row = self.connection.execute(sql, parameters).fetchone()
+        self.race()
+        return self
+
+    def fetchone(self) -> tuple[object, ...] | None:
+        """Return the row read before the race."""
+        return self.row
+
+
+@pytest.mark.parametrize("committed", [False, True])
+def test_lazy_expiry_keeps_a_racing_write(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, *, committed: bool) -> None:
+    """Reading an expired entry while another thread rewrites it must not delete the new value."""
+    clock = TickClock()
+    with SQLiteCacheStore(tmp_path / "cache.sqlite", clock=clock) as store:
+        store.set("ns", "k", b"old", ttl_sec=5)
+        store.flush()
+        clock.now += 10
+
+        def rewrite() -> None:
+            store.set("ns", "k", b"new", ttl_sec=60)
+            if committed:
+                store.flush()
+
+        with sqlite3.connect(store.path) as connection:
+            monkeypatch.setattr(store, "_reader", lambda: RacingReader(connection, rewrite))
+            assert store.get("ns", "k") is None
+        store.flush()
+        monkeypatch.undo()
+        assert store.get("ns", "k") == b"new"
+
+
+def test_large_values_are_compressed(tmp_path: Path) -> None:
+    """With zstandard installed, values above the threshold are stored compressed."""
+    pytest.importorskip("zstandard")
+    value = b"def handler(request):\n    return None\n" * 500
+    with SQLiteCacheStore(tmp_path / "cache.sqlite", compress_min_bytes=1024) as store:
+        store.set("ns", "big", value)
+        store.set("ns", "small", b"x" * 100)
+        store.flush()
+        assert store.get("ns", "big") == value
+        assert store.total_bytes < len(value) // 10 + 100
+
+        def round_trip(worker: int) -> bool:
+            payloads = {f"{worker}-{index}": value + f"{worker}-{index}".encode() for index in range(50)}
+            for key, payload in payloads.items():
+                store.set("ns", key, payload)
+            return all(store.get("ns", key) == payload for key, payload in payloads.items())
+
+        with ThreadPoolExecutor(4) as pool:
+            assert all(pool.map(round_trip, range(4)))
+
+
+def test_concurrent_writers_and_async_access(tmp_path: Path) -> None:
+    """Writes from several threads and from the event loop all land."""
+    with SQLiteCacheStore(tmp_path / "cache.sqlite", write_batch=16) as store:
+
+        def write(worker: int) -> None:
+            for index in range(200):
+                store.set("ns", f"{worker}-{index}", str(index).encode())
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        async def read_back() -> list[bytes | None]:
+            await store.aset("ns", "loop", b"async")
+            return await asyncio.gather(*(store.aget("ns", f"{worker}-199") for worker in range(4)))
+
+        assert asyncio.run(read_back()) == [b"199"] * 4
+        store.flush()
+        assert store.get("ns", "loop") == b"async"
+        assert store.total_bytes == 4 * sum(len(str(index)) for index in range(200)) + 5
@@ -0,0 +1 @@
+"""Concurrency unit tests."""
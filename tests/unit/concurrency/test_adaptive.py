@@ -0,0 +1,239 @@
+"""Tests for the AIMD concurrency limiter and its client wrapper."""
+
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from impactscan.concurrency.adaptive import AdaptiveConcurrencyClient, AdaptiveConcurrencyLimiter
+from impactscan.config import ImpactScanConfig
+from impactscan.errors import RateLimitExceededError
+from impactscan.llm.adapters import CallableAdapter, OpenAIAdapter
+from impactscan.llm.client import Message
+from impactscan.models import ImpactRunSummary
+
+MESSAGES: list[Message] = [{"role": "user", "content": "q"}]
+COMPLETION = Path(__file__).parents[1] / "llm" / "fixtures" / "chat_completion_triage.json"
+
+
+class StepClock:
+    """Clock that callers advance by hand."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+async def _round(limiter: AdaptiveConcurrencyLimiter, clock: StepClock, latency: float) -> None:
+    """Admit ``limit`` requests and complete them all successfully after ``latency``."""
+    permits = [await limiter.acquire() for _ in range(limiter.limit)]
+    clock.now += latency
+    for permit in permits:
+        limiter.release(permit, "ok")
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_until_congestion_then_backs_off_once() -> None:
+    """Slow start doubles per round trip; a burst of failures from one round counts as one cut."""
+    clock = StepClock()
+    limiter = AdaptiveConcurrencyLimiter(32, clock=clock)
+    for _ in range(4):
+        await _round(limiter, clock, 1.0)
+    assert limiter.limit == 16
+
+    permits = [await limiter.acquire() for _ in range(16)]
+    for permit in permits:
+        limiter.release(permit, "throttled")
+    assert limiter.limit == 8
+    assert [change.reason for change in limiter.history].count("throttled") == 1
+
+    # Congestion avoidance: a little under one more slot per round trip.
+    for _ in range(3):
+        await _round(limiter, clock, 1.0)
+    assert limiter.limit == 10
+
+
+@pytest.mark.asyncio
+async def test_latency_inflation_and_errors() -> None:
+    """Requests far slower than the baseline cut the limit; unrelated errors do not."""
+    clock = StepClock()
+    limiter = AdaptiveConcurrencyLimiter(8, initial_limit=8, clock=clock)
+    await _round(limiter, clock, 1.0)
+    assert limiter.baseline_latency() == 1.0
+
+    permit = await limiter.acquire()
+    limiter.release(permit, "error")
+    assert limiter.limit == 8
+
+    permit = await limiter.acquire()
+    clock.now += 3.0
+    limiter.release(permit, "ok")
+    assert limiter.limit == 4
+    assert limiter.history[-1].reason == "latency"
+
+
+@pytest.mark.asyncio
+async def test_a_few_tiny_requests_do_not_pin_the_baseline() -> None:
+    """The baseline is a percentile, so occasional near-instant calls leave ordinary ones unpenalised."""
+    clock = StepClock()
+    limiter = AdaptiveConcurrencyLimiter(8, initial_limit=8, clock=clock)
+    for latency in (1.0, 1.2, 0.9, 1.1, 0.01, 1.0, 0.01):
+        permit = await limiter.acquire()
+        clock.now += latency
+        limiter.release(permit, "ok")
+    assert limiter.baseline_latency() == 1.0
+
+    permit = await limiter.acquire()
+    clock.now += 1.5
+    limiter.release(permit, "ok")
+    assert limiter.limit == 8
+    assert "latency" not in {change.reason for change in limiter.history}
+
+
+@pytest.mark.asyncio
+async def test_each_model_is_judged_against_its_own_baseline() -> None:
+    """A slower model sharing the limiter does not read as congestion of the faster one."""
+    clock = StepClock()
+    limiter = AdaptiveConcurrencyLimiter(16, initial_limit=16, clock=clock)
+    for _ in range(20):
+        for key, latency in (("small", 0.01), ("large", 0.05)):
+            permit = await limiter.acquire(key)
+            clock.now += latency
+            limiter.release(permit, "ok")
+    assert limiter.baseline_latency("small") == pytest.approx(0.01)
+    assert limiter.baseline_latency("large") == pytest.approx(0.05)
+    assert limiter.limit == 16
+    assert "latency" not in {change.reason for change in limiter.history}
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff_inside_the_adapter_is_not_latency() -> None:
+    """The sample is the provider round trip the adapter reports, not the call including its retry wait."""
+    responses = [httpx.Response(503, json={}), httpx.Response(200, content=COMPLETION.read_bytes())]
+    adapter = OpenAIAdapter(api_key="k", model="m", transport=httpx.MockTransport(lambda _request: responses.pop(0)))
+
+    async def backoff(_seconds: float) -> None:
+        await asyncio.sleep(0.2)
+
+    adapter.retry_sleep = backoff
+    limiter = AdaptiveConcurrencyLimiter(8, initial_limit=8)
+    for _ in range(4):
+        limiter.release(await limiter.acquire("m"), "ok", latency=0.05)
+    await AdaptiveConcurrencyClient(adapter, limiter, key="m").chat(MESSAGES)
+    assert limiter.limit == 8
+    assert "latency" not in {change.reason for change in limiter.history}
+
+
+@pytest.mark.asyncio
+async def test_throttles_retried_inside_the_adapter_reach_the_limiter() -> None:
+    """A 429 the adapter retries still halves the limit, even though the call itself succeeds."""
+    responses = [httpx.Response(429, json={}), httpx.Response(200, content=COMPLETION.read_bytes())]
+
+    async def no_sleep(_seconds: float) -> None:
+        return None
+
+    adapter = OpenAIAdapter(
+        api_key="k",
+        model="m",
+        rpm_limit=None,
+        tpm_limit=None,
+        transport=httpx.MockTransport(lambda _request: responses.pop(0)),
+    )
+    adapter.retry_sleep = no_sleep
+    limiter = AdaptiveConcurrencyLimiter(8, initial_limit=8)
+    response = await AdaptiveConcurrencyClient(adapter, limiter).chat(MESSAGES)
+
+    assert response.get("text") is not None
+    assert limiter.limit == 4
+    assert limiter.history[-1].reason == "throttled"
+    assert limiter.baseline_latency() is None
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_order_as_slots_free() -> None:
+    """Waiters queue FIFO behind the limit and a cancelled waiter gives up its place."""
+    limiter = AdaptiveConcurrencyLimiter(1)
+    first = await limiter.acquire()
+    order: list[str] = []
+
+    async def wait(name: str) -> None:
+        permit = await limiter.acquire()
+        order.append(name)
+        limiter.release(permit, "error")
+
+    tasks = [asyncio.create_task(wait(name)) for name in "abc"]
+    await asyncio.sleep(0)
+    tasks[1].cancel()
+    limiter.release(first, "error")
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert order == ["a", "c"]
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_timeouts_count_as_congestion() -> None:
+    """A call exceeding the client timeout raises and halves the limit."""
+
+    async def slow(_messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        await asyncio.sleep(1)
+        return {"text": "late"}
+
+    limiter = AdaptiveConcurrencyLimiter(4, initial_limit=4)
+    client = AdaptiveConcurrencyClient(CallableAdapter(slow), limiter, timeout=0.01)
+    with pytest.raises(TimeoutError):
+        await client.chat(MESSAGES)
+    assert limiter.limit == 2
+    assert limiter.history[-1].reason == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_simulated_provider_converges_below_its_capacity() -> None:
+    """Against a provider that queues above 6 and throttles above 10 concurrent calls, the limit settles there."""
+    ceiling = ImpactScanConfig(target_dir=".", analysis={"parallelism": 32}).analysis.parallelism
+    active = 0
+    peak = 0
+    throttled = 0
+
+    async def provider(_messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        nonlocal active, peak, throttled
+        active += 1
+        peak = max(peak, active)
+        try:
+            if active > 10:
+                throttled += 1
+                msg = "429 Too Many Requests"
+                raise RateLimitExceededError(msg)
+            await asyncio.sleep(0.004 * (1 + max(0, active - 6)))
+            return {"text": "ok", "usage": {"prompt_tokens": 1, "completion_tokens": 1}}
+        finally:
+            active -= 1
+
+    limiter = AdaptiveConcurrencyLimiter(ceiling)
+    client = AdaptiveConcurrencyClient(CallableAdapter(provider), limiter)
+    results = await asyncio.gather(*(client.chat(MESSAGES) for _ in range(400)), return_exceptions=True)
+
+    assert len([result for result in results if not isinstance(result, BaseException)]) + throttled == 400
+    assert throttled < 40
+    assert peak <= max(change.limit for change in limiter.history) <= ceiling
+    assert 2 <= limiter.limit <= 12
+    reasons = {change.reason for change in limiter.history}
+    assert "increase" in reasons
+    assert reasons & {"throttled", "latency"}
+
+    summary = ImpactRunSummary(
+        files_scanned=0,
+        matches_total=0,
+        candidates_after_filter=0,
+        triage_kept=0,
+        analyzed=0,
+        elapsed_sec=0.0,
+        **limiter.summary(),
+    )
+    assert summary.concurrency_limit == limiter.limit
+    assert summary.concurrency_history[0].reason == "start"
@@ -0,0 +1,108 @@
+"""Tests for consuming async iterators from synchronous code."""
+
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator
+
+import pytest
+
+from impactscan.concurrency.bridge import iterate_in_thread
+
+
+def test_items_stream_lazily_from_a_background_loop() -> None:
+    """Items arrive in order from another thread, and nothing runs before the first ``next``."""
+    threads: list[int] = []
+
+    async def produce() -> AsyncIterator[int]:
+        threads.append(threading.get_ident())
+        for value in range(5):
+            await asyncio.sleep(0)
+            yield value
+
+    stream = iterate_in_thread(produce)
+    assert threads == []
+    assert list(stream) == [0, 1, 2, 3, 4]
+    assert threads != [threading.get_ident()]
+
+
+def test_unread_items_are_bounded() -> None:
+    """The producer pauses once ``max_buffered`` items wait for the consumer."""
+    produced = 0
+
+    async def produce() -> AsyncIterator[int]:
+        nonlocal produced
+        for value in range(100):
+            produced += 1
+            yield value
+
+    stream = iterate_in_thread(produce, max_buffered=3)
+    assert next(stream) == 0
+    time.sleep(0.1)
+    assert produced <= 5
+    assert list(stream) == list(range(1, 100))
+
+
+def test_leaving_early_cancels_in_flight_work() -> None:
+    """Closing the iterator cancels the request the producer is waiting on and stops its thread."""
+    cancelled = threading.Event()
+
+    async def produce() -> AsyncIterator[int]:
+        yield 1
+        try:
+            await asyncio.sleep(60)  # a slow LLM request
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield 2
+
+    started = time.perf_counter()
+    for value in iterate_in_thread(produce, name="bridge-test"):
+        assert value == 1
+        break
+    assert cancelled.is_set()
+    assert time.perf_counter() - started < 5
+    assert all(thread.name != "bridge-test" for thread in threading.enumerate())
+
+
+def test_a_producer_that_will_not_stop_is_abandoned_after_the_join_timeout(caplog: pytest.LogCaptureFixture) -> None:
+    """Cleanup that blocks its loop cannot hang the caller; the abandoned thread is logged."""
+    release = threading.Event()
+
+    async def produce() -> AsyncIterator[int]:
+        try:
+            yield 1
+            await asyncio.sleep(60)
+        finally:
+            release.wait(5)  # blocking cleanup, e.g. a stuck subprocess wait
+
+    started = time.perf_counter()
+    for _value in iterate_in_thread(produce, name="bridge-stuck", join_timeout=0.1):
+        break
+    assert time.perf_counter() - started < 2
+    assert "bridge-stuck did not stop" in caplog.text
+    release.set()
+
+
+def test_producer_errors_are_raised_in_the_caller() -> None:
+    """Items before the failure are delivered, then the producer's exception is raised."""
+
+    async def produce() -> AsyncIterator[int]:
+        yield 1
+        msg = "backend down"
+        raise RuntimeError(msg)
+
+    received: list[int] = []
+    with pytest.raises(RuntimeError, match="backend down"):
+        received.extend(iterate_in_thread(produce))
+    assert received == [1]
+
+
+def test_max_buffered_must_be_positive() -> None:
+    """A zero-sized buffer could never hand over an item."""
+
+    async def produce() -> AsyncIterator[int]:
+        yield 1
+
+    with pytest.raises(ValueError, match="at least 1"):
+        next(iterate_in_thread(produce, max_buffered=0))
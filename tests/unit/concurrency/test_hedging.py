@@ -0,0 +1,176 @@
+"""Tests for hedged LLM requests."""
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from impactscan.concurrency.hedging import HedgedClient, LatencyTracker, build_hedged_client
+from impactscan.concurrency.limiter import RateLimiter
+from impactscan.config import AnalysisConfig
+from impactscan.llm.adapters import CallableAdapter
+from impactscan.llm.client import Message
+from impactscan.models import ImpactRunSummary
+
+MESSAGES: list[Message] = [{"role": "user", "content": "q"}]
+FAST = 0.001
+SLOW = 5.0
+
+
+class Provider:
+    """Fake provider answering each call after the next scripted delay."""
+
+    def __init__(self) -> None:
+        """Answer quickly until a script is set."""
+        self.delays: list[float | Exception] = []
+        self.calls = 0
+        self.cancelled = 0
+
+    def script(self, *delays: float | Exception) -> None:
+        """Queue per-call delays; an exception entry fails that call at once."""
+        self.delays.extend(delays)
+
+    async def __call__(self, _messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        """Sleep for the scripted delay and answer with the call number."""
+        self.calls += 1
+        number = self.calls
+        delay = self.delays.pop(0) if self.delays else FAST
+        if isinstance(delay, Exception):
+            raise delay
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"text": f"call {number}", "usage": {"total_tokens": 10}}
+
+
+async def _warm_up(client: HedgedClient, calls: int = 20) -> None:
+    for _ in range(calls):
+        await client.chat(MESSAGES)
+
+
+def test_latency_percentiles_need_enough_samples() -> None:
+    """Nearest-rank percentiles per model, only once ``min_samples`` latencies were seen."""
+    tracker = LatencyTracker(samples=100, min_samples=10)
+    for latency in range(1, 10):
+        tracker.record("small", float(latency))
+    assert tracker.percentile("small", 0.5) is None
+    tracker.record("small", 10.0)
+    assert tracker.percentile("small", 0.5) == 5.0
+    assert tracker.percentile("small", 0.95) == 10.0
+    assert tracker.percentile("large", 0.5) is None
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_the_loser_cancelled() -> None:
+    """A call past the percentile gets a duplicate charged to the limiter; the first answer wins."""
+    provider = Provider()
+    limiter = RateLimiter(rpm_limit=1000)
+    client = HedgedClient(CallableAdapter(provider), limiter=limiter, percentile=0.9)
+    await _warm_up(client)
+    provider.script(SLOW)
+    response = await asyncio.wait_for(client.chat(MESSAGES), timeout=1.0)
+    assert response.get("text") == "call 22"
+    assert provider.cancelled == 1
+    assert client.hedges == client.hedge_wins == 1
+    assert client.hedge_rate == pytest.approx(1 / 21)
+
+    summary = ImpactRunSummary(
+        files_scanned=0,
+        matches_total=0,
+        candidates_after_filter=0,
+        triage_kept=0,
+        analyzed=0,
+        elapsed_sec=0.0,
+        **client.summary(),
+    )
+    assert summary.hedge_rate == pytest.approx(1 / 21)
+    assert summary.hedge_latency_saved_sec is not None
+    assert summary.hedge_latency_saved_sec >= 0.0
+
+
+@pytest.mark.asyncio
+async def test_won_hedges_record_the_primary_elapsed_time() -> None:
+    """A hedge win adds the primary's elapsed time, not the hedge's own shorter latency, to the distribution."""
+    provider = Provider()
+    client = HedgedClient(CallableAdapter(provider), percentile=0.9, max_hedge_fraction=1.0)
+    provider.script(*[0.02] * 20)
+    await _warm_up(client)
+    provider.script(SLOW, FAST)
+    await asyncio.wait_for(client.chat(MESSAGES), timeout=1.0)
+    assert client.hedge_wins == 1
+    fastest = client.tracker.percentile("default", 0.0)
+    assert fastest is not None
+    assert fastest >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_cancelled_hedges_give_back_their_completion_reserve() -> None:
+    """A hedge cancelled because the primary answered first is only charged for its prompt."""
+    provider = Provider()
+    limiter = RateLimiter(tpm_limit=600)
+    client = HedgedClient(CallableAdapter(provider), limiter=limiter, percentile=0.9)
+    await _warm_up(client)
+    provider.script(0.05, SLOW)
+    assert (await client.chat(MESSAGES)).get("text") == "call 21"
+    assert client.hedges == 1
+    assert limiter.try_acquire(500) is not None
+
+
+@pytest.mark.asyncio
+async def test_hedges_respect_the_traffic_cap_and_limiter_capacity() -> None:
+    """No hedge beyond ``max_hedge_fraction`` of calls, nor when the limiter has no capacity right now."""
+    provider = Provider()
+    client = HedgedClient(CallableAdapter(provider), percentile=0.9, max_hedge_fraction=0.05)
+    await _warm_up(client)
+    provider.script(0.05)
+    await client.chat(MESSAGES)
+    assert client.hedges == 1
+    provider.script(0.05)
+    await client.chat(MESSAGES)
+    assert client.hedges == 1
+
+    provider = Provider()
+    limiter = RateLimiter(rpm_limit=1)
+    client = HedgedClient(CallableAdapter(provider), limiter=limiter, percentile=0.9)
+    await _warm_up(client)
+    assert limiter.try_acquire() is not None
+    provider.script(0.05)
+    await client.chat(MESSAGES)
+    assert client.hedges == 0
+    assert provider.calls == 21
+
+
+@pytest.mark.asyncio
+async def test_failures_fall_back_to_the_other_attempt() -> None:
+    """A failed attempt lets the other one answer; if both fail, the first attempt's error is raised."""
+    provider = Provider()
+    client = HedgedClient(CallableAdapter(provider), percentile=0.9, max_hedge_fraction=1.0)
+    await _warm_up(client)
+
+    provider.script(0.05, RuntimeError("hedge failed"))
+    assert (await client.chat(MESSAGES)).get("text") == "call 21"
+
+    async def failing_primary(_messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        provider.calls += 1
+        if provider.calls % 2:
+            await asyncio.sleep(0.05)
+            msg = "primary failed"
+            raise ValueError(msg)
+        msg = "hedge failed"
+        raise RuntimeError(msg)
+
+    client.client = CallableAdapter(failing_primary)
+    with pytest.raises(ValueError, match="primary failed"):
+        await client.chat(MESSAGES)
+
+
+def test_hedging_is_off_unless_configured() -> None:
+    """``build_hedged_client`` only wraps when ``hedge_percentile`` is set."""
+    adapter = CallableAdapter(Provider())
+    assert build_hedged_client(adapter, AnalysisConfig()) is adapter
+    hedged = build_hedged_client(adapter, AnalysisConfig(hedge_percentile=0.99, hedge_max_fraction=0.02))
+    assert isinstance(hedged, HedgedClient)
+    assert hedged.percentile == 0.99
+    assert hedged.max_hedge_fraction == 0.02
@@ -0,0 +1,131 @@
+"""Tests for the dual token-bucket rate limiter, driven by a fake clock."""
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from impactscan.concurrency.limiter import RateLimitedClient, RateLimiter
+from impactscan.llm.adapters import CallableAdapter
+from impactscan.llm.client import Message
+from impactscan.llm.tokens import ApproxTokenCounter
+
+
+class FakeClock:
+    """Monotonic clock that only advances when the limiter sleeps."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        """Return the current fake time."""
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        """Advance time instantly, yielding to other tasks."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def _limiter(clock: FakeClock, **limits: int) -> RateLimiter:
+    return RateLimiter(clock=clock, sleep=clock.sleep, **limits)
+
+
+@pytest.mark.asyncio
+async def test_request_rate_matches_rpm_exactly() -> None:
+    """A full bucket admits a burst of ``rpm_limit``; afterwards one request per 60/rpm seconds."""
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm_limit=60)
+    admitted: list[float] = []
+
+    async def call() -> None:
+        await limiter.acquire()
+        admitted.append(clock.now)
+
+    await asyncio.gather(*(call() for _ in range(180)))
+    assert admitted[:60] == [0.0] * 60
+    assert admitted[60:] == [float(second) for second in range(1, 121)]
+    assert limiter.waited_sec == 120.0
+
+
+@pytest.mark.asyncio
+async def test_token_rate_matches_tpm_and_both_limits_apply() -> None:
+    """Throughput is bounded by whichever bucket is tighter."""
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm_limit=600, tpm_limit=6000)  # 10 requests/s, 100 tokens/s
+    for _ in range(20):
+        await limiter.acquire(1000)
+    # 6 requests fit the initial bucket; each further 1000 tokens takes 10 s.
+    assert clock.now == 140.0
+
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm_limit=600, tpm_limit=6000)
+    for _ in range(700):
+        await limiter.acquire(1)
+    # 600 fit the initial bucket; the next 100 are paced at 10 per second by the request limit.
+    assert clock.now == pytest.approx(10.0)
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_arrival_order() -> None:
+    """A large request at the head of the queue is not overtaken by smaller ones."""
+    clock = FakeClock()
+    limiter = _limiter(clock, tpm_limit=600)  # 10 tokens/s
+    await limiter.acquire(600)
+    order: list[str] = []
+
+    async def call(name: str, tokens: int) -> None:
+        await limiter.acquire(tokens)
+        order.append(name)
+
+    await asyncio.gather(call("big", 300), call("small", 10), call("tiny", 1))
+    assert order == ["big", "small", "tiny"]
+    assert clock.sleeps == [30.0, 1.0, 0.1]
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_refunds_and_charges_the_difference() -> None:
+    """Over-estimates are refunded, under-estimates become debt repaid before the next admission."""
+    clock = FakeClock()
+    limiter = _limiter(clock, tpm_limit=6000)
+    reservation = await limiter.acquire(6000)
+    reservation.reconcile_usage({"prompt_tokens": 800, "completion_tokens": 200})
+    await limiter.acquire(5000)
+    assert clock.now == 0.0
+
+    reservation = await limiter.acquire(0)
+    reservation.reconcile(1000)
+    reservation.reconcile(99_999)  # settling twice has no effect
+    await limiter.acquire(500)
+    assert clock.now == 15.0
+
+    oversized = await limiter.acquire(50_000)
+    assert oversized.tokens == 6000
+
+
+@pytest.mark.asyncio
+async def test_clients_sharing_a_limiter_share_its_budget() -> None:
+    """Two wrapped clients on one deployment draw from one bucket and reconcile to reported usage."""
+    clock = FakeClock()
+    limiter = _limiter(clock, tpm_limit=6000)
+    calls: list[int | None] = []
+
+    def respond(messages: list[Message], **kwargs: Any) -> dict[str, Any]:  # noqa: ARG001
+        calls.append(kwargs["max_tokens"])
+        return {"text": "ok", "usage": {"total_tokens": 1000}}
+
+    counter = ApproxTokenCounter()
+    first = RateLimitedClient(CallableAdapter(respond), limiter, counter)
+    second = RateLimitedClient(CallableAdapter(respond), limiter, counter)
+    messages: list[Message] = [{"role": "user", "content": "x" * 400}]
+    assert first.estimate(messages, None) == 100 + 4 + 512
+    for _ in range(3):
+        await first.chat(messages, max_tokens=2896)
+        await second.chat(messages, max_tokens=2896)
+    # Each call reserves 3000 and is refunded 2000, so the bucket drains by 1000 per call
+    # until the fifth and sixth calls each wait 10 s for 1000 tokens to refill.
+    assert calls == [2896] * 6
+    assert clock.sleeps == [10.0, 10.0]
@@ -0,0 +1 @@
+"""LLM unit tests."""
@@ -0,0 +1,183 @@
+"""Tests for the content-addressed LLM response cache."""
+
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from impactscan.cache.store import MemoryCacheStore, SQLiteCacheStore
+from impactscan.concurrency.limiter import RateLimitedClient, RateLimiter
+from impactscan.llm.adapters import CallableAdapter
+from impactscan.llm.cache import CachingLLMClient, bypass_cache
+from impactscan.llm.client import Message
+from impactscan.llm.tokens import ApproxTokenCounter, TokenUsage
+from impactscan.models import ImpactRunSummary
+
+MESSAGES: list[Message] = [{"role": "user", "content": "Is this call site affected?"}]
+USAGE = {"prompt_tokens": 30, "completion_tokens": 10, "total_tokens": 40}
+
+
+class Provider:
+    """Fake provider counting calls, optionally slow or failing."""
+
+    def __init__(self, *, delay: float = 0.0, fail: bool = False) -> None:
+        """Configure the behaviour."""
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, _messages: list[Message], **kwargs: Any) -> dict[str, Any]:
+        """Answer with the temperature echoed back."""
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            msg = "provider unavailable"
+            raise RuntimeError(msg)
+        return {"text": f"t={kwargs['temperature']}", "json": {"impact": True}, "usage": USAGE, "raw": object()}
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_served_from_the_cache() -> None:
+    """Repeats hit the cache without ``raw``; any change to the request is a different key."""
+    provider = Provider()
+    client = CachingLLMClient(CallableAdapter(provider), MemoryCacheStore(), model="gpt-small")
+    first = await client.chat(MESSAGES)
+    again = await client.chat(MESSAGES)
+    warmer = await client.chat(MESSAGES, temperature=0.7)
+    assert provider.calls == 2
+    assert again == {"text": "t=0.2", "json": {"impact": True}, "usage": dict.fromkeys(USAGE, 0), "cached": True}
+    assert "raw" in first
+    assert warmer.get("text") == "t=0.7"
+
+    other_model = CachingLLMClient(CallableAdapter(provider), client.store, model="gpt-large")
+    await other_model.chat(MESSAGES)
+    assert provider.calls == 3
+
+    usage = client.token_usage()
+    assert usage == {
+        "llm_cache_hits": 1,
+        "llm_cache_misses": 2,
+        "llm_cache_hit_ratio": pytest.approx(1 / 3),
+        "llm_cache_tokens_saved": 40,
+    }
+    summary = ImpactRunSummary(
+        files_scanned=0,
+        matches_total=0,
+        candidates_after_filter=0,
+        triage_kept=0,
+        analyzed=0,
+        elapsed_sec=0.0,
+        token_usage={"total": 80, **usage},
+    )
+    assert summary.token_usage["llm_cache_tokens_saved"] == 40
+    assert isinstance(summary.token_usage["total"], int)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call() -> None:
+    """Single-flight: one provider call answers every concurrent duplicate."""
+    provider = Provider(delay=0.01)
+    client = CachingLLMClient(CallableAdapter(provider), MemoryCacheStore(), model="m")
+    responses = await asyncio.gather(*(client.chat(MESSAGES) for _ in range(10)))
+    assert provider.calls == 1
+    assert all(response.get("text") == "t=0.2" for response in responses)
+    assert client.token_usage()["llm_cache_hits"] == 9
+    assert client.tokens_saved == 9 * 40
+
+
+@pytest.mark.asyncio
+async def test_answers_without_a_call_do_not_count_as_spent_tokens() -> None:
+    """Hits and joined calls report zero usage, so run totals only include the provider's answer."""
+    provider = Provider(delay=0.01)
+    client = CachingLLMClient(CallableAdapter(provider), MemoryCacheStore(), model="m")
+    usage = TokenUsage()
+    responses = [*await asyncio.gather(*(client.chat(MESSAGES) for _ in range(3))), await client.chat(MESSAGES)]
+    for response in responses:
+        usage.record_response("analysis", response.get("usage"), estimated_prompt=99)
+    assert [response.get("cached", False) for response in responses] == [False, True, True, True]
+    assert usage.counts["total"] == 40
+    assert client.tokens_saved == 3 * 40
+
+
+@pytest.mark.asyncio
+async def test_unparsed_structured_answers_are_not_cached() -> None:
+    """A JSON request whose answer did not parse is sent again rather than replayed from the cache."""
+    answers: list[dict[str, Any]] = [{"text": "not json", "json": None}, {"text": "{}", "json": {}}]
+
+    async def provider(_messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        return answers.pop(0)
+
+    client = CachingLLMClient(CallableAdapter(provider), MemoryCacheStore(), model="m")
+    json_format = {"type": "json_object"}
+    assert (await client.chat(MESSAGES, response_format=json_format)).get("json") is None
+    assert (await client.chat(MESSAGES, response_format=json_format)).get("json") == {}
+    assert (await client.chat(MESSAGES, response_format=json_format)).get("cached") is True
+
+
+@pytest.mark.asyncio
+async def test_requests_inside_bypass_cache_replace_the_stored_answer() -> None:
+    """A retry of a rejected answer reaches the provider, and its answer is what later requests get."""
+    provider = Provider()
+    client = CachingLLMClient(CallableAdapter(provider), MemoryCacheStore(), model="m")
+    await client.chat(MESSAGES, temperature=0.0)
+    with bypass_cache():
+        fresh = await client.chat(MESSAGES, temperature=0.0)
+    assert provider.calls == 2
+    assert fresh.get("cached") is None
+    assert (await client.chat(MESSAGES, temperature=0.0)).get("cached") is True
+    assert provider.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_store_failures_do_not_fail_requests(tmp_path: Path) -> None:
+    """A broken or closed store is logged and skipped; the provider's answer is still returned."""
+
+    class BrokenStore(MemoryCacheStore):
+        async def aset(self, namespace: str, key: str, value: bytes, ttl_sec: int | None = None) -> None:  # noqa: ARG002
+            msg = "disk I/O error"
+            raise sqlite3.OperationalError(msg)
+
+    provider = Provider()
+    client = CachingLLMClient(CallableAdapter(provider), BrokenStore(), model="m")
+    assert (await client.chat(MESSAGES)).get("text") == "t=0.2"
+
+    store = SQLiteCacheStore(tmp_path / "cache.sqlite")
+    store.close()
+    closed = CachingLLMClient(CallableAdapter(provider), store, model="m")
+    assert (await closed.chat(MESSAGES)).get("text") == "t=0.2"
+    assert provider.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_reach_every_waiter_and_are_not_cached() -> None:
+    """A failed shared call raises for all callers; the next request retries."""
+    provider = Provider(delay=0.01, fail=True)
+    client = CachingLLMClient(CallableAdapter(provider), MemoryCacheStore(), model="m")
+    results = await asyncio.gather(*(client.chat(MESSAGES) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    provider.fail = False
+    assert (await client.chat(MESSAGES)).get("text") == "t=0.2"
+    assert provider.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_hits_skip_the_rate_limiter_and_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Only misses take limiter capacity; entries past ``ttl_sec`` are fetched again."""
+    now = [0.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    provider = Provider()
+    limiter = RateLimiter(rpm_limit=1, clock=lambda: now[0])
+    limited = RateLimitedClient(CallableAdapter(provider), limiter, ApproxTokenCounter())
+    client = CachingLLMClient(limited, MemoryCacheStore(), model="m", ttl_sec=60)
+    for _ in range(5):
+        await client.chat(MESSAGES)
+    assert provider.calls == 1
+    assert limiter.waited_sec == 0.0
+
+    now[0] += 60
+    await client.chat(MESSAGES)
+    assert provider.calls == 2
+    assert limiter.waited_sec == 0.0
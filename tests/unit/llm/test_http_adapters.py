@@ -0,0 +1,199 @@
+"""Tests for the HTTP adapters against a stand-in server replaying recorded responses."""
+
+import json
+from email.utils import format_datetime
+from datetime import UTC, datetime
+from pathlib import Path
+
+import httpx
+import orjson
+import pytest
+
+from impactscan.concurrency.limiter import RateLimiter, Reservation
+from impactscan.errors import LLMServiceError, RateLimitExceededError
+from impactscan.llm.adapters import AzureOpenAIAdapter, OpenAIAdapter
+from impactscan.llm.client import Message
+from impactscan.llm.http import HTTP2_AVAILABLE, close_shared_http_clients, parse_retry_after, shared_http_client
+
+FIXTURES = Path(__file__).parent / "fixtures"
+MESSAGES: list[Message] = [{"role": "system", "content": "triage"}, {"role": "user", "content": "window"}]
+
+Step = httpx.Response | type[httpx.TimeoutException]
+
+
+class ReplayServer:
+    """Stand-in endpoint answering each request with the next scripted step."""
+
+    def __init__(self, *steps: Step) -> None:
+        """Queue responses, or timeout exception types to raise."""
+        self.steps = list(steps)
+        self.requests: list[httpx.Request] = []
+
+    @staticmethod
+    def recorded(name: str, status: int = 200, headers: dict[str, str] | None = None) -> httpx.Response:
+        """Return a recorded response body from the fixtures directory."""
+        return httpx.Response(status, content=(FIXTURES / f"{name}.json").read_bytes(), headers=headers)
+
+    @staticmethod
+    def error(status: int, headers: dict[str, str] | None = None) -> httpx.Response:
+        """Return an error response with a provider-style JSON body."""
+        body = {"error": {"code": str(status), "message": "scripted failure"}}
+        return httpx.Response(status, json=body, headers=headers)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Record the request and play the next step."""
+        self.requests.append(request)
+        step = self.steps.pop(0)
+        if isinstance(step, httpx.Response):
+            return step
+        msg = "scripted timeout"
+        raise step(msg, request=request)
+
+    def transport(self) -> httpx.MockTransport:
+        """Return a transport that routes requests to this server."""
+        return httpx.MockTransport(self.handle)
+
+
+class SleepRecorder:
+    """Replacement for the retry sleep that returns at once."""
+
+    def __init__(self) -> None:
+        """Start with no waits."""
+        self.waits: list[float] = []
+
+    async def __call__(self, seconds: float) -> None:
+        """Record the wait."""
+        self.waits.append(seconds)
+
+
+class RecordingLimiter(RateLimiter):
+    """Rate limiter keeping every reservation it grants."""
+
+    def __init__(self) -> None:
+        """Limit nothing; only record."""
+        super().__init__(rpm_limit=1000, tpm_limit=1_000_000)
+        self.reservations: list[Reservation] = []
+
+    async def acquire(self, tokens: int = 0) -> Reservation:
+        """Reserve as usual and keep the reservation."""
+        reservation = await super().acquire(tokens)
+        self.reservations.append(reservation)
+        return reservation
+
+
+def _openai(server: ReplayServer, **kwargs: object) -> tuple[OpenAIAdapter, SleepRecorder]:
+    adapter = OpenAIAdapter(api_key="sk-test", model="gpt-4o-mini", transport=server.transport(), **kwargs)  # type: ignore[arg-type]
+    sleeper = SleepRecorder()
+    adapter.retry_sleep = sleeper
+    return adapter, sleeper
+
+
+@pytest.mark.asyncio
+async def test_openai_request_and_recorded_response() -> None:
+    """The request carries the model and options; the recorded JSON answer is decoded."""
+    server = ReplayServer(ReplayServer.recorded("chat_completion_triage"))
+    limiter = RecordingLimiter()
+    adapter, _ = _openai(server, limiter=limiter)
+    response = await adapter.chat(MESSAGES, response_format={"type": "json_object"}, max_tokens=300)
+
+    (request,) = server.requests
+    assert str(request.url) == "https://api.openai.com/v1/chat/completions"
+    assert request.headers["authorization"] == "Bearer sk-test"
+    sent = orjson.loads(request.content)
+    assert sent["model"] == "gpt-4o-mini"
+    assert sent["max_tokens"] == 300
+    assert sent["response_format"] == {"type": "json_object"}
+    assert response.get("usage") == {"prompt_tokens": 412, "completion_tokens": 58, "total_tokens": 470}
+    assert (response.get("json") or {})["results"][0]["triage_decision"] == "keep"
+    (reservation,) = limiter.reservations
+    assert reservation.settled
+
+
+@pytest.mark.asyncio
+async def test_azure_request_and_tool_call_arguments() -> None:
+    """Azure requests target the deployment with api-version and key headers; tool arguments become ``json``."""
+    server = ReplayServer(ReplayServer.recorded("chat_completion_tool_call"))
+    adapter = AzureOpenAIAdapter(
+        endpoint="https://example.openai.azure.com/",
+        api_key="azure-key",
+        deployment="analysis",
+        api_version="2024-10-21",
+        transport=server.transport(),
+    )
+    response = await adapter.chat(MESSAGES, tools=[{"type": "function", "function": {"name": "report_impact"}}])
+    (request,) = server.requests
+    assert str(request.url) == (
+        "https://example.openai.azure.com/openai/deployments/analysis/chat/completions?api-version=2024-10-21"
+    )
+    assert request.headers["api-key"] == "azure-key"
+    assert "model" not in json.loads(request.content)
+    assert response.get("text") is None
+    assert response.get("json") == {"impact_level": "high", "confidence": 0.9}
+
+
+@pytest.mark.asyncio
+async def test_throttling_is_retried_after_the_requested_wait() -> None:
+    """429 responses are retried after ``Retry-After`` / ``retry-after-ms``; each attempt takes limiter capacity."""
+    server = ReplayServer(
+        ReplayServer.error(429, {"retry-after": "2"}),
+        ReplayServer.error(429, {"retry-after-ms": "250"}),
+        ReplayServer.error(503),
+        ReplayServer.recorded("chat_completion_triage"),
+    )
+    limiter = RecordingLimiter()
+    adapter, sleeper = _openai(server, limiter=limiter)
+    response = await adapter.chat(MESSAGES)
+    assert response.get("usage", {}).get("total_tokens") == 470
+    assert len(server.requests) == 4
+    assert sleeper.waits[:2] == [2.0, 0.25]
+    assert 0 < sleeper.waits[2] <= 60
+    assert len(limiter.reservations) == 4
+
+
+@pytest.mark.asyncio
+async def test_timeouts_are_retried_then_surface_as_timeout_error() -> None:
+    """Transport timeouts retry with backoff and finally raise ``TimeoutError``."""
+    server = ReplayServer(httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ReadTimeout)
+    adapter, sleeper = _openai(server, max_attempts=3)
+    with pytest.raises(TimeoutError):
+        await adapter.chat(MESSAGES)
+    assert len(server.requests) == 3
+    assert len(sleeper.waits) == 2
+
+
+@pytest.mark.asyncio
+async def test_client_errors_and_exhausted_throttling_are_not_hidden() -> None:
+    """A 400 is raised at once; persistent 429s raise ``RateLimitExceededError`` after the last attempt."""
+    server = ReplayServer(ReplayServer.error(400))
+    adapter, _ = _openai(server)
+    with pytest.raises(LLMServiceError) as raised:
+        await adapter.chat(MESSAGES)
+    assert raised.value.status_code == 400
+    assert len(server.requests) == 1
+
+    server = ReplayServer(*(ReplayServer.error(429, {"retry-after": "1"}) for _ in range(2)))
+    adapter, _ = _openai(server, max_attempts=2)
+    with pytest.raises(RateLimitExceededError) as throttled:
+        await adapter.chat(MESSAGES)
+    assert throttled.value.retry_after == 1.0
+
+
+@pytest.mark.asyncio
+async def test_adapters_for_one_endpoint_share_a_pooled_client() -> None:
+    """One keep-alive client per endpoint and event loop, using HTTP/2 when available."""
+    first = shared_http_client("https://api.openai.com/v1")
+    assert shared_http_client("https://api.openai.com/v1") is first
+    assert shared_http_client("https://example.openai.azure.com") is not first
+    await close_shared_http_clients()
+    assert first.is_closed
+    assert shared_http_client("https://api.openai.com/v1") is not first
+    await close_shared_http_clients()
+    assert isinstance(HTTP2_AVAILABLE, bool)
+
+
+def test_retry_after_accepts_http_dates() -> None:
+    """``Retry-After`` may be an HTTP date."""
+    moment = datetime(2026, 1, 1, 12, 0, 30, tzinfo=UTC)
+    headers = httpx.Headers({"retry-after": format_datetime(moment, usegmt=True)})
+    assert parse_retry_after(headers, now=moment.timestamp() - 30) == 30.0
+    assert parse_retry_after(httpx.Headers({"retry-after": "soon"})) is None
@@ -0,0 +1,69 @@
+"""Tests for the client layers a run wraps around its LLM clients."""
+
+from impactscan.cache.store import MemoryCacheStore
+from impactscan.concurrency.adaptive import AdaptiveConcurrencyClient
+from impactscan.concurrency.hedging import HedgedClient
+from impactscan.concurrency.limiter import RateLimitedClient
+from impactscan.config import ImpactScanConfig
+from impactscan.llm.adapters import CallableAdapter, OpenAIAdapter
+from impactscan.llm.cache import CachingLLMClient
+from impactscan.llm.stack import ClientStack, model_names
+from impactscan.llm.tokens import ApproxTokenCounter
+
+
+def _layers(client: object) -> list[type]:
+    layers: list[type] = []
+    while client is not None:
+        layers.append(type(client))
+        client = getattr(client, "client", None)
+    return layers
+
+
+def test_layers_follow_the_configuration() -> None:
+    """Cache outside, then rate limit, hedging and adaptive concurrency; a client is rate limited once."""
+    config = ImpactScanConfig(target_dir=".", analysis={"hedge_percentile": 0.9})
+    stack = ClientStack(config, ApproxTokenCounter(), MemoryCacheStore())
+    adapter = CallableAdapter(lambda *_args, **_kwargs: {"text": "ok"})
+    wrapped = stack.wrap(adapter, model="small")
+    assert _layers(wrapped) == [
+        CachingLLMClient,
+        RateLimitedClient,
+        HedgedClient,
+        AdaptiveConcurrencyClient,
+        CallableAdapter,
+    ]
+    stack.wrap(adapter, model="large")
+    assert len(stack.rate_limiters) == 1
+    assert set(stack.summary()) == {"concurrency_limit", "concurrency_history", "hedge_rate", "hedge_latency_saved_sec"}
+
+    unlimited = OpenAIAdapter(api_key="k", model="gpt")
+    assert _layers(stack.wrap(unlimited, model="gpt"))[1:] == [
+        RateLimitedClient,
+        HedgedClient,
+        AdaptiveConcurrencyClient,
+        OpenAIAdapter,
+    ]
+    own = OpenAIAdapter(api_key="k", model="gpt", rpm_limit=60)
+    assert _layers(stack.wrap(own, model="gpt"))[1:] == [HedgedClient, AdaptiveConcurrencyClient, OpenAIAdapter]
+
+    bare = ClientStack(
+        ImpactScanConfig(
+            target_dir=".",
+            analysis={"adaptive_concurrency": False, "rpm_limit": None, "tpm_limit": None},
+            cache={"llm_responses": False},
+        ),
+        ApproxTokenCounter(),
+        MemoryCacheStore(),
+    )
+    assert bare.wrap(adapter, model="small") is adapter
+    assert bare.summary() == {}
+    assert bare.token_usage() == {}
+
+
+def test_model_names_come_from_the_enabled_provider() -> None:
+    """Cache keys use the configured deployment or model names."""
+    azure = ImpactScanConfig(target_dir=".", azure_openai={"enabled": True, "deployments": {"small": "mini"}})
+    assert model_names(azure) == ("mini", "large")
+    openai = ImpactScanConfig(target_dir=".", openai={"enabled": True, "model_large": "gpt-big"})
+    assert model_names(openai) == ("small", "gpt-big")
+    assert model_names(ImpactScanConfig(target_dir=".")) == ("small", "large")
@@ -0,0 +1,143 @@
+"""Tests for token counters, memoisation and usage accounting."""
+
+import importlib.util
+import sys
+import types
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.errors import ConfigError
+from impactscan.llm.tokens import (
+    MESSAGE_OVERHEAD_TOKENS,
+    ApproxTokenCounter,
+    CachedTokenCounter,
+    TiktokenCounter,
+    TokenCounter,
+    TokenUsage,
+    default_token_counter,
+    prompt_tokens,
+    window_tokens,
+)
+from impactscan.models import CandidateFileWindow, CandidateHit
+from impactscan.preprocess.filecache import FileContentCache
+from impactscan.preprocess.windows import WindowBuilder
+
+if TYPE_CHECKING:
+    from impactscan.llm.client import Message
+
+HAS_TIKTOKEN = importlib.util.find_spec("tiktoken") is not None
+
+
+class CharCounter(TokenCounter):
+    """One token per character, recording every text it is asked to count."""
+
+    name = "chars"
+
+    def __init__(self) -> None:
+        """Start with no calls."""
+        self.calls: list[str] = []
+
+    def count(self, text: str) -> int:
+        """Count characters."""
+        self.calls.append(text)
+        return len(text)
+
+
+def test_approx_counter_weights_non_ascii_characters() -> None:
+    """ASCII is counted per four characters, other characters one each."""
+    counter = ApproxTokenCounter()
+    assert counter.count("") == 0
+    assert counter.count("abcd" * 10) == 10
+    assert counter.count("abcde") == 2
+    assert counter.count("後方互換性") == 5
+    messages: list[Message] = [{"role": "system", "content": "abcd"}, {"role": "user", "content": "abcdabcd"}]
+    assert counter.count_messages(messages) == 3 + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+def test_cached_counter_counts_each_text_once() -> None:
+    """Repeated texts are served from the digest-keyed cache, bounded by ``max_entries``."""
+    inner = CharCounter()
+    counter = CachedTokenCounter(inner, max_entries=2)
+    assert [counter.count(text) for text in ["aa", "bbb", "aa", "c", "bbb"]] == [2, 3, 2, 1, 3]
+    assert inner.calls == ["aa", "bbb", "c", "bbb"]
+    assert (counter.stats.hits, counter.stats.misses) == (1, 4)
+    assert counter.name == "chars"
+
+
+@pytest.mark.skipif(HAS_TIKTOKEN, reason="tiktoken is installed")
+def test_exact_counter_requires_tiktoken() -> None:
+    """Without tiktoken the exact counter is a configuration error and the default falls back."""
+    with pytest.raises(ConfigError, match="tiktoken"):
+        TiktokenCounter()
+    assert default_token_counter().name == "approx"
+
+
+def test_unloadable_encoding_falls_back_to_the_estimate(monkeypatch: pytest.MonkeyPatch) -> None:
+    """An encoding tiktoken cannot fetch, e.g. offline, degrades to the approximation instead of failing."""
+
+    def get_encoding(name: str) -> object:
+        msg = f"could not download {name}"
+        raise OSError(msg)
+
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding))
+    with pytest.raises(ConfigError, match="could not download"):
+        TiktokenCounter()
+    assert default_token_counter().name == "approx"
+
+
+@pytest.mark.skipif(not HAS_TIKTOKEN, reason="tiktoken is not installed")
+def test_exact_counter_uses_bpe() -> None:
+    """With tiktoken installed the default counter is exact."""
+    counter = default_token_counter()
+    assert counter.name.startswith("tiktoken:")
+    assert counter.count("hello world") == 2
+
+
+def test_windows_carry_counts_for_later_stages() -> None:
+    """A window is counted once; prompts reuse its carried count."""
+    inner = CharCounter()
+    counter = CachedTokenCounter(inner)
+    window = CandidateFileWindow(file="a.py", content="x = 1\n")
+    assert window_tokens(window, counter) == 6
+    assert window.token_count == 6
+    skeleton: list[Message] = [{"role": "system", "content": "system"}, {"role": "user", "content": "user"}]
+    fixed = 6 + 4 + 2 * MESSAGE_OVERHEAD_TOKENS
+    assert prompt_tokens(counter, skeleton, [window, window]) == fixed + 12
+    assert prompt_tokens(counter, skeleton, [window], framing=3) == fixed + 9
+    assert inner.calls == ["x = 1\n", "system", "user"]
+
+
+def test_builder_trims_context_when_the_exact_count_is_over_budget(tmp_path: Path) -> None:
+    """When the byte estimate undercounts, context lines are dropped until the window fits."""
+    (tmp_path / "a.py").write_bytes(b"line\n" * 50)
+    config = ImpactScanConfig(
+        target_dir=str(tmp_path),
+        ripgrep={"context_lines": 10},
+        preprocess={"max_tokens_file_context": 40},
+    )
+    hit = CandidateHit(file="a.py", line_no=25, byte_offset=120, text="line")
+    estimated = WindowBuilder(config, FileContentCache(tmp_path)).build("a.py", [hit])[0]
+    assert estimated.spans == [(15, 35)]
+    assert estimated.token_count == 27
+
+    counted = WindowBuilder(config, FileContentCache(tmp_path), token_counter=CharCounter()).build("a.py", [hit])[0]
+    assert counted.spans == [(22, 29)]
+    assert counted.token_count == len(counted.content) == 40
+
+
+def test_usage_records_provider_counts_or_estimates() -> None:
+    """Reported usage wins; the prompt estimate fills in when a provider omits it."""
+    usage = TokenUsage()
+    usage.record_response("triage", {"prompt_tokens": 100, "completion_tokens": 20})
+    usage.record_response("triage", None, estimated_prompt=50)
+    usage.record_response("analysis", {"prompt_tokens": 300, "completion_tokens": 80})
+    assert usage.as_dict() == {
+        "analysis_completion": 80,
+        "analysis_prompt": 300,
+        "total": 550,
+        "triage_completion": 20,
+        "triage_prompt": 150,
+    }
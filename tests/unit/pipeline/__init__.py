@@ -0,0 +1 @@
+"""Pipeline unit tests."""
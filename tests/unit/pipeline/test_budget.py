@@ -0,0 +1,41 @@
+"""Tests for run budgets."""
+
+from impactscan.config import AnalysisConfig
+from impactscan.llm.tokens import TokenUsage
+from impactscan.pipeline.budget import RunBudget
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+def test_unbounded_budget_never_runs_out() -> None:
+    """Without limits every analysis may start."""
+    budget = RunBudget(AnalysisConfig(), TokenUsage())
+    assert all(budget.start_analysis() for _ in range(1000))
+    assert budget.exhausted is None
+
+
+def test_wall_time_counts_from_start() -> None:
+    """Time before :meth:`RunBudget.start` is not charged, and the exhausted budget is remembered."""
+    clock = FakeClock()
+    usage = TokenUsage()
+    budget = RunBudget(AnalysisConfig(max_wall_time_sec=10, max_total_tokens=100), usage, clock=clock)
+    clock.now = 30.0
+    budget.start()
+    clock.now = 39.0
+    assert budget.check()
+    clock.now = 40.0
+    assert not budget.check()
+    usage.add("total", 500)
+    assert not budget.start_analysis()
+    assert budget.exhausted == "wall_time"
+    assert budget.analyzed == 0
@@ -0,0 +1,131 @@
+"""Tests for duplicate window clustering and result fan-out."""
+
+import random
+from typing import Any
+
+import pytest
+
+from impactscan.config import AnalysisConfig
+from impactscan.llm.adapters import CallableAdapter
+from impactscan.llm.client import Message
+from impactscan.models import CandidateFileWindow, CandidateHit, ImpactAssessment, InstructionIntention, TriageResult
+from impactscan.pipeline.dedup import cluster_windows, fan_out_triage, minhash_signature, signature_similarity
+from impactscan.pipeline.triage import run_triage
+
+CODE = "def load(client):\n    user = client.fetch_user(user_id)\n    return user.name\n"
+
+
+def _window(file: str, content: str, start: int = 1, occurrences: int = 1) -> CandidateFileWindow:
+    hits = [CandidateHit(file=file, line_no=start + 1, byte_offset=0, text="fetch_user")] * occurrences
+    return CandidateFileWindow(
+        file=file,
+        spans=[(start, start + 2)],
+        hits=hits,
+        num_occurrences=occurrences,
+        file_hash=f"hash-{file}",
+        content=content,
+    )
+
+
+def _words(seed: int, count: int) -> list[str]:
+    rng = random.Random(seed)  # noqa: S311
+    return [f"token{rng.randrange(10_000)}" for _ in range(count)]
+
+
+def test_exact_and_whitespace_duplicates_share_a_cluster() -> None:
+    """Byte-identical and re-indented copies cluster; the first window stays representative."""
+    windows = [
+        _window("src/app.py", CODE),
+        _window("src/other.py", "unrelated = True\n"),
+        _window("vendor/app.py", CODE),
+        _window("gen/app.py", CODE.replace("    ", "\t").replace("\n", " \n")),
+    ]
+    clusters = cluster_windows(windows)
+    assert [[member.file for member in cluster.members] for cluster in clusters] == [
+        ["src/app.py", "vendor/app.py", "gen/app.py"],
+        ["src/other.py"],
+    ]
+    assert clusters[0].representative is windows[0]
+
+
+def test_results_fan_out_with_member_lines_and_counts() -> None:
+    """Each member gets its own file, shifted line references, occurrences and revision."""
+    (cluster,) = cluster_windows([_window("a.py", CODE, start=10), _window("b.py", CODE, start=40, occurrences=3)])
+    triage = TriageResult(
+        file="a.py",
+        window_index=0,
+        triage_decision="keep",
+        relevance_score=0.8,
+        quick_reason="calls fetch_user",
+    )
+    assert [(result.file, result.triage_decision) for result in cluster.fan_out_triage(triage)] == [
+        ("a.py", "keep"),
+        ("b.py", "keep"),
+    ]
+    assessment = ImpactAssessment(
+        file="a.py",
+        impact_level="high",
+        reason="Renamed API",
+        confidence=0.9,
+        lines=["11", "L10-12", "client.fetch_user(user_id)"],
+        num_occurrences=1,
+    )
+    copies = cluster.fan_out_assessment(assessment)
+    assert [(copy.file, copy.lines, copy.num_occurrences, copy.hash) for copy in copies] == [
+        ("a.py", ["11", "L10-12", "client.fetch_user(user_id)"], 1, "hash-a.py"),
+        ("b.py", ["41", "L40-42", "client.fetch_user(user_id)"], 3, "hash-b.py"),
+    ]
+
+
+def test_near_duplicates_cluster_only_when_enabled() -> None:
+    """A copy with a couple of edited words joins the cluster under MinHash; unrelated code does not."""
+    base = _words(1, 300)
+    edited = [*base]
+    edited[100] = "patched"
+    edited[200] = "patched"
+    windows = [
+        _window("a.py", " ".join(base)),
+        _window("b.py", " ".join(edited)),
+        _window("c.py", " ".join(_words(2, 300))),
+    ]
+    assert len(cluster_windows(windows)) == 3
+    clusters = cluster_windows(windows, near_duplicate_threshold=0.8)
+    assert [[member.file for member in cluster.members] for cluster in clusters] == [["a.py", "b.py"], ["c.py"]]
+
+
+def test_signature_similarity_tracks_jaccard() -> None:
+    """The estimate is close to the true shingle overlap."""
+    base = _words(3, 400)
+    half = base[:200] + _words(4, 200)
+    assert signature_similarity(minhash_signature(" ".join(base)), minhash_signature(" ".join(base))) == 1.0
+    estimate = signature_similarity(minhash_signature(" ".join(base)), minhash_signature(" ".join(half)))
+    assert 0.2 <= estimate <= 0.5  # true Jaccard of the 5-grams is about 0.33
+
+
+@pytest.mark.asyncio
+async def test_triage_runs_once_per_cluster() -> None:
+    """Only representatives reach the model; every window still gets a result."""
+    calls: list[int] = []
+
+    def model(messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        windows = messages[1]["content"].count("### file=")
+        calls.append(windows)
+        file = messages[1]["content"].split("### file=")[1].split()[0]
+        result = {
+            "file": file,
+            "window_index": 0,
+            "triage_decision": "keep",
+            "relevance_score": 0.9,
+            "quick_reason": "r",
+        }
+        return {"json": {"results": [result]}}
+
+    windows = [_window(f"copy{index}/app.py", CODE) for index in range(5)] + [_window("solo.py", "x = 1\n")]
+    clusters = cluster_windows(windows)
+    representatives = [cluster.representative for cluster in clusters]
+    intention = InstructionIntention(intention="rename")
+    config = AnalysisConfig(parallelism=1, triage_batch_max_windows=1)
+    results = await run_triage(representatives, intention=intention, client=CallableAdapter(model), config=config)
+    expanded = fan_out_triage(clusters, results)
+    assert calls == [1, 1]
+    assert sorted(result.file for result in expanded) == sorted(window.file for window in windows)
@@ -0,0 +1,122 @@
+"""Tests for the run journal."""
+
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from impactscan.models import CandidateFileWindow, ImpactAssessment, InstructionIntention, TriageResult
+from impactscan.pipeline.journal import RunJournal, read_journal
+
+WINDOW = CandidateFileWindow(file="a.py", window_index=1, content="api.fetch_user(user_id)\n")
+TRIAGE = TriageResult(file="a.py", window_index=1, triage_decision="keep", relevance_score=0.8, quick_reason="call")
+ASSESSMENT = ImpactAssessment(file="a.py", impact_level="high", reason="renamed call", confidence=0.9, lines=["1"])
+
+
+def _write_full_journal(path: Path) -> None:
+    journal = RunJournal(path)
+    journal.record_run("Rename `fetch_user`", ["fetch_user"])
+    journal.record_intention(InstructionIntention(intention="Rename fetch_user", must_keywords=["fetch_user"]))
+    journal.record_triage(WINDOW, TRIAGE)
+    journal.record_assessment(WINDOW, ASSESSMENT)
+    journal.close()
+
+
+def test_replay_returns_results_for_unchanged_windows(tmp_path: Path) -> None:
+    """Recorded results are replayed for the same window content and ignored once it changed."""
+    path = tmp_path / "run.jsonl"
+    _write_full_journal(path)
+    state = read_journal(path)
+    assert state.instruction == "Rename `fetch_user`"
+    assert state.extra_keywords == ["fetch_user"]
+    assert state.intention is not None
+    assert state.intention.must_keywords == ["fetch_user"]
+    assert state.triage_for(WINDOW) == TRIAGE
+    assert state.assessment_for(WINDOW) == ASSESSMENT
+    edited = WINDOW.model_copy(update={"content": "api.load_user(user_id)\n"})
+    assert state.triage_for(edited) is None
+    assert state.assessment_for(edited) is None
+
+
+def test_torn_last_record_is_ignored_and_cut_before_appending(tmp_path: Path) -> None:
+    """A crash mid-write leaves a partial line; replay skips it and appending starts on a fresh line."""
+    path = tmp_path / "run.jsonl"
+    journal = RunJournal(path)
+    journal.record_run("Rename `fetch_user`", [])
+    journal.record_triage(WINDOW, TRIAGE)
+    journal.close()
+    with path.open("ab") as handle:
+        handle.write(b'{"type": "assessment", "key": ["a.py", 1], "dig')
+    assert read_journal(path).assessments == {}
+    journal = RunJournal(path, append=True)
+    journal.record_assessment(WINDOW, ASSESSMENT)
+    journal.close()
+    state = read_journal(path)
+    assert state.triage_for(WINDOW) == TRIAGE
+    assert state.assessment_for(WINDOW) == ASSESSMENT
+    assert len(path.read_bytes().splitlines()) == 3
+
+
+def test_records_are_synced_in_batches_off_the_calling_thread(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """``fsync`` runs on the writer thread once per ``fsync_every`` records, and on close."""
+    threads: list[str] = []
+    fsync = os.fsync
+
+    def counting_fsync(fd: int) -> None:
+        threads.append(threading.current_thread().name)
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    journal = RunJournal(tmp_path / "run.jsonl", fsync_every=3, fsync_interval_sec=3600)
+    for _ in range(7):
+        journal.record_triage(WINDOW, TRIAGE)
+    journal.sync()
+    assert threads == ["journal-writer"] * 3
+    journal.close()
+    assert threads == ["journal-writer"] * 4
+    assert len(read_journal(tmp_path / "run.jsonl").triage) == 1
+    assert len((tmp_path / "run.jsonl").read_bytes().splitlines()) == 7
+
+
+def test_pending_records_are_synced_after_the_interval(tmp_path: Path) -> None:
+    """A record that does not fill a batch is still made durable once the interval has passed."""
+    synced = threading.Event()
+
+    class ObservedJournal(RunJournal):
+        def _sync(self) -> None:
+            super()._sync()
+            synced.set()
+
+    journal = ObservedJournal(tmp_path / "run.jsonl", fsync_every=100, fsync_interval_sec=0.05)
+    journal.record_triage(WINDOW, TRIAGE)
+    assert synced.wait(5)
+    assert read_journal(tmp_path / "run.jsonl").triage_for(WINDOW) == TRIAGE
+    journal.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        journal.record_assessment(WINDOW, ASSESSMENT)
+
+
+def test_window_set_shows_changed_and_missing_windows(tmp_path: Path) -> None:
+    """Recorded windows let a resumed run tell which windows changed or disappeared."""
+    path = tmp_path / "run.jsonl"
+    journal = RunJournal(path)
+    journal.record_window(WINDOW)
+    journal.record_window(WINDOW.model_copy(update={"file": "b.py", "window_index": 0}))
+    journal.close()
+    state = read_journal(path)
+    assert state.windows.keys() == {("a.py", 1), ("b.py", 0)}
+    assert not state.changed(WINDOW)
+    assert state.changed(WINDOW.model_copy(update={"content": "api.load_user(user_id)\n"}))
+    assert not state.changed(WINDOW.model_copy(update={"file": "c.py"}))
+    assert state.missing({("a.py", 1)}) == [("b.py", 0)]
+
+
+def test_missing_journal_replays_as_empty(tmp_path: Path) -> None:
+    """Resuming without a journal on disk starts from nothing."""
+    state = read_journal(tmp_path / "absent.jsonl")
+    assert state.instruction is None
+    assert state.assessments == {}
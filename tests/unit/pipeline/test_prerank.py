@@ -0,0 +1,96 @@
+"""Tests for lexical pre-ranking."""
+
+from typing import Literal
+
+import pytest
+
+from impactscan.config import PreprocessConfig
+from impactscan.models import CandidateFileWindow, CandidateHit, InstructionIntention
+from impactscan.pipeline.prerank import LexicalRanker
+
+INTENTION = InstructionIntention(
+    intention="Rename fetch_user to load_user",
+    must_keywords=["fetch_user", "UserRecord"],
+    should_keywords=["user_id"],
+)
+CALL = "def handler(user_id):\n    record: UserRecord = api.fetch_user(user_id)\n    return record\n"
+
+
+def _window(file: str, content: str, kind: Literal["code", "string", "comment"] = "code") -> CandidateFileWindow:
+    hit = CandidateHit(file=file, line_no=2, byte_offset=0, text="", kind=kind)
+    return CandidateFileWindow(file=file, content=content, hits=[hit], num_occurrences=1)
+
+
+def test_rank_orders_by_keywords_kind_and_path() -> None:
+    """Full keyword coverage in code outranks partial coverage, string literals, comments and vendored copies."""
+    windows = [
+        _window("vendor/api/client.py", CALL),
+        _window("src/notes.py", "# fetch_user is deprecated\n", kind="comment"),
+        _window("src/partial.py", "value = api.fetch_user(42)\n"),
+        _window("src/handler.py", CALL),
+        _window("src/messages.py", 'HELP = "call fetch_user(user_id) for a UserRecord"\n', kind="string"),
+    ]
+    ranked = LexicalRanker(INTENTION, PreprocessConfig()).rank(windows)
+    assert [window.file for window, _score in ranked] == [
+        "src/handler.py",
+        "src/messages.py",
+        "vendor/api/client.py",
+        "src/partial.py",
+        "src/notes.py",
+    ]
+    assert all(0.0 <= score <= 1.0 for _window, score in ranked)
+
+
+def test_string_hits_use_the_configured_penalty() -> None:
+    """``string_weight_penalty`` scales a window whose only hit is in a string literal."""
+    code = LexicalRanker(INTENTION, PreprocessConfig(string_weight_penalty=0.4)).rank([_window("a.py", CALL)])
+    string = LexicalRanker(INTENTION, PreprocessConfig(string_weight_penalty=0.4)).rank(
+        [_window("a.py", CALL, kind="string")],
+    )
+    assert string[0][1] == pytest.approx(code[0][1] * 0.6)
+
+
+@pytest.mark.parametrize(
+    ("path", "weight"),
+    [
+        ("src/app/service.py", 1.0),
+        ("third_party/lib/service.py", 0.5),
+        ("proto/user_pb2.py", 0.5),
+        ("docs/guide/usage.py", 0.6),
+        ("README.md", 0.6),
+        ("src/service_test.go", 0.8),
+        ("tests/vendor/fixture.py", 0.5),
+    ],
+)
+def test_path_weights(path: str, weight: float) -> None:
+    """Vendored, generated, documentation and test paths are weighted down, taking the lowest match."""
+    assert LexicalRanker(INTENTION, PreprocessConfig()).path_weight(path) == weight
+
+
+def test_streaming_scores_use_the_statistics_seen_so_far() -> None:
+    """``score`` updates the corpus statistics, and an intention without keywords scores nothing."""
+    ranker = LexicalRanker(INTENTION, PreprocessConfig())
+    first = ranker.score(_window("a.py", CALL))
+    assert 0.0 < first <= 1.0
+    assert ranker.documents == 1
+    keywordless = LexicalRanker(InstructionIntention(intention="nothing"), PreprocessConfig())
+    assert keywordless.score(_window("a.py", CALL)) == 0
+
+
+def test_scores_after_the_warm_up_do_not_depend_on_arrival_order() -> None:
+    """Once the warm-up corpus is complete the statistics are frozen, so order no longer matters."""
+    warmup = [_window("src/handler.py", CALL), _window("src/partial.py", "value = api.fetch_user(42)\n")]
+    later = [
+        _window("src/other.py", "x = api.fetch_user(1)\n" * 5),
+        _window("src/notes.py", "# fetch_user and user_id\n", kind="comment"),
+        _window("src/record.py", "record: UserRecord = api.fetch_user(user_id)\n"),
+    ]
+    forward = LexicalRanker(INTENTION, PreprocessConfig(), warmup=2)
+    backward = LexicalRanker(INTENTION, PreprocessConfig(), warmup=2)
+    for window in warmup:
+        forward.score(window)
+        backward.score(window)
+    assert forward.calibrated
+    scores = [forward.score(window) for window in later]
+    assert [backward.score(window) for window in reversed(later)] == scores[::-1]
+    assert forward.documents == 2
@@ -0,0 +1,565 @@
+"""Tests for the streaming stage pipeline and the engine built on it."""
+
+import asyncio
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Sequence
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.engine import ImpactScanEngine
+from impactscan.llm.adapters import CallableAdapter
+from impactscan.llm.client import Message
+from impactscan.models import CandidateHit, ImpactAssessment, InstructionIntention
+from impactscan.pipeline.journal import JournalState, RunJournal, read_journal
+from impactscan.pipeline.stream import StreamingPipeline
+from impactscan.preprocess.classifier import HeuristicClassifier, NonCodeRanges
+from impactscan.preprocess.filecache import FileContentCache
+from impactscan.preprocess.windows import WindowBuilder
+
+KEYWORD = "fetch_user"
+HEADER = re.compile(r"^### file=(\S+) window_index=(\d+)", re.MULTILINE)
+INTENTION = InstructionIntention(intention="Rename fetch_user to load_user", must_keywords=[KEYWORD])
+MODULE = "import api\n\n\ndef handler(user_id):\n    return api.fetch_user(user_id)\n"
+
+
+class FakeModel:
+    """Answers intention, triage and analysis prompts, counting the windows it is asked about."""
+
+    def __init__(self, *, fail_analysis: bool = False) -> None:
+        """Start with no calls."""
+        self.triaged: list[str] = []
+        self.analysed: list[str] = []
+        self.fail_analysis = fail_analysis
+
+    async def __call__(self, messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        """Keep every window and rate it high."""
+        await asyncio.sleep(0)
+        system, user = messages[0]["content"], messages[1]["content"]
+        if "extracts structured intents" in system:
+            return {"json": {"intention": INTENTION.intention, "must_keywords": [KEYWORD]}}
+        keys = HEADER.findall(user)
+        if "triage" in system:
+            self.triaged.extend(file for file, _ in keys)
+            results = [
+                {
+                    "file": file,
+                    "window_index": int(index),
+                    "triage_decision": "keep",
+                    "relevance_score": 0.9,
+                    "quick_reason": f"calls {KEYWORD}",
+                }
+                for file, index in keys
+            ]
+            return {"json": {"results": results}, "usage": {"prompt_tokens": 50, "completion_tokens": 5}}
+        self.analysed.extend(file for file, _ in keys)
+        if self.fail_analysis:
+            msg = "analysis backend down"
+            raise RuntimeError(msg)
+        assessment = {"impact_level": "high", "reason": "renamed call", "confidence": 0.8, "lines": ["5"]}
+        return {"json": assessment, "usage": {"prompt_tokens": 200, "completion_tokens": 40}}
+
+
+class RankingModel(FakeModel):
+    """Scores windows per file and holds the first analysis until every window was triaged."""
+
+    def __init__(self, scores: dict[str, float]) -> None:
+        """Score each file as given."""
+        super().__init__()
+        self.scores = scores
+        self.all_triaged = asyncio.Event()
+
+    async def __call__(self, messages: list[Message], **kwargs: Any) -> dict[str, Any]:
+        """Rate windows by file; analyses wait until triage saw every file."""
+        if "triage" in messages[0]["content"]:
+            response = await super().__call__(messages, **kwargs)
+            for result in response["json"]["results"]:
+                result["relevance_score"] = self.scores[result["file"]]
+            if len(self.triaged) == len(self.scores):
+                self.all_triaged.set()
+            return response
+        if "extracts structured intents" not in messages[0]["content"]:
+            await self.all_triaged.wait()
+        return await super().__call__(messages, **kwargs)
+
+
+class ScoringModel(FakeModel):
+    """Scores windows per file, answering as soon as asked."""
+
+    def __init__(self, scores: dict[str, float]) -> None:
+        """Score each file as given."""
+        super().__init__()
+        self.scores = scores
+
+    async def __call__(self, messages: list[Message], **kwargs: Any) -> dict[str, Any]:
+        """Rate triaged windows by file."""
+        response = await super().__call__(messages, **kwargs)
+        if "triage" in messages[0]["content"]:
+            for result in response["json"]["results"]:
+                result["relevance_score"] = self.scores[result["file"]]
+        return response
+
+
+def _write_repo(root: Path, files: dict[str, str]) -> None:
+    for name, content in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(content)
+
+
+def _hits(root: Path, name: str) -> list[CandidateHit]:
+    data = (root / name).read_bytes()
+    hits: list[CandidateHit] = []
+    for match in re.finditer(KEYWORD.encode(), data):
+        line_no = data.count(b"\n", 0, match.start()) + 1
+        hits.append(
+            CandidateHit(file=name, line_no=line_no, byte_offset=match.start(), text="", matched_keywords=[KEYWORD]),
+        )
+    return hits
+
+
+def _pipeline(
+    root: Path,
+    hits: AsyncIterator[CandidateHit],
+    model: FakeModel,
+    analysis: dict[str, Any] | None = None,
+    *,
+    journal: RunJournal | None = None,
+    replay: JournalState | None = None,
+    **pipeline: int,
+) -> StreamingPipeline:
+    config = ImpactScanConfig(
+        target_dir=str(root),
+        preprocess={"analyzer": "heuristics"},
+        analysis=analysis or {},
+        pipeline=pipeline,
+    )
+    files = FileContentCache(root)
+    client = CallableAdapter(model)
+    return StreamingPipeline(
+        config,
+        intention=INTENTION,
+        hits=hits,
+        files=files,
+        classifier=HeuristicClassifier(config.preprocess),
+        windows=WindowBuilder(config, files),
+        triage_client=client,
+        analysis_client=client,
+        journal=journal,
+        replay=replay,
+    )
+
+
+@pytest.mark.asyncio
+async def test_first_assessment_arrives_while_the_scan_is_still_running(tmp_path: Path) -> None:
+    """The scan only continues once an assessment was received, which a batch pipeline would never do."""
+    _write_repo(tmp_path, {name: MODULE.replace("handler", name[0]) for name in ("a.py", "b.py", "c.py")})
+    first_seen = asyncio.Event()
+
+    async def scan() -> AsyncIterator[CandidateHit]:
+        # A file is complete once the next file's hits start, so ``b.py`` releases ``a.py``.
+        for name in ("a.py", "b.py"):
+            for hit in _hits(tmp_path, name):
+                yield hit
+        await first_seen.wait()
+        for hit in _hits(tmp_path, "c.py"):
+            yield hit
+
+    pipeline = _pipeline(tmp_path, scan(), FakeModel())
+    assessments: list[ImpactAssessment] = []
+    async with asyncio.timeout(5):
+        async for assessment in pipeline.assessments():
+            assessments.append(assessment)
+            first_seen.set()
+    assert assessments[0].file == "a.py"
+    assert sorted(assessment.file for assessment in assessments) == ["a.py", "b.py", "c.py"]
+    assert assessments[0].impact_level == "high"
+    assert assessments[0].lines == ["5"]
+    assert pipeline.stats.files_scanned == 3
+    assert pipeline.stats.analyzed == 3
+
+
+@pytest.mark.asyncio
+async def test_comment_hits_are_dropped_and_duplicates_analysed_once(tmp_path: Path) -> None:
+    """Hits in comments never reach triage; copies of a window share one triage and analysis."""
+    commented = "# fetch_user is deprecated\nVALUE = 1\n"
+    _write_repo(tmp_path, {"a.py": MODULE, "vendor/a.py": MODULE, "notes.py": commented})
+
+    async def scan() -> AsyncIterator[CandidateHit]:
+        for name in ("a.py", "notes.py", "vendor/a.py"):
+            for hit in _hits(tmp_path, name):
+                yield hit
+
+    model = FakeModel()
+    pipeline = _pipeline(tmp_path, scan(), model, classify_workers=1, window_workers=1)
+    assessments = [assessment async for assessment in pipeline.assessments()]
+    assert sorted(assessment.file for assessment in assessments) == ["a.py", "vendor/a.py"]
+    assert model.triaged == ["a.py"]
+    assert model.analysed == ["a.py"]
+    stats = pipeline.stats
+    assert (stats.files_scanned, stats.matches_total, stats.candidates_after_filter) == (3, 3, 2)
+    assert (stats.triage_kept, stats.analyzed) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_classifier_reads_the_mapped_file_without_a_copy(tmp_path: Path) -> None:
+    """Classification is handed the file cache's memory map, not a copy of the file."""
+    _write_repo(tmp_path, {"a.py": MODULE})
+    seen: list[type] = []
+
+    class Recording(HeuristicClassifier):
+        async def build_ranges(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+            seen.append(type(content))
+            return await super().build_ranges(path, content, lang)
+
+    async def scan() -> AsyncIterator[CandidateHit]:
+        for hit in _hits(tmp_path, "a.py"):
+            yield hit
+
+    pipeline = _pipeline(tmp_path, scan(), FakeModel())
+    pipeline.classifier = Recording(pipeline.config.preprocess)
+    assert len([assessment async for assessment in pipeline.assessments()]) == 1
+    assert seen == [memoryview]
+
+
+@pytest.mark.asyncio
+async def test_files_are_classified_in_batches(tmp_path: Path) -> None:
+    """One classify worker hands queued files to ``build_ranges_many`` together, up to the batch size."""
+    names = [f"{letter}.py" for letter in "abcdefgh"]
+    _write_repo(tmp_path, {name: MODULE.replace("handler", name[0]) for name in names})
+    batches: list[list[str]] = []
+
+    class Recording(HeuristicClassifier):
+        async def build_ranges_many(
+            self,
+            items: Sequence[tuple[str, bytes | memoryview, str | None]],
+        ) -> list[NonCodeRanges]:
+            batches.append([path for path, _content, _lang in items])
+            return await super().build_ranges_many(items)
+
+    async def scan() -> AsyncIterator[CandidateHit]:
+        for name in names:
+            for hit in _hits(tmp_path, name):
+                yield hit
+
+    pipeline = _pipeline(tmp_path, scan(), FakeModel(), classify_workers=1, classify_batch_files=3)
+    pipeline.classifier = Recording(pipeline.config.preprocess)
+    assert len([assessment async for assessment in pipeline.assessments()]) == len(names)
+    assert sorted(path for batch in batches for path in batch) == names
+    assert max(len(batch) for batch in batches) == 3
+
+
+@pytest.mark.asyncio
+async def test_backpressure_bounds_how_far_the_scan_runs_ahead(tmp_path: Path) -> None:
+    """With small queues and a consumer that stops reading, the scan stalls instead of buffering."""
+    names = [f"m{index:03}.py" for index in range(200)]
+    _write_repo(tmp_path, {name: MODULE.replace("handler", f"handler_{name[1:4]}") for name in names})
+    pulled = 0
+
+    async def scan() -> AsyncIterator[CandidateHit]:
+        nonlocal pulled
+        for name in names:
+            pulled += 1
+            for hit in _hits(tmp_path, name):
+                yield hit
+
+    pipeline = _pipeline(tmp_path, scan(), FakeModel(), queue_size=2, triage_workers=1, analyze_workers=1)
+    stream = pipeline.assessments()
+    await anext(stream)
+    await asyncio.sleep(0.1)
+    assert pulled < 40
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stage_errors_reach_the_consumer(tmp_path: Path) -> None:
+    """An exception in a stage cancels the pipeline and is raised from the iterator."""
+    _write_repo(tmp_path, {"a.py": MODULE})
+
+    async def scan() -> AsyncIterator[CandidateHit]:
+        for hit in _hits(tmp_path, "a.py"):
+            yield hit
+
+    pipeline = _pipeline(tmp_path, scan(), FakeModel(fail_analysis=True))
+    with pytest.raises(RuntimeError, match="analysis backend down"):
+        async for _assessment in pipeline.assessments():
+            pass
+
+
+async def _scan_files(root: Path, names: list[str]) -> AsyncIterator[CandidateHit]:
+    for name in names:
+        for hit in _hits(root, name):
+            yield hit
+
+
+@pytest.mark.asyncio
+async def test_most_relevant_windows_are_analysed_first(tmp_path: Path) -> None:
+    """Windows waiting for the large model are taken in descending relevance order."""
+    scores = {"a.py": 0.5, "b.py": 0.9, "c.py": 0.6, "d.py": 0.8, "e.py": 0.7}
+    _write_repo(tmp_path, {name: MODULE.replace("handler", name[0]) for name in scores})
+    model = RankingModel(scores)
+    pipeline = _pipeline(tmp_path, _scan_files(tmp_path, list(scores)), model, analyze_workers=1)
+    async with asyncio.timeout(5):
+        assessments = [assessment async for assessment in pipeline.assessments()]
+    assert len(assessments) == 5
+    # The first analysis may start before the rest are triaged; the others follow by score.
+    later = model.analysed[1:]
+    assert later == sorted(later, key=lambda name: -scores[name])
+
+
+@pytest.mark.asyncio
+async def test_analysis_count_budget_stops_the_run(tmp_path: Path) -> None:
+    """After ``max_analyzed`` large-model calls the rest is skipped, and accounted for, instead of analysed."""
+    names = [f"m{index}.py" for index in range(6)]
+    _write_repo(tmp_path, {name: MODULE.replace("handler", f"handler_{name[1]}") for name in names})
+    model = FakeModel()
+    pipeline = _pipeline(tmp_path, _scan_files(tmp_path, names), model, {"max_analyzed": 2}, analyze_workers=1)
+    assessments = [assessment async for assessment in pipeline.assessments()]
+    stats = pipeline.stats
+    assert len(model.analysed) == len(assessments) == 2
+    assert stats.budget_exhausted == "analyzed"
+    assert stats.skipped_windows > 0
+    assert stats.analyzed + stats.skipped_windows == stats.candidates_after_filter
+
+
+@pytest.mark.asyncio
+async def test_a_budget_spends_analysis_on_the_most_relevant_windows(tmp_path: Path) -> None:
+    """With ``max_analyzed`` the best windows are analysed, even when the best one is triaged last."""
+    scores = {"a.py": 0.5, "b.py": 0.6, "c.py": 0.55, "d.py": 0.7, "e.py": 0.95}
+    _write_repo(tmp_path, {name: MODULE.replace("handler", name[0]) for name in scores})
+    model = ScoringModel(scores)
+    pipeline = _pipeline(
+        tmp_path,
+        _scan_files(tmp_path, list(scores)),
+        model,
+        {"max_analyzed": 2, "triage_batch_max_windows": 1},
+        analyze_workers=1,
+    )
+    async with asyncio.timeout(5):
+        assessments = [assessment async for assessment in pipeline.assessments()]
+    assert model.analysed == ["e.py", "d.py"]
+    assert sorted(assessment.file for assessment in assessments) == ["d.py", "e.py"]
+    assert pipeline.stats.budget_exhausted == "analyzed"
+
+
+@pytest.mark.asyncio
+async def test_token_budget_skips_analysis_once_spent(tmp_path: Path) -> None:
+    """Triage tokens count against ``max_total_tokens``; nothing is analysed once it is spent."""
+    _write_repo(tmp_path, {"a.py": MODULE, "b.py": MODULE.replace("handler", "other")})
+    model = FakeModel()
+    pipeline = _pipeline(tmp_path, _scan_files(tmp_path, ["a.py", "b.py"]), model, {"max_total_tokens": 10})
+    assessments = [assessment async for assessment in pipeline.assessments()]
+    assert assessments == []
+    assert model.analysed == []
+    assert pipeline.stats.budget_exhausted == "tokens"
+    assert pipeline.stats.skipped_windows == pipeline.stats.candidates_after_filter
+
+
+@pytest.mark.asyncio
+async def test_low_lexical_scores_skip_triage(tmp_path: Path) -> None:
+    """With ``prerank_drop_ratio`` a vendored window scoring below the cut never reaches the model."""
+    vendored = MODULE.replace("handler", "vendored")
+    _write_repo(tmp_path, {"a.py": MODULE, "vendor/lib/b.py": vendored})
+    model = FakeModel()
+    scan = _scan_files(tmp_path, ["vendor/lib/b.py", "a.py"])
+    pipeline = _pipeline(tmp_path, scan, model, {"prerank_drop_ratio": 1.0, "prerank_warmup_windows": 1})
+    assessments = [assessment async for assessment in pipeline.assessments()]
+    assert [assessment.file for assessment in assessments] == ["a.py"]
+    assert model.triaged == ["a.py"]
+    assert pipeline.stats.prerank_dropped == 1
+    assert pipeline.stats.candidates_after_filter == 2
+
+
+@pytest.mark.asyncio
+async def test_windows_are_not_dropped_before_the_ranker_is_calibrated(tmp_path: Path) -> None:
+    """Scores of the warm-up windows depend on arrival order, so none of them is dropped."""
+    vendored = MODULE.replace("handler", "vendored")
+    _write_repo(tmp_path, {"a.py": MODULE, "vendor/lib/b.py": vendored})
+    model = FakeModel()
+    scan = _scan_files(tmp_path, ["vendor/lib/b.py", "a.py"])
+    pipeline = _pipeline(tmp_path, scan, model, {"prerank_drop_ratio": 1.0, "prerank_warmup_windows": 2})
+    assessments = [assessment async for assessment in pipeline.assessments()]
+    assert sorted(assessment.file for assessment in assessments) == ["a.py", "vendor/lib/b.py"]
+    assert pipeline.stats.prerank_dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_resumed_run_only_does_outstanding_work(tmp_path: Path) -> None:
+    """After an interrupted run, replaying its journal skips every window it already triaged or assessed."""
+    names = ["a.py", "b.py", "c.py", "d.py"]
+    _write_repo(tmp_path, {name: MODULE.replace("handler", name[0]) for name in names})
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(path)
+    journal.record_run("Rename", [])
+    stream = _pipeline(tmp_path, _scan_files(tmp_path, names), FakeModel(), journal=journal).assessments()
+    first = await anext(stream)
+    await stream.aclose()
+    journal.close()
+
+    state = read_journal(path)
+    assert first.file in {file for file, _index in state.assessments}
+    model = FakeModel()
+    journal = RunJournal(path, append=True)
+    pipeline = _pipeline(tmp_path, _scan_files(tmp_path, names), model, journal=journal, replay=state)
+    assessments = [assessment async for assessment in pipeline.assessments()]
+    journal.close()
+    assert sorted(assessment.file for assessment in assessments) == names
+    assert not {file for file, _index in state.triage} & set(model.triaged)
+    assert sorted(model.analysed) == sorted(set(names) - {file for file, _index in state.assessments})
+    assert (pipeline.stats.triage_kept, pipeline.stats.analyzed) == (4, 4)
+    assert {file for file, _index in read_journal(path).assessments} == set(names)
+
+
+@pytest.mark.asyncio
+async def test_resumed_run_reports_changed_and_vanished_windows(
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Windows edited or deleted since the journal was written are re-analysed or reported, never replayed."""
+    names = ["a.py", "b.py", "c.py"]
+    _write_repo(tmp_path, {name: MODULE.replace("handler", name[0]) for name in names})
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(path)
+    first = _pipeline(tmp_path, _scan_files(tmp_path, names), FakeModel(), journal=journal)
+    assert len([assessment async for assessment in first.assessments()]) == len(names)
+    journal.close()
+
+    _write_repo(tmp_path, {"a.py": MODULE.replace("handler", "edited")})
+    (tmp_path / "c.py").unlink()
+    model = FakeModel()
+    pipeline = _pipeline(tmp_path, _scan_files(tmp_path, names[:2]), model, replay=read_journal(path))
+    with caplog.at_level("INFO", logger="impactscan.pipeline.stream"):
+        assessments = [assessment async for assessment in pipeline.assessments()]
+    assert sorted(assessment.file for assessment in assessments) == ["a.py", "b.py"]
+    assert model.analysed == ["a.py"]
+    assert "1 windows changed and 1 are gone" in caplog.text
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+@pytest.mark.asyncio
+async def test_engine_run_drains_the_stream_into_a_summary(tmp_path: Path) -> None:
+    """``run`` scans with ripgrep, streams every stage and reports the counters and token usage."""
+    _write_repo(tmp_path, {"a.py": MODULE, "b.py": "VALUE = 1\n"})
+    config = ImpactScanConfig(
+        target_dir=str(tmp_path),
+        preprocess={"analyzer": "heuristics"},
+        output={"dir": str(tmp_path / "reports")},
+        cache={"path": str(tmp_path / "cache" / "store.sqlite")},
+        analysis={"hedge_percentile": 0.95},
+    )
+    model = FakeModel()
+    engine = ImpactScanEngine(config, CallableAdapter(model), CallableAdapter(model))
+    summary = await engine.run(instruction=f"Rename `{KEYWORD}` to `load_user`")
+    assert (summary.files_scanned, summary.matches_total, summary.triage_kept, summary.analyzed) == (1, 1, 1, 1)
+    assert summary.token_usage["triage_prompt"] == 50
+    assert summary.token_usage["analysis_completion"] == 40
+    assert summary.elapsed_sec > 0
+    assert sorted(summary.output_paths) == ["csv", "jsonl"]
+    assert summary.cache_stats["noncode_ranges"] == {"hits": 0, "misses": 1}
+    assert summary.concurrency_limit is not None
+    assert summary.concurrency_history[0].reason == "start"
+    assert summary.hedge_rate == 0.0
+    assert summary.hedge_latency_saved_sec == 0.0
+    assert summary.token_usage["llm_cache_misses"] == 3
+
+    rerun = await engine.run(instruction=f"Rename `{KEYWORD}` to `load_user`")
+    assert rerun.cache_stats["noncode_ranges"] == {"hits": 1, "misses": 0}
+    assert (rerun.token_usage["llm_cache_hits"], rerun.token_usage["llm_cache_misses"]) == (3, 0)
+    assert rerun.token_usage["total"] == 0
+    assert len(model.analysed) == 1
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+@pytest.mark.asyncio
+async def test_resumed_engine_run_writes_the_same_reports(tmp_path: Path) -> None:
+    """A run interrupted after one assessment and resumed reports exactly what an uninterrupted run does."""
+    repo = tmp_path / "repo"
+    _write_repo(repo, {f"{name}.py": MODULE.replace("handler", name) for name in ("a", "b", "c", "d", "e")})
+    instruction = f"Rename `{KEYWORD}` to `load_user`"
+
+    def engine(run: str, model: FakeModel) -> ImpactScanEngine:
+        config = ImpactScanConfig(
+            target_dir=str(repo),
+            preprocess={"analyzer": "heuristics"},
+            output={"dir": str(tmp_path / run), "journal_path": str(tmp_path / f"{run}.jsonl")},
+        )
+        return ImpactScanEngine(config, CallableAdapter(model), CallableAdapter(model))
+
+    await engine("straight", FakeModel()).run(instruction=instruction)
+    interrupted = engine("resumed", FakeModel()).iter_assessments(instruction=instruction)
+    await anext(interrupted)
+    await interrupted.aclose()
+    model = FakeModel()
+    summary = await engine("resumed", model).run(instruction=instruction, resume=True)
+
+    assert len(model.analysed) < 5
+    assert summary.analyzed == 5
+    for report in ("impact_assessments.csv", "impact_assessments.jsonl"):
+        assert (tmp_path / "resumed" / report).read_bytes() == (tmp_path / "straight" / report).read_bytes()
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+def test_engine_streams_assessments_to_synchronous_callers(tmp_path: Path) -> None:
+    """``iter_assessments_sync`` yields the same assessments without an event loop in the caller."""
+    _write_repo(tmp_path, {"a.py": MODULE, "b.py": MODULE.replace("handler", "other")})
+    config = ImpactScanConfig(target_dir=str(tmp_path), preprocess={"analyzer": "heuristics"})
+    model = FakeModel()
+    engine = ImpactScanEngine(config, CallableAdapter(model), CallableAdapter(model))
+    assessments = list(engine.iter_assessments_sync(instruction=f"Rename `{KEYWORD}` to `load_user`"))
+    assert sorted(assessment.file for assessment in assessments) == ["a.py", "b.py"]
+    assert engine.last_stats.analyzed == 2
+
+
+@pytest.mark.asyncio
+async def test_engine_closes_what_it_opened_when_setup_fails(tmp_path: Path) -> None:
+    """A cache store that cannot be opened still leaves the already started journal closed and synced."""
+    _write_repo(tmp_path / "repo", {"a.py": MODULE})
+    config = ImpactScanConfig(
+        target_dir=str(tmp_path / "repo"),
+        preprocess={"analyzer": "heuristics"},
+        output={"dir": str(tmp_path / "reports"), "journal_path": str(tmp_path / "run.jsonl")},
+        cache={"path": str(tmp_path)},
+    )
+    model = FakeModel()
+    engine = ImpactScanEngine(config, CallableAdapter(model), CallableAdapter(model))
+    with pytest.raises(sqlite3.OperationalError):
+        await engine.run(instruction=f"Rename `{KEYWORD}` to `load_user`")
+    assert "journal-writer" not in {thread.name for thread in threading.enumerate()}
+    assert read_journal(tmp_path / "run.jsonl").instruction == f"Rename `{KEYWORD}` to `load_user`"
+
+
+def _child_processes() -> list[str]:
+    """Return the command names of this process's children, from /proc."""
+    children: list[str] = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            name, fields = stat.read_text().rsplit(")", 1)
+        except OSError:
+            continue
+        if int(fields.split()[1]) == os.getpid():
+            children.append(name.split("(", 1)[1])
+    return children
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+def test_leaving_a_synchronous_stream_early_stops_ripgrep(tmp_path: Path) -> None:
+    """Breaking after one assessment while ripgrep has more output than a pipe holds returns promptly."""
+    padding = f"# {KEYWORD} " + "x" * 1000 + "\n"
+    _write_repo(tmp_path, {f"pkg/m{index:03}.py": MODULE + padding * 20 for index in range(200)})
+    config = ImpactScanConfig(target_dir=str(tmp_path), preprocess={"analyzer": "heuristics"})
+    model = FakeModel()
+    engine = ImpactScanEngine(config, CallableAdapter(model), CallableAdapter(model))
+    started = time.monotonic()
+    for _assessment in engine.iter_assessments_sync(instruction=f"Rename `{KEYWORD}` to `load_user`"):
+        break
+    assert time.monotonic() - started < 30
+    assert not [thread for thread in threading.enumerate() if thread.name == "impactscan-loop"]
+    assert engine.last_stats.files_scanned < 200
+    if Path("/proc").is_dir():
+        assert "rg" not in _child_processes()
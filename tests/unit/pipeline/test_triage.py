@@ -0,0 +1,189 @@
+"""Tests for batched triage."""
+
+import re
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from impactscan.cache.store import MemoryCacheStore
+from impactscan.concurrency.limiter import RateLimitedClient, RateLimiter
+from impactscan.config import AnalysisConfig
+from impactscan.llm.adapters import CallableAdapter
+from impactscan.llm.cache import CachingLLMClient
+from impactscan.llm.client import Message
+from impactscan.llm.tokens import ApproxTokenCounter, TokenUsage
+from impactscan.models import CandidateFileWindow, InstructionIntention
+from impactscan.pipeline.triage import BatchSizer, run_triage
+
+HEADER = re.compile(r"^### file=(\S+) window_index=(\d+)", re.MULTILINE)
+INTENTION = InstructionIntention(intention="Rename fetch_user to load_user", must_keywords=["fetch_user"])
+
+Corrupt = Callable[[int, dict[str, Any]], dict[str, Any] | None]
+
+
+class FakeModel:
+    """Answers triage prompts, letting a test drop or corrupt items in multi-window batches."""
+
+    def __init__(self, corrupt: Corrupt | None = None) -> None:
+        """Record every batch as the list of window keys it contained."""
+        self.batches: list[list[tuple[str, int]]] = []
+        self.corrupt = corrupt
+
+    def __call__(self, messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        """Return one result per window header in the user message."""
+        keys = [(file, int(index)) for file, index in HEADER.findall(messages[1]["content"])]
+        self.batches.append(keys)
+        results: list[dict[str, Any]] = []
+        for position, (file, index) in enumerate(keys):
+            item: dict[str, Any] | None = {
+                "file": file,
+                "window_index": index,
+                "triage_decision": "keep" if index % 2 else "drop",
+                "relevance_score": 0.9 if index % 2 else 0.1,
+                "quick_reason": "calls fetch_user" if index % 2 else "unrelated",
+            }
+            if self.corrupt is not None and len(keys) > 1:
+                item = self.corrupt(position, item)
+            if item is not None:
+                results.append(item)
+        return {"json": {"results": results}, "usage": {"prompt_tokens": 100, "completion_tokens": 10 * len(keys)}}
+
+
+class RecordingCounter(ApproxTokenCounter):
+    """Approximate counter that records every text it is asked to count."""
+
+    def __init__(self) -> None:
+        """Start with no calls."""
+        super().__init__()
+        self.calls: list[str] = []
+
+    def count(self, text: str) -> int:
+        """Record ``text`` and count it."""
+        self.calls.append(text)
+        return super().count(text)
+
+
+def _windows(count: int, content: str = "user = fetch_user(user_id)\n") -> list[CandidateFileWindow]:
+    return [
+        CandidateFileWindow(file=f"src/m{index // 4}.py", window_index=index % 4, content=content)
+        for index in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_windows_are_packed_into_batches() -> None:
+    """Forty windows take five requests; results come back in input order with usage recorded."""
+    model = FakeModel()
+    windows = _windows(40)
+    usage = TokenUsage()
+    config = AnalysisConfig(parallelism=1, triage_batch_max_windows=8)
+    results = await run_triage(windows, intention=INTENTION, client=CallableAdapter(model), config=config, usage=usage)
+    assert [len(batch) for batch in model.batches] == [8] * 5
+    assert [(result.file, result.window_index) for result in results] == [
+        (window.file, window.window_index) for window in windows
+    ]
+    assert {result.triage_decision for result in results} == {"keep", "drop"}
+    assert usage.as_dict()["triage_prompt"] == 500
+    assert usage.as_dict()["triage_completion"] == 400
+
+
+@pytest.mark.asyncio
+async def test_batches_respect_the_token_budget() -> None:
+    """Large windows are batched by tokens, not only by count."""
+    model = FakeModel()
+    windows = _windows(6, content="x" * 2000)  # about 500 tokens each with the approximate counter
+    config = AnalysisConfig(parallelism=1, triage_batch_tokens=1500, triage_batch_max_windows=8)
+    await run_triage(windows, intention=INTENTION, client=CallableAdapter(model), config=config)
+    assert [len(batch) for batch in model.batches] == [2, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_missing_and_malformed_items_are_retried_alone() -> None:
+    """Only the windows without a valid result are sent again, one per request."""
+
+    def corrupt(position: int, item: dict[str, Any]) -> dict[str, Any] | None:
+        if position == 1:
+            return None
+        if position == 2:
+            return {**item, "relevance_score": "very"}
+        return item
+
+    model = FakeModel(corrupt)
+    windows = _windows(4)
+    sizer = BatchSizer(4)
+    config = AnalysisConfig(parallelism=1)
+    results = await run_triage(windows, intention=INTENTION, client=CallableAdapter(model), config=config, sizer=sizer)
+    keys = [(window.file, window.window_index) for window in windows]
+    assert model.batches == [keys, [keys[1]], [keys[2]]]
+    assert [(result.file, result.window_index) for result in results] == keys
+    assert sizer.size == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_size_adapts_to_the_error_rate() -> None:
+    """A model that garbles batches larger than three settles the size at or below that."""
+
+    def corrupt(position: int, item: dict[str, Any]) -> dict[str, Any] | None:
+        return None if position >= 3 else item
+
+    model = FakeModel(corrupt)
+    sizer = BatchSizer(16)
+    config = AnalysisConfig(parallelism=1)
+    await run_triage(_windows(120), intention=INTENTION, client=CallableAdapter(model), config=config, sizer=sizer)
+    multi = [len(batch) for batch in model.batches if len(batch) > 1]
+    assert multi[0] == 16
+    assert max(multi[-5:]) <= 4
+    assert sum(len(batch) for batch in model.batches) < 2 * 120
+
+
+@pytest.mark.asyncio
+async def test_windows_without_a_valid_answer_are_kept_as_maybe() -> None:
+    """When even single-window requests fail, the window is kept at the triage threshold."""
+
+    def unusable(_messages: list[Message], **_kwargs: Any) -> dict[str, Any]:
+        return {"text": "I cannot help with that."}
+
+    config = AnalysisConfig(parallelism=2, triage_threshold=0.4)
+    results = await run_triage(_windows(3), intention=INTENTION, client=CallableAdapter(unusable), config=config)
+    assert [(result.triage_decision, result.relevance_score) for result in results] == [("maybe", 0.4)] * 3
+
+
+@pytest.mark.asyncio
+async def test_retries_are_not_answered_from_the_llm_cache() -> None:
+    """An answer that fails validation is not replayed to the retry, and the valid one replaces it in the cache."""
+    model = FakeModel()
+    answers = 0
+
+    def flaky(messages: list[Message], **kwargs: Any) -> dict[str, Any]:
+        nonlocal answers
+        answers += 1
+        if answers == 1:
+            return {"json": {"results": [{"file": "src/m0.py", "relevance_score": "high"}]}}
+        return model(messages, **kwargs)
+
+    store = MemoryCacheStore()
+    config = AnalysisConfig(parallelism=1)
+    windows = _windows(2)[1:]
+    client = CachingLLMClient(CallableAdapter(flaky), store, model="small")
+    results = await run_triage(windows, intention=INTENTION, client=client, config=config)
+    assert [result.triage_decision for result in results] == ["keep"]
+    assert answers == 2
+
+    rerun = CachingLLMClient(CallableAdapter(flaky), store, model="small")
+    assert await run_triage(windows, intention=INTENTION, client=rerun, config=config) == results
+    assert answers == 2
+
+
+@pytest.mark.asyncio
+async def test_request_estimates_reuse_window_token_counts() -> None:
+    """The rate limiter reserves the estimate built from window counts instead of counting rendered prompts."""
+    model = FakeModel()
+    windows = _windows(8)
+    counter = RecordingCounter()
+    client = RateLimitedClient(CallableAdapter(model), RateLimiter(tpm_limit=1_000_000), counter)
+    config = AnalysisConfig(parallelism=1, triage_batch_max_windows=4)
+    await run_triage(windows, intention=INTENTION, client=client, config=config, counter=counter)
+    assert len(model.batches) == 2
+    assert not [text for text in counter.calls if "### file=" in text]
+    assert counter.calls.count(windows[0].content) == len(windows)
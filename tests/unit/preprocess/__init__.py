@@ -0,0 +1 @@
+"""Preprocess unit tests."""
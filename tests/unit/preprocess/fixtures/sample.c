@@ -0,0 +1,22 @@
+/* COMMENT_block spanning
+ * COMMENT_lines with "COMMENT_quoted" */
+#include <CODE_header.h>
+
+static const char *CODE_name = "STRING_literal // STRING_slashes";
+static char CODE_quote = '"';
+static wchar_t *CODE_wide = L"STRING_wide";
+
+int CODE_function(int CODE_arg) {  // COMMENT_trailing
+#if 0
+    DISABLED_call(DISABLED_arg);
+#ifdef DISABLED_feature
+    DISABLED_nested();
+#endif
+#else
+    CODE_enabled(CODE_arg, "STRING_enabled");
+#endif
+#ifdef CODE_option
+    CODE_optional();
+#endif
+    return CODE_arg / 2; /* COMMENT_after_division */
+}
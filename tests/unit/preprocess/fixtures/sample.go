@@ -0,0 +1,13 @@
+// COMMENT_package comment
+package CODE_main
+
+import "STRING_fmt"
+
+func CODE_handler(CODE_arg string) rune {
+	CODE_raw := `STRING_raw // not a comment
+STRING_second_line`
+	CODE_text := "STRING_interpreted /* not a comment */"
+	/* COMMENT_block */
+	CODE_rune := 'r'
+	return CODE_rune // COMMENT_trailing
+}
@@ -0,0 +1,10 @@
+// COMMENT_header with 'COMMENT_quoted'
+const CODE_first = "STRING_double // STRING_slashes";
+const CODE_second = 'STRING_single';
+const CODE_third = `STRING_template
+STRING_multiline`;
+/* COMMENT_block
+   COMMENT_more */
+function CODE_divide(CODE_a, CODE_b) {
+  return CODE_a / CODE_b; // COMMENT_trailing
+}
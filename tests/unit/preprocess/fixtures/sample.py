@@ -0,0 +1,13 @@
+# COMMENT_header mentions "COMMENT_quoted" inside a comment
+import CODE_module
+
+
+def CODE_handler(CODE_arg):
+    """STRING_docstring with # STRING_hash inside."""
+    CODE_value = "STRING_double # not a comment"
+    CODE_other = 'STRING_single \' still STRING_escaped'
+    CODE_raw = rb"STRING_raw_bytes"
+    CODE_text = f"STRING_prefixed"
+    CODE_block = '''STRING_triple
+    spanning "STRING_nested" lines'''
+    return CODE_value + CODE_other  # COMMENT_trailing 'COMMENT_quoted'
@@ -0,0 +1,14 @@
+// COMMENT_line with "COMMENT_quoted"
+/// COMMENT_doc for COMMENT_thing
+struct CODE_Thing<'a> {
+    CODE_field: &'a str,
+}
+
+fn CODE_parse<'a>(CODE_input: &'a str) -> char {
+    let CODE_raw = r#"STRING_raw with "quotes" inside"#;
+    let CODE_plain = "STRING_plain \" STRING_escaped";
+    let CODE_byte = b"STRING_bytes";
+    /* COMMENT_block */
+    let CODE_ch = 'x';
+    CODE_ch
+}
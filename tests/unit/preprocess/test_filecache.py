@@ -0,0 +1,70 @@
+"""Tests for the shared memory-mapped file cache."""
+
+from pathlib import Path
+
+import pytest
+
+from impactscan.cache.keys import content_digest
+from impactscan.preprocess.classifier import HeuristicClassifier
+from impactscan.preprocess.filecache import FileContentCache
+
+SOURCE = b"first\nsecond // user_id\n\nfourth"
+
+
+def test_line_index_maps_lines_to_bytes(tmp_path: Path) -> None:
+    """Line slices are 1-based, keep newlines and clamp to the file."""
+    (tmp_path / "a.c").write_bytes(SOURCE)
+    with FileContentCache(tmp_path) as files:
+        mapped = files.get("a.c")
+        assert mapped.line_count == 4
+        assert bytes(files.lines("a.c", 2, 3)) == b"second // user_id\n\n"
+        assert bytes(mapped.lines(4, 99)) == b"fourth"
+        assert bytes(mapped.lines(0, 1)) == b"first\n"
+        assert mapped.line_of(SOURCE.index(b"user_id")) == 2
+        assert mapped.line_of(len(SOURCE) - 1) == 4
+
+
+def test_trailing_newline_and_empty_files(tmp_path: Path) -> None:
+    """A final newline does not add a line; empty files have none."""
+    (tmp_path / "a.py").write_bytes(b"one\ntwo\n")
+    (tmp_path / "empty.py").write_bytes(b"")
+    with FileContentCache(tmp_path) as files:
+        assert files.get("a.py").line_count == 2
+        assert bytes(files.lines("a.py", 2, 2)) == b"two\n"
+        assert files.get("empty.py").line_count == 0
+        assert bytes(files.read("empty.py")) == b""
+
+
+def test_files_are_mapped_once_and_evicted_lru(tmp_path: Path) -> None:
+    """Repeat lookups hit the cache; views outlive the eviction of their file."""
+    for name in ("a.py", "b.py", "c.py"):
+        (tmp_path / name).write_bytes(name.encode() * 3)
+    files = FileContentCache(tmp_path, max_open=2)
+    held = files.read("a.py")
+    assert files.digest("a.py") == content_digest(b"a.py" * 3)
+    files.get("b.py")
+    files.get("a.py")
+    files.get("c.py")
+    assert len(files) == 2
+    assert (files.stats.hits, files.stats.misses) == (2, 3)
+    files.get("b.py")
+    assert files.stats.misses == 4
+    files.close()
+    assert bytes(held) == b"a.py" * 3
+    mapped = FileContentCache(tmp_path).get("b.py")
+    piece = mapped.lines(1, 1)
+    mapped.close()
+    assert bytes(piece) == b"b.py" * 3
+    with pytest.raises(ValueError, match="max_open"):
+        FileContentCache(max_open=0)
+
+
+def test_classifier_reads_through_the_cache(tmp_path: Path) -> None:
+    """The heuristic classifier lexes the shared map instead of opening the file again."""
+    (tmp_path / "a.c").write_bytes(SOURCE)
+    with FileContentCache(tmp_path) as files:
+        classifier = HeuristicClassifier()
+        ranges = classifier.build_ranges_for_path("a.c", files=files)
+        assert ranges == classifier.build_ranges_for_path(tmp_path / "a.c")
+        assert ranges.comment_spans == [(13, 23)]
+        assert files.stats.misses == 1
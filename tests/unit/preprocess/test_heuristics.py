@@ -0,0 +1,109 @@
+"""Tests for the single-pass heuristic lexers and their accuracy against tree-sitter."""
+
+import re
+from pathlib import Path
+
+import pytest
+
+from impactscan.cache.store import MemoryCacheStore
+from impactscan.config import PreprocessConfig
+from impactscan.errors import ConfigError
+from impactscan.preprocess.cache import CachingClassifier
+from impactscan.preprocess.classifier import (
+    HeuristicClassifier,
+    HitKind,
+    NonCodeRanges,
+    TreeSitterClassifier,
+    classify_hits,
+)
+from impactscan.preprocess.factory import build_classifier
+from impactscan.preprocess.heuristics import LEXERS, Lexer, LexerSpec
+from impactscan.preprocess.languages import detect_language
+from impactscan.preprocess.treesitter import GRAMMAR_MODULES
+
+FIXTURES = Path(__file__).parent / "fixtures"
+LABEL = re.compile(rb"\b(CODE|COMMENT|STRING|DISABLED)_\w+")
+EXPECTED: dict[bytes, HitKind] = {
+    b"CODE": "code",
+    b"COMMENT": "comment",
+    b"STRING": "string",
+    b"DISABLED": "preproc_disabled",
+}
+SAMPLES = sorted(path.name for path in FIXTURES.glob("sample.*"))
+
+
+def _labels(content: bytes) -> tuple[list[int], list[HitKind]]:
+    """Return the offset and expected kind of every labelled identifier."""
+    matches = list(LABEL.finditer(content))
+    return [match.start() for match in matches], [EXPECTED[match.group(1)] for match in matches]
+
+
+def _agreement(actual: list[HitKind], expected: list[HitKind]) -> float:
+    return sum(left == right for left, right in zip(actual, expected, strict=True)) / len(expected)
+
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_heuristics_classify_fixture_labels(name: str) -> None:
+    """Every labelled identifier in the fixture corpus lands in its declared kind."""
+    content = (FIXTURES / name).read_bytes()
+    offsets, expected = _labels(content)
+    ranges = HeuristicClassifier().build_ranges_sync(name, content, None)
+    assert classify_hits(offsets, ranges) == expected
+
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_tree_sitter_agrees_with_heuristics(name: str) -> None:
+    """Where a grammar is installed, both classifiers agree on at least 95% of labels."""
+    lang = detect_language(name)
+    assert lang is not None
+    pytest.importorskip(GRAMMAR_MODULES[lang][0])
+    content = (FIXTURES / name).read_bytes()
+    offsets, expected = _labels(content)
+    heuristic = classify_hits(offsets, HeuristicClassifier().build_ranges_sync(name, content, lang))
+    parsed = classify_hits(offsets, TreeSitterClassifier(languages=[lang]).build_ranges_sync(name, content, lang))
+    assert _agreement(heuristic, parsed) >= 0.95
+    assert _agreement(parsed, expected) >= 0.95
+
+
+def test_disabled_blocks_follow_config_and_stay_open_to_end_of_file() -> None:
+    """``#if 0`` without ``#endif`` disables the rest of the file unless detection is off."""
+    content = b"int a;\n#if 0\nDISABLED_rest();\n"
+    enabled = HeuristicClassifier().build_ranges_sync("a.c", content, None)
+    assert enabled.disabled_spans == [(12, len(content))]
+    disabled = HeuristicClassifier(PreprocessConfig(detect_if0_blocks=False)).build_ranges_sync("a.c", content, "c")
+    assert disabled.disabled_spans == []
+
+
+def test_unsupported_language_and_ambiguous_spec() -> None:
+    """Unknown languages get empty ranges; a lead byte cannot serve two kinds."""
+    empty = NonCodeRanges(comment_spans=[], string_spans=[], disabled_spans=[])
+    assert HeuristicClassifier().build_ranges_sync("notes.txt", b"# text", None) == empty
+    with pytest.raises(ValueError, match="more than one token kind"):
+        Lexer(LexerSpec(rules=((b"#", "comment", rb"#[^\n]*"), (b"#", "string", rb"#\"[^\"]*\""))))
+
+
+@pytest.mark.asyncio
+async def test_memory_mapped_and_threaded_paths_match(tmp_path: Path) -> None:
+    """Scanning a file from disk, in memory and in a worker thread gives the same ranges."""
+    content = (FIXTURES / "sample.c").read_bytes() * 20_000
+    path = tmp_path / "big.c"
+    path.write_bytes(content)
+    classifier = HeuristicClassifier()
+    expected = classifier.build_ranges_sync("big.c", content, None)
+    assert classifier.build_ranges_for_path(path) == expected
+    assert await classifier.build_ranges("big.c", content, None) == expected
+    (tmp_path / "empty.py").write_bytes(b"")
+    assert classifier.build_ranges_for_path(tmp_path / "empty.py").comment_spans == []
+    assert LEXERS["cpp"] is LEXERS["c"]
+
+
+def test_build_classifier_selects_analyzer() -> None:
+    """The factory wires heuristics as tree-sitter's fallback and applies range caching."""
+    tree_sitter = build_classifier(PreprocessConfig())
+    assert isinstance(tree_sitter, TreeSitterClassifier)
+    assert isinstance(tree_sitter.fallback, HeuristicClassifier)
+    cached = build_classifier(PreprocessConfig(analyzer="heuristics"), MemoryCacheStore())
+    assert isinstance(cached, CachingClassifier)
+    assert isinstance(cached.inner, HeuristicClassifier)
+    with pytest.raises(ConfigError, match="pygments"):
+        build_classifier(PreprocessConfig(analyzer="pygments"))
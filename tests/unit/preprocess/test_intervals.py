@@ -0,0 +1,47 @@
+"""Tests for interval tables and hit classification."""
+
+from impactscan.preprocess.classifier import NonCodeRanges, classify_hit, classify_hits
+from impactscan.preprocess.intervals import IntervalTable
+
+
+def test_spans_are_sorted_and_merged() -> None:
+    """Overlapping and touching spans merge; empty spans disappear."""
+    table = IntervalTable([(30, 40), (0, 10), (5, 12), (12, 15), (50, 50)])
+    assert table.spans() == [(0, 15), (30, 40)]
+    assert len(table) == 2
+
+
+def test_lookups_treat_spans_as_half_open() -> None:
+    """Starts are inside an interval and ends are outside."""
+    table = IntervalTable([(10, 20), (30, 40)])
+    assert [table.contains(offset) for offset in (0, 10, 19, 20, 35, 40)] == [False, True, True, False, True, False]
+    assert table.contains_sorted([0, 10, 19, 20, 35, 40]) == [False, True, True, False, True, False]
+    assert IntervalTable([]).contains_sorted([1, 2]) == [False, False]
+
+
+def test_classification_precedence_and_keep_strings() -> None:
+    """Disabled blocks beat comments, which beat strings; strings can be folded into code."""
+    ranges = NonCodeRanges(
+        comment_spans=[(0, 10), (100, 120)],
+        string_spans=[(5, 30)],
+        disabled_spans=[(110, 200)],
+    )
+    assert classify_hit(7, ranges, keep_strings=True) == "comment"
+    assert classify_hit(20, ranges, keep_strings=True) == "string"
+    assert classify_hit(20, ranges, keep_strings=False) == "code"
+    assert classify_hit(115, ranges, keep_strings=True) == "preproc_disabled"
+    assert classify_hit(50, ranges, keep_strings=True) == "code"
+
+
+def test_batch_matches_per_hit_for_unsorted_offsets() -> None:
+    """The batch API returns labels in input order, even for unsorted offsets."""
+    ranges = NonCodeRanges(
+        comment_spans=[(0, 10), (100, 120)],
+        string_spans=[(5, 30), (60, 70)],
+        disabled_spans=[(110, 200)],
+    )
+    offsets = [115, 7, 65, 20, 50, 7, 199, 200]
+    for keep_strings in (True, False):
+        expected = [classify_hit(offset, ranges, keep_strings) for offset in offsets]
+        assert classify_hits(offsets, ranges, keep_strings) == expected
+    assert classify_hits([], ranges) == []
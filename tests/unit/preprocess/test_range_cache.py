@@ -0,0 +1,152 @@
+"""Tests for the content-addressed non-code range cache."""
+
+from collections.abc import Sequence
+
+import pytest
+
+from impactscan.cache.store import MemoryCacheStore
+from impactscan.config import PreprocessConfig
+from impactscan.preprocess.cache import (
+    NONCODE_NAMESPACE,
+    CachingClassifier,
+    decode_ranges,
+    encode_ranges,
+    with_range_cache,
+)
+from impactscan.preprocess.classifier import (
+    HeuristicClassifier,
+    NonCodeClassifier,
+    NonCodeRanges,
+    TreeSitterClassifier,
+)
+
+RANGES = NonCodeRanges(
+    comment_spans=[(0, 12), (40, 58)],
+    string_spans=[(20, 31)],
+    disabled_spans=[],
+)
+
+
+class CountingClassifier(NonCodeClassifier):
+    """Returns fixed ranges and counts how often it had to parse."""
+
+    def __init__(self, name: str = "heuristics") -> None:
+        """Start with no parses."""
+        self.name = name
+        self.calls = 0
+        self.batches: list[int] = []
+
+    async def build_ranges(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Record an asynchronous parse."""
+        return self.build_ranges_sync(path, content, lang)
+
+    def build_ranges_sync(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:  # noqa: ARG002
+        """Record a synchronous parse."""
+        self.calls += 1
+        return RANGES
+
+    async def build_ranges_many(
+        self,
+        items: Sequence[tuple[str, bytes | memoryview, str | None]],
+    ) -> list[NonCodeRanges]:
+        """Record the size of each batch."""
+        self.batches.append(len(items))
+        return [self.build_ranges_sync(path, content, lang) for path, content, lang in items]
+
+
+def test_encode_round_trips_and_stays_compact() -> None:
+    """Spans survive encoding as packed integers, including values beyond 32 bits."""
+    payload = encode_ranges(RANGES)
+    assert decode_ranges(payload) == RANGES
+    assert len(payload) == 14 + 6 * 4
+
+    large = NonCodeRanges(comment_spans=[(1, 2**33)], string_spans=[], disabled_spans=[(3, 4)])
+    assert decode_ranges(encode_ranges(large)) == large
+    assert decode_ranges(encode_ranges(NonCodeRanges([], [], []))) == NonCodeRanges([], [], [])
+
+
+def test_decode_rejects_corrupt_payloads() -> None:
+    """Truncated or foreign payloads are treated as cache misses."""
+    payload = encode_ranges(RANGES)
+    assert decode_ranges(payload[:-1]) is None
+    assert decode_ranges(b"\x09" + payload[1:]) is None
+    assert decode_ranges(b"") is None
+
+
+def test_sync_lookups_skip_parsing_for_unchanged_content() -> None:
+    """Identical content is parsed once; other content, languages, analyzers or settings miss."""
+    inner = CountingClassifier()
+    store = MemoryCacheStore()
+    cached = CachingClassifier(inner, store)
+
+    assert cached.build_ranges_sync("a.py", b"x = 1", "python") == RANGES
+    assert cached.build_ranges_sync("b.py", b"x = 1", "python") == RANGES
+    cached.build_ranges_sync("a.py", b"x = 2", "python")
+    cached.build_ranges_sync("a.js", b"x = 1", "javascript")
+    CachingClassifier(inner, store, config=PreprocessConfig(detect_if0_blocks=False)).build_ranges_sync(
+        "a.py",
+        b"x = 1",
+        "python",
+    )
+    inner.name = "tree-sitter"
+    CachingClassifier(inner, store).build_ranges_sync("a.py", b"x = 1", "python")
+
+    assert inner.calls == 5
+    assert cached.stats.as_dict() == {"hits": 1, "misses": 3}
+    assert cached.stats.hit_rate == 0.25
+
+
+@pytest.mark.asyncio
+async def test_async_lookups_share_entries_with_sync_path() -> None:
+    """Entries written by the sync path are served to async callers."""
+    inner = CountingClassifier()
+    store = MemoryCacheStore()
+    CachingClassifier(inner, store).build_ranges_sync("a.c", b"int x;", "c")
+    cached = CachingClassifier(inner, store)
+    assert await cached.build_ranges("a.c", b"int x;", "c") == RANGES
+    assert inner.calls == 1
+    assert cached.stats.hits == 1
+
+
+def test_corrupt_entries_are_recomputed() -> None:
+    """A corrupt stored value counts as a miss and is overwritten."""
+    inner = CountingClassifier()
+    store = MemoryCacheStore()
+    cached = CachingClassifier(inner, store)
+    store.set(NONCODE_NAMESPACE, cached.cache_key(b"x", "python"), b"junk")
+    assert cached.build_ranges_sync("a.py", b"x", "python") == RANGES
+    assert cached.build_ranges_sync("a.py", b"x", "python") == RANGES
+    assert (inner.calls, cached.stats.hits, cached.stats.misses) == (1, 1, 1)
+
+
+def test_with_range_cache_honours_config() -> None:
+    """The wrapper is only applied when caching is enabled and a store is available."""
+    inner = CountingClassifier()
+    store = MemoryCacheStore()
+    assert isinstance(with_range_cache(inner, PreprocessConfig(), store), CachingClassifier)
+    assert with_range_cache(inner, PreprocessConfig(cache_noncode_ranges=False), store) is inner
+    assert with_range_cache(inner, PreprocessConfig(), None) is inner
+
+
+def test_keys_name_the_analyzer_that_handles_the_file() -> None:
+    """Files tree-sitter cannot parse are cached under the fallback's name, not under tree-sitter."""
+    config = PreprocessConfig(max_file_bytes_for_parse=10)
+    tree_sitter = TreeSitterClassifier(config, fallback=HeuristicClassifier(config), languages=["python"])
+    cached = CachingClassifier(tree_sitter, MemoryCacheStore(), config=config)
+    assert cached.analyzer_for(b"x = 1", "python") == "tree-sitter"
+    assert cached.analyzer_for(b"x = 1" * 10, "python") == "heuristics"
+    assert cached.analyzer_for(b"x = 1", "cobol") == "heuristics"
+    default_limit = CachingClassifier(tree_sitter, MemoryCacheStore())
+    assert cached.cache_key(b"x = 1", "c") != default_limit.cache_key(b"x = 1", "c")
+
+
+@pytest.mark.asyncio
+async def test_batches_hand_every_miss_to_the_inner_classifier_at_once() -> None:
+    """``build_ranges_many`` keeps the wrapped classifier's fan-out for the files it has to parse."""
+    inner = CountingClassifier()
+    cached = CachingClassifier(inner, MemoryCacheStore())
+    await cached.build_ranges("a.py", b"x = 1", "python")
+    items = [("a.py", b"x = 1", "python"), ("b.py", b"y = 2", "python"), ("c.py", b"z = 3", "python")]
+    assert await cached.build_ranges_many(items) == [RANGES] * 3
+    assert inner.batches == [2]
+    assert cached.stats.as_dict() == {"hits": 1, "misses": 3}
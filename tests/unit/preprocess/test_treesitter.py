@@ -0,0 +1,98 @@
+"""Tests for the process-pool tree-sitter classifier."""
+
+import pytest
+
+from impactscan.config import PreprocessConfig
+from impactscan.preprocess.classifier import NonCodeClassifier, NonCodeRanges, TreeSitterClassifier, classify_hits
+from impactscan.preprocess import treesitter
+from impactscan.preprocess.treesitter import size_balanced_batches
+from tree_sitter import Language
+
+FALLBACK = NonCodeRanges(comment_spans=[(0, 1)], string_spans=[], disabled_spans=[])
+
+
+def no_grammars(lang: str) -> Language | None:  # noqa: ARG001
+    """Grammar loader for workers that have no grammars installed."""
+    return None
+
+
+class FixedClassifier(NonCodeClassifier):
+    """Fallback that records which files it was asked about."""
+
+    def __init__(self) -> None:
+        """Start with no calls."""
+        self.paths: list[str] = []
+
+    async def build_ranges(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:
+        """Record an asynchronous fallback."""
+        return self.build_ranges_sync(path, content, lang)
+
+    def build_ranges_sync(self, path: str, content: bytes | memoryview, lang: str | None) -> NonCodeRanges:  # noqa: ARG002
+        """Record a synchronous fallback."""
+        self.paths.append(path)
+        return FALLBACK
+
+
+def test_batches_balance_total_size() -> None:
+    """Large files are spread first so batch totals stay close."""
+    sizes = [100, 1, 1, 1, 50, 50, 2, 2]
+    batches = size_balanced_batches(sizes, 3)
+    assert sorted(index for batch in batches for index in batch) == list(range(len(sizes)))
+    assert sorted(sum(sizes[index] for index in batch) for batch in batches) == [53, 54, 100]
+    assert size_balanced_batches([5, 5], 8) == [[0], [1]]
+    assert size_balanced_batches([], 4) == []
+
+
+@pytest.mark.asyncio
+async def test_pool_falls_back_for_unavailable_grammars() -> None:
+    """Files without a loaded grammar, or too large to parse, use the fallback in input order."""
+    fallback = FixedClassifier()
+    config = PreprocessConfig(parse_workers=2, max_file_bytes_for_parse=10)
+    with TreeSitterClassifier(config, fallback=fallback, loader=no_grammars) as classifier:
+        items = [("a.py", b"x = 1", "python"), ("b.txt", b"text", None), ("c.py", b"y = 2" * 10, "python")]
+        assert await classifier.build_ranges_many(items) == [FALLBACK] * 3
+        assert fallback.paths == ["a.py", "b.txt", "c.py"]
+        assert await classifier.build_ranges("d.go", b"package d", "go") == FALLBACK
+
+    empty = NonCodeRanges(comment_spans=[], string_spans=[], disabled_spans=[])
+    assert TreeSitterClassifier(config, loader=no_grammars).build_ranges_sync("a.py", b"x", "python") == empty
+
+
+@pytest.mark.asyncio
+async def test_languages_without_an_installed_grammar_skip_the_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    """By default only installed grammars are parsed; everything else goes straight to the fallback."""
+    monkeypatch.setattr(treesitter, "GRAMMAR_MODULES", {"python": ("impactscan_missing_grammar", "language")})
+    fallback = FixedClassifier()
+    with TreeSitterClassifier(PreprocessConfig(parse_workers=2), fallback=fallback) as classifier:
+        assert classifier.languages == ()
+        assert classifier.analyzer_for(b"x = 1", "python") == "none"
+        assert await classifier.build_ranges("a.py", b"x = 1", "python") == FALLBACK
+    assert fallback.paths == ["a.py"]
+
+
+PYTHON_SOURCE = b'''# leading comment
+def load(user_id):
+    """Docstring mentioning user_id."""
+    return query("user_id", user_id)  # trailing user_id
+'''
+
+
+def _offsets(source: bytes, needle: bytes) -> list[int]:
+    offsets: list[int] = []
+    start = source.find(needle)
+    while start != -1:
+        offsets.append(start)
+        start = source.find(needle, start + 1)
+    return offsets
+
+
+@pytest.mark.asyncio
+async def test_python_grammar_classifies_comments_and_strings() -> None:
+    """With the Python grammar installed, pooled and in-process parsing agree."""
+    pytest.importorskip("tree_sitter_python")
+    offsets = _offsets(PYTHON_SOURCE, b"user_id")
+    with TreeSitterClassifier(PreprocessConfig(parse_workers=2), languages=["python"]) as classifier:
+        pooled = await classifier.build_ranges("a.py", PYTHON_SOURCE, "python")
+        local = classifier.build_ranges_sync("a.py", PYTHON_SOURCE, "python")
+    assert pooled == local
+    assert classify_hits(offsets, pooled) == ["code", "string", "string", "code", "comment"]
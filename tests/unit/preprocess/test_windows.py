@@ -0,0 +1,87 @@
+"""Tests for the token-budget-aware window builder."""
+
+import math
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.models import CandidateHit
+from impactscan.preprocess.filecache import FileContentCache
+from impactscan.preprocess.windows import WindowBuilder
+from impactscan.scanner.incremental import FileRevision
+
+LINE = b"x" * 39 + b"\n"  # 40 bytes, 10 tokens at the default estimate.
+
+
+def _config(tmp_path: Path, *, merge: int = 40, budget: int = 2000, context: int = 12) -> ImpactScanConfig:
+    return ImpactScanConfig(
+        target_dir=str(tmp_path),
+        ripgrep={"context_lines": context},
+        preprocess={"merge_window_lines": merge, "max_tokens_file_context": budget},
+    )
+
+
+def _hits(file: str, lines: list[int]) -> list[CandidateHit]:
+    return [
+        CandidateHit(file=file, line_no=line, byte_offset=(line - 1) * len(LINE), text="x") for line in lines
+    ]
+
+
+def test_nearby_hits_merge_and_context_never_overlaps(tmp_path: Path) -> None:
+    """Hits within ``merge_window_lines`` share a window; context stops at the neighbour."""
+    (tmp_path / "a.py").write_bytes(LINE * 200)
+    builder = WindowBuilder(_config(tmp_path, merge=10, context=12), FileContentCache(tmp_path))
+    windows = builder.build("a.py", _hits("a.py", [50, 5, 58, 80, 196]))
+    assert [window.spans for window in windows] == [[(1, 17)], [(38, 70)], [(71, 92)], [(184, 200)]]
+    assert [window.window_index for window in windows] == [0, 1, 2, 3]
+    assert [[hit.line_no for hit in window.hits] for window in windows] == [[5], [50, 58], [80], [196]]
+    assert windows[1].num_occurrences == 2
+    assert windows[0].content == (LINE * 17).decode()
+
+
+def test_oversized_windows_split_around_dense_clusters(tmp_path: Path) -> None:
+    """Within a merged run over budget, the closest hits stay together and every window fits."""
+    (tmp_path / "a.py").write_bytes(LINE * 400)
+    budget = 100  # ten lines
+    builder = WindowBuilder(_config(tmp_path, merge=40, budget=budget, context=3), FileContentCache(tmp_path))
+    lines = [100, 101, 102, 104, 106, 115, 121, 127, 133, 139]
+    windows = builder.build("a.py", _hits("a.py", lines))
+    assert [hit.line_no for window in windows for hit in window.hits] == lines
+    assert [hit.line_no for hit in windows[0].hits] == [100, 101, 102, 104, 106]
+    for window in windows:
+        ((start, end),) = window.spans
+        assert math.ceil((end - start + 1) * len(LINE) / 4) <= budget
+    assert builder.build("a.py", _hits("a.py", lines)) == windows
+
+
+def test_single_line_over_budget_is_clipped_around_the_hit(tmp_path: Path) -> None:
+    """A minified line longer than the budget keeps the text around its hit."""
+    line = b"a" * 5000 + b"NEEDLE" + b"b" * 5000 + b"\n"
+    (tmp_path / "min.js").write_bytes(line)
+    builder = WindowBuilder(_config(tmp_path, budget=50), FileContentCache(tmp_path))
+    hit = CandidateHit(file="min.js", line_no=1, byte_offset=5000, text="")
+    (window,) = builder.build("min.js", [hit])
+    assert window.spans == [(1, 1)]
+    assert len(window.content) == 200
+    assert "NEEDLE" in window.content
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_windows_per_file_with_revisions(tmp_path: Path) -> None:
+    """Each file's windows follow its last hit; recorded revisions override hashing."""
+    (tmp_path / "a.py").write_bytes(LINE * 10)
+    (tmp_path / "b.py").write_bytes(LINE * 10)
+    revisions = {"a.py": FileRevision(commit="abc", file_hash="recorded")}
+    builder = WindowBuilder(_config(tmp_path), FileContentCache(tmp_path), revisions=revisions)
+
+    async def hits() -> AsyncIterator[CandidateHit]:
+        for hit in [*_hits("a.py", [1, 3]), *_hits("gone.py", [1]), *_hits("b.py", [2])]:
+            yield hit
+
+    windows = [window async for window in builder.stream(hits())]
+    assert [(window.file, window.commit, window.file_hash) for window in windows] == [
+        ("a.py", "abc", "recorded"),
+        ("b.py", None, FileContentCache(tmp_path).digest("b.py")),
+    ]
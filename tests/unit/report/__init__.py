@@ -0,0 +1 @@
+"""Report unit tests."""
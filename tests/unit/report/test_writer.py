@@ -0,0 +1,77 @@
+"""Tests for the report writers."""
+
+import csv
+from pathlib import Path
+
+import orjson
+
+from impactscan.config import OutputConfig
+from impactscan.models import ImpactAssessment, ImpactRunSummary
+from impactscan.report.writer import write_csv, write_jsonl, write_reports, write_summary_md
+
+ASSESSMENTS = [
+    ImpactAssessment(file="b.py", impact_level="low", reason="alias", confidence=0.4, lines=["3"]),
+    ImpactAssessment(
+        file="a.py",
+        impact_level="high",
+        reason="renamed call",
+        confidence=0.9,
+        lines=["12", "14"],
+        perspective_scores={"security": 0.1},
+        affected_apis=["fetch_user", "load_user"],
+    ),
+    ImpactAssessment(file="a.py", impact_level="medium", reason="import", confidence=0.7, lines=["2"]),
+]
+
+
+def test_reports_do_not_depend_on_completion_order(tmp_path: Path) -> None:
+    """The same assessments in any order give byte-identical CSV and JSONL files, sorted by file and line."""
+    write_jsonl(str(tmp_path / "one.jsonl"), ASSESSMENTS)
+    write_jsonl(str(tmp_path / "two.jsonl"), reversed(ASSESSMENTS))
+    write_csv(str(tmp_path / "one.csv"), ASSESSMENTS)
+    write_csv(str(tmp_path / "two.csv"), reversed(ASSESSMENTS))
+    assert (tmp_path / "one.jsonl").read_bytes() == (tmp_path / "two.jsonl").read_bytes()
+    assert (tmp_path / "one.csv").read_bytes() == (tmp_path / "two.csv").read_bytes()
+    records = [orjson.loads(line) for line in (tmp_path / "one.jsonl").read_bytes().splitlines()]
+    expected = [("a.py", ["2"]), ("a.py", ["12", "14"]), ("b.py", ["3"])]
+    assert [(record["file"], record["lines"]) for record in records] == expected
+
+
+def test_csv_flattens_lists_and_mappings(tmp_path: Path) -> None:
+    """List fields are joined with semicolons and mappings become JSON."""
+    path = tmp_path / "report.csv"
+    write_csv(str(path), ASSESSMENTS)
+    with path.open(newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert rows[1]["affected_apis"] == "fetch_user;load_user"
+    assert rows[1]["lines"] == "12;14"
+    assert rows[1]["perspective_scores"] == '{"security":0.1}'
+    assert rows[1]["change_suggestion"] == ""
+
+
+def test_write_reports_follows_the_output_config(tmp_path: Path) -> None:
+    """Only enabled formats are written, into ``output.dir``, and the summary lists every report."""
+    output = OutputConfig(dir=str(tmp_path / "reports"), write_csv=False, write_summary_md=True)
+    summary = ImpactRunSummary(
+        files_scanned=2,
+        matches_total=3,
+        candidates_after_filter=3,
+        triage_kept=3,
+        analyzed=3,
+        elapsed_sec=1.5,
+    )
+    paths = write_reports(output, ASSESSMENTS, summary)
+    assert sorted(paths) == ["jsonl", "summary_md"]
+    assert sorted(path.name for path in (tmp_path / "reports").iterdir()) == ["impact_assessments.jsonl", "summary.md"]
+    markdown = (tmp_path / "reports" / "summary.md").read_text()
+    assert "| files_scanned | 2 |" in markdown
+    assert "summary.md" in markdown
+
+
+def test_summary_cells_are_escaped(tmp_path: Path) -> None:
+    """Pipes and newlines cannot break the Markdown table."""
+    path = tmp_path / "summary.md"
+    write_summary_md(str(path), {"note": "a | b\nc", "usage": {"total": 5}})
+    lines = path.read_text().splitlines()
+    assert "| note | a \\| b c |" in lines
+    assert '| usage | {"total":5} |' in lines
@@ -0,0 +1 @@
+"""Scanner unit tests."""
@@ -0,0 +1,130 @@
+"""Tests for glob filtering and git-aware incremental scanning."""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.errors import ConfigError
+from impactscan.models import CandidateHit
+from impactscan.scanner.globs import GlobFilter
+from impactscan.scanner.incremental import IncrementalScanner, ScanState
+from impactscan.scanner.ripgrep import RipgrepScanner
+
+requires_git_rg = pytest.mark.skipif(
+    shutil.which("git") is None or shutil.which("rg") is None,
+    reason="git and ripgrep are required",
+)
+
+
+def _git(root: Path, *args: str) -> None:
+    identity = ["-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(["git", *identity, *args], cwd=root, check=True, capture_output=True)  # noqa: S603, S607
+
+
+def _write(root: Path, files: dict[str, str]) -> None:
+    for name, body in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body)
+
+
+def test_glob_filter_matches_ripgrep_semantics() -> None:
+    """Unanchored globs match at any depth and excludes win over includes."""
+    glob_filter = GlobFilter(["**/*"], ["**/node_modules/**", "**/*.min.js"])
+    assert glob_filter.matches("src/app.py")
+    assert glob_filter.matches("./top.py")
+    assert not glob_filter.matches("web/node_modules/lib/index.js")
+    assert not glob_filter.matches("web/bundle.min.js")
+    assert not glob_filter.matches(".github/workflows/ci.yml")
+    assert GlobFilter(["**/*"], [], include_hidden=True).matches(".github/workflows/ci.yml")
+
+    python_only = GlobFilter(["*.py", "docs/*.md"], [])
+    assert python_only.matches("deep/nested/mod.py")
+    assert python_only.matches("docs/index.md")
+    assert not python_only.matches("other/docs/index.md")
+    assert not python_only.matches("docs/sub/index.md")
+
+
+def test_scan_state_publishes_only_on_commit(tmp_path: Path) -> None:
+    """Staged rows stay invisible until committed and replace only the named files."""
+    state = ScanState(tmp_path / "state.sqlite")
+    first = CandidateHit(file="a.py", line_no=1, byte_offset=0, text="user_id", matched_keywords=["user_id"])
+    second = CandidateHit(file="b.py", line_no=3, byte_offset=20, text="user_id = 2")
+    state.begin("k")
+    state.stage("k", [("a.py", "h1", [first]), ("b.py", "h2", [second])])
+    assert state.last_run("k") is None
+    assert state.load("k") == []
+
+    state.commit("k", commit="c1", dirty=["b.py"], replaced=None)
+    assert state.load("k") == [("a.py", "h1", [first]), ("b.py", "h2", [second])]
+    previous = state.last_run("k")
+    assert previous is not None
+    assert (previous.commit, previous.dirty) == ("c1", frozenset({"b.py"}))
+
+    state.begin("k")
+    state.stage("k", [("a.py", "h3", [first])])
+    state.commit("k", commit="c2", dirty=[], replaced={"a.py", "b.py"})
+    assert state.load("k") == [("a.py", "h3", [first])]
+    assert state.load("k", after="a.py") == []
+
+
+def test_incremental_scanner_requires_state_path(tmp_path: Path) -> None:
+    """Incremental mode needs somewhere to keep its state."""
+    with pytest.raises(ConfigError):
+        IncrementalScanner(RipgrepScanner(ImpactScanConfig(target_dir=str(tmp_path))))
+
+
+@requires_git_rg
+@pytest.mark.asyncio
+async def test_incremental_scan_matches_full_rescan(tmp_path: Path) -> None:
+    """After commits and dirty edits the incremental result equals a fresh full scan."""
+    target = tmp_path / "repo"
+    target.mkdir()
+    _write(
+        target,
+        {
+            "auth/session.py": "def load(user_id):\n    return user_id\n",
+            "billing/invoice.py": "TOTAL = 1\n",
+            "docs/notes.md": "user_id is deprecated\n",
+            "old/legacy.py": "user_id = None\n",
+        },
+    )
+    _git(target, "init", "-q")
+    _git(target, "add", "-A")
+    _git(target, "commit", "-qm", "init")
+    config = ImpactScanConfig(
+        target_dir=str(target),
+        ripgrep={"incremental_state_path": str(tmp_path / "state" / "scan.sqlite")},
+    )
+    incremental = IncrementalScanner(RipgrepScanner(config))
+    full = RipgrepScanner(config)
+
+    async def snapshot_incremental() -> list[tuple[str, int, str]]:
+        hits = incremental.search(must_keywords=["user_id"])
+        return sorted([(hit.file, hit.line_no, hit.text) async for hit in hits])
+
+    async def snapshot_full() -> list[tuple[str, int, str]]:
+        return sorted([(hit.file, hit.line_no, hit.text) async for hit in full.search(must_keywords=["user_id"])])
+
+    assert await snapshot_incremental() == await snapshot_full()
+    assert incremental.last_mode == "full"
+
+    _write(target, {"billing/invoice.py": "TOTAL = user_id\n", "new/module.py": "x = user_id\n"})
+    (target / "old" / "legacy.py").unlink()
+    _git(target, "add", "-A")
+    _git(target, "commit", "-qm", "change")
+    _write(target, {"auth/session.py": "def load(account):\n    return account\n", "scratch.py": "user_id\n"})
+
+    assert await snapshot_incremental() == await snapshot_full()
+    assert incremental.last_mode == "incremental"
+    assert incremental.rescanned_files == 4
+    assert set(incremental.revisions) == {"billing/invoice.py", "docs/notes.md", "new/module.py", "scratch.py"}
+
+    # Reverting a dirty edit must be picked up from the previous run's dirty set.
+    _write(target, {"auth/session.py": "def load(user_id):\n    return user_id\n"})
+    (target / "scratch.py").unlink()
+    assert await snapshot_incremental() == await snapshot_full()
+    assert incremental.rescanned_files == 1
@@ -0,0 +1,133 @@
+"""Tests for the persistent trigram index."""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.scanner.index import TrigramIndex, git_fingerprint, trigrams
+from impactscan.scanner.ripgrep import RipgrepScanner
+
+requires_rg = pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+
+
+def _tree(root: Path) -> list[str]:
+    files = {
+        "auth/session.py": "def load_session(user_id):\n    return Session(user_id)\n",
+        "billing/invoice.py": "TOTAL = compute_total()\n",
+        "docs/notes.md": "The USER_ID column is deprecated.\n",
+        "assets/logo.bin": "user_id\0\0binary",
+    }
+    for name, body in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body)
+    return sorted(files)
+
+
+def test_trigrams_are_case_folded() -> None:
+    """Upper- and lowercase text share trigrams."""
+    assert trigrams(b"ABCd") == trigrams(b"abcd") == {int.from_bytes(b"abc", "big"), int.from_bytes(b"bcd", "big")}
+    assert trigrams(b"ab") == set()
+
+
+def test_unicode_case_folding_keeps_candidates(tmp_path: Path) -> None:
+    """Files matching through Unicode case folding stay candidates; non-ASCII keywords need a full walk."""
+    (tmp_path / "kelvin.py").write_text("TEMP_\u212a = 1\n")
+    (tmp_path / "greeting.py").write_text("ПРИВЕТ = 1\n")
+    index = TrigramIndex(tmp_path / "grams.sqlite", root=str(tmp_path))
+    index.update(["kelvin.py", "greeting.py"], fingerprint="fp", signature="sig")
+    assert index.candidates(["temp_k"]) == ["kelvin.py"]
+    assert index.candidates(["привет"]) is None
+
+
+def test_candidates_narrow_keywords_to_matching_files(tmp_path: Path) -> None:
+    """Only files containing every trigram of a keyword are returned; binaries never are."""
+    paths = _tree(tmp_path)
+    index = TrigramIndex(tmp_path / "index" / "grams.sqlite", root=str(tmp_path))
+    stats = index.update(paths, fingerprint="fp", signature="sig")
+    assert stats.added == 4
+    assert index.candidates(["user_id"]) == ["auth/session.py", "docs/notes.md"]
+    assert index.candidates(["compute_total", "load_session"]) == ["auth/session.py", "billing/invoice.py"]
+    assert index.candidates(["nothing-here"]) == []
+    assert index.candidates(["id"]) is None
+
+
+def test_update_is_incremental(tmp_path: Path) -> None:
+    """Unchanged files are skipped, modified files re-read and deleted files dropped."""
+    paths = _tree(tmp_path)
+    index = TrigramIndex(tmp_path / "grams.sqlite", root=str(tmp_path))
+    index.update(paths, fingerprint="one", signature="sig")
+
+    invoice = tmp_path / "billing" / "invoice.py"
+    invoice.write_text("TOTAL = refund_total()\n")
+    os.utime(invoice, ns=(1, 1))
+    stats = index.update([path for path in paths if path != "docs/notes.md"], fingerprint="two", signature="sig")
+
+    assert (stats.added, stats.updated, stats.removed, stats.unchanged) == (0, 1, 1, 2)
+    assert index.candidates(["compute_total"]) == []
+    assert index.candidates(["refund_total"]) == ["billing/invoice.py"]
+    assert index.is_fresh(fingerprint="two", signature="sig")
+    assert not index.is_fresh(fingerprint="one", signature="sig")
+    assert not index.is_fresh(fingerprint="two", signature="other-globs")
+
+
+def test_oversized_files_are_always_candidates(tmp_path: Path) -> None:
+    """Files above the size limit cannot be ruled out and are always searched."""
+    paths = _tree(tmp_path)
+    index = TrigramIndex(tmp_path / "grams.sqlite", root=str(tmp_path), max_file_bytes=30)
+    index.update(paths, fingerprint="fp", signature="sig")
+    assert index.candidates(["compute_total"]) == ["auth/session.py", "billing/invoice.py", "docs/notes.md"]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_fingerprint_tracks_dirty_edits(tmp_path: Path) -> None:
+    """Editing an already-dirty file still changes the fingerprint."""
+    assert git_fingerprint(str(tmp_path)) is None
+    _tree(tmp_path)
+    identity = ["-c", "user.name=t", "-c", "user.email=t@t"]
+    for command in (["init", "-q"], ["add", "-A"], [*identity, "commit", "-qm", "init"]):
+        subprocess.run(["git", *command], cwd=tmp_path, check=True)  # noqa: S603, S607
+    clean = git_fingerprint(str(tmp_path))
+    (tmp_path / "billing" / "invoice.py").write_text("TOTAL = 1\n")
+    dirty = git_fingerprint(str(tmp_path))
+    (tmp_path / "billing" / "invoice.py").write_text("TOTAL = 22\n")
+    assert len({clean, dirty, git_fingerprint(str(tmp_path))}) == 3
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_fingerprint_tracks_edits_to_renamed_files(tmp_path: Path) -> None:
+    """A renamed file is stat'ed under its new path, so editing it changes the fingerprint."""
+    _tree(tmp_path)
+    identity = ["-c", "user.name=t", "-c", "user.email=t@t"]
+    for command in (["init", "-q"], ["add", "-A"], [*identity, "commit", "-qm", "init"], ["mv", "billing", "bills"]):
+        subprocess.run(["git", *command], cwd=tmp_path, check=True)  # noqa: S603, S607
+    renamed = git_fingerprint(str(tmp_path))
+    (tmp_path / "bills" / "invoice.py").write_text("TOTAL = compute_total() + 1\n")
+    assert git_fingerprint(str(tmp_path)) != renamed
+
+
+@requires_rg
+@pytest.mark.asyncio
+async def test_scanner_uses_fresh_index_and_falls_back_when_stale(tmp_path: Path) -> None:
+    """A fresh index narrows the search; a stale one triggers a full walk with identical hits."""
+    target = tmp_path / "repo"
+    target.mkdir()
+    _tree(target)
+    config = ImpactScanConfig(target_dir=str(target), ripgrep={"index_path": str(tmp_path / "grams.sqlite")})
+    scanner = RipgrepScanner(config)
+
+    assert await scanner.index_candidates(["user_id"]) is None
+    await scanner.update_index()
+    assert await scanner.index_candidates(["user_id"]) == ["auth/session.py", "docs/notes.md"]
+    indexed = sorted([(hit.file, hit.line_no) async for hit in scanner.search(must_keywords=["user_id"])])
+
+    (target / "billing" / "extra.py").write_text("user_id = 1\n")
+    assert await scanner.index_candidates(["user_id"]) is None
+    walked = sorted([(hit.file, hit.line_no) async for hit in scanner.search(must_keywords=["user_id"])])
+
+    assert indexed == [("auth/session.py", 1), ("auth/session.py", 2), ("docs/notes.md", 1)]
+    assert walked == sorted([*indexed, ("billing/extra.py", 1)])
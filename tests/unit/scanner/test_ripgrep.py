@@ -0,0 +1,183 @@
+"""Tests for the streaming ripgrep scanner."""
+
+import asyncio
+import base64
+import shutil
+import sys
+import textwrap
+from pathlib import Path
+
+import orjson
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.errors import RipgrepExecutionError, RipgrepNotFoundError
+from impactscan.scanner.ripgrep import KeywordAttributor, RipgrepEventParser, RipgrepScanner
+
+requires_rg = pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+
+
+def _match_event(path: str, line_no: int, offset: int, text: str, start: int) -> bytes:
+    return orjson.dumps(
+        {
+            "type": "match",
+            "data": {
+                "path": {"text": path},
+                "lines": {"text": text},
+                "line_number": line_no,
+                "absolute_offset": offset,
+                "submatches": [{"match": {"text": text[start : start + 3]}, "start": start, "end": start + 3}],
+            },
+        },
+    )
+
+
+def _write_fake_rg(tmp_path: Path, events: list[bytes], returncode: int = 0) -> str:
+    """Create an executable that replays canned ``rg --json`` events."""
+    payload = tmp_path / "events.jsonl"
+    payload.write_bytes(b"\n".join(events) + b"\n")
+    script = tmp_path / "fake-rg"
+    script.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{sys.executable}
+            import sys
+            sys.stdout.buffer.write(open({str(payload)!r}, "rb").read())
+            sys.stderr.write("boom")
+            sys.exit({returncode})
+            """,
+        ),
+    )
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_parser_builds_hits_from_match_events() -> None:
+    """Match events become hits with the submatch byte offset and stripped text."""
+    parser = RipgrepEventParser()
+    assert parser.feed(b'{"type":"begin","data":{"path":{"text":"./a.py"}}}') is None
+    hit = parser.feed(_match_event("./src/a.py", 4, 100, "x = foo()\n", 4))
+    assert hit is not None
+    assert hit.file == "src/a.py"
+    assert hit.line_no == 4
+    assert hit.byte_offset == 104
+    assert hit.text == "x = foo()"
+    assert hit.kind == "unknown"
+    assert parser.stats.hits == 1
+
+
+def test_parser_decodes_non_utf8_paths_and_summary() -> None:
+    """Base64 ``bytes`` payloads are decoded and summary stats are captured."""
+    parser = RipgrepEventParser()
+    event = orjson.loads(_match_event("x", 1, 0, "foo\n", 0))
+    event["data"]["path"] = {"bytes": base64.b64encode(b"./bin\xffary.c").decode()}
+    hit = parser.feed(orjson.dumps(event))
+    assert hit is not None
+    assert hit.file.startswith("bin")
+    summary = {"type": "summary", "data": {"stats": {"searches": 12, "searches_with_match": 3}}}
+    assert parser.feed(orjson.dumps(summary)) is None
+    assert parser.stats.files_searched == 12
+    assert parser.stats.files_with_matches == 3
+
+
+def test_attributor_credits_every_keyword_in_submatches() -> None:
+    """Submatch texts map back to keywords, including ones nested in longer matches."""
+    attributor = KeywordAttributor(["user_id", "user", "token"], fixed_strings=True, smart_case=True)
+    assert attributor.ignore_case
+    assert attributor.attribute(["USER_ID", "Token"]) == ["user_id", "user", "token"]
+    assert attributor.attribute(["unrelated"]) == []
+
+
+def test_attributor_follows_smart_case_across_the_pattern_set() -> None:
+    """One uppercase keyword makes the whole single-walk search case sensitive."""
+    attributor = KeywordAttributor(["Config", "load"], fixed_strings=True, smart_case=True)
+    assert not attributor.ignore_case
+    assert attributor.attribute(["LOAD"]) == []
+    regex = KeywordAttributor([r"get_\w+", "set("], fixed_strings=False, smart_case=True)
+    assert regex.attribute(["get_user", "set("]) == [r"get_\w+", "set("]
+
+
+def test_parser_attaches_matched_keywords() -> None:
+    """Hits carry the keywords attributed from their submatches."""
+    parser = RipgrepEventParser(attributor=KeywordAttributor(["foo", "bar"], fixed_strings=True, smart_case=True))
+    event = orjson.loads(_match_event("a.py", 1, 0, "bar(foo)\n", 4))
+    event["data"]["submatches"].append({"match": {"text": "bar"}, "start": 0, "end": 3})
+    hit = parser.feed(orjson.dumps(event))
+    assert hit is not None
+    assert hit.matched_keywords == ["foo", "bar"]
+
+
+def test_build_args_reflect_configuration() -> None:
+    """Globs, case handling and keywords are forwarded to ripgrep."""
+    config = ImpactScanConfig(
+        target_dir=".",
+        include_globs=["**/*.py"],
+        exclude_globs=["**/vendor/**"],
+        ripgrep={"threads": 4, "include_hidden": True, "smart_case": False},
+    )
+    args = RipgrepScanner(config).build_args(["foo", "-bar", "foo", ""])
+    assert args[:2] == ["--json", "--no-config"]
+    assert "--fixed-strings" in args
+    assert "--case-sensitive" in args
+    assert args[args.index("--threads") + 1] == "4"
+    assert "--hidden" in args
+    assert args[args.index("**/*.py") - 1 : args.index("**/*.py") + 1] == ["--glob", "**/*.py"]
+    assert "!**/vendor/**" in args
+    assert args[-6:] == ["-e", "foo", "-e", "-bar", "--", "."]
+
+
+def test_missing_executable_raises() -> None:
+    """A missing ripgrep binary surfaces as RipgrepNotFoundError."""
+    scanner = RipgrepScanner(ImpactScanConfig(target_dir="."), executable="definitely-not-rg")
+    with pytest.raises(RipgrepNotFoundError):
+        list(scanner.search_sync(must_keywords=["foo"]))
+
+
+@pytest.mark.asyncio
+async def test_search_streams_through_bounded_queue(tmp_path: Path) -> None:
+    """Async search yields every hit in order and records throughput stats."""
+    events = [_match_event("./f.py", i, i * 10, f"foo {i}\n", 0) for i in range(1, 501)]
+    config = ImpactScanConfig(target_dir=str(tmp_path), ripgrep={"queue_size": 8})
+    scanner = RipgrepScanner(config, executable=_write_fake_rg(tmp_path, events))
+    lines = [hit.line_no async for hit in scanner.search(must_keywords=["foo"])]
+    assert lines == list(range(1, 501))
+    assert scanner.last_stats.hits == 500
+    assert scanner.last_stats.parse_hits_per_sec > 0
+
+
+@pytest.mark.asyncio
+async def test_search_can_be_abandoned_early(tmp_path: Path) -> None:
+    """Closing the iterator early stops ripgrep while its output still fills the pipe and the reader's buffer."""
+    events = [_match_event("./f.py", i, 0, "foo\n", 0) for i in range(1, 20001)]
+    config = ImpactScanConfig(target_dir=str(tmp_path), ripgrep={"queue_size": 4, "shards": 1})
+    scanner = RipgrepScanner(config, executable=_write_fake_rg(tmp_path, events))
+    stream = scanner.search(must_keywords=["foo"])
+    first = [await anext(stream) for _ in range(3)]
+    await asyncio.wait_for(stream.aclose(), timeout=10)
+    assert [hit.line_no for hit in first] == [1, 2, 3]
+    assert scanner.last_stats.hits < 20000
+
+
+def test_search_sync_shares_parser_and_reports_errors(tmp_path: Path) -> None:
+    """The sync path parses identically and raises when ripgrep fails outright."""
+    events = [_match_event("./f.py", 1, 0, "foo\n", 0)]
+    config = ImpactScanConfig(target_dir=str(tmp_path))
+    hits = list(RipgrepScanner(config, executable=_write_fake_rg(tmp_path, events)).search_sync(must_keywords=["foo"]))
+    assert [(hit.file, hit.line_no) for hit in hits] == [("f.py", 1)]
+
+    failing = RipgrepScanner(config, executable=_write_fake_rg(tmp_path, [b""], returncode=2))
+    with pytest.raises(RipgrepExecutionError, match="boom"):
+        list(failing.search_sync(must_keywords=["foo"]))
+
+
+@requires_rg
+def test_search_sync_against_real_tree(tmp_path: Path) -> None:
+    """End-to-end search over a small tree honours exclude globs."""
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.py").write_text("def foo():\n    return 1\n")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "dep.js").write_text("foo()\n")
+    scanner = RipgrepScanner(ImpactScanConfig(target_dir=str(tmp_path)))
+    hits = list(scanner.search_sync(must_keywords=["foo", "return"]))
+    assert [(hit.file, hit.line_no, hit.byte_offset) for hit in hits] == [("pkg/mod.py", 1, 4), ("pkg/mod.py", 2, 15)]
+    assert [hit.matched_keywords for hit in hits] == [["foo"], ["return"]]
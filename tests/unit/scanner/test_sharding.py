@@ -0,0 +1,116 @@
+"""Tests for sharded ripgrep scanning."""
+
+import os
+import shutil
+import sys
+import textwrap
+from pathlib import Path
+
+import orjson
+import pytest
+
+from impactscan.config import ImpactScanConfig
+from impactscan.scanner.ripgrep import RipgrepScanner
+from impactscan.scanner.sharding import ShardPlanner, balance
+
+requires_rg = pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+
+
+def test_balance_uses_longest_processing_time_first() -> None:
+    """Heaviest roots are placed first onto the least loaded shard."""
+    shards = balance({"a": 7, "b": 5, "c": 4, "d": 3, "e": 1}, 2)
+    loads = [sum({"a": 7, "b": 5, "c": 4, "d": 3, "e": 1}[name] for name in shard) for shard in shards]
+    assert sorted(loads) == [10, 10]
+    assert balance({"a": 1}, 4) == [["a"]]
+
+
+def test_planner_splits_oversized_directories() -> None:
+    """A dominant top-level directory is broken into its children."""
+    planner = ShardPlanner()
+    for index in range(8):
+        planner.add(f"./big/sub{index % 4}/f{index}.py")
+    planner.add("./small/x.py")
+    planner.add("./README.md")
+    partitions = planner.partitions(3)
+    roots = sorted(root for shard in partitions for root in shard)
+    assert roots == ["README.md", "big/sub0", "big/sub1", "big/sub2", "big/sub3", "small"]
+    assert len(partitions) == 3
+
+
+def test_planner_never_lists_files_below_max_depth() -> None:
+    """Directories at the depth limit stay whole so no file is dropped."""
+    planner = ShardPlanner(max_depth=1)
+    planner.add("a/b/c.py")
+    planner.add("a/d.py")
+    planner.add("e.py")
+    assert sorted(root for shard in planner.partitions(4) for root in shard) == ["a", "e.py"]
+    assert ShardPlanner().partitions(2) == []
+
+
+@requires_rg
+@pytest.mark.asyncio
+async def test_sharded_search_matches_single_process(tmp_path: Path) -> None:
+    """Sharded and single-process scans return the same hits with per-file order intact."""
+    for top in range(5):
+        for sub in range(3):
+            directory = tmp_path / f"pkg{top}" / f"mod{sub}"
+            directory.mkdir(parents=True)
+            (directory / "code.py").write_text("".join(f"token_{line} = 1\n" for line in range(20)))
+    (tmp_path / "root.py").write_text("token_root = 1\n")
+
+    single = RipgrepScanner(ImpactScanConfig(target_dir=str(tmp_path)))
+    sharded = RipgrepScanner(ImpactScanConfig(target_dir=str(tmp_path), ripgrep={"shards": 4, "queue_size": 3}))
+    single_hits = [(hit.file, hit.line_no) async for hit in single.search(must_keywords=["token_"])]
+    sharded_hits = [(hit.file, hit.line_no) async for hit in sharded.search(must_keywords=["token_"])]
+
+    assert sorted(single_hits) == sorted(sharded_hits)
+    assert sharded.last_stats.hits == len(single_hits) == 301
+    seen: list[str] = []
+    for file, _ in sharded_hits:
+        if not seen or seen[-1] != file:
+            assert file not in seen, "a file's hits must arrive contiguously"
+            seen.append(file)
+    for file in seen:
+        lines = [line for name, line in sharded_hits if name == file]
+        assert lines == sorted(lines)
+
+
+@pytest.mark.asyncio
+async def test_closing_a_sharded_search_stops_every_shard(tmp_path: Path) -> None:
+    """Every shard's ripgrep is gone once ``aclose()`` returns, not only after garbage collection."""
+    event = orjson.dumps(
+        {
+            "type": "match",
+            "data": {
+                "path": {"text": "f.py"},
+                "lines": {"text": "foo\n"},
+                "line_number": 1,
+                "absolute_offset": 0,
+                "submatches": [{"match": {"text": "foo"}, "start": 0, "end": 3}],
+            },
+        },
+    )
+    (tmp_path / "events.jsonl").write_bytes((event + b"\n") * 20000)
+    pids = tmp_path / "pids"
+    pids.mkdir()
+    script = tmp_path / "fake-rg"
+    script.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{sys.executable}
+            import os, sys
+            open(os.path.join({str(pids)!r}, str(os.getpid())), "w").close()
+            sys.stdout.buffer.write(open({str(tmp_path / "events.jsonl")!r}, "rb").read())
+            """,
+        ),
+    )
+    script.chmod(0o755)
+    config = ImpactScanConfig(target_dir=str(tmp_path), ripgrep={"shards": 2, "queue_size": 4})
+    stream = RipgrepScanner(config, executable=str(script)).search(must_keywords=["foo"], paths=["a.py", "b.py"])
+    await anext(stream)
+    await stream.aclose()
+    started = sorted(int(path.name) for path in pids.iterdir())
+    assert started
+    for pid in started:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)